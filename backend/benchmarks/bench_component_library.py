@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la biblioteca de componentes en layouts comunes.
+
+Indexa un corpus de landings (los HTML de ejemplo del repositorio y los .html
+de `benchmarks/corpus/`) y simula una nueva generación para un prompt parecido:
+la respuesta del modelo usa una referencia por cada componente ofrecido y
+escribe completo el resto de la página. Compara tokens de salida y latencia
+estimada contra escribir la página completa, incluyendo los tokens extra del
+prompt y el tiempo de extracción y expansión.
+
+Uso:
+    python benchmarks/bench_component_library.py [--tokens-por-segundo 60]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_prompt_minify import cargar_corpus
+from services.component_library import (
+    ComponentLibrary,
+    extract_components,
+    extract_texts,
+    render_candidates_for_prompt
+)
+from utils.token_count import estimate_tokens
+
+PROMPT_ORIGINAL = "Landing page para una empresa de tecnología con servicios, testimonios y contacto"
+PROMPT_NUEVO = "Landing para una consultora de tecnología con servicios, contacto y testimonios"
+
+
+def respuesta_simulada(html: str, candidatos: list) -> str:
+    """Reemplaza en la página cada sección de un tipo ofrecido por su referencia."""
+    por_tipo = {c["type"]: c for c in candidatos}
+    for tipo, fragmento, _ in extract_components(html):
+        candidato = por_tipo.pop(tipo, None)
+        if candidato is None:
+            continue
+        textos = (extract_texts(fragmento) + candidato["texts"])[:len(candidato["texts"])]
+        referencia = f"<!-- componente:{candidato['id']} {json.dumps(textos, ensure_ascii=False)} -->"
+        html = html.replace(fragmento, referencia, 1)
+        # El CSS del componente tampoco lo escribe el modelo
+        for regla in candidato["css"].split("\n"):
+            if regla.strip() and len(regla.strip()) > 3:
+                html = html.replace(regla, "", 1)
+    return html
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens-por-segundo", type=float, default=60.0)
+    args = parser.parse_args()
+    
+    print(f"{'página':<26}{'comp.':>6}{'salida':>8}{'con ref.':>10}{'prompt +':>10}{'latencia':>10}{'con ref.':>10}{'expandir (ms)':>15}")
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        for ruta in cargar_corpus():
+            html = open(ruta, encoding="utf-8").read()
+            biblioteca = ComponentLibrary(os.path.join(directorio, os.path.basename(ruta) + ".db"))
+            biblioteca.index_page(html, PROMPT_ORIGINAL)
+            
+            candidatos = biblioteca.find_candidates(PROMPT_NUEVO)
+            respuesta = respuesta_simulada(html, candidatos)
+            
+            inicio = time.perf_counter()
+            biblioteca.expand_references(respuesta, candidatos)
+            ms_expandir = (time.perf_counter() - inicio) * 1000
+            
+            salida, salida_ref = estimate_tokens(html), estimate_tokens(respuesta)
+            prompt_extra = estimate_tokens(render_candidates_for_prompt(candidatos))
+            # El prefill es ~20 veces más rápido que la decodificación
+            latencia = salida / args.tokens_por_segundo
+            latencia_ref = salida_ref / args.tokens_por_segundo + prompt_extra / (args.tokens_por_segundo * 20)
+            
+            print(f"{os.path.basename(ruta)[:25]:<26}{len(candidatos):>6}{salida:>8}{salida_ref:>10}"
+                  f"{prompt_extra:>10}{latencia:>9.1f}s{latencia_ref:>9.1f}s{ms_expandir:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
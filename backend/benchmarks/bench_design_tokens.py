@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los design tokens: costo de un cambio de paleta con y sin modelo.
+
+Para cada página del corpus (los HTML de ejemplo del repositorio y los .html de
+`benchmarks/corpus/`) extrae los design tokens y simula un cambio de paleta:
+reescribir localmente las variables de color vs. pedirle al modelo la página
+completa con los colores nuevos. Informa cuántos literales se reemplazaron, el
+tiempo de extracción y de aplicación, el tamaño del diff resultante y los
+tokens de salida que se evitan.
+
+El corpus incluye además una página sintética con colores dentro de textos
+entre comillas y de `url(...)` (rutas, `content`, data URIs SVG y base64), que
+no deben reescribirse, y otra que carga fuentes web con `@import`, que debe
+seguir antes de cualquier regla (el `:root` nuevo va después). La columna
+`intacto` verifica ambas cosas para cada página.
+
+Uso:
+    python benchmarks/bench_design_tokens.py [--tokens-por-segundo 60]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_prompt_minify import cargar_corpus
+from utils.design_tokens import apply_design_tokens, extract_design_tokens, read_design_tokens
+from utils.html_diff import compute_html_patch, patch_size
+from utils.token_count import estimate_tokens
+
+# Colores que aparecen dentro de textos y URLs: la extracción no debe tocarlos
+PAGINA_TEXTOS_Y_URLS = """<!DOCTYPE html>
+<html lang="es">
+<head>
+    <style>
+        .logo { color: #333; background: url("img#333.png") no-repeat; border-color: #333; }
+        .badge::before { content: "#333 white"; color: white; background: #333; }
+        .hero { background-image: url("data:image/svg+xml;utf8,<svg xmlns='http://www.w3.org/2000/svg'><path fill='#fff'/></svg>"); color: #fff; }
+        .card { background: url(data:image/png;base64,iVBORw0KGgo=) #fff; padding: 16px; margin: 16px; gap: 16px; }
+    </style>
+</head>
+<body>
+    <div class="logo" style="color: #333; background: url('fondo#333.png')">Logo</div>
+</body>
+</html>
+"""
+
+# Fuentes web con @import: el :root agregado no puede quedar antes del @import
+PAGINA_IMPORT = """<!DOCTYPE html>
+<html lang="es">
+<head>
+    <style>
+        @charset "utf-8";
+        @import url("https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap");
+        body { font-family: "Inter", sans-serif; color: #1f2937; padding: 24px; }
+        h1 { color: #1f2937; margin: 24px 0; }
+        .cta { background: #2563eb; color: white; padding: 12px 24px; }
+        .cta:hover { background: #2563eb; }
+    </style>
+</head>
+<body>
+    <h1>Hola</h1>
+    <a class="cta" href="#">Empezar</a>
+</body>
+</html>
+"""
+
+_PROTEGIDO = re.compile(r""""[^"]*"|'[^']*'|url\([^()]*\)""")
+
+
+def cargar_paginas() -> list:
+    """Devuelve (nombre, HTML) de cada página del corpus, incluida la sintética."""
+    paginas = [(os.path.basename(ruta), open(ruta, encoding="utf-8").read()) for ruta in cargar_corpus()]
+    return paginas + [
+        ("textos-y-urls (sintética)", PAGINA_TEXTOS_Y_URLS),
+        ("import-fuentes (sintética)", PAGINA_IMPORT)
+    ]
+
+
+def textos_intactos(original: str, con_tokens: str) -> bool:
+    """Si cada texto entre comillas y cada `url(...)` del CSS original sigue igual."""
+    return all(
+        texto in con_tokens
+        for estilo in re.findall(r"<style\b[^>]*>(.*?)</style>|style=\"([^\"]*)\"", original, re.DOTALL)
+        for texto in _PROTEGIDO.findall("".join(estilo))
+    )
+
+
+def imports_al_principio(html: str) -> bool:
+    """Si en cada `<style>` todos los `@import` siguen antes de la primera regla."""
+    for estilo in re.findall(r"<style\b[^>]*>(.*?)</style>", html, re.DOTALL):
+        css = _PROTEGIDO.sub("''", re.sub(r"/\*.*?\*/", "", estilo, flags=re.DOTALL))
+        primera_regla = css.find("{")
+        if primera_regla != -1 and css.rfind("@import") > primera_regla:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens-por-segundo", type=float, default=60.0)
+    args = parser.parse_args()
+    
+    print(f"{'página':<26}{'tokens':>8}{'usos':>6}{'extraer (ms)':>14}{'aplicar (ms)':>14}"
+          f"{'diff (B)':>10}{'modelo (tok)':>14}{'modelo (s)':>12}{'intacto':>9}")
+    
+    for nombre, html in cargar_paginas():
+        inicio = time.perf_counter()
+        con_tokens = extract_design_tokens(html)
+        ms_extraer = (time.perf_counter() - inicio) * 1000
+        
+        tokens = read_design_tokens(con_tokens)
+        usos = con_tokens.count("var(--")
+        
+        # Cambio de paleta: todos los colores a un mismo valor nuevo
+        cambios = {nombre: "#1e3a8a" for nombre in tokens if nombre.startswith("--color")}
+        inicio = time.perf_counter()
+        reskin = apply_design_tokens(con_tokens, cambios)
+        ms_aplicar = (time.perf_counter() - inicio) * 1000
+        
+        diff = patch_size(compute_html_patch(con_tokens, reskin))
+        salida_modelo = estimate_tokens(con_tokens)
+        
+        intacto = "sí" if textos_intactos(html, con_tokens) and imports_al_principio(con_tokens) else "NO"
+        print(f"{nombre[:25]:<26}{len(tokens):>8}{usos:>6}{ms_extraer:>14.2f}{ms_aplicar:>14.2f}"
+              f"{diff:>10}{salida_modelo:>14}{salida_modelo / args.tokens_por_segundo:>11.1f}s{intacto:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark del diff compacto de /api/modify-landing.
+
+Genera páginas sintéticas de ~30 a ~100 KB con la estructura típica de las
+landings generadas, les aplica modificaciones representativas (cambio de
+paleta, cambio de texto, nueva sección) y mide el tiempo de cálculo del diff
+y el tamaño de la respuesta frente a devolver la página completa.
+
+Como en el servicio, la modificación se aplica sobre la página minificada (la
+que ve el modelo) y el formato original se recupera con `preserve_formatting`
+antes de calcular el diff.
+
+Uso:
+    python benchmarks/bench_html_diff.py [--repeticiones 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.html_diff import apply_html_patch, compute_html_patch, patch_size
+from utils.html_minify import minify_html, preserve_formatting
+
+
+def construir_pagina(secciones: int) -> str:
+    """Construye una landing sintética con `secciones` secciones de contenido."""
+    estilos = []
+    cuerpo = []
+    for i in range(secciones):
+        estilos.append(f"""
+        .seccion-{i} {{
+            padding: 80px 20px;
+            background: #f4f6fb;
+            color: #1f2937;
+        }}
+        .seccion-{i} h2 {{
+            font-size: 2rem;
+            color: #1e40af;
+            margin-bottom: 24px;
+        }}
+        .seccion-{i} .tarjeta:hover {{
+            transform: translateY(-4px);
+            box-shadow: 0 10px 30px rgba(0, 0, 0, 0.1);
+        }}""")
+        tarjetas = "\n".join(
+            f"""                <div class="tarjeta">
+                    <h3>Servicio {i}.{j}</h3>
+                    <p>Descripción detallada del servicio {j} con beneficios concretos para el cliente.</p>
+                    <a href="#contacto" class="boton">Más información</a>
+                </div>""" for j in range(4)
+        )
+        cuerpo.append(f"""        <section class="seccion-{i}" id="seccion-{i}">
+            <h2>Sección número {i}</h2>
+            <div class="grilla">
+{tarjetas}
+            </div>
+        </section>""")
+    
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Landing de prueba</title>
+    <style>{"".join(estilos)}
+    </style>
+</head>
+<body>
+    <header><nav><a href="#">Inicio</a><a href="#contacto">Contacto</a></nav></header>
+    <main>
+{chr(10).join(cuerpo)}
+    </main>
+    <footer id="contacto"><p>Contacto: info@ejemplo.com</p></footer>
+</body>
+</html>"""
+
+
+MODIFICACIONES = {
+    "cambio de paleta": lambda html: html.replace("#1e40af", "#0f766e").replace("#f4f6fb", "#f0fdfa"),
+    "cambio de texto": lambda html: html.replace("Sección número 3<", "Nuestros clientes opinan<", 1),
+    "nueva sección": lambda html: html.replace(
+        "</main>",
+        '<section class="testimonios"><h2>Testimonios</h2><p>"Excelente servicio"</p></section></main>'
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+    
+    print(f"{'página':>8} {'modificación':<18}{'formato (ms)':>13}{'diff (ms)':>10}{'completa (B)':>14}"
+          f"{'diff (B)':>10}{'ahorro':>8}")
+    for secciones in (18, 36, 56):
+        base = construir_pagina(secciones)
+        for nombre, modificar in MODIFICACIONES.items():
+            respuesta_modelo = modificar(minify_html(base))
+            
+            inicio = time.perf_counter()
+            for _ in range(args.repeticiones):
+                nuevo = preserve_formatting(base, respuesta_modelo)
+            ms_formato = (time.perf_counter() - inicio) * 1000 / args.repeticiones
+            
+            inicio = time.perf_counter()
+            for _ in range(args.repeticiones):
+                patch = compute_html_patch(base, nuevo)
+            ms = (time.perf_counter() - inicio) * 1000 / args.repeticiones
+            
+            assert apply_html_patch(base, patch) == nuevo
+            completa = len(json.dumps({"html": nuevo}, ensure_ascii=False).encode("utf-8"))
+            diff = patch_size(patch)
+            print(f"{len(base) // 1024:>6}KB {nombre:<18}{ms_formato:>13.1f}{ms:>10.1f}{completa:>14}{diff:>10}"
+                  f"{1 - diff / completa:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark del post-procesado de la respuesta del modelo: cascada de regex vs. una pasada.
+
+Para cada página del corpus (los HTML de ejemplo del repositorio y los .html de
+`benchmarks/corpus/`) arma variantes como las que devuelve el modelo (documento
+completo, envuelto en bloques markdown, fragmento sin esqueleto, etiquetas en
+mayúsculas, páginas grandes) y compara la implementación anterior de
+`generate_code` (copiada abajo como referencia) con `normalize_html_document`.
+Verifica que la salida sea idéntica en todas las variantes e informa el tiempo
+medio de cada una y la aceleración.
+
+Uso:
+    python benchmarks/bench_html_normalize.py [--repeticiones 50]
+"""
+
+import argparse
+import os
+import re
+import sys
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_prompt_minify import cargar_corpus, cronometrar
+from utils.html_normalize import normalize_html_document
+
+
+def legacy_clean_html_code(html_code: str) -> str:
+    """Referencia: limpieza anterior de `generate_code`."""
+    if html_code.startswith('```html'):
+        html_code = html_code.replace('```html', '').replace('```', '').strip()
+    elif html_code.startswith('```'):
+        html_code = html_code.replace('```', '').strip()
+    
+    html_code = html_code.strip()
+    
+    return html_code
+
+
+def legacy_ensure_complete_html_structure(html_code: str) -> str:
+    """Referencia: reparación de estructura anterior de `generate_code`."""
+    has_doctype = html_code.lower().startswith('<!doctype html>')
+    has_html_tag = '<html' in html_code.lower()
+    has_head_tag = '<head>' in html_code.lower() or '<head ' in html_code.lower()
+    has_body_tag = '<body>' in html_code.lower() or '<body ' in html_code.lower()
+    
+    if has_doctype and has_html_tag and has_head_tag and has_body_tag:
+        return html_code
+    
+    if not has_doctype or not has_html_tag:
+        title = "Landing Page"
+        if '<title>' in html_code:
+            title_match = re.search(r'<title>(.*?)</title>', html_code, re.IGNORECASE)
+            if title_match:
+                title = title_match.group(1)
+        
+        styles = """
+        body {
+            margin: 0;
+            padding: 20px;
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            line-height: 1.6;
+            color: #333;
+        }
+        * {
+            box-sizing: border-box;
+        }
+        """
+        
+        if '<style>' in html_code:
+            style_match = re.search(r'<style>(.*?)</style>', html_code, re.DOTALL | re.IGNORECASE)
+            if style_match:
+                styles = style_match.group(1)
+        
+        body_content = html_code
+        body_content = re.sub(r'<!DOCTYPE[^>]*>', '', body_content, flags=re.IGNORECASE)
+        body_content = re.sub(r'</?html[^>]*>', '', body_content, flags=re.IGNORECASE)
+        body_content = re.sub(r'<head>.*?</head>', '', body_content, flags=re.DOTALL | re.IGNORECASE)
+        body_content = re.sub(r'</?body[^>]*>', '', body_content, flags=re.IGNORECASE)
+        body_content = re.sub(r'<style>.*?</style>', '', body_content, flags=re.DOTALL | re.IGNORECASE)
+        body_content = body_content.strip()
+        
+        complete_html = f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>{styles}</style>
+</head>
+<body>
+    {body_content}
+</body>
+</html>"""
+        
+        return complete_html
+    
+    return html_code
+
+
+def legacy_postprocess(html_code: str) -> str:
+    return legacy_ensure_complete_html_structure(legacy_clean_html_code(html_code))
+
+
+def variantes(html: str) -> dict:
+    """Respuestas del modelo derivadas de una página del corpus."""
+    cuerpo = re.search(r"<body[^>]*>(.*)</body>", html, re.DOTALL | re.IGNORECASE)
+    cuerpo = cuerpo.group(1) if cuerpo else html
+    estilo = re.search(r"<style>.*?</style>", html, re.DOTALL | re.IGNORECASE)
+    estilo = estilo.group(0) if estilo else ""
+    sin_doctype = re.sub(r"<!DOCTYPE[^>]*>", "", html, flags=re.IGNORECASE)
+    
+    return {
+        "documento": html,
+        "```html": f"```html\n{html}\n```",
+        "```": f"```\n{html}\n```",
+        "espacios": f"\n\n   {html}  \n",
+        "sin doctype": sin_doctype,
+        "sin head/body": re.sub(r"</?(?:head|body)[^>]*>", "", html, flags=re.IGNORECASE),
+        "fragmento": cuerpo,
+        "frag. título/estilo": f"<title>Oferta</title>\n{estilo}\n{cuerpo}",
+        "```html fragmento": f"```html\n{estilo}\n{cuerpo}\n```",
+        "mayúsculas": sin_doctype.replace("<head>", "<HEAD>").replace("<body", "<BODY")
+                                 .replace("<style>", "<STYLE>").replace("</style>", "</STYLE>"),
+        "grande (x20)": sin_doctype * 20,
+        "grande completo": html.replace("</body>", cuerpo * 20 + "</body>"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+    
+    print(f"{'página':<26}{'variante':<22}{'KB':>8}{'cascada (ms)':>14}{'una pasada (ms)':>17}{'aceleración':>13}")
+    
+    diferencias = 0
+    total_antes = total_despues = 0.0
+    for ruta in cargar_corpus():
+        html = open(ruta, encoding="utf-8").read()
+        for nombre, entrada in variantes(html).items():
+            esperado, ms_antes = cronometrar(legacy_postprocess, entrada, args.repeticiones)
+            obtenido, ms_despues = cronometrar(normalize_html_document, entrada, args.repeticiones)
+            if obtenido != esperado:
+                diferencias += 1
+                print(f"  DIFERENCIA: {os.path.basename(ruta)} / {nombre}")
+            total_antes += ms_antes
+            total_despues += ms_despues
+            
+            print(f"{os.path.basename(ruta)[:25]:<26}{nombre:<22}{len(entrada) / 1024:>8.1f}"
+                  f"{ms_antes:>14.3f}{ms_despues:>17.3f}{ms_antes / max(ms_despues, 1e-9):>12.1f}x")
+    
+    print(f"\nTotal: {total_antes:.2f} ms -> {total_despues:.2f} ms "
+          f"({total_antes / max(total_despues, 1e-9):.1f}x); salidas distintas: {diferencias}")
+    if diferencias:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga de extremo a extremo contra completions simuladas.
+
+Levanta `llm_stub.LLMStub` y la aplicación con uvicorn en un proceso aparte
+(con bases de datos y directorios temporales), y le envía peticiones a
+`/api/generate-landing` y `/api/modify-landing` con cada nivel de concurrencia
+fijo: cada uno de los N clientes envía la siguiente petición en cuanto recibe la
+respuesta anterior. Informa el throughput, la latencia p50/p95/p99 y la tasa de
+errores, y guarda los resultados en JSON para comparar versiones.
+
+Uso:
+    python benchmarks/bench_load.py [--concurrencias 1,4,16] [--peticiones 48]
+        [--latencia-base 0.3] [--tokens-por-segundo 80] [--tokens-pagina 1500]
+        [--salida benchmarks/results/load.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.llm_stub import LLMStub
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROMPTS = [
+    "Landing para una cafetería artesanal con menú y reservas",
+    "Página de un estudio de arquitectura minimalista con portfolio",
+    "Landing de una app de finanzas personales con planes de precios",
+    "Sitio de una academia de idiomas online con testimonios y FAQ",
+]
+
+INSTRUCCIONES = [
+    "Cambia el color principal a verde oscuro",
+    "Agrega una sección de testimonios antes del footer",
+    "Haz el título principal más corto y directo",
+    "Agrega un botón de WhatsApp flotante",
+]
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_aplicacion(
+    puerto: int,
+    openai_url: str,
+    directorio: str,
+    backend_dir: str = BACKEND_DIR
+) -> subprocess.Popen:
+    """Arranca la aplicación de `backend_dir` con uvicorn, con sus datos en un directorio temporal."""
+    entorno = {
+        **os.environ,
+        "TRAFFIC_RECORD_PATH": "",
+        "OPENAI_BASE_URL": openai_url,
+        "OPENAI_API_KEY": "sk-benchmark",
+        "JOBS_DB_PATH": os.path.join(directorio, "jobs.db"),
+        "COMPONENTS_DB_PATH": os.path.join(directorio, "components.db"),
+        "PUBLISH_DIR": os.path.join(directorio, "published"),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(puerto), "--log-level", "warning"],
+        cwd=backend_dir,
+        env=entorno
+    )
+
+
+async def esperar_aplicacion(cliente: httpx.AsyncClient, proceso: subprocess.Popen, timeout: float = 60) -> None:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"La aplicación terminó al arrancar (código {proceso.returncode})")
+        try:
+            if (await cliente.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("La aplicación no respondió a /api/health")
+
+
+def cuerpo_peticion(endpoint: str, i: int, html_base: str) -> Dict:
+    if endpoint == "generate":
+        return {"prompt": PROMPTS[i % len(PROMPTS)]}
+    return {
+        "currentHTML": html_base,
+        "modificationRequest": INSTRUCCIONES[i % len(INSTRUCCIONES)],
+        "conversationHistory": []
+    }
+
+
+def es_error(respuesta: httpx.Response) -> bool:
+    return respuesta.status_code != 200
+
+
+async def medir_nivel(
+    cliente: httpx.AsyncClient,
+    endpoint: str,
+    concurrencia: int,
+    peticiones: int,
+    html_base: str
+) -> Dict:
+    """Envía `peticiones` peticiones con `concurrencia` clientes en bucle cerrado."""
+    ruta = "/api/generate-landing" if endpoint == "generate" else "/api/modify-landing"
+    latencias: List[float] = []
+    estados: Dict[str, int] = {}
+    errores = 0
+    siguiente = 0
+    
+    async def trabajador():
+        nonlocal siguiente, errores
+        while siguiente < peticiones:
+            i = siguiente
+            siguiente += 1
+            inicio = time.perf_counter()
+            try:
+                respuesta = await cliente.post(ruta, json=cuerpo_peticion(endpoint, i, html_base))
+                estado = str(respuesta.status_code)
+                fallo = es_error(respuesta)
+            except httpx.HTTPError as e:
+                estado, fallo = type(e).__name__, True
+            latencias.append(time.perf_counter() - inicio)
+            estados[estado] = estados.get(estado, 0) + 1
+            errores += fallo
+    
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+    
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrencia,
+        "requests": peticiones,
+        "errors": errores,
+        "error_rate": errores / peticiones,
+        "duration_s": round(duracion, 3),
+        "throughput_rps": round((peticiones - errores) / duracion, 3),
+        "latency_ms": resumen_latencias(latencias),
+        "status_codes": estados
+    }
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada."""
+    indice = max(0, min(len(valores) - 1, round(p / 100 * len(valores) + 0.5) - 1))
+    return valores[indice]
+
+
+def resumen_latencias(latencias: List[float]) -> Dict[str, float]:
+    valores = sorted(latencia * 1000 for latencia in latencias)
+    return {
+        "p50": round(percentil(valores, 50), 1),
+        "p95": round(percentil(valores, 95), 1),
+        "p99": round(percentil(valores, 99), 1),
+        "mean": round(sum(valores) / len(valores), 1),
+        "max": round(valores[-1], 1)
+    }
+
+
+def version_actual(backend_dir: str = BACKEND_DIR) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=backend_dir,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def ejecutar(args) -> Dict:
+    stub = LLMStub(args.latencia_base, args.tokens_por_segundo, args.tokens_pagina).start()
+    puerto = puerto_libre()
+    concurrencias = [int(c) for c in args.concurrencias.split(",")]
+    endpoints = args.endpoints.split(",")
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        proceso = iniciar_aplicacion(puerto, stub.url, directorio)
+        limites = httpx.Limits(max_connections=max(concurrencias) + 4, max_keepalive_connections=max(concurrencias) + 4)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{puerto}", timeout=300, limits=limites) as cliente:
+                await esperar_aplicacion(cliente, proceso)
+                
+                # Calentamiento (no se mide): también da la página base de las modificaciones
+                respuesta = await cliente.post("/api/generate-landing", json={"prompt": PROMPTS[0]})
+                respuesta.raise_for_status()
+                html_base = respuesta.json()["data"]["html"]
+                await cliente.post("/api/modify-landing", json=cuerpo_peticion("modify", 0, html_base))
+                
+                resultados = []
+                for endpoint in endpoints:
+                    for concurrencia in concurrencias:
+                        resultado = await medir_nivel(cliente, endpoint, concurrencia, args.peticiones, html_base)
+                        resultados.append(resultado)
+                        imprimir_fila(resultado)
+        finally:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+            stub.stop()
+    
+    return {
+        "benchmark": "load",
+        "version": version_actual(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            "concurrencies": concurrencias,
+            "requests_per_level": args.peticiones,
+            "llm_base_latency_s": args.latencia_base,
+            "llm_tokens_per_second": args.tokens_por_segundo,
+            "llm_page_tokens": args.tokens_pagina
+        },
+        "llm": stub.stats(),
+        "results": resultados
+    }
+
+
+def imprimir_fila(r: Dict) -> None:
+    lat = r["latency_ms"]
+    print(f"{r['endpoint']:<10}{r['concurrency']:>6}{r['throughput_rps']:>10.2f}"
+          f"{lat['p50']:>10.0f}{lat['p95']:>10.0f}{lat['p99']:>10.0f}{r['error_rate'] * 100:>9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrencias", default="1,4,16", help="niveles de concurrencia, separados por comas")
+    parser.add_argument("--peticiones", type=int, default=48, help="peticiones por endpoint y nivel")
+    parser.add_argument("--endpoints", default="generate,modify")
+    parser.add_argument("--latencia-base", type=float, default=0.3, help="segundos antes del primer token")
+    parser.add_argument("--tokens-por-segundo", type=float, default=80)
+    parser.add_argument("--tokens-pagina", type=int, default=1500)
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto benchmarks/results/load-<versión>-<fecha>.json)")
+    args = parser.parse_args()
+    
+    print(f"{'endpoint':<10}{'conc.':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>10}")
+    informe = asyncio.run(ejecutar(args))
+    
+    salida = args.salida or os.path.join(
+        BACKEND_DIR, "benchmarks", "results",
+        f"load-{informe['version'] or 'local'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
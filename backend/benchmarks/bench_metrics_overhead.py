@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark del costo de registrar métricas en el camino caliente.
+
+Mide el tiempo por operación de `Histogram.observe` y `Counter.inc` (shards por
+hilo, sin locks) frente a la misma cuenta protegida con un lock global, con 1 y
+con varios hilos registrando a la vez, y el tiempo de generar la exposición de
+`/metrics`.
+
+Uso:
+    python benchmarks/bench_metrics_overhead.py [--operaciones 200000] [--hilos 8]
+"""
+
+import argparse
+import bisect
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.metrics import LATENCY_BUCKETS, Counter, Histogram, render_metrics
+
+
+class HistogramaConLock:
+    """Referencia: un único conjunto de celdas protegido por un lock."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._celdas = {}
+    
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            celdas = self._celdas.setdefault(key, [0] * (len(LATENCY_BUCKETS) + 3))
+            celdas[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+            celdas[-2] += value
+            celdas[-1] += 1
+
+
+def ns_por_operacion(registrar, operaciones: int, hilos: int) -> float:
+    por_hilo = operaciones // hilos
+    
+    def trabajo(_):
+        for i in range(por_hilo):
+            registrar(i)
+    
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        list(executor.map(trabajo, range(hilos)))
+    return (time.perf_counter() - inicio) * 1e9 / (por_hilo * hilos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operaciones", type=int, default=200000)
+    parser.add_argument("--hilos", type=int, default=8)
+    args = parser.parse_args()
+    
+    histograma = Histogram("bench_latencia_seconds", "benchmark", ("route",))
+    contador = Counter("bench_eventos", "benchmark", ("route",))
+    referencia = HistogramaConLock()
+    
+    casos = [
+        ("Histogram.observe (shards)", lambda i: histograma.observe(i % 7 * 0.01, route="/api/x")),
+        ("Counter.inc (shards)", lambda i: contador.inc(route="/api/x")),
+        ("histograma con lock", lambda i: referencia.observe(i % 7 * 0.01, route="/api/x")),
+    ]
+    print(f"{'operación':<30}{'1 hilo (ns)':>14}{f'{args.hilos} hilos (ns)':>16}")
+    for nombre, registrar in casos:
+        uno = ns_por_operacion(registrar, args.operaciones, 1)
+        varios = ns_por_operacion(registrar, args.operaciones, args.hilos)
+        print(f"{nombre:<30}{uno:>14.0f}{varios:>16.0f}")
+    
+    inicio = time.perf_counter()
+    texto = render_metrics()
+    print(f"\nExposición de /metrics: {(time.perf_counter() - inicio) * 1000:.2f} ms, {len(texto)} bytes")
+
+
+if __name__ == "__main__":
+    main()
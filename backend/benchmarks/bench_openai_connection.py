@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark del costo de conexión del cliente de OpenAI.
+
+Compara la latencia de la primera petición (DNS + TCP + TLS + petición) y de
+las peticiones en régimen estable para tres configuraciones del cliente:
+sin keep-alive (cada petición abre una conexión), con el pool de conexiones
+pero sin precalentar, y con el pool precalentado como en el arranque de la app.
+Si el paquete `h2` está instalado, repite la medición con HTTP/2.
+
+Por defecto usa un servidor local que simula el costo de abrir una conexión
+(`--costo-conexion`), así que no consume cuota ni necesita red. Con `--real`
+mide contra la API de OpenAI (`GET /models`, que no consume tokens).
+
+Uso:
+    python benchmarks/bench_openai_connection.py [--peticiones 20] [--costo-conexion 0.15]
+    python benchmarks/bench_openai_connection.py --real
+"""
+
+import argparse
+import importlib.util
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import openai
+from utils import openai_client
+
+# Tamaño del pool keep-alive según la configuración de la aplicación
+KEEPALIVE_CONFIGURADO = openai_client.MAX_KEEPALIVE_CONNECTIONS
+
+
+def iniciar_servidor_local(costo_conexion: float) -> ThreadingHTTPServer:
+    """Levanta un servidor HTTP/1.1 keep-alive que tarda `costo_conexion` en aceptar cada conexión."""
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def setup(self):
+            # Simula DNS + handshake TCP/TLS: se paga una vez por conexión
+            time.sleep(costo_conexion)
+            super().setup()
+        
+        def do_GET(self):
+            cuerpo = b'{"object": "list", "data": []}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+        
+        def log_message(self, *args):
+            pass
+    
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def peticion(gestor: openai_client.OpenAIClientManager) -> float:
+    """Hace una petición liviana y devuelve su duración en segundos."""
+    inicio = time.perf_counter()
+    try:
+        gestor.get_client().with_options(max_retries=0).models.list()
+    except openai.APIStatusError:
+        # Sin API key válida la respuesta es 401, pero la conexión se usó igual
+        pass
+    return time.perf_counter() - inicio
+
+
+def medir(nombre: str, peticiones: int, keepalive: bool, precalentar: bool, http2: bool) -> dict:
+    """Crea un cliente con la configuración pedida y mide la primera petición y las siguientes."""
+    openai_client.HTTP2_ENABLED = http2
+    openai_client.MAX_KEEPALIVE_CONNECTIONS = KEEPALIVE_CONFIGURADO if keepalive else 0
+    
+    gestor = openai_client.OpenAIClientManager()
+    try:
+        if precalentar:
+            gestor.warm_up()
+        else:
+            gestor.get_client()
+        
+        primera = peticion(gestor)
+        siguientes = [peticion(gestor) for _ in range(peticiones)]
+    finally:
+        gestor.close()
+    
+    return {
+        "config": nombre,
+        "primera_ms": primera * 1000,
+        "estable_ms": statistics.median(siguientes) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=20)
+    parser.add_argument("--costo-conexion", type=float, default=0.15,
+                        help="segundos que el servidor local tarda en aceptar cada conexión")
+    parser.add_argument("--real", action="store_true", help="medir contra la API real de OpenAI")
+    args = parser.parse_args()
+    
+    if not args.real:
+        servidor = iniciar_servidor_local(args.costo_conexion)
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{servidor.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    
+    # (nombre, keep-alive, precalentar, http2)
+    configuraciones = [
+        ("sin keep-alive", False, False, False),
+        ("pool, en frío", True, False, False),
+        ("pool, precalentado", True, True, False),
+    ]
+    if args.real and importlib.util.find_spec("h2") is not None:
+        configuraciones += [
+            ("HTTP/2, en frío", True, False, True),
+            ("HTTP/2, precalentado", True, True, True),
+        ]
+    
+    resultados = [medir(nombre, args.peticiones, keepalive, precalentar, http2)
+                  for nombre, keepalive, precalentar, http2 in configuraciones]
+    
+    print(f"{'configuración':<24}{'primera (ms)':>14}{'estable (ms)':>14}")
+    for r in resultados:
+        print(f"{r['config']:<24}{r['primera_ms']:>14.1f}{r['estable_ms']:>14.1f}")
+    
+    fria = next(r for r in resultados if r["config"] == "pool, en frío")
+    caliente = next(r for r in resultados if r["config"] == "pool, precalentado")
+    sin_pool = next(r for r in resultados if r["config"] == "sin keep-alive")
+    print(f"\n⚡ Primera petición: {fria['primera_ms'] - caliente['primera_ms']:.1f} ms menos con precalentamiento")
+    print(f"⚡ Régimen estable: {sin_pool['estable_ms'] - fria['estable_ms']:.1f} ms menos por petición con keep-alive")
+
+
+if __name__ == "__main__":
+    main()
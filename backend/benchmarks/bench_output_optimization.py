@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la etapa de salida: costo de optimizar y comprimir vs. bytes transferidos.
+
+Para cada página del corpus (los HTML de ejemplo del repositorio y los .html de
+`benchmarks/corpus/`) aplica en orden la poda de CSS sin uso y repetido, la
+minificación y la compresión gzip (y brotli si está instalado), e informa los
+bytes después de cada etapa (para la poda, la diferencia en bytes de la página
+tal como se entrega, y aparte la del CSS minificado), el tiempo de CPU de las tres etapas y el tiempo de transferencia ahorrado en un
+enlace lento respecto de enviar la página tal cual.
+La respuesta de la API es JSON, así que los bytes se miden sobre la página
+serializada como cadena JSON.
+
+Uso:
+    python benchmarks/bench_output_optimization.py [--mbps 1.5] [--repeticiones 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_prompt_minify import cargar_corpus, cronometrar
+from utils.compression import brotli, compress_body
+from utils.css_optimize import optimize_page_css
+from utils.html_minify import minify_html
+
+
+def tamano_json(html: str) -> int:
+    return len(json.dumps(html, ensure_ascii=False).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mbps", type=float, default=1.5, help="ancho de banda del enlace del cliente")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+    
+    codificaciones = ["gzip", "br"] if brotli is not None else ["gzip"]
+    if brotli is None:
+        print("brotli no está instalado: solo se mide gzip\n")
+    
+    def ms_transferencia(bytes_):
+        return bytes_ * 8 / (args.mbps * 1_000_000) * 1000
+    
+    encabezado = f"{'página':<26}{'original':>10}{'CSS podado':>12}{'CSS min.':>10}{'minif.':>9}"
+    encabezado += "".join(f"{c:>8}" for c in codificaciones)
+    encabezado += f"{'CPU (ms)':>10}{'ahorro red (ms)':>17}"
+    print(encabezado)
+    
+    totales = {"original": 0, "final": 0, "cpu": 0.0, "red": 0.0}
+    for ruta in cargar_corpus():
+        html = open(ruta, encoding="utf-8").read()
+        
+        (podado, stats), ms_poda = cronometrar(optimize_page_css, html, args.repeticiones)
+        minificado, ms_minify = cronometrar(minify_html, podado, args.repeticiones)
+        cuerpo = json.dumps(minificado, ensure_ascii=False).encode("utf-8")
+        
+        # La codificación preferida (la última de la lista) es la que se cuenta
+        comprimidos = {}
+        for codificacion in codificaciones:
+            comprimido, ms_compresion = cronometrar(
+                lambda b: compress_body(b, codificacion), cuerpo, args.repeticiones
+            )
+            comprimidos[codificacion] = len(comprimido)
+        
+        original = tamano_json(html)
+        final = comprimidos[codificaciones[-1]]
+        cpu = ms_poda + ms_minify + ms_compresion
+        ahorro_red = ms_transferencia(original) - ms_transferencia(final)
+        totales["original"] += original
+        totales["final"] += final
+        totales["cpu"] += cpu
+        totales["red"] += ahorro_red
+        
+        poda = tamano_json(podado) - original
+        poda_minificada = stats['css_bytes_after'] - stats['css_bytes_before']
+        fila = f"{os.path.basename(ruta)[:25]:<26}{original:>10}{poda:>12}{poda_minificada:>10}{len(cuerpo):>9}"
+        fila += "".join(f"{comprimidos[c]:>8}" for c in codificaciones)
+        fila += f"{cpu:>10.2f}{ahorro_red:>17.1f}"
+        print(fila)
+    
+    print(f"\nTotal: {totales['original']} B -> {totales['final']} B "
+          f"({1 - totales['final'] / max(totales['original'], 1):.0%} menos); "
+          f"CPU {totales['cpu']:.2f} ms vs. {totales['red']:.1f} ms de transferencia ahorrados a {args.mbps} Mbps")
+
+
+if __name__ == "__main__":
+    main()
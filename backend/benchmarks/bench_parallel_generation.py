@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia y tokens: generación secuencial vs. generación paralela por secciones.
+
+Reemplaza la llamada a OpenAI por una completion simulada cuya latencia depende
+de los tokens de entrada y salida, de modo que compara `generar_landing` con
+`generar_landing_paralela` sin gastar cuota ni depender de la red.
+
+Uso:
+    python benchmarks/bench_parallel_generation.py [--rondas 3] [--tokens-por-segundo 60]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services import generate_code
+
+
+def estimar_tokens(texto: str) -> int:
+    """Aproximación estándar de ~4 caracteres por token."""
+    return max(1, len(texto) // 4)
+
+
+class CompletionSimulada:
+    """
+    Completion falsa con latencia proporcional a los tokens procesados.
+    """
+    
+    def __init__(self, tokens_por_segundo: float, latencia_base: float, tokens_pagina: int):
+        self.tokens_por_segundo = tokens_por_segundo
+        self.latencia_base = latencia_base
+        self.tokens_pagina = tokens_pagina
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llamadas = 0
+        self._lock = threading.Lock()
+    
+    def __call__(self, messages, model="gpt-3.5-turbo", temperature=0.3, max_tokens=4000, cancel_token=None):
+        prompt = "\n".join(m["content"] for m in messages)
+        
+        if "director de arte" in messages[0]["content"]:
+            salida = self._esqueleto()
+        elif "Generá SOLO la sección" in prompt:
+            salida = self._seccion(self.tokens_pagina // 5)
+        else:
+            salida = self._pagina(self.tokens_pagina)
+        
+        tokens_entrada, tokens_salida = estimar_tokens(prompt), estimar_tokens(salida)
+        # El prefill es ~20 veces más rápido que la decodificación
+        time.sleep(self.latencia_base + tokens_entrada / (self.tokens_por_segundo * 20)
+                   + tokens_salida / self.tokens_por_segundo)
+        
+        with self._lock:
+            self.prompt_tokens += tokens_entrada
+            self.completion_tokens += tokens_salida
+            self.llamadas += 1
+        return salida
+    
+    @staticmethod
+    def _esqueleto() -> str:
+        return """{"title": "Demo", "palette": {"primary": "#1e40af", "text": "#111827"},
+        "typography": {"headings": "Inter", "body": "Inter"},
+        "css": ":root{--color-primary:#1e40af;--font-body:Inter,sans-serif}body{margin:0;font-family:var(--font-body)}",
+        "sections": [{"id": "header", "type": "header", "description": "nav"},
+                     {"id": "hero", "type": "hero", "description": "hero"},
+                     {"id": "servicios", "type": "content", "description": "servicios"},
+                     {"id": "testimonios", "type": "content", "description": "testimonios"},
+                     {"id": "footer", "type": "footer", "description": "contacto"}]}"""
+    
+    @staticmethod
+    def _seccion(tokens: int) -> str:
+        relleno = "<p>Contenido de ejemplo para la sección.</p>\n" * max(1, tokens * 4 // 45)
+        return f"<style>#s{{padding:40px}}</style>\n<section id=\"s\">\n{relleno}</section>"
+    
+    @staticmethod
+    def _pagina(tokens: int) -> str:
+        relleno = "<p>Contenido de ejemplo para la sección.</p>\n" * max(1, tokens * 4 // 45)
+        return ("<!DOCTYPE html>\n<html lang=\"es\">\n<head><title>Demo</title><style>body{margin:0}</style>"
+                f"</head>\n<body>\n{relleno}</body>\n</html>")
+
+
+def medir(nombre: str, funcion, simulada: CompletionSimulada, rondas: int) -> dict:
+    """Ejecuta `funcion` varias veces y devuelve latencia media y tokens por página."""
+    simulada.prompt_tokens = simulada.completion_tokens = simulada.llamadas = 0
+    inicio = time.perf_counter()
+    for _ in range(rondas):
+        funcion("Landing page para una consultora de tecnología con servicios y testimonios")
+    transcurrido = (time.perf_counter() - inicio) / rondas
+    
+    return {
+        "modo": nombre,
+        "latencia_s": transcurrido,
+        "llamadas": simulada.llamadas / rondas,
+        "prompt_tokens": simulada.prompt_tokens / rondas,
+        "completion_tokens": simulada.completion_tokens / rondas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rondas", type=int, default=3)
+    parser.add_argument("--tokens-por-segundo", type=float, default=60.0)
+    parser.add_argument("--latencia-base", type=float, default=0.4)
+    parser.add_argument("--tokens-pagina", type=int, default=3000)
+    args = parser.parse_args()
+    
+    simulada = CompletionSimulada(args.tokens_por_segundo, args.latencia_base, args.tokens_pagina)
+    generate_code.create_chat_completion = simulada
+    
+    resultados = [
+        medir("secuencial", generate_code.generar_landing, simulada, args.rondas),
+        medir("paralela", generate_code.generar_landing_paralela, simulada, args.rondas),
+    ]
+    
+    print(f"{'modo':<12}{'latencia (s)':>14}{'llamadas':>10}{'prompt tok':>12}{'compl. tok':>12}")
+    for r in resultados:
+        print(f"{r['modo']:<12}{r['latencia_s']:>14.2f}{r['llamadas']:>10.1f}"
+              f"{r['prompt_tokens']:>12.0f}{r['completion_tokens']:>12.0f}")
+    
+    speedup = resultados[0]["latencia_s"] / resultados[1]["latencia_s"]
+    print(f"\n⚡ Speedup de latencia: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
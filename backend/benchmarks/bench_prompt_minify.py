@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la minificación de currentHTML antes del prompt de modificación.
+
+Recorre un corpus de landings generadas (los HTML de ejemplo del repositorio y,
+si existe, cada archivo .html de `benchmarks/corpus/`), y reporta por página
+los tokens antes y después de minificar, el tiempo de minificación y de
+reindentado, y verifica que minificar el resultado reindentado reproduzca el
+mismo documento minificado.
+
+Uso:
+    python benchmarks/bench_prompt_minify.py [--repeticiones 20]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.html_minify import minify_html, pretty_print_html
+from utils.token_count import estimate_tokens, tiktoken
+
+RAIZ = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+def cargar_corpus() -> list:
+    """Devuelve la lista de rutas del corpus de landings."""
+    rutas = [os.path.join(RAIZ, nombre) for nombre in
+             ("demo_landing_page.html", "demo_frontend.html", "test-component.html")]
+    rutas += sorted(glob.glob(os.path.join(os.path.dirname(__file__), "corpus", "*.html")))
+    return [ruta for ruta in rutas if os.path.exists(ruta)]
+
+
+def cronometrar(funcion, argumento, repeticiones: int) -> tuple:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion(argumento)
+    return resultado, (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+    
+    print(f"Conteo de tokens: {'tiktoken' if tiktoken else 'aproximado (4 caracteres por token)'}\n")
+    print(f"{'página':<26}{'tokens':>8}{'minif.':>8}{'ahorro':>8}{'min (ms)':>10}{'pretty (ms)':>12}{'estable':>9}")
+    
+    total_antes = total_despues = 0
+    for ruta in cargar_corpus():
+        html = open(ruta, encoding="utf-8").read()
+        minificado, ms_minify = cronometrar(minify_html, html, args.repeticiones)
+        legible, ms_pretty = cronometrar(pretty_print_html, minificado, args.repeticiones)
+        
+        antes, despues = estimate_tokens(html), estimate_tokens(minificado)
+        total_antes += antes
+        total_despues += despues
+        estable = minify_html(legible) == minificado
+        
+        print(f"{os.path.basename(ruta)[:25]:<26}{antes:>8}{despues:>8}{1 - despues / antes:>8.1%}"
+              f"{ms_minify:>10.2f}{ms_pretty:>12.2f}{'sí' if estable else 'NO':>9}")
+    
+    if total_antes:
+        print(f"\n💰 Tokens ahorrados en el corpus: {total_antes - total_despues} "
+              f"de {total_antes} ({1 - total_despues / total_antes:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark del costo de Server-Timing y del perfilado por muestreo.
+
+Mide el tiempo por petición de `ServerTimingMiddleware` sobre una aplicación
+ASGI mínima que registra cinco etapas, frente a la misma aplicación sin el
+middleware, con el profiler apagado y con una sesión de perfilado activa, y el
+costo de una etapa (`stage`) con y sin una petición en curso.
+
+Uso:
+    python benchmarks/bench_server_timing.py [--peticiones 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.sampling_profiler import get_sampling_profiler
+from utils.server_timing import ServerTimingMiddleware, StageTimings, _registro, stage
+
+ETAPAS = ("validation", "prompt", "llm", "parse", "postprocess")
+
+
+async def aplicacion(scope, receive, send):
+    for nombre in ETAPAS:
+        with stage(nombre):
+            pass
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/html")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def us_por_peticion(app, peticiones: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/x", "headers": []}
+    
+    async def receive():
+        return {"type": "http.request", "body": b""}
+    
+    async def send(message):
+        pass
+    
+    inicio = time.perf_counter()
+    for _ in range(peticiones):
+        await app(scope, receive, send)
+    return (time.perf_counter() - inicio) * 1e6 / peticiones
+
+
+def ns_por_etapa(operaciones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(operaciones):
+        with stage("prompt"):
+            pass
+    return (time.perf_counter() - inicio) * 1e9 / operaciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=20000)
+    args = parser.parse_args()
+    
+    middleware = ServerTimingMiddleware(aplicacion)
+    casos = [
+        ("sin middleware", aplicacion),
+        ("Server-Timing, profiler apagado", middleware),
+    ]
+    print(f"{'caso':<40}{'µs por petición':>16}")
+    for nombre, app in casos:
+        print(f"{nombre:<40}{asyncio.run(us_por_peticion(app, args.peticiones)):>16.2f}")
+    
+    # Sesión que perfila todas las peticiones del caso (el hilo muestrea cada 10 ms)
+    profiler = get_sampling_profiler()
+    profiler.start(args.peticiones, 10)
+    perfilado = asyncio.run(us_por_peticion(middleware, args.peticiones))
+    print(f"{'Server-Timing, perfilando':<40}{perfilado:>16.2f}")
+    print(f"  muestras: {profiler.status()['samples']}, sesión activa: {profiler.active}")
+    
+    print(f"\n`stage` fuera de una petición: {ns_por_etapa(args.peticiones * 10):.0f} ns")
+    contexto = _registro.set(StageTimings())
+    try:
+        print(f"`stage` dentro de una petición: {ns_por_etapa(args.peticiones * 10):.0f} ns")
+    finally:
+        _registro.reset(contexto)
+
+
+if __name__ == "__main__":
+    main()
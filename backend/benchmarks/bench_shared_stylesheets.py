@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las hojas de estilos compartidas: bytes transferidos en una campaña.
+
+Para cada página del corpus arma una campaña de páginas casi idénticas (cambia
+solo el texto del título) y calcula los bytes gzip que descarga un visitante que
+recorre todas: con el CSS inline en cada página, con la hoja de estilos externa
+(que se descarga una sola vez y luego sale de la caché) y con la hoja externa más
+el CSS crítico inline. También informa los bytes de la primera visita, que son
+los que bloquean el primer render.
+
+Uso:
+    python benchmarks/bench_shared_stylesheets.py [--paginas 10]
+"""
+
+import argparse
+import gzip
+import os
+import re
+import sys
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_prompt_minify import cargar_corpus
+from utils.stylesheet_extract import externalize_stylesheet
+
+_TITULO = re.compile(r"(<h1\b[^>]*>)", re.IGNORECASE)
+
+
+def tamano_gzip(texto: str) -> int:
+    return len(gzip.compress(texto.encode("utf-8"), compresslevel=9, mtime=0))
+
+
+def campana(html: str, paginas: int) -> list:
+    if not _TITULO.search(html):
+        return [html + f"<!-- página {i} -->" for i in range(paginas)]
+    return [_TITULO.sub(lambda m: f"{m.group(1)}Página {i}: ", html, count=1) for i in range(paginas)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", type=int, default=10, help="páginas de la campaña")
+    args = parser.parse_args()
+    
+    print(f"{'página':<26}{'modo':<18}{'1ª visita':>11}{'campaña':>10}{'ahorro':>9}")
+    for ruta in cargar_corpus():
+        html = open(ruta, encoding="utf-8").read()
+        paginas = campana(html, args.paginas)
+        
+        inline = [tamano_gzip(pagina) for pagina in paginas]
+        filas = [("CSS inline", inline[0], sum(inline))]
+        for modo, critico in (("hoja externa", False), ("externa + crítico", True)):
+            hojas = set()
+            tamanos = []
+            for pagina in paginas:
+                def publicar(css):
+                    hojas.add(css)
+                    return "/p/styles/0123456789abcdef0123456789abcdef.css"
+                
+                extraida, _ = externalize_stylesheet(pagina, publicar, critico)
+                tamanos.append(tamano_gzip(extraida))
+            hoja = sum(tamano_gzip(css) for css in hojas)
+            # Con el CSS crítico inline la hoja no bloquea el primer render
+            primera = tamanos[0] + (0 if critico else hoja)
+            filas.append((modo, primera, sum(tamanos) + hoja))
+        
+        for modo, primera, total in filas:
+            ahorro = 1 - total / max(sum(inline), 1)
+            print(f"{os.path.basename(ruta)[:25]:<26}{modo:<18}{primera:>11}{total:>10}{ahorro:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la traducción de landings por textos vs. regenerar la página por idioma.
+
+Para cada página del corpus (los HTML de ejemplo del repositorio y los .html de
+`benchmarks/corpus/`) compara los tokens de entrada y salida y la latencia
+estimada de producir la página en varios idiomas de dos formas: pidiendo al
+modelo la página completa traducida, una llamada por idioma, o enviando solo
+los textos extraídos en un lote por idioma, con los idiomas en paralelo.
+Mide también el tiempo local de extraer los textos y escribir las traducciones.
+
+Uso:
+    python benchmarks/bench_translation.py [--idiomas 3] [--tokens-por-segundo 60]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_prompt_minify import cargar_corpus
+from services.translate_page import apply_translations, extract_segments
+from utils.token_count import estimate_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--idiomas", type=int, default=3)
+    parser.add_argument("--tokens-por-segundo", type=float, default=60.0)
+    args = parser.parse_args()
+    
+    print(f"{'página':<26}{'tokens pág.':>12}{'tokens texto':>14}{'regenerar':>11}{'textos':>9}"
+          f"{'ahorro':>9}{'local (ms)':>12}")
+    
+    for ruta in cargar_corpus():
+        html = open(ruta, encoding="utf-8").read()
+        
+        inicio = time.perf_counter()
+        segmentos = extract_segments(html)
+        textos = list(dict.fromkeys(texto for _, _, texto, _ in segmentos))
+        apply_translations(html, segmentos, {t: t for t in textos}, "en")
+        ms_local = (time.perf_counter() - inicio) * 1000
+        
+        tokens_pagina = estimate_tokens(html)
+        tokens_texto = estimate_tokens(json.dumps(textos, ensure_ascii=False))
+        
+        # Regenerar: la página entra y sale completa, una vez por idioma y en secuencia.
+        # Textos: el lote entra y sale una vez por idioma, con los idiomas en paralelo.
+        # El prefill es ~20 veces más rápido que la decodificación.
+        latencia_regenerar = args.idiomas * (tokens_pagina / (args.tokens_por_segundo * 20)
+                                             + tokens_pagina / args.tokens_por_segundo)
+        latencia_textos = tokens_texto / (args.tokens_por_segundo * 20) + tokens_texto / args.tokens_por_segundo
+        ahorro = 1 - tokens_texto / tokens_pagina
+        
+        print(f"{os.path.basename(ruta)[:25]:<26}{tokens_pagina:>12}{tokens_texto:>14}"
+              f"{latencia_regenerar:>10.1f}s{latencia_textos:>8.1f}s{ahorro:>8.0%}{ms_local:>12.2f}")
+    
+    print(f"\nLatencias estimadas para {args.idiomas} idiomas; el ahorro de tokens es por idioma.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Servidor local compatible con la API de chat completions de OpenAI, para benchmarks.
+
+Responde a `POST /v1/chat/completions` (con y sin streaming, con `n` y con la
+herramienta de modificación estructurada) sin consumir cuota: la latencia
+simulada es una latencia base más el prefill del prompt y la decodificación de
+la respuesta a `tokens_por_segundo`, y en streaming los fragmentos se envían a
+ese ritmo, así que el tiempo hasta el primer token y la duración total se
+parecen a los de la API real. La respuesta es una página de `tokens_pagina`
+tokens, el esqueleto JSON del modo paralelo o una sección, según el prompt;
+con `tokens_respuesta` el largo de cada respuesta se decide por petición (lo usa
+`replay_traffic.py` para reproducir los tokens grabados).
+
+Se usa desde `bench_load.py`, o por separado apuntando el backend a él:
+    
+    python benchmarks/llm_stub.py --puerto 18080 --tokens-por-segundo 80
+    OPENAI_BASE_URL=http://127.0.0.1:18080/v1 OPENAI_API_KEY=sk-stub python main.py
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+def estimar_tokens(texto: str) -> int:
+    """Aproximación estándar de ~4 caracteres por token."""
+    return max(1, len(texto) // 4)
+
+
+_TARJETA = """<div class="card"><h3>Servicio destacado</h3><p>Descripción breve del servicio con beneficios concretos para el cliente.</p><a class="btn" href="#contacto">Consultar</a></div>
+"""
+
+
+def seccion_de_ejemplo(tokens: int) -> str:
+    """Arma una sección de tarjetas de aproximadamente `tokens` tokens."""
+    tarjetas = _TARJETA * max(1, math.ceil(tokens / estimar_tokens(_TARJETA)))
+    return f'<section id="servicios">\n{tarjetas}</section>'
+
+
+def pagina_de_ejemplo(tokens: int) -> str:
+    """Arma una landing con CSS embebido de aproximadamente `tokens` tokens."""
+    cabecera = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Landing de ejemplo</title>
+<style>
+:root { --color-primary: #1e40af; --color-text: #111827; --font-body: Inter, sans-serif; }
+body { margin: 0; font-family: var(--font-body); color: var(--color-text); }
+header, section, footer { padding: 48px 24px; }
+.hero { background: var(--color-primary); color: #fff; text-align: center; }
+.card { border: 1px solid #e5e7eb; border-radius: 12px; padding: 24px; margin: 12px; }
+.btn { background: var(--color-primary); color: #fff; padding: 12px 24px; border-radius: 8px; }
+</style>
+</head>
+<body>
+<header><nav><a href="#servicios">Servicios</a> <a href="#contacto">Contacto</a></nav></header>
+<section class="hero"><h1>Título principal</h1><p>Propuesta de valor en una frase.</p><a class="btn" href="#contacto">Empezar</a></section>
+"""
+    pie = """
+<footer id="contacto"><p>Contacto: hola@ejemplo.com</p></footer>
+</body>
+</html>"""
+    return cabecera + seccion_de_ejemplo(tokens - estimar_tokens(cabecera + pie)) + pie
+
+
+ESQUELETO = json.dumps({
+    "title": "Landing de ejemplo",
+    "palette": {"primary": "#1e40af", "text": "#111827"},
+    "typography": {"headings": "Inter", "body": "Inter"},
+    "css": ":root{--color-primary:#1e40af;--font-body:Inter,sans-serif}body{margin:0;font-family:var(--font-body)}",
+    "sections": [
+        {"id": "header", "type": "header", "description": "navegación"},
+        {"id": "hero", "type": "hero", "description": "propuesta de valor"},
+        {"id": "servicios", "type": "content", "description": "servicios"},
+        {"id": "testimonios", "type": "content", "description": "testimonios"},
+        {"id": "footer", "type": "footer", "description": "contacto"}
+    ]
+})
+
+
+class LLMStub:
+    """
+    Servidor de completions simuladas que corre en un hilo de fondo.
+    """
+    
+    def __init__(
+        self,
+        latencia_base: float = 0.3,
+        tokens_por_segundo: float = 80,
+        tokens_pagina: int = 1500,
+        puerto: int = 0,
+        tokens_respuesta: Optional[Callable[[Dict], Optional[int]]] = None
+    ):
+        self.latencia_base = latencia_base
+        self.tokens_por_segundo = tokens_por_segundo
+        self.tokens_pagina = tokens_pagina
+        self.tokens_respuesta = tokens_respuesta
+        self._pagina = pagina_de_ejemplo(tokens_pagina)
+        self._lock = threading.Lock()
+        self.llamadas = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._handler())
+        self._servidor.daemon_threads = True
+    
+    @property
+    def url(self) -> str:
+        """URL base para OPENAI_BASE_URL."""
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}/v1"
+    
+    def start(self) -> "LLMStub":
+        """Empieza a atender peticiones en un hilo de fondo."""
+        threading.Thread(target=self._servidor.serve_forever, name="llm-stub", daemon=True).start()
+        return self
+    
+    def stop(self) -> None:
+        """Detiene el servidor."""
+        self._servidor.shutdown()
+        self._servidor.server_close()
+    
+    def stats(self) -> Dict:
+        """Llamadas recibidas y tokens simulados desde el arranque."""
+        with self._lock:
+            return {
+                "calls": self.llamadas,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens
+            }
+    
+    def respuesta(self, cuerpo: Dict) -> str:
+        """
+        Elige el texto (o los argumentos de la herramienta) que devuelve una petición.
+        
+        Args:
+            cuerpo (Dict): Cuerpo JSON de la petición de chat completions
+            
+        Returns:
+            str: Contenido del mensaje, o argumentos JSON si la petición trae `tools`
+        """
+        tokens = self.tokens_respuesta(cuerpo) if self.tokens_respuesta else None
+        pagina = self._pagina if tokens is None else pagina_de_ejemplo(tokens)
+        
+        herramientas = cuerpo.get("tools") or []
+        if herramientas:
+            if herramientas[0]["function"]["name"] == "aplicar_modificacion":
+                return json.dumps({
+                    "html": pagina,
+                    "changes_applied": ["Actualicé el contenido pedido"],
+                    "warnings": []
+                }, ensure_ascii=False)
+            return "{}"
+        
+        mensajes = cuerpo.get("messages") or []
+        sistema = mensajes[0]["content"] if mensajes else ""
+        prompt = mensajes[-1]["content"] if mensajes else ""
+        if "director de arte" in sistema:
+            return ESQUELETO
+        if "Generá SOLO la sección" in prompt:
+            return seccion_de_ejemplo(tokens or self.tokens_pagina // 5)
+        return pagina
+    
+    def _registrar(self, tokens_prompt: int, tokens_salida: int) -> None:
+        with self._lock:
+            self.llamadas += 1
+            self.prompt_tokens += tokens_prompt
+            self.completion_tokens += tokens_salida
+    
+    def _handler(self):
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def do_GET(self):
+                # GET /v1/models, que usa el precalentamiento del cliente
+                self._json({"object": "list", "data": []})
+            
+            def do_POST(self):
+                cuerpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                texto = stub.respuesta(cuerpo)
+                tokens_prompt = estimar_tokens(json.dumps(cuerpo.get("messages", []), ensure_ascii=False))
+                tokens_salida = estimar_tokens(texto)
+                n = int(cuerpo.get("n") or 1)
+                stub._registrar(tokens_prompt, tokens_salida * n)
+                
+                # Latencia base y prefill (~20 veces más rápido que la decodificación)
+                time.sleep(stub.latencia_base + tokens_prompt / (stub.tokens_por_segundo * 20))
+                herramienta = (cuerpo.get("tools") or [None])[0]
+                if cuerpo.get("stream"):
+                    self._stream(texto, n, herramienta)
+                else:
+                    time.sleep(tokens_salida / stub.tokens_por_segundo)
+                    self._json(self._completion(texto, n, herramienta, tokens_prompt, tokens_salida))
+            
+            def _completion(self, texto, n, herramienta, tokens_prompt, tokens_salida) -> Dict:
+                choices = []
+                for i in range(n):
+                    mensaje = {"role": "assistant", "content": texto}
+                    if herramienta:
+                        mensaje = {"role": "assistant", "content": None, "tool_calls": [{
+                            "id": "call_stub", "type": "function",
+                            "function": {"name": herramienta["function"]["name"], "arguments": texto}
+                        }]}
+                    choices.append({"index": i, "message": mensaje, "finish_reason": "stop"})
+                return {
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": "stub", "choices": choices,
+                    "usage": {
+                        "prompt_tokens": tokens_prompt,
+                        "completion_tokens": tokens_salida * n,
+                        "total_tokens": tokens_prompt + tokens_salida * n
+                    }
+                }
+            
+            def _stream(self, texto: str, n: int, herramienta: Optional[Dict]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                
+                # Un token (~4 caracteres) por evento, como la API real; los eventos se
+                # envían en tandas para no dormir menos de ~20 ms por vez
+                por_tanda = max(1, math.ceil(stub.tokens_por_segundo * 0.02))
+                try:
+                    for inicio in range(0, len(texto), por_tanda * 4):
+                        eventos: List[bytes] = []
+                        for desde in range(inicio, min(inicio + por_tanda * 4, len(texto)), 4):
+                            parte = texto[desde:desde + 4]
+                            for i in range(n):
+                                delta = {"content": parte}
+                                if herramienta:
+                                    delta = {"tool_calls": [{
+                                        "index": 0, "id": "call_stub", "type": "function",
+                                        "function": {"name": herramienta["function"]["name"], "arguments": parte}
+                                    }]}
+                                fragmento = {
+                                    "id": "chatcmpl-stub", "object": "chat.completion.chunk",
+                                    "created": int(time.time()), "model": "stub",
+                                    "choices": [{"index": i, "delta": delta, "finish_reason": None}]
+                                }
+                                eventos.append(f"data: {json.dumps(fragmento, ensure_ascii=False)}\n\n".encode())
+                        self._chunk(b"".join(eventos))
+                        time.sleep(por_tanda / stub.tokens_por_segundo)
+                    self._chunk(b"data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # El backend canceló la llamada (cliente desconectado o plazo vencido)
+                    pass
+            
+            def _chunk(self, datos: bytes) -> None:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(datos), datos))
+                self.wfile.flush()
+            
+            def _json(self, datos: Dict) -> None:
+                cuerpo = json.dumps(datos, ensure_ascii=False).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+            
+            def log_message(self, *args):
+                pass
+        
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=18080)
+    parser.add_argument("--latencia-base", type=float, default=0.3, help="segundos antes del primer token")
+    parser.add_argument("--tokens-por-segundo", type=float, default=80)
+    parser.add_argument("--tokens-pagina", type=int, default=1500, help="tokens de la página generada")
+    args = parser.parse_args()
+    
+    stub = LLMStub(args.latencia_base, args.tokens_por_segundo, args.tokens_pagina, args.puerto).start()
+    print(f"Completions simuladas en {stub.url} (Ctrl+C para terminar)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Repite tráfico grabado con TRAFFIC_RECORD_PATH contra completions simuladas.
+
+Cada build (un directorio `backend` de la versión a medir; por defecto este) se
+levanta con uvicorn y `llm_stub.LLMStub`, y recibe las peticiones grabadas con
+sus intervalos originales divididos por `--velocidad`, sin esperar respuestas
+(carga abierta, como en producción). Cada petición lleva una marca en su texto
+(del mismo largo que el texto que reemplaza) con la que el stub reconoce sus
+llamadas y responde con los tokens de respuesta grabados, así que la latencia
+del modelo se simula a partir de los tokens reales. Con dos builds informa la
+diferencia de latencia y throughput entre ambas, y guarda todo en JSON.
+
+Uso:
+    python benchmarks/replay_traffic.py data/traffic.jsonl [--velocidad 2] [--limite 500]
+    python benchmarks/replay_traffic.py data/traffic.jsonl --builds ../../release/backend,.
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.bench_load import (
+    BACKEND_DIR,
+    es_error,
+    esperar_aplicacion,
+    iniciar_aplicacion,
+    puerto_libre,
+    resumen_latencias,
+    version_actual
+)
+from benchmarks.llm_stub import LLMStub
+
+# Marca de cada petición repetida: el texto grabado solo tiene `x` y `0`, así que no aparece por azar
+MARCA = "rp{:06d}"
+_MARCA = re.compile(r"rp\d{6}")
+
+
+def cargar_grabacion(ruta: str, limite: Optional[int]) -> List[Dict]:
+    """Lee las peticiones grabadas con cuerpo, ordenadas por llegada."""
+    entradas = []
+    with open(ruta, encoding="utf-8") as archivo:
+        for linea in archivo:
+            if linea.strip():
+                entrada = json.loads(linea)
+                if entrada.get("body") is not None:
+                    entradas.append(entrada)
+    entradas.sort(key=lambda entrada: entrada["ts"])
+    return entradas[:limite] if limite else entradas
+
+
+def marcar(cuerpo: Dict, marca: str) -> Dict:
+    """Reemplaza el comienzo de los textos libres del primer nivel por la marca."""
+    def reemplazar(texto):
+        if isinstance(texto, str) and "<" not in texto and len(texto) >= len(marca):
+            return marca + texto[len(marca):]
+        return texto
+    
+    marcado = copy.deepcopy(cuerpo)
+    for clave, valor in marcado.items():
+        if isinstance(valor, list):
+            marcado[clave] = [reemplazar(v) for v in valor]
+        else:
+            marcado[clave] = reemplazar(valor)
+    return marcado
+
+
+def estimar_tokens_por_segundo(entradas: List[Dict], latencia_base: float) -> Optional[float]:
+    """Velocidad de decodificación observada en la grabación, descontando la latencia base de cada llamada."""
+    tokens = sum(entrada["llm"]["completion_tokens"] for entrada in entradas)
+    segundos = sum(max(0.0, entrada["llm"]["seconds"] - entrada["llm"]["calls"] * latencia_base) for entrada in entradas)
+    return tokens / segundos if tokens and segundos else None
+
+
+async def repetir(
+    cliente: httpx.AsyncClient,
+    entradas: List[Dict],
+    cuerpos: List[Dict],
+    velocidad: float
+) -> Dict:
+    """Envía cada petición en su momento relativo a la primera y espera todas las respuestas."""
+    latencias: List[float] = []
+    por_ruta: Dict[str, List[float]] = {}
+    errores = 0
+    inicio = time.perf_counter()
+    primera = entradas[0]["ts"]
+    
+    async def enviar(entrada: Dict, cuerpo: Dict):
+        nonlocal errores
+        enviada = time.perf_counter()
+        ruta = entrada["path"] + (f"?{entrada['query']}" if entrada.get("query") else "")
+        try:
+            fallo = es_error(await cliente.post(ruta, json=cuerpo))
+        except httpx.HTTPError:
+            fallo = True
+        errores += fallo
+        latencia = time.perf_counter() - enviada
+        latencias.append(latencia)
+        por_ruta.setdefault(entrada["path"], []).append(latencia)
+    
+    tareas = []
+    for entrada, cuerpo in zip(entradas, cuerpos):
+        espera = (entrada["ts"] - primera) / velocidad - (time.perf_counter() - inicio)
+        if espera > 0:
+            await asyncio.sleep(espera)
+        tareas.append(asyncio.create_task(enviar(entrada, cuerpo)))
+    await asyncio.gather(*tareas)
+    duracion = time.perf_counter() - inicio
+    
+    return {
+        "requests": len(entradas),
+        "errors": errores,
+        "error_rate": errores / len(entradas),
+        "duration_s": round(duracion, 3),
+        "throughput_rps": round((len(entradas) - errores) / duracion, 3),
+        "latency_ms": resumen_latencias(latencias),
+        "latency_ms_by_path": {ruta: resumen_latencias(valores) for ruta, valores in sorted(por_ruta.items())}
+    }
+
+
+async def medir_build(backend_dir: str, entradas: List[Dict], args) -> Dict:
+    # Tokens de respuesta por llamada de cada petición, según su marca
+    plan: Dict[str, int] = {}
+    cuerpos = []
+    for i, entrada in enumerate(entradas):
+        marca = MARCA.format(i)
+        cuerpos.append(marcar(entrada["body"], marca))
+        if entrada["llm"]["calls"]:
+            plan[marca] = max(1, entrada["llm"]["completion_tokens"] // entrada["llm"]["calls"])
+    
+    def tokens_respuesta(cuerpo: Dict) -> Optional[int]:
+        marca = _MARCA.search(json.dumps(cuerpo.get("messages", []), ensure_ascii=False))
+        return plan.get(marca.group(0)) if marca else None
+    
+    stub = LLMStub(args.latencia_base, args.tokens_por_segundo, tokens_respuesta=tokens_respuesta).start()
+    puerto = puerto_libre()
+    with tempfile.TemporaryDirectory() as directorio:
+        proceso = iniciar_aplicacion(puerto, stub.url, directorio, backend_dir)
+        limites = httpx.Limits(max_connections=None, max_keepalive_connections=64)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{puerto}", timeout=600, limits=limites) as cliente:
+                await esperar_aplicacion(cliente, proceso)
+                resultado = await repetir(cliente, entradas, cuerpos, args.velocidad)
+        finally:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+            stub.stop()
+    
+    return {
+        "build": os.path.abspath(backend_dir),
+        "version": version_actual(backend_dir),
+        "llm": stub.stats(),
+        **resultado
+    }
+
+
+def imprimir_comparacion(grabado: Dict, builds: List[Dict]) -> None:
+    nombres = [build["version"] or os.path.basename(build["build"]) for build in builds]
+    columnas = ["grabado"] + nombres + (["diferencia"] if len(builds) == 2 else [])
+    print(f"\n{'':<18}" + "".join(f"{columna:>14}" for columna in columnas))
+    
+    filas = [(f"latencia {p} ms", "latency_ms", p) for p in ("p50", "p95", "p99", "mean")]
+    filas += [("req/s", "throughput_rps", None), ("errores %", "error_rate", None)]
+    for nombre, clave, percentil in filas:
+        referencia = grabado.get(clave)
+        valores = [build[clave] for build in builds]
+        if percentil:
+            referencia = referencia[percentil] if referencia else None
+            valores = [valor[percentil] for valor in valores]
+        elif clave == "error_rate":
+            referencia = referencia * 100
+            valores = [valor * 100 for valor in valores]
+        celdas = ["-" if referencia is None else f"{referencia:.1f}"] + [f"{valor:.1f}" for valor in valores]
+        if len(builds) == 2:
+            celdas.append(f"{(valores[1] - valores[0]) / valores[0] * 100:+.1f}%" if valores[0] else "-")
+        print(f"{nombre:<18}" + "".join(f"{celda:>14}" for celda in celdas))
+
+
+async def ejecutar(args) -> Dict:
+    entradas = cargar_grabacion(args.grabacion, args.limite)
+    if not entradas:
+        raise SystemExit(f"No hay peticiones grabadas en {args.grabacion}")
+    if args.tokens_por_segundo is None:
+        args.tokens_por_segundo = estimar_tokens_por_segundo(entradas, args.latencia_base) or 80
+    
+    duracion = (entradas[-1]["ts"] - entradas[0]["ts"]) / args.velocidad
+    print(f"{len(entradas)} peticiones en {duracion:.0f} s (velocidad x{args.velocidad:g}), "
+          f"modelo simulado a {args.tokens_por_segundo:.0f} tokens/s")
+    
+    builds = []
+    for backend_dir in args.builds.split(","):
+        print(f"Repitiendo contra {os.path.abspath(backend_dir)}...")
+        builds.append(await medir_build(backend_dir, entradas, args))
+    
+    # Lo que vio producción, como referencia de qué tan fiel es la simulación
+    grabado = {
+        "latency_ms": resumen_latencias([entrada["duration_ms"] / 1000 for entrada in entradas]),
+        "error_rate": sum(entrada["status"] != 200 for entrada in entradas) / len(entradas)
+    }
+    imprimir_comparacion(grabado, builds)
+    
+    return {
+        "benchmark": "replay",
+        "recording": os.path.abspath(args.grabacion),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "requests": len(entradas),
+            "speed": args.velocidad,
+            "llm_base_latency_s": args.latencia_base,
+            "llm_tokens_per_second": round(args.tokens_por_segundo, 1)
+        },
+        "recorded": grabado,
+        "builds": builds
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("grabacion", help="archivo JSONL grabado con TRAFFIC_RECORD_PATH")
+    parser.add_argument("--builds", default=BACKEND_DIR,
+                        help="directorios backend a comparar, separados por comas (por defecto este)")
+    parser.add_argument("--velocidad", type=float, default=1, help="2 repite el tráfico al doble de ritmo")
+    parser.add_argument("--limite", type=int, help="repetir solo las primeras N peticiones")
+    parser.add_argument("--latencia-base", type=float, default=0.3, help="segundos antes del primer token")
+    parser.add_argument("--tokens-por-segundo", type=float,
+                        help="velocidad del modelo simulado (por defecto, la observada en la grabación)")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto benchmarks/results/replay-<fecha>.json)")
+    args = parser.parse_args()
+    
+    informe = asyncio.run(ejecutar(args))
+    
+    salida = args.salida or os.path.join(BACKEND_DIR, "benchmarks", "results", f"replay-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
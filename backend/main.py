@@ -3,10 +3,31 @@ from fastapi import FastAPI  # Framework web principal para crear la API REST
 from fastapi.middleware.cors import CORSMiddleware  # Middleware para manejar CORS (Cross-Origin Resource Sharing)
 from routes.generate import router as generar_router  # Importa el router que contiene las rutas de generación
 from routes.modify import router as modificar_router  # Importa el router que contiene las rutas de modificación conversacional
+from routes.session import router as sesion_router  # Importa el router con el WebSocket de sesiones de edición
+from routes.jobs import router as trabajos_router  # Importa el router de la API asíncrona de trabajos
+from routes.translate import router as traduccion_router  # Importa el router de traducción de landing pages
+from routes.publish import router as publicacion_router, pages_router as paginas_router  # Publicación y entrega de páginas
+from routes.metrics import router as metricas_router  # Endpoint /metrics para Prometheus
+from routes.admin import router as admin_router  # Rutas de administración (perfilado por muestreo)
+from services.job_queue import get_job_queue  # Cola durable de trabajos procesada por workers asíncronos
+from fastapi.concurrency import run_in_threadpool  # Ejecuta funciones bloqueantes sin frenar el event loop
+from utils.openai_client import warm_up_openai_client, close_openai_client  # Pool de conexiones hacia OpenAI
+from utils.compression import CompressionMiddleware, RequestDecompressionMiddleware  # Compresión de respuestas y peticiones
+from utils.metrics import MetricsMiddleware  # Latencia por ruta y peticiones en curso
+from utils.server_timing import ServerTimingMiddleware  # Header Server-Timing y perfilado por muestreo
+from utils.traffic_recorder import TrafficRecorderMiddleware  # Grabación opcional del tráfico (TRAFFIC_RECORD_PATH)
 
 # Crear la instancia principal de la aplicación FastAPI con un título descriptivo
 app = FastAPI(title="Generador IA de Landing Pages")
 
+# Grabar el tráfico sanitizado para repetirlo en benchmarks (solo con TRAFFIC_RECORD_PATH;
+# se registra primero para quedar por dentro de la descompresión y ver los cuerpos descomprimidos)
+app.add_middleware(TrafficRecorderMiddleware)
+
+# Descomprimir los cuerpos gzip/br/zstd de las peticiones (se registra antes que CORS
+# para que sus errores 413/415 también lleven los headers de CORS)
+app.add_middleware(RequestDecompressionMiddleware)
+
 # Configurar middleware CORS para permitir peticiones desde el frontend
 app.add_middleware(
     CORSMiddleware,
@@ -16,12 +37,65 @@ app.add_middleware(
     allow_headers=["*"],  # Permite todos los headers en las peticiones
 )
 
+# Comprimir con brotli o gzip las respuestas de texto que superan RESPONSE_COMPRESSION_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Desglosar el tiempo de cada petición por etapas en el header Server-Timing (por fuera
+# de la compresión, para que el total incluya comprimir el cuerpo)
+app.add_middleware(ServerTimingMiddleware)
+
+# Medir la latencia de cada petición (se registra último para envolver a los demás
+# middlewares y medir también la descompresión y la compresión)
+app.add_middleware(MetricsMiddleware)
+
 # Incluir el router de generación que contiene los endpoints para generar landing pages
 app.include_router(generar_router)
 
 # Incluir el router de modificación que contiene los endpoints para modificaciones conversacionales
 app.include_router(modificar_router)
 
+# Incluir el router de sesiones que expone el WebSocket de edición conversacional
+app.include_router(sesion_router)
+
+# Incluir el router de trabajos para generaciones y modificaciones asíncronas
+app.include_router(trabajos_router)
+
+# Incluir el router de traducción que genera variantes localizadas de una landing page
+app.include_router(traduccion_router)
+
+# Incluir los routers de publicación: POST /api/publish y las páginas publicadas en /p/{id}
+app.include_router(publicacion_router)
+app.include_router(paginas_router)
+
+# Incluir el router de métricas en formato Prometheus
+app.include_router(metricas_router)
+
+# Incluir el router de administración (requiere ADMIN_TOKEN)
+app.include_router(admin_router)
+
+
+@app.on_event("startup")
+async def iniciar_servicios():
+    """
+    Arranca la cola de trabajos: recupera su estado tras un reinicio y lanza los workers.
+    
+    También crea el cliente de OpenAI y abre sus conexiones, para que la primera
+    petición de un usuario no pague la resolución DNS ni el handshake TLS.
+    """
+    await run_in_threadpool(warm_up_openai_client)
+    await get_job_queue().start()
+
+
+@app.on_event("shutdown")
+async def detener_servicios():
+    """
+    Detiene los workers de la cola de trabajos, cierra su base de datos y
+    cierra las conexiones del cliente de OpenAI.
+    """
+    await get_job_queue().stop()
+    close_openai_client()
+
+
 # Endpoint raíz que sirve como health check para verificar que la API está funcionando
 @app.get("/")
 def read_root():
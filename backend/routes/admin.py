@@ -0,0 +1,90 @@
+"""
+Rutas de administración.
+
+`POST /api/admin/profile` arranca una sesión del profiler por muestreo para las
+próximas N peticiones; `GET /api/admin/profile` consulta su estado y
+`GET /api/admin/profile/folded` descarga las pilas en formato folded, listas
+para flamegraph.pl o speedscope. Todas piden el header `X-Admin-Token` con el
+valor de la variable de entorno ADMIN_TOKEN; sin ADMIN_TOKEN quedan deshabilitadas.
+"""
+
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import Response
+
+from schemas.profile_schema import ProfileRequest
+from utils.error_handlers import create_success_response
+from utils.sampling_profiler import get_sampling_profiler
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """
+    Verifica el token de administración de la petición.
+    
+    Args:
+        x_admin_token (Optional[str]): Header X-Admin-Token
+        
+    Raises:
+        HTTPException: 403 si ADMIN_TOKEN no está configurado o el token no coincide
+    """
+    esperado = os.getenv("ADMIN_TOKEN", "")
+    if not esperado or not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), esperado.encode()):
+        raise HTTPException(status_code=403, detail="Acceso de administración denegado")
+
+
+# Crear router para las rutas de administración
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)],
+    responses={
+        403: {"description": "Token de administración ausente o inválido"}
+    }
+)
+
+
+@router.post("/profile")
+async def iniciar_perfilado_route(data: ProfileRequest):
+    """
+    Endpoint para perfilar por muestreo las próximas peticiones.
+    
+    Las rutas de administración y `/metrics` no cuentan como peticiones
+    perfiladas. La sesión termina al completarse la última petición o a los
+    MAX_PROFILE_SECONDS.
+    
+    Args:
+        data (ProfileRequest): Cantidad de peticiones e intervalo de muestreo
+        
+    Returns:
+        dict: Respuesta con el estado de la sesión
+        
+    Raises:
+        HTTPException: 409 si ya hay una sesión en curso
+    """
+    estado = get_sampling_profiler().start(data.requests, data.interval_ms)
+    return create_success_response(data=estado, message="Perfilado iniciado")
+
+
+@router.get("/profile")
+async def estado_perfilado_route():
+    """
+    Endpoint para consultar la sesión de perfilado en curso o la última.
+    
+    Returns:
+        dict: Respuesta con 'active', peticiones perfiladas y pendientes, muestras y pilas
+    """
+    return create_success_response(data=get_sampling_profiler().status(), message="Estado del perfilado")
+
+
+@router.get("/profile/folded")
+async def perfil_folded_route():
+    """
+    Endpoint para descargar las pilas muestreadas en formato folded.
+    
+    Returns:
+        Response: Texto plano con una línea `marco;marco;... cantidad` por pila
+    """
+    return Response(content=get_sampling_profiler().folded(), headers={"Content-Type": "text/plain; charset=utf-8"})
@@ -5,10 +5,29 @@ Este módulo contiene los endpoints relacionados con la generación inicial
 de landing pages usando inteligencia artificial.
 """
 
-from fastapi import APIRouter
-from schemas.prompt_schema import PromptRequest
-from services.generate_code import generar_landing, validate_generation_request
-from utils.error_handlers import handle_generic_error, create_success_response
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from schemas.prompt_schema import BatchPromptRequest, PromptRequest
+from services.component_library import get_component_library
+from services.publish_store import get_publish_store
+from services.generate_code import (
+    build_generation_result,
+    generar_landing,
+    generar_landing_paralela,
+    generar_landing_variantes,
+    validate_generation_request
+)
+from utils.cancellation import CancellationToken, cancel_on_disconnect, get_cancellation_stats
+from utils.compression import get_compression_stats
+from utils.css_optimize import get_css_optimization_stats
+from utils.deadline import Deadline, resolve_deadline
+from utils.error_handlers import handle_generic_error, handle_validation_error, create_success_response
+from utils.idempotency import get_idempotency_store, request_fingerprint, validate_idempotency_key
 
 
 # Crear router para las rutas de generación
@@ -23,32 +42,69 @@ router = APIRouter(
 
 
 @router.post("/generate-landing")
-async def generar_landing_route(data: PromptRequest):
+async def generar_landing_route(
+    data: PromptRequest,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    request_timeout: Optional[str] = Header(default=None, alias="X-Request-Timeout")
+):
     """
     Endpoint para generar una landing page basada en un prompt de texto.
     
+    Si se envía el header `Idempotency-Key`, un reintento con la misma clave y
+    el mismo cuerpo se engancha a la generación en curso o recibe su resultado,
+    sin iniciar otra llamada a OpenAI.
+    
+    Si el cliente se desconecta, la llamada a OpenAI se corta. Con
+    `Idempotency-Key` se espera antes un período de gracia por si llega un reintento.
+    Todas las etapas comparten el plazo de `X-Request-Timeout` (o el del endpoint
+    por defecto) y la petición responde 504 si se agota.
+    
     Args:
-        data (PromptRequest): Objeto que contiene el prompt del usuario
+        data (PromptRequest): Objeto que contiene el prompt del usuario, el modo
+            de generación y el número de variantes
+        request (Request): Petición HTTP, para detectar la desconexión del cliente
+        response (Response): Respuesta HTTP, para indicar si el resultado es reutilizado
+        idempotency_key (Optional[str]): Clave de idempotencia opcional
+        request_timeout (Optional[str]): Plazo total en segundos para toda la petición
         
     Returns:
-        dict: Respuesta con el código HTML generado y estado de éxito
-        
+        dict: Respuesta con el código HTML generado y estado de éxito. Si se
+            piden varias variantes, 'html' contiene la primera y 'variants' todas.
+            'design_tokens' trae las variables de :root de cada página. Con
+            `minify`, el HTML va minificado y 'output_stats' trae los bytes
+            antes/después de cada página. Con variantes, ambos son listas con
+            un elemento por variante.
+            
     Raises:
         HTTPException: Para errores de validación o generación
     """
     try:
+        # El plazo corre desde que llega la petición y lo comparten todas las etapas
+        deadline = resolve_deadline(request_timeout, "generate")
+        
         # Validar la petición usando el validador modular
         validate_generation_request(data.prompt)
+        key = validate_idempotency_key(idempotency_key)
+        deadline.check("validación")
         
-        # Generar la landing page usando el servicio modular
-        html_code = generar_landing(data.prompt)
+        if key is None:
+            token = CancellationToken(deadline)
+            async with cancel_on_disconnect(request, token.cancel):
+                return await _generar_respuesta(data, token)
         
-        # Retornar respuesta estandarizada
-        return create_success_response(
-            data={"html": html_code},
-            message="Landing page generada exitosamente"
+        resultado, reutilizado = await get_idempotency_store().run(
+            key,
+            request_fingerprint("/api/generate-landing", data.model_dump_json()),
+            lambda token: _generar_respuesta(data, token),
+            request,
+            deadline
         )
-        
+        if reutilizado:
+            response.headers["Idempotent-Replayed"] = "true"
+        return resultado
+    
     except Exception as e:
         # Manejar errores usando el handler modular
         if hasattr(e, 'status_code'):
@@ -59,6 +115,119 @@ async def generar_landing_route(data: PromptRequest):
             raise handle_generic_error(e, "generación de landing page")
 
 
+async def _generar_respuesta(data: PromptRequest, cancel_token: CancellationToken) -> dict:
+    """
+    Ejecuta la generación en el threadpool y construye la respuesta estandarizada.
+    
+    Args:
+        data (PromptRequest): Petición de generación ya validada
+        cancel_token (CancellationToken): Token que corta la llamada a OpenAI
+        
+    Returns:
+        dict: Respuesta estandarizada con el HTML generado
+    """
+    # Las variantes se piden en una sola completion, incompatible con el modo paralelo
+    if data.variants > 1:
+        if data.mode == "parallel":
+            raise handle_validation_error(
+                "variants",
+                "Las variantes múltiples solo están disponibles en modo 'standard'"
+            )
+        
+        variantes = await run_in_threadpool(generar_landing_variantes, data.prompt, data.variants, cancel_token)
+        return create_success_response(
+            data=build_generation_result(variantes, data.minify),
+            message=f"{len(variantes)} variantes generadas exitosamente"
+        )
+    
+    # Generar la landing page usando el servicio modular según el modo pedido
+    generar = generar_landing_paralela if data.mode == "parallel" else generar_landing
+    html_code = await run_in_threadpool(generar, data.prompt, cancel_token)
+    
+    # Retornar respuesta estandarizada
+    return create_success_response(
+        data=build_generation_result([html_code], data.minify),
+        message="Landing page generada exitosamente"
+    )
+
+
+@router.post("/generate-landings")
+async def generar_landings_lote_route(
+    data: BatchPromptRequest,
+    request_timeout: Optional[str] = Header(default=None, alias="X-Request-Timeout")
+):
+    """
+    Endpoint para generar varias landing pages en lote.
+    
+    Los prompts se generan con concurrencia acotada y cada resultado se envía
+    como una línea NDJSON en cuanto termina, sin respetar el orden de entrada
+    (cada línea lleva su `index`). Un prompt que falla (validación, error de
+    OpenAI o plazo agotado) produce una línea con `status: "error"` y el código
+    HTTP que habría tenido la petición individual, sin detener ni hacer fallar a
+    los demás.
+    
+    El plazo de `X-Request-Timeout` cubre el lote completo: los prompts que
+    siguen en espera o en curso cuando se agota terminan con error.
+    
+    Args:
+        data (BatchPromptRequest): Prompts, modo y concurrencia máxima
+        request_timeout (Optional[str]): Plazo total en segundos para todo el lote
+        
+    Returns:
+        StreamingResponse: Flujo `application/x-ndjson` con un resultado por línea
+    """
+    return StreamingResponse(
+        _generar_lote(data, resolve_deadline(request_timeout, "batch")),
+        media_type="application/x-ndjson"
+    )
+
+
+async def _generar_lote(data: BatchPromptRequest, deadline: Deadline) -> AsyncIterator[str]:
+    """
+    Genera los prompts del lote y produce cada resultado como línea NDJSON.
+    
+    Args:
+        data (BatchPromptRequest): Petición de generación en lote
+        deadline (Deadline): Plazo compartido por todo el lote
+        
+    Yields:
+        str: Línea NDJSON con 'index', 'prompt', 'status' y 'html', o 'status_code'
+            y 'error' si la generación falló
+    """
+    semaforo = asyncio.Semaphore(data.concurrency)
+    token = CancellationToken(deadline)
+    generar = generar_landing_paralela if data.mode == "parallel" else generar_landing
+    
+    async def generar_uno(index: int, prompt: str) -> dict:
+        try:
+            validate_generation_request(prompt)
+            async with semaforo:
+                token.raise_if_cancelled("espera en cola")
+                html_code = await run_in_threadpool(generar, prompt, token)
+            return {"index": index, "prompt": prompt, "status": "success", "html": html_code}
+        except Exception as e:
+            # Validación, fallo de OpenAI o plazo agotado: nunca una línea "success"
+            return {
+                "index": index,
+                "prompt": prompt,
+                "status": "error",
+                "status_code": getattr(e, "status_code", 500),
+                "error": getattr(e, "detail", None) or str(e)
+            }
+    
+    tareas = [asyncio.create_task(generar_uno(i, p)) for i, p in enumerate(data.prompts)]
+    try:
+        for siguiente in asyncio.as_completed(tareas):
+            resultado = await siguiente
+            yield json.dumps(resultado, ensure_ascii=False) + "\n"
+    finally:
+        # Si el cliente corta el stream, cortar las llamadas en curso y no seguir
+        # generando el resto del lote
+        token.cancel()
+        for tarea in tareas:
+            tarea.cancel()
+
+
 @router.get("/generate-examples")
 async def get_generation_examples():
     """
@@ -76,7 +245,7 @@ async def get_generation_examples():
             data={"examples": examples},
             message="Ejemplos obtenidos exitosamente"
         )
-        
+    
     except Exception as e:
         raise handle_generic_error(e, "obtención de ejemplos")
 
@@ -90,6 +259,14 @@ async def health_check():
         dict: Estado del servicio
     """
     return create_success_response(
-        data={"service": "generation", "status": "healthy"},
+        data={
+            "service": "generation",
+            "status": "healthy",
+            "cancellations": get_cancellation_stats().snapshot(),
+            "component_library": get_component_library().stats(),
+            "css_optimization": get_css_optimization_stats(),
+            "response_compression": get_compression_stats(),
+            "published_pages": get_publish_store().stats()
+        },
         message="Servicio de generación funcionando correctamente"
     )
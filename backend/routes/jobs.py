@@ -0,0 +1,185 @@
+"""
+Rutas de la API asíncrona de trabajos.
+
+Las generaciones y modificaciones largas se encolan y devuelven un ID de
+trabajo de inmediato; el cliente consulta el estado con polling o long-polling
+en `GET /api/jobs/{id}` en lugar de mantener abierta la conexión HTTP.
+"""
+
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+
+from schemas.modification_schema import ModificationRequest
+from schemas.prompt_schema import PromptRequest
+from services.generate_code import (
+    build_generation_result,
+    generar_landing,
+    generar_landing_paralela,
+    generar_landing_variantes,
+    validate_generation_request
+)
+from services.job_queue import get_job_queue
+from services.modify_code import modificar_landing_conversacional, validate_modification_request
+from utils.cancellation import CancellationToken
+from utils.deadline import resolve_deadline
+from utils.error_handlers import create_success_response, handle_validation_error
+from utils.server_timing import add_stage
+
+
+# Crear router para las rutas de trabajos
+router = APIRouter(
+    prefix="/api/jobs",
+    tags=["jobs"],
+    responses={
+        400: {"description": "Error de validación"},
+        404: {"description": "Trabajo no encontrado"}
+    }
+)
+
+# Tiempo máximo (en segundos) que un long-poll puede esperar
+MAX_WAIT_SECONDS = 30
+
+
+def _procesar_generacion(payload: Dict[str, Any], cancel_token: CancellationToken) -> Dict[str, Any]:
+    """
+    Handler de trabajos de generación.
+    
+    Args:
+        payload (Dict[str, Any]): PromptRequest serializado
+        cancel_token (CancellationToken): Token con el plazo restante del trabajo
+        
+    Returns:
+        Dict[str, Any]: Resultado con el HTML generado, con los mismos campos que
+            `POST /api/generate-landing`
+    """
+    data = PromptRequest(**payload)
+    if data.variants > 1:
+        variantes = generar_landing_variantes(data.prompt, data.variants, cancel_token)
+        return build_generation_result(variantes, data.minify)
+    
+    generar = generar_landing_paralela if data.mode == "parallel" else generar_landing
+    return build_generation_result([generar(data.prompt, cancel_token)], data.minify)
+
+
+def _procesar_modificacion(payload: Dict[str, Any], cancel_token: CancellationToken) -> Dict[str, Any]:
+    """
+    Handler de trabajos de modificación.
+    
+    Args:
+        payload (Dict[str, Any]): ModificationRequest serializado
+        cancel_token (CancellationToken): Token con el plazo restante del trabajo
+        
+    Returns:
+        Dict[str, Any]: Resultado con el HTML modificado, el análisis, los cambios aplicados y las advertencias
+    """
+    data = ModificationRequest(**payload)
+    codigo_modificado, analisis, cambios, advertencias = modificar_landing_conversacional(
+        codigo_actual=data.currentHTML,
+        instruccion_modificacion=data.modificationRequest,
+        historial_conversacion=data.conversationHistory or [],
+        cancel_token=cancel_token,
+        output_mode=data.outputMode
+    )
+    return {
+        "html": codigo_modificado,
+        "analysis": analisis,
+        "changes_applied": cambios,
+        "warnings": advertencias
+    }
+
+
+get_job_queue().register_handler("generate", _procesar_generacion)
+get_job_queue().register_handler("modify", _procesar_modificacion)
+
+
+@router.post("/generate", status_code=202)
+async def encolar_generacion(
+    data: PromptRequest,
+    request_timeout: Optional[str] = Header(default=None, alias="X-Request-Timeout")
+):
+    """
+    Encola la generación de una landing page.
+    
+    Args:
+        data (PromptRequest): Petición de generación
+        request_timeout (Optional[str]): Plazo total en segundos, incluida la espera en cola
+        
+    Returns:
+        dict: ID del trabajo encolado
+        
+    Raises:
+        HTTPException: Para errores de validación
+    """
+    deadline = resolve_deadline(request_timeout, "job")
+    validate_generation_request(data.prompt)
+    if data.variants > 1 and data.mode == "parallel":
+        raise handle_validation_error(
+            "variants",
+            "Las variantes múltiples solo están disponibles en modo 'standard'"
+        )
+    
+    job_id = await get_job_queue().enqueue("generate", data.model_dump(), deadline)
+    return create_success_response(
+        data={"job_id": job_id, "status": "queued"},
+        message="Generación encolada"
+    )
+
+
+@router.post("/modify", status_code=202)
+async def encolar_modificacion(
+    data: ModificationRequest,
+    request_timeout: Optional[str] = Header(default=None, alias="X-Request-Timeout")
+):
+    """
+    Encola la modificación de una landing page.
+    
+    Args:
+        data (ModificationRequest): Petición de modificación
+        request_timeout (Optional[str]): Plazo total en segundos, incluida la espera en cola
+        
+    Returns:
+        dict: ID del trabajo encolado
+        
+    Raises:
+        HTTPException: Para errores de validación
+    """
+    deadline = resolve_deadline(request_timeout, "job")
+    validate_modification_request(data.currentHTML, data.modificationRequest)
+    
+    job_id = await get_job_queue().enqueue("modify", data.model_dump(), deadline)
+    return create_success_response(
+        data={"job_id": job_id, "status": "queued"},
+        message="Modificación encolada"
+    )
+
+
+@router.get("/{job_id}")
+async def obtener_trabajo(
+    job_id: str,
+    wait: float = Query(default=0, ge=0, le=MAX_WAIT_SECONDS, description="Segundos de long-poll")
+):
+    """
+    Obtiene el estado de un trabajo, esperando opcionalmente a que termine.
+    
+    Args:
+        job_id (str): ID del trabajo
+        wait (float): Segundos máximos a esperar a que el trabajo termine (long-poll)
+        
+    Returns:
+        dict: Estado del trabajo y su resultado si ya terminó
+        
+    Raises:
+        HTTPException: 404 si el trabajo no existe
+    """
+    job = await get_job_queue().wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {job_id}")
+    
+    # Server-Timing de la consulta: tiempo en cola y de ejecución del trabajo
+    if job["started_at"] is not None:
+        add_stage("job-queue", job["started_at"] - job["created_at"])
+        if job["finished_at"] is not None:
+            add_stage("job-run", job["finished_at"] - job["started_at"])
+    
+    return create_success_response(data=job, message=f"Estado del trabajo: {job['status']}")
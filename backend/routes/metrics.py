@@ -0,0 +1,70 @@
+"""
+Ruta `/metrics` para Prometheus.
+
+Expone las métricas que registra `utils.metrics` (latencia por ruta, llamadas a
+OpenAI, tokens, reintentos y errores) junto con los valores que ya llevan otros
+módulos y se leen al momento del scrape: profundidad de la cola de trabajos y
+aciertos de las cachés de idempotencia y de respuestas comprimidas.
+"""
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from services.job_queue import get_job_queue
+from utils.compression import get_compression_stats
+from utils.idempotency import get_idempotency_store
+from utils.metrics import CONTENT_TYPE, register_collector, render_metrics
+
+
+# Router sin prefijo: Prometheus espera la ruta /metrics
+router = APIRouter(tags=["metrics"])
+
+
+def _cache_lookups():
+    idempotencia = get_idempotency_store()
+    compresion = get_compression_stats()
+    # Solo las respuestas completas pasan por la caché de variantes comprimidas
+    consultas_compresion = compresion["responses"] - compresion["streamed"]
+    return {
+        "idempotency": (idempotencia.hits, idempotencia.hits + idempotencia.misses),
+        "compressed_responses": (compresion["cache_hits"], consultas_compresion)
+    }
+
+
+def _collect_cache_requests():
+    for cache, (aciertos, consultas) in _cache_lookups().items():
+        yield {"cache": cache, "result": "hit"}, aciertos
+        yield {"cache": cache, "result": "miss"}, consultas - aciertos
+
+
+def _collect_cache_hit_ratio():
+    for cache, (aciertos, consultas) in _cache_lookups().items():
+        if consultas:
+            yield {"cache": cache}, aciertos / consultas
+
+
+register_collector(
+    "job_queue_depth", "gauge", "Trabajos en cola esperando un worker",
+    lambda: [({}, get_job_queue().depth())]
+)
+register_collector(
+    "cache_requests_total", "counter", "Consultas a las cachés por resultado",
+    _collect_cache_requests
+)
+register_collector(
+    "cache_hit_ratio", "gauge", "Proporción de aciertos de cada caché desde el arranque",
+    _collect_cache_hit_ratio
+)
+
+
+@router.get("/metrics")
+async def metrics_route():
+    """
+    Endpoint de métricas en el formato de texto de Prometheus.
+    
+    Returns:
+        Response: Exposición de todas las métricas
+    """
+    # La profundidad de la cola se consulta en SQLite: no bloquear el event loop
+    return Response(content=await run_in_threadpool(render_metrics), headers={"Content-Type": CONTENT_TYPE})
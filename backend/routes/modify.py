@@ -5,15 +5,29 @@ Este módulo contiene los endpoints relacionados con la modificación
 iterativa de landing pages usando inteligencia artificial.
 """
 
-from fastapi import APIRouter
-from typing import List
-from schemas.modification_schema import ModificationRequest, ModificationResponse, ConversationEntry
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
+from schemas.modification_schema import (
+    ModificationRequest,
+    ModificationResponse,
+    ConversationEntry,
+    DesignTokensRequest
+)
 from services.modify_code import (
     modificar_landing_conversacional, 
     validate_modification_request,
     get_modification_examples
 )
-from utils.error_handlers import handle_generic_error, create_success_response
+from services.conversation_summary import get_summary_store
+from services.modification_results import get_modification_result_store
+from utils.cancellation import CancellationToken, cancel_on_disconnect
+from utils.deadline import resolve_deadline
+from utils.design_tokens import apply_design_tokens, extract_design_tokens, read_design_tokens
+from utils.error_handlers import handle_generic_error, handle_validation_error, create_success_response
+from utils.html_diff import compute_html_patch, patch_size
+from utils.html_minify import get_minification_stats
+from utils.idempotency import get_idempotency_store, request_fingerprint, validate_idempotency_key
 
 
 # Crear router para las rutas de modificación
@@ -27,44 +41,66 @@ router = APIRouter(
 )
 
 
-@router.post("/modify-landing", response_model=ModificationResponse)
-async def modificar_landing_route(data: ModificationRequest):
+@router.post("/modify-landing", response_model=ModificationResponse, response_model_exclude_none=True)
+async def modificar_landing_route(
+    data: ModificationRequest,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    request_timeout: Optional[str] = Header(default=None, alias="X-Request-Timeout")
+):
     """
     Endpoint para modificar una landing page existente de forma conversacional.
     
+    Si se envía el header `Idempotency-Key`, un reintento con la misma clave y
+    el mismo cuerpo reutiliza la modificación en curso o ya terminada.
+    Si el cliente se desconecta, la llamada a OpenAI se corta (con clave, tras
+    un período de gracia).
+    Todas las etapas comparten el plazo de `X-Request-Timeout` (o el del endpoint
+    por defecto) y la petición responde 504 si se agota.
+    
     Args:
         data (ModificationRequest): Datos de la petición de modificación
+        request (Request): Petición HTTP, para detectar la desconexión del cliente
+        response (Response): Respuesta HTTP, para indicar si el resultado es reutilizado
+        idempotency_key (Optional[str]): Clave de idempotencia opcional
+        request_timeout (Optional[str]): Plazo total en segundos para toda la petición
         
     Returns:
-        ModificationResponse: Respuesta con el código modificado y análisis
-        
+        ModificationResponse: Respuesta con el código modificado, o con un diff
+            compacto contra currentHTML si se pidió responseFormat='diff'
+            
     Raises:
         HTTPException: Para errores de validación o modificación
     """
     try:
+        # El plazo corre desde que llega la petición y lo comparten todas las etapas
+        deadline = resolve_deadline(request_timeout, "modify")
+        
         # Validar la petición usando el validador modular
         validate_modification_request(
-            data.current_html, 
-            data.modification_instruction
+            data.currentHTML, 
+            data.modificationRequest
         )
+        key = validate_idempotency_key(idempotency_key)
+        deadline.check("validación")
         
-        # Realizar la modificación usando el servicio modular
-        codigo_modificado, analisis_cambios = modificar_landing_conversacional(
-            codigo_actual=data.current_html,
-            instruccion_modificacion=data.modification_instruction,
-            historial_conversacion=data.conversation_history or []
-        )
+        if key is None:
+            token = CancellationToken(deadline)
+            async with cancel_on_disconnect(request, token.cancel):
+                return await _modificar_respuesta(data, token)
         
-        # Crear respuesta estructurada
-        response = ModificationResponse(
-            modified_html=codigo_modificado,
-            changes_analysis=analisis_cambios,
-            success=True,
-            message="Modificación aplicada exitosamente"
+        resultado, reutilizado = await get_idempotency_store().run(
+            key,
+            request_fingerprint("/api/modify-landing", data.model_dump_json()),
+            lambda token: _modificar_respuesta(data, token),
+            request,
+            deadline
         )
-        
-        return response
-        
+        if reutilizado:
+            response.headers["Idempotent-Replayed"] = "true"
+        return resultado
+    
     except Exception as e:
         # Manejar errores usando el handler modular
         if hasattr(e, 'status_code'):
@@ -75,6 +111,151 @@ async def modificar_landing_route(data: ModificationRequest):
             raise handle_generic_error(e, "modificación de landing page")
 
 
+async def _modificar_respuesta(data: ModificationRequest, cancel_token: CancellationToken) -> ModificationResponse:
+    """
+    Ejecuta la modificación en el threadpool y construye la respuesta.
+    
+    Args:
+        data (ModificationRequest): Petición de modificación ya validada
+        cancel_token (CancellationToken): Token que corta la llamada a OpenAI
+        
+    Returns:
+        ModificationResponse: Página completa o diff compacto según responseFormat
+    """
+    # Recuperar el resumen incremental de la conversación, si el cliente la identifica
+    # Si el cliente deshizo turnos, su página es una que el resumen ya conoce y
+    # el resumen vuelve al estado que tenía con ella
+    resumen = None
+    if data.conversationId:
+        resumen = get_summary_store().get_or_create(data.conversationId)
+        if not resumen.restore(data.currentHTML):
+            if resumen.is_empty():
+                resumen.seed_from_history(data.conversationHistory or [])
+            resumen.checkpoint(data.currentHTML)
+    
+    # Realizar la modificación usando el servicio modular
+    codigo_modificado, _, cambios, advertencias = await run_in_threadpool(
+        modificar_landing_conversacional,
+        codigo_actual=data.currentHTML,
+        instruccion_modificacion=data.modificationRequest,
+        historial_conversacion=data.conversationHistory or [],
+        resumen=resumen,
+        cancel_token=cancel_token,
+        output_mode=data.outputMode
+    )
+    if resumen is not None:
+        resumen.checkpoint(codigo_modificado)
+    detalles = {"changes_applied": cambios, "warnings": advertencias or None}
+    
+    # Devolver solo el diff si se pidió y efectivamente es más chico que la página
+    if data.responseFormat == "diff":
+        cancel_token.raise_if_cancelled("cálculo del diff")
+        patch = compute_html_patch(data.currentHTML, codigo_modificado)
+        if patch_size(patch) < len(codigo_modificado.encode("utf-8")):
+            # Si el cliente no puede aplicar el diff, descarga la página sin repetir la modificación
+            get_modification_result_store().put(codigo_modificado)
+            return ModificationResponse(patch=patch, **detalles)
+    
+    # Crear respuesta estructurada
+    return ModificationResponse(html=codigo_modificado, **detalles)
+
+
+@router.get("/modify-landing/results/{checksum}")
+async def obtener_resultado_modificacion(checksum: str):
+    """
+    Endpoint para descargar la página completa de una modificación devuelta como diff.
+    
+    El cliente lo usa cuando no puede aplicar el diff (por ejemplo, si su HTML
+    base ya no coincide), en lugar de volver a pedir la modificación al modelo.
+    
+    Args:
+        checksum (str): `patch.resultChecksum` del diff recibido
+        
+    Returns:
+        dict: Página completa resultante de la modificación
+        
+    Raises:
+        HTTPException: 404 si la página no existe o ya expiró
+    """
+    html_code = get_modification_result_store().get(checksum)
+    if html_code is None:
+        raise HTTPException(status_code=404, detail=f"Resultado no encontrado o expirado: {checksum}")
+    
+    return create_success_response(
+        data={"html": html_code},
+        message="Resultado de la modificación obtenido exitosamente"
+    )
+
+
+@router.post("/design-tokens")
+async def leer_design_tokens_route(data: DesignTokensRequest):
+    """
+    Endpoint para obtener los design tokens (variables de :root) de una landing page.
+    
+    Si la página todavía repite colores, fuentes o espaciados literales (por
+    ejemplo, una página generada antes de esta etapa), se extraen primero y la
+    respuesta incluye el HTML resultante.
+    
+    Args:
+        data (DesignTokensRequest): Página a analizar
+        
+    Returns:
+        dict: HTML con los tokens extraídos y el mapa de tokens
+    """
+    try:
+        html_code = extract_design_tokens(data.currentHTML)
+        return create_success_response(
+            data={"html": html_code, "design_tokens": read_design_tokens(html_code)},
+            message="Design tokens obtenidos exitosamente"
+        )
+    
+    except Exception as e:
+        raise handle_generic_error(e, "lectura de design tokens")
+
+
+@router.post("/design-tokens/apply")
+async def aplicar_design_tokens_route(data: DesignTokensRequest):
+    """
+    Endpoint para cambiar paleta, tipografía o espaciados reescribiendo variables de :root.
+    
+    Aplica el cambio localmente, sin llamar al modelo: solo cambian las
+    declaraciones de las variables indicadas.
+    
+    Args:
+        data (DesignTokensRequest): Página actual y valores nuevos de las variables
+        
+    Returns:
+        dict: Página completa (o diff compacto si se pidió responseFormat='diff') y el mapa de tokens
+        
+    Raises:
+        HTTPException: 400 si una variable no existe en la página o su valor no es válido
+    """
+    try:
+        try:
+            html_code = apply_design_tokens(data.currentHTML, data.tokens)
+        except ValueError as e:
+            raise handle_validation_error("tokens", str(e))
+        
+        respuesta = {"design_tokens": read_design_tokens(html_code)}
+        if data.responseFormat == "diff":
+            patch = compute_html_patch(data.currentHTML, html_code)
+            if patch_size(patch) < len(html_code.encode("utf-8")):
+                respuesta["patch"] = patch
+        if "patch" not in respuesta:
+            respuesta["html"] = html_code
+        
+        return create_success_response(
+            data=respuesta,
+            message=f"{len(data.tokens)} design tokens aplicados exitosamente"
+        )
+    
+    except Exception as e:
+        if hasattr(e, 'status_code'):
+            raise e
+        else:
+            raise handle_generic_error(e, "aplicación de design tokens")
+
+
 @router.get("/modify-examples")
 async def get_modification_examples():
     """
@@ -90,7 +271,7 @@ async def get_modification_examples():
             data={"examples": examples},
             message="Ejemplos de modificación obtenidos exitosamente"
         )
-        
+    
     except Exception as e:
         raise handle_generic_error(e, "obtención de ejemplos de modificación")
 
@@ -109,15 +290,15 @@ async def validate_modification_route(data: ModificationRequest):
     try:
         # Validar usando el validador modular
         validate_modification_request(
-            data.current_html, 
-            data.modification_instruction
+            data.currentHTML, 
+            data.modificationRequest
         )
         
         return create_success_response(
             data={"valid": True},
             message="Petición de modificación válida"
         )
-        
+    
     except Exception as e:
         if hasattr(e, 'status_code'):
             raise e
@@ -135,14 +316,20 @@ async def get_conversation_history(conversation_id: str):
         conversation_id (str): ID de la conversación
         
     Returns:
-        dict: Historial de la conversación
+        dict: Historial de la conversación y su resumen incremental, si existe
         
     Note:
-        Este endpoint está preparado para implementación futura con base de datos.
+        El historial completo está preparado para implementación futura con base de datos.
     """
-    # TODO: Implementar cuando se agregue persistencia
+    resumen = get_summary_store().get(conversation_id)
+    
+    # TODO: Implementar el historial completo cuando se agregue persistencia
     return create_success_response(
-        data={"conversation_id": conversation_id, "history": []},
+        data={
+            "conversation_id": conversation_id,
+            "history": [],
+            "summary": resumen.to_dict() if resumen else None
+        },
         message="Funcionalidad en desarrollo - historial persistente"
     )
 
@@ -161,7 +348,9 @@ async def delete_conversation_history(conversation_id: str):
     Note:
         Este endpoint está preparado para implementación futura con base de datos.
     """
-    # TODO: Implementar cuando se agregue persistencia
+    get_summary_store().delete(conversation_id)
+    
+    # TODO: Eliminar también el historial cuando se agregue persistencia
     return create_success_response(
         data={"conversation_id": conversation_id, "deleted": True},
         message="Funcionalidad en desarrollo - eliminación de historial"
@@ -177,6 +366,10 @@ async def health_check():
         dict: Estado del servicio
     """
     return create_success_response(
-        data={"service": "modification", "status": "healthy"},
+        data={
+            "service": "modification",
+            "status": "healthy",
+            "prompt_minification": get_minification_stats()
+        },
         message="Servicio de modificación funcionando correctamente"
     )
@@ -0,0 +1,161 @@
+"""
+Rutas para publicar landing pages y servirlas.
+
+`POST /api/publish` guarda una página terminada en el almacén direccionado por
+contenido y devuelve su URL. `GET /p/{id}` sirve la página desde disco con un
+ETag fuerte, caché inmutable y la variante precomprimida que acepte el cliente;
+`GET /p/{slug}` sirve la última versión publicada con ese alias, revalidando.
+`GET /p/styles/{id}.css` sirve las hojas de estilos compartidas que se extraen
+de las páginas publicadas con `external_css`.
+"""
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from schemas.publish_schema import PublishRequest
+from services.publish_store import get_publish_store, validate_publish_request
+from utils.error_handlers import create_success_response, handle_generic_error
+from utils.static_files import IMMUTABLE_CACHE_CONTROL, static_file_response
+
+
+# Crear router para la publicación de landing pages
+router = APIRouter(
+    prefix="/api",
+    tags=["publish"],
+    responses={
+        400: {"description": "Error de validación"},
+        500: {"description": "Error interno del servidor"}
+    }
+)
+
+# Router para servir las páginas publicadas (fuera de /api, con URLs cortas)
+pages_router = APIRouter(
+    prefix="/p",
+    tags=["publish"],
+    responses={404: {"description": "Página no publicada"}}
+)
+
+# Las páginas publicadas corren en un origen opaco: sus scripts no comparten
+# origen con la API
+_PAGE_HEADERS = {
+    "Content-Security-Policy": "sandbox allow-scripts allow-forms allow-popups allow-modals",
+    "X-Content-Type-Options": "nosniff"
+}
+
+
+@router.post("/publish")
+async def publicar_landing_route(data: PublishRequest, request: Request):
+    """
+    Endpoint para publicar una landing page terminada.
+    
+    La página se guarda una sola vez por contenido, junto con sus variantes
+    gzip (y brotli) precomprimidas. Con `slug`, el alias pasa a apuntar a esta
+    versión. Con `external_css`, el CSS embebido se publica aparte como hoja de
+    estilos por hash, que comparten todas las páginas con el mismo CSS.
+    
+    Args:
+        data (PublishRequest): Página y alias opcional
+        request (Request): Petición HTTP, para armar las URLs absolutas
+        
+    Returns:
+        dict: Respuesta con 'id', 'url' (inmutable), 'slug_url' (si hay alias),
+            'etag', 'bytes', los bytes de cada variante comprimida y, si se
+            extrajo el CSS, 'stylesheet'
+            
+    Raises:
+        HTTPException: Para errores de validación o de escritura
+    """
+    try:
+        validate_publish_request(data.html, data.slug, data.external_css, data.critical_css)
+        
+        # La compresión a máxima calidad y la escritura a disco no bloquean el event loop
+        publicada = await run_in_threadpool(
+            get_publish_store().publish,
+            data.html,
+            data.slug,
+            data.external_css,
+            data.critical_css
+        )
+        
+        base = str(request.base_url).rstrip("/")
+        publicada["url"] = f"{base}/p/{publicada['id']}"
+        if data.slug:
+            publicada["slug_url"] = f"{base}/p/{data.slug}"
+        
+        return create_success_response(
+            data=publicada,
+            message="Landing page ya publicada" if publicada["reused"] else "Landing page publicada exitosamente"
+        )
+    
+    except Exception as e:
+        # Manejar errores usando el handler modular
+        if hasattr(e, 'status_code'):
+            # Si ya es una HTTPException, re-lanzarla
+            raise e
+        else:
+            # Convertir a HTTPException usando el handler
+            raise handle_generic_error(e, "publicación de landing page")
+
+
+@pages_router.api_route("/styles/{nombre}", methods=["GET", "HEAD"])
+async def servir_hoja_de_estilos_route(nombre: str, request: Request):
+    """
+    Sirve una hoja de estilos compartida, con caché inmutable.
+    
+    Args:
+        nombre (str): Id de la hoja de estilos seguido de `.css`
+        request (Request): Petición HTTP (Accept-Encoding, If-None-Match)
+        
+    Returns:
+        Response: Archivo de la hoja de estilos, o 304 si el cliente ya lo tiene
+        
+    Raises:
+        HTTPException: 404 si la hoja de estilos no existe
+    """
+    style_id = nombre.removesuffix(".css")
+    variantes = get_publish_store().stylesheet_variants(style_id) if nombre.endswith(".css") else None
+    if variantes is None:
+        raise HTTPException(status_code=404, detail="Hoja de estilos no encontrada")
+    
+    return static_file_response(
+        request,
+        variantes,
+        etag=style_id,
+        media_type="text/css",
+        headers={"X-Content-Type-Options": "nosniff"}
+    )
+
+
+@pages_router.api_route("/{ref}", methods=["GET", "HEAD"])
+async def servir_landing_route(ref: str, request: Request):
+    """
+    Sirve una página publicada por id o por alias.
+    
+    Por id la respuesta es inmutable (un año de caché sin revalidar). Por alias
+    se revalida en cada visita (`no-cache`): el ETag es el del contenido, así que
+    mientras el alias no cambie la respuesta es un 304 sin cuerpo.
+    
+    Args:
+        ref (str): Id de la página o alias
+        request (Request): Petición HTTP (Accept-Encoding, If-None-Match)
+        
+    Returns:
+        Response: Archivo de la página, o 304 si el cliente ya lo tiene
+        
+    Raises:
+        HTTPException: 404 si la página o el alias no existen
+    """
+    store = get_publish_store()
+    resuelto = store.resolve(ref)
+    if resuelto is None:
+        raise HTTPException(status_code=404, detail="Página no encontrada")
+    
+    page_id, por_alias = resuelto
+    return static_file_response(
+        request,
+        store.variants(page_id),
+        etag=page_id,
+        media_type="text/html",
+        cache_control="no-cache" if por_alias else IMMUTABLE_CACHE_CONTROL,
+        headers=_PAGE_HEADERS
+    )
+
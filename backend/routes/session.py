@@ -0,0 +1,252 @@
+"""
+Rutas WebSocket para sesiones de edición conversacional.
+
+Una sesión mantiene el HTML actual y el historial en memoria del servidor: cada
+turno envía solo la instrucción, y el progreso y el resultado vuelven por la
+misma conexión, sin re-enviar la página ni pagar el setup de una petición HTTP
+(ni el preflight CORS) en cada turno.
+
+Al conectarse con `?sessionId=...` se retoma una sesión anterior que todavía no
+expiró (por ejemplo, tras un corte de red), con su HTML e historial; si no
+existe, se crea una nueva. Las sesiones sobreviven a la desconexión hasta que
+expiran por inactividad. Si el cliente se desconecta durante un turno, la
+llamada a OpenAI se corta.
+
+Protocolo (mensajes JSON):
+    cliente → {"type": "sync", "html": "...", "history": [...]}
+    cliente → {"type": "generate", "prompt": "...", "mode": "standard"}
+    cliente → {"type": "modify", "instruction": "...", "responseFormat": "diff", "outputMode": "structured"}
+    servidor → {"type": "session", "sessionId": "...", "resumed": false}
+    servidor → {"type": "progress", "chars": 1234}
+    servidor → {"type": "result", "html": "..."} | {"type": "result", "patch": {...}}
+               (los resultados de 'modify' incluyen además "changes_applied" y "warnings")
+    servidor → {"type": "error", "detail": "..."}
+    
+Los mensajes 'generate' y 'modify' aceptan "timeout" (segundos) con el mismo
+significado que el header `X-Request-Timeout` de los endpoints HTTP.
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+
+from schemas.modification_schema import ConversationEntry
+from services.generate_code import generar_landing, generar_landing_paralela, validate_generation_request
+from services.modification_results import get_modification_result_store
+from services.modify_code import modificar_landing_conversacional, validate_modification_request
+from services.session_store import LandingSession, get_session_store
+from utils.cancellation import CancellationToken, RequestCancelled
+from utils.deadline import resolve_deadline
+from utils.html_diff import compute_html_patch, patch_size
+
+
+# Crear router para las rutas de sesión
+router = APIRouter(
+    prefix="/api",
+    tags=["session"]
+)
+
+
+@router.websocket("/ws/landing-session")
+async def landing_session_socket(
+    websocket: WebSocket,
+    session_id: Optional[str] = Query(default=None, alias="sessionId")
+):
+    """
+    Endpoint WebSocket para una sesión de edición conversacional.
+    
+    Los mensajes se leen en una tarea aparte mientras se procesa cada turno, de
+    modo que una desconexión se detecta de inmediato y cancela el turno en curso.
+    
+    Args:
+        websocket (WebSocket): Conexión del cliente
+        session_id (Optional[str]): Sesión a retomar, si el cliente ya tenía una
+    """
+    await websocket.accept()
+    
+    store = get_session_store()
+    session = store.get(session_id) if session_id else None
+    retomada = session is not None
+    if session is None:
+        session = store.create()
+    await websocket.send_json({"type": "session", "sessionId": session.session_id, "resumed": retomada})
+    
+    entrada: asyncio.Queue = asyncio.Queue()
+    turno: Optional[CancellationToken] = None
+    
+    async def leer_mensajes() -> None:
+        try:
+            while True:
+                entrada.put_nowait(await websocket.receive_json())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # El cliente se fue (o envió algo que no es JSON): cortar el turno en curso
+            if turno is not None:
+                turno.cancel()
+            entrada.put_nowait(None)
+    
+    lector = asyncio.create_task(leer_mensajes())
+    try:
+        while True:
+            mensaje = await entrada.get()
+            if mensaje is None:
+                return
+            tipo = mensaje.get("type")
+            
+            # Cada mensaje renueva la expiración por inactividad de la sesión
+            store.get(session.session_id)
+            
+            try:
+                if tipo == "sync":
+                    _sync_session(session, mensaje)
+                elif tipo in ("generate", "modify"):
+                    turno = CancellationToken(resolve_deadline(_timeout(mensaje), tipo))
+                    if tipo == "generate":
+                        await _handle_generate(websocket, session, mensaje, turno)
+                    else:
+                        await _handle_modify(websocket, session, mensaje, turno)
+                else:
+                    await websocket.send_json({"type": "error", "detail": f"Tipo de mensaje desconocido: {tipo}"})
+            
+            except RequestCancelled:
+                # El turno se cortó porque el cliente se desconectó
+                return
+            except (ValidationError, ValueError) as e:
+                await websocket.send_json({"type": "error", "detail": f"Mensaje inválido: {e}"})
+            except Exception as e:
+                detail = getattr(e, "detail", None) or str(e)
+                await websocket.send_json({"type": "error", "detail": detail})
+            finally:
+                turno = None
+    
+    except WebSocketDisconnect:
+        pass
+    
+    finally:
+        lector.cancel()
+        # La sesión queda en el almacén para poder retomarla hasta que expire
+        store.get(session.session_id)
+
+
+def _sync_session(session: LandingSession, mensaje: dict) -> None:
+    """
+    Reemplaza el estado de la sesión con el HTML e historial que envía el cliente.
+    
+    Args:
+        session (LandingSession): Sesión a actualizar
+        mensaje (dict): Mensaje 'sync' con 'html' e 'history'
+    """
+    historial = [ConversationEntry(**entrada) for entrada in mensaje.get("history") or []]
+    session.sync(str(mensaje.get("html") or ""), historial)
+
+
+async def _handle_generate(
+    websocket: WebSocket,
+    session: LandingSession,
+    mensaje: dict,
+    token: CancellationToken
+) -> None:
+    """
+    Genera una landing page inicial y la guarda como estado de la sesión.
+    
+    Args:
+        websocket (WebSocket): Conexión del cliente
+        session (LandingSession): Sesión actual
+        mensaje (dict): Mensaje 'generate' con 'prompt', y 'mode' y 'timeout' opcionales
+        token (CancellationToken): Token del turno; se cancela si el cliente se desconecta
+    """
+    prompt = str(mensaje.get("prompt") or "")
+    validate_generation_request(prompt)
+    
+    generar = generar_landing_paralela if mensaje.get("mode") == "parallel" else generar_landing
+    html_code = await run_in_threadpool(generar, prompt, token)
+    
+    session.record_turn("initial_generation", prompt, html_code)
+    await websocket.send_json({"type": "result", "html": html_code})
+
+
+async def _handle_modify(
+    websocket: WebSocket,
+    session: LandingSession,
+    mensaje: dict,
+    token: CancellationToken
+) -> None:
+    """
+    Aplica una modificación sobre el HTML de la sesión, informando el progreso.
+    
+    Args:
+        websocket (WebSocket): Conexión del cliente
+        session (LandingSession): Sesión actual
+        mensaje (dict): Mensaje 'modify' con 'instruction', y 'responseFormat', 'outputMode' y 'timeout' opcionales
+        token (CancellationToken): Token del turno; se cancela si el cliente se desconecta
+    """
+    instruccion = str(mensaje.get("instruction") or "")
+    validate_modification_request(session.current_html, instruccion)
+    
+    loop = asyncio.get_running_loop()
+    progreso: asyncio.Queue = asyncio.Queue()
+    
+    def on_progress(recibidos: int) -> None:
+        # Se invoca desde el hilo del threadpool: entregar al event loop de forma segura
+        loop.call_soon_threadsafe(progreso.put_nowait, recibidos)
+    
+    async def reenviar_progreso() -> None:
+        while True:
+            recibidos = await progreso.get()
+            # Coalescer: si llegaron varios avances, enviar solo el último
+            while not progreso.empty():
+                recibidos = progreso.get_nowait()
+            try:
+                await websocket.send_json({"type": "progress", "chars": recibidos})
+            except Exception:
+                # El cliente se fue: cortar la llamada a OpenAI en lugar de terminarla
+                token.cancel()
+                return
+    
+    html_base = session.current_html
+    output_mode = mensaje.get("outputMode")
+    reenvio = asyncio.create_task(reenviar_progreso())
+    try:
+        codigo_modificado, _, cambios, advertencias = await run_in_threadpool(
+            modificar_landing_conversacional,
+            codigo_actual=html_base,
+            instruccion_modificacion=instruccion,
+            historial_conversacion=session.history,
+            on_progress=on_progress,
+            resumen=session.summary,
+            cancel_token=token,
+            output_mode=output_mode if output_mode in ("structured", "markers") else None
+        )
+    finally:
+        reenvio.cancel()
+    
+    session.record_turn("modification", instruccion, codigo_modificado)
+    detalles = {"changes_applied": cambios, "warnings": advertencias}
+    
+    if mensaje.get("responseFormat") == "diff":
+        token.raise_if_cancelled("cálculo del diff")
+        patch = compute_html_patch(html_base, codigo_modificado)
+        if patch_size(patch) < len(codigo_modificado.encode("utf-8")):
+            get_modification_result_store().put(codigo_modificado)
+            await websocket.send_json({"type": "result", "patch": patch, **detalles})
+            return
+    
+    await websocket.send_json({"type": "result", "html": codigo_modificado, **detalles})
+
+
+def _timeout(mensaje: dict) -> Optional[str]:
+    """
+    Obtiene el plazo pedido en un mensaje, en el formato del header `X-Request-Timeout`.
+    
+    Args:
+        mensaje (dict): Mensaje del cliente
+        
+    Returns:
+        Optional[str]: Segundos pedidos, o None para usar el plazo por defecto
+    """
+    timeout = mensaje.get("timeout")
+    return str(timeout) if timeout is not None else None
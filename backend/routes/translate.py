@@ -0,0 +1,87 @@
+"""
+Rutas para la traducción de landing pages.
+
+Este módulo contiene los endpoints que generan variantes localizadas de una
+landing page existente traduciendo solo sus textos.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from schemas.translation_schema import TranslationRequest, TranslationResponse
+from services.translate_page import traducir_landing, validate_translation_request
+from utils.cancellation import CancellationToken, cancel_on_disconnect
+from utils.deadline import resolve_deadline
+from utils.error_handlers import handle_generic_error
+
+
+# Crear router para las rutas de traducción
+router = APIRouter(
+    prefix="/api",
+    tags=["translation"],
+    responses={
+        400: {"description": "Error de validación"},
+        500: {"description": "Error interno del servidor"}
+    }
+)
+
+
+@router.post("/translate-landing", response_model=TranslationResponse, response_model_exclude_none=True)
+async def traducir_landing_route(
+    data: TranslationRequest,
+    request: Request,
+    request_timeout: Optional[str] = Header(default=None, alias="X-Request-Timeout")
+):
+    """
+    Endpoint para traducir una landing page existente a uno o más idiomas.
+    
+    Solo se envían al modelo los textos visibles y los atributos traducibles,
+    en un lote por idioma, y las traducciones se escriben sobre el HTML original.
+    Los idiomas se traducen en paralelo. Si el cliente se desconecta, las
+    llamadas a OpenAI se cortan.
+    
+    Args:
+        data (TranslationRequest): Página e idiomas destino
+        request (Request): Petición HTTP, para detectar la desconexión del cliente
+        request_timeout (Optional[str]): Plazo total en segundos para toda la petición
+        
+    Returns:
+        TranslationResponse: HTML traducido por idioma, advertencias y tamaño del texto traducido
+        
+    Raises:
+        HTTPException: Para errores de validación o traducción
+    """
+    try:
+        # El plazo corre desde que llega la petición y lo comparten todas las etapas
+        deadline = resolve_deadline(request_timeout, "translate")
+        
+        # Validar la petición usando el validador modular
+        validate_translation_request(data.html, data.languages)
+        deadline.check("validación")
+        
+        token = CancellationToken(deadline)
+        async with cancel_on_disconnect(request, token.cancel):
+            paginas, estadisticas = await run_in_threadpool(
+                traducir_landing,
+                data.html,
+                data.languages,
+                data.sourceLanguage,
+                token
+            )
+        
+        advertencias = {idioma: p["warnings"] for idioma, p in paginas.items() if p["warnings"]}
+        return TranslationResponse(
+            translations={idioma: p["html"] for idioma, p in paginas.items()},
+            warnings=advertencias or None,
+            stats=estadisticas
+        )
+    
+    except Exception as e:
+        # Manejar errores usando el handler modular
+        if hasattr(e, 'status_code'):
+            # Si ya es una HTTPException, re-lanzarla
+            raise e
+        else:
+            # Convertir a HTTPException usando el handler
+            raise handle_generic_error(e, "traducción de landing page")
@@ -1,6 +1,6 @@
 # Importación de BaseModel y Field de Pydantic para validación de datos
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 
 class ConversationEntry(BaseModel):
     """
@@ -32,6 +32,13 @@ class ModificationRequest(BaseModel):
         currentHTML (str): Código HTML actual de la landing page que se va a modificar
         modificationRequest (str): Instrucción en lenguaje natural del usuario sobre qué modificar
         conversationHistory (List[ConversationEntry]): Historial de la conversación para mantener contexto
+        responseFormat (str): 'full' para recibir la página completa o 'diff' para recibir
+                              solo un diff compacto contra currentHTML
+        conversationId (Optional[str]): ID de la conversación, para mantener un resumen
+                                        incremental de las decisiones en el servidor
+        outputMode (Optional[str]): 'structured' para que el modelo devuelva un JSON con el
+                                    código y los cambios, o 'markers' para el formato de texto
+                                    con marcadores; por defecto el configurado en el servidor
     """
     currentHTML: str = Field(
         ..., 
@@ -49,18 +56,36 @@ class ModificationRequest(BaseModel):
         description="Historial de conversación para mantener contexto",
         max_items=10  # Limitar a máximo 10 entradas para evitar payloads muy grandes
     )
+    responseFormat: Literal["full", "diff"] = Field(
+        default="full",
+        description="Formato de respuesta: página completa ('full') o diff contra currentHTML ('diff')"
+    )
+    conversationId: Optional[str] = Field(
+        default=None,
+        description="ID de la conversación para el resumen incremental de decisiones",
+        max_length=64
+    )
+    outputMode: Optional[Literal["structured", "markers"]] = Field(
+        default=None,
+        description="Formato de salida del modelo: JSON estructurado ('structured') o marcadores de texto ('markers')"
+    )
 
 class ModificationResponse(BaseModel):
     """
     Modelo de respuesta para las modificaciones conversacionales.
     
     Attributes:
-        html (str): Código HTML modificado
+        html (Optional[str]): Código HTML modificado (se omite cuando se devuelve un diff)
+        patch (Optional[Dict[str, Any]]): Diff compacto contra el HTML enviado (solo con responseFormat='diff')
         status (str): Estado de la operación
         changes_applied (List[str]): Lista de cambios aplicados (opcional)
         warnings (List[str]): Lista de advertencias o notas (opcional)
     """
-    html: str = Field(..., description="Código HTML modificado")
+    html: Optional[str] = Field(default=None, description="Código HTML modificado")
+    patch: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Diff compacto contra currentHTML, con checksums de la base y del resultado"
+    )
     status: str = Field(default="success", description="Estado de la operación")
     changes_applied: Optional[List[str]] = Field(
         default=None, 
@@ -70,3 +95,28 @@ class ModificationResponse(BaseModel):
         default=None, 
         description="Lista de advertencias o notas sobre la modificación"
     )
+
+class DesignTokensRequest(BaseModel):
+    """
+    Modelo de validación para leer o aplicar los design tokens de una landing page.
+    
+    Attributes:
+        currentHTML (str): Código HTML actual de la landing page
+        tokens (Dict[str, str]): Valor nuevo de cada variable de :root a cambiar
+                                 (solo al aplicar), por ejemplo {"--color-1": "#1e3a8a"}
+        responseFormat (str): 'full' para recibir la página completa o 'diff' para recibir
+                              solo un diff compacto contra currentHTML
+    """
+    currentHTML: str = Field(
+        ...,
+        description="Código HTML actual de la landing page",
+        min_length=1
+    )
+    tokens: Dict[str, str] = Field(
+        default={},
+        description="Valor nuevo de cada variable de :root a cambiar"
+    )
+    responseFormat: Literal["full", "diff"] = Field(
+        default="full",
+        description="Formato de respuesta: página completa ('full') o diff contra currentHTML ('diff')"
+    )
@@ -0,0 +1,23 @@
+# Importación de BaseModel y Field de Pydantic para validación de datos
+from pydantic import BaseModel, Field
+
+class ProfileRequest(BaseModel):
+    """
+    Modelo de validación para arrancar una sesión de perfilado por muestreo.
+    
+    Attributes:
+        requests (int): Cantidad de peticiones a perfilar a partir de ahora
+        interval_ms (float): Milisegundos entre muestras de las pilas
+    """
+    requests: int = Field(
+        default=20,
+        description="Cantidad de peticiones a perfilar a partir de ahora",
+        ge=1,
+        le=1000
+    )
+    interval_ms: float = Field(
+        default=10,
+        description="Milisegundos entre muestras (menos milisegundos, más detalle y más costo)",
+        ge=1,
+        le=100
+    )
@@ -1,5 +1,8 @@
 # Importación de BaseModel de Pydantic para validación de datos
-from pydantic import BaseModel  # Clase base para crear modelos de validación de datos
+from pydantic import BaseModel, Field  # Clase base para crear modelos de validación de datos
+from typing import List, Literal
+
+from services.generate_code import MAX_VARIANTES
 
 class PromptRequest(BaseModel):
     """
@@ -12,5 +15,52 @@ class PromptRequest(BaseModel):
         prompt (str): Texto descriptivo que el usuario proporciona para generar
                      la landing page. Debe ser una cadena de texto que describa
                      las características deseadas de la página web.
+        mode (str): Modo de generación: 'standard' (una sola completion) o
+                   'parallel' (esqueleto de diseño + secciones concurrentes).
+        variants (int): Número de variantes alternativas a generar en una sola
+                       llamada al modelo (solo en modo 'standard').
+        minify (bool): Si es True, el HTML se entrega minificado para reducir
+                      los bytes transferidos.
     """
     prompt: str  # Campo obligatorio que contiene la descripción de la landing page a generar
+    mode: Literal["standard", "parallel"] = Field(
+        default="standard",
+        description="Modo de generación: 'standard' o 'parallel' (secciones concurrentes)"
+    )
+    variants: int = Field(
+        default=1,
+        ge=1,
+        le=MAX_VARIANTES,
+        description=f"Número de variantes a generar en una sola llamada (1 a {MAX_VARIANTES})"
+    )
+    minify: bool = Field(
+        default=False,
+        description="Entregar el HTML minificado (sin espacios ni comentarios redundantes)"
+    )
+
+
+class BatchPromptRequest(BaseModel):
+    """
+    Modelo de validación para la generación en lote de landing pages.
+    
+    Attributes:
+        prompts (List[str]): Descripciones de las landing pages a generar
+        mode (str): Modo de generación aplicado a todos los prompts
+        concurrency (int): Cantidad máxima de generaciones simultáneas
+    """
+    prompts: List[str] = Field(
+        ...,
+        description="Prompts a generar",
+        min_length=1,
+        max_length=100
+    )
+    mode: Literal["standard", "parallel"] = Field(
+        default="standard",
+        description="Modo de generación para todos los prompts"
+    )
+    concurrency: int = Field(
+        default=4,
+        ge=1,
+        le=8,
+        description="Cantidad máxima de generaciones simultáneas (1 a 8)"
+    )
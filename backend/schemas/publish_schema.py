@@ -0,0 +1,32 @@
+# Importación de BaseModel y Field de Pydantic para validación de datos
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class PublishRequest(BaseModel):
+    """
+    Modelo de validación para las peticiones de publicación de landing pages.
+    
+    Attributes:
+        html (str): Código HTML completo de la página a publicar
+        slug (Optional[str]): Alias legible que apunta a la última versión publicada
+        external_css (bool): Mover el CSS embebido a una hoja de estilos compartida
+        critical_css (bool): Con external_css, dejar inline el CSS de la parte visible al cargar
+    """
+    html: str = Field(
+        ...,
+        description="Código HTML completo de la página a publicar",
+        min_length=1
+    )
+    slug: Optional[str] = Field(
+        default=None,
+        description="Alias de la página (minúsculas, números y guiones)",
+        max_length=64
+    )
+    external_css: bool = Field(
+        default=False,
+        description="Mover el CSS embebido a una hoja de estilos externa, compartida entre páginas con el mismo CSS"
+    )
+    critical_css: bool = Field(
+        default=False,
+        description="Con external_css, dejar inline el CSS de la parte visible al cargar y cargar la hoja sin bloquear"
+    )
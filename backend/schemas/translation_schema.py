@@ -0,0 +1,47 @@
+# Importación de BaseModel y Field de Pydantic para validación de datos
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+class TranslationRequest(BaseModel):
+    """
+    Modelo de validación para las peticiones de traducción de landing pages.
+    
+    Attributes:
+        html (str): Código HTML de la landing page a traducir
+        languages (List[str]): Códigos de los idiomas destino (por ejemplo 'en', 'pt-BR')
+        sourceLanguage (Optional[str]): Idioma de la página; si se omite lo detecta el modelo
+    """
+    html: str = Field(
+        ...,
+        description="Código HTML de la landing page a traducir",
+        min_length=1
+    )
+    languages: List[str] = Field(
+        ...,
+        description="Códigos de los idiomas destino",
+        min_length=1,
+        max_length=5
+    )
+    sourceLanguage: Optional[str] = Field(
+        default=None,
+        description="Idioma original de la página",
+        max_length=16
+    )
+
+class TranslationResponse(BaseModel):
+    """
+    Modelo de respuesta para las traducciones.
+    
+    Attributes:
+        translations (Dict[str, str]): HTML traducido por cada idioma pedido
+        warnings (Dict[str, List[str]]): Advertencias por idioma (solo los idiomas que tengan)
+        stats (Dict[str, int]): Segmentos encontrados, textos únicos, caracteres y lotes traducidos
+        status (str): Estado de la operación
+    """
+    translations: Dict[str, str] = Field(..., description="HTML traducido por idioma")
+    warnings: Optional[Dict[str, List[str]]] = Field(
+        default=None,
+        description="Advertencias por idioma, por ejemplo textos que quedaron sin traducir"
+    )
+    stats: Dict[str, int] = Field(..., description="Tamaño del texto traducido")
+    status: str = Field(default="success", description="Estado de la operación")
@@ -0,0 +1,542 @@
+"""
+Biblioteca local de componentes extraídos de landing pages ya generadas.
+
+Cada página generada se recorre para extraer sus secciones reconocibles (nav,
+hero, precios, testimonios, footer, etc.) junto con el CSS que las afecta, y se
+guardan en SQLite indexadas por tipo de sección y por los términos de estilo
+del prompt que las originó. En una generación nueva se ofrecen al modelo los
+componentes más parecidos: en lugar de reescribir su HTML y CSS, el modelo
+escribe una referencia con los textos adaptados, y la referencia se expande
+localmente. Así el modelo solo genera lo que es realmente nuevo.
+
+Formato de referencia que escribe el modelo:
+    <!-- componente:3f2a9c1b7d4e ["Mi Empresa", "Inicio", "Contacto"] -->
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.design_tokens import inline_design_tokens
+from utils.token_count import estimate_tokens
+
+
+# Ruta por defecto de la base de datos de componentes
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "components.db")
+
+# Tipos de sección reconocidos y palabras clave (en id, clases o primer título) que los identifican
+TIPOS_SECCION = {
+    "nav": ("nav", "navbar", "menu", "navegacion"),
+    "hero": ("hero", "banner", "portada", "jumbotron"),
+    "features": ("feature", "servicio", "service", "beneficio", "caracteristica", "ventaja"),
+    "pricing": ("pricing", "precio", "plan", "tarifa"),
+    "testimonials": ("testimonial", "testimonio", "review", "resena", "opinion", "cliente"),
+    "faq": ("faq", "pregunta"),
+    "contact": ("contact", "contacto", "formulario"),
+    "footer": ("footer", "pie"),
+}
+
+# Etiquetas que delimitan una sección candidata
+ETIQUETAS_SECCION = ("header", "nav", "section", "footer", "aside", "div")
+
+# Componentes que se conservan por tipo de sección (se descartan los menos usados)
+MAX_COMPONENTES_POR_TIPO = 50
+
+# Componentes que se ofrecen como máximo en cada prompt (uno por tipo)
+MAX_CANDIDATOS = 4
+
+# Similitud mínima entre los términos del prompt y los del componente para ofrecerlo
+MIN_SIMILITUD = 0.1
+
+# Tamaño mínimo (en caracteres de HTML + CSS) para que valga la pena reutilizar un fragmento
+MIN_CARACTERES_FRAGMENTO = 400
+
+# Textos máximos por componente: con más, la referencia deja de ser más corta que el HTML
+MAX_TEXTOS = 30
+
+# Palabras del prompt que no aportan información de estilo
+PALABRAS_VACIAS = frozenset("""
+    una uno unos unas para con por los las del que como sobre pagina landing page
+    sitio web moderna moderno quiero necesito hacer crear genera generar
+    with from that this para este esta sus tiene tener seccion secciones
+""".split())
+
+_TAG_PATTERN = re.compile(r"<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9-]*)([^>]*)>", re.DOTALL)
+_TEXT_PATTERN = re.compile(r">([^<>]*?\S[^<>]*?)<")
+_ATTR_PATTERN = re.compile(r"""\b(id|class)\s*=\s*["']([^"']*)["']""", re.IGNORECASE)
+_HEADING_PATTERN = re.compile(r"<h[1-3][^>]*>(.*?)</h[1-3]>", re.DOTALL | re.IGNORECASE)
+_REFERENCE_PATTERN = re.compile(r"<!--\s*componente:([0-9a-f]{12})\s*(\[.*?\])?\s*-->", re.DOTALL)
+_VOID_TAGS = frozenset("area base br col embed hr img input link meta source track wbr".split())
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS components (
+    id TEXT PRIMARY KEY,
+    section_type TEXT NOT NULL,
+    style_tokens TEXT NOT NULL,
+    html TEXT NOT NULL,
+    css TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_components_type ON components (section_type);
+"""
+
+
+class ComponentLibrary:
+    """
+    Índice persistente de fragmentos de sección reutilizables.
+    
+    Se usa desde los hilos del threadpool: la conexión es compartida y se
+    protege con un lock.
+    """
+    
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, enabled: bool = True):
+        self._db_path = db_path
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stats = {"indexed": 0, "offered": 0, "reused": 0, "tokens_saved": 0}
+    
+    def index_page(self, html_code: str, prompt: str) -> int:
+        """
+        Extrae las secciones reconocibles de una página generada y las guarda.
+        
+        Args:
+            html_code (str): Página HTML completa
+            prompt (str): Prompt que originó la página, fuente de los términos de estilo
+            
+        Returns:
+            int: Componentes nuevos guardados
+        """
+        if not self.enabled:
+            return 0
+        
+        tokens = " ".join(sorted(style_tokens(prompt)))
+        ahora = time.time()
+        nuevos = 0
+        # Guardar el CSS con valores literales: las variables de :root no viajan con el fragmento
+        html_code = inline_design_tokens(html_code)
+        with self._lock:
+            conn = self._connect()
+            for tipo, fragmento, css in extract_components(html_code):
+                component_id = _component_id(tipo, fragmento)
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO components "
+                    "(id, section_type, style_tokens, html, css, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (component_id, tipo, tokens, fragmento, css, ahora, ahora)
+                )
+                if cursor.rowcount:
+                    nuevos += 1
+                    self._trim(conn, tipo)
+            self._stats["indexed"] += nuevos
+        return nuevos
+    
+    def find_candidates(self, prompt: str, limit: int = MAX_CANDIDATOS) -> List[Dict]:
+        """
+        Busca los componentes más parecidos al prompt, como máximo uno por tipo.
+        
+        Args:
+            prompt (str): Prompt de la generación nueva
+            limit (int): Cantidad máxima de componentes
+            
+        Returns:
+            List[Dict]: Componentes con 'id', 'type', 'html', 'css' y 'texts'
+        """
+        if not self.enabled:
+            return []
+        
+        consulta = style_tokens(prompt)
+        if not consulta:
+            return []
+        
+        with self._lock:
+            filas = self._connect().execute(
+                "SELECT id, section_type, style_tokens, html, css, uses FROM components"
+            ).fetchall()
+        
+        mejores: Dict[str, Tuple[float, tuple]] = {}
+        for fila in filas:
+            terminos = set(fila[2].split())
+            union = consulta | terminos
+            similitud = len(consulta & terminos) / len(union) if union else 0.0
+            if similitud < MIN_SIMILITUD:
+                continue
+            # A igual similitud, preferir el componente más reutilizado
+            puntaje = similitud + min(fila[5], 10) * 0.001
+            if fila[1] not in mejores or puntaje > mejores[fila[1]][0]:
+                mejores[fila[1]] = (puntaje, fila)
+        
+        elegidos = sorted(mejores.values(), key=lambda item: item[0], reverse=True)[:limit]
+        candidatos = [
+            {"id": f[0], "type": f[1], "html": f[3], "css": f[4], "texts": extract_texts(f[3])}
+            for _, f in elegidos
+        ]
+        with self._lock:
+            self._stats["offered"] += len(candidatos)
+        return candidatos
+    
+    def expand_references(self, html_code: str, candidatos: List[Dict]) -> str:
+        """
+        Reemplaza las referencias a componentes por su HTML con los textos indicados
+        y agrega su CSS a la hoja de estilos de la página.
+        
+        Args:
+            html_code (str): Respuesta del modelo, con posibles referencias
+            candidatos (List[Dict]): Componentes ofrecidos en el prompt
+            
+        Returns:
+            str: Página con las referencias expandidas
+        """
+        por_id = {c["id"]: c for c in candidatos}
+        usados: List[Dict] = []
+        ahorro = 0
+        
+        def expandir(match: re.Match) -> str:
+            nonlocal ahorro
+            componente = por_id.get(match.group(1))
+            if componente is None:
+                return ""
+            textos = _parse_texts(match.group(2))
+            if componente not in usados:
+                usados.append(componente)
+            ahorro += max(0, estimate_tokens(componente["html"] + componente["css"]) - estimate_tokens(match.group(0)))
+            return fill_texts(componente["html"], textos)
+        
+        html_code = _REFERENCE_PATTERN.sub(expandir, html_code)
+        if not usados:
+            return html_code
+        
+        html_code = _inject_css(_merge_css([c["css"] for c in usados]), html_code)
+        with self._lock:
+            try:
+                self._connect().executemany(
+                    "UPDATE components SET uses = uses + 1, last_used_at = ? WHERE id = ?",
+                    [(time.time(), c["id"]) for c in usados]
+                )
+            except sqlite3.Error:
+                # El contador de usos es solo para el ranking: la página ya está expandida
+                pass
+            self._stats["reused"] += len(usados)
+            self._stats["tokens_saved"] += ahorro
+        return html_code
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Componentes guardados, ofrecidos, reutilizados y tokens de salida ahorrados
+        """
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            total = self._connect().execute("SELECT COUNT(*) FROM components").fetchone()[0]
+            return {"enabled": True, "components": total, **self._stats}
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self._db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self._db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+    
+    def _trim(self, conn: sqlite3.Connection, tipo: str) -> None:
+        conn.execute(
+            "DELETE FROM components WHERE section_type = ? AND id NOT IN ("
+            "SELECT id FROM components WHERE section_type = ? "
+            "ORDER BY uses DESC, last_used_at DESC LIMIT ?)",
+            (tipo, tipo, MAX_COMPONENTES_POR_TIPO)
+        )
+
+
+def style_tokens(texto: str) -> Set[str]:
+    """
+    Obtiene los términos de estilo de un prompt: palabras significativas normalizadas.
+    
+    Args:
+        texto (str): Prompt del usuario
+        
+    Returns:
+        Set[str]: Términos en minúsculas, sin acentos y sin palabras vacías
+    """
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+    palabras = re.findall(r"[a-z0-9#]{4,}", texto)
+    return {p.rstrip("s") if len(p) > 5 else p for p in palabras if p not in PALABRAS_VACIAS}
+
+
+def extract_components(html_code: str) -> List[Tuple[str, str, str]]:
+    """
+    Extrae las secciones reconocibles de una página, con el CSS que las afecta.
+    
+    Se toman las secciones más externas del body (header, nav, section, footer
+    o div con id/clase reconocible) cuyo tipo se pueda clasificar.
+    
+    Args:
+        html_code (str): Página HTML completa
+        
+    Returns:
+        List[Tuple[str, str, str]]: (tipo, HTML del fragmento, CSS del fragmento)
+    """
+    inicio_body = re.search(r"<body[^>]*>", html_code, re.IGNORECASE)
+    if inicio_body is None:
+        return []
+    css = "\n".join(re.findall(r"<style[^>]*>(.*?)</style>", html_code, re.DOTALL | re.IGNORECASE))
+    
+    componentes = []
+    pila: List[str] = []
+    abierto: Optional[Tuple[int, str, int]] = None  # (profundidad, etiqueta, offset)
+    crudo = None
+    for match in _TAG_PATTERN.finditer(html_code, inicio_body.end()):
+        if match.group(2) is None:
+            continue
+        cierre, etiqueta, atributos = match.group(1), match.group(2).lower(), match.group(3)
+        
+        # Saltar el contenido de script y style
+        if crudo is not None:
+            if cierre and etiqueta == crudo:
+                crudo = None
+            continue
+        if not cierre and etiqueta in ("script", "style"):
+            crudo = etiqueta
+            continue
+        
+        if cierre:
+            if etiqueta not in pila:
+                continue
+            while pila and pila.pop() != etiqueta:
+                pass
+            if abierto is not None and len(pila) == abierto[0] and etiqueta == abierto[1]:
+                fragmento = html_code[abierto[2]:match.end()]
+                tipo = _classify(abierto[1], html_code[abierto[2]:abierto[2] + 300], fragmento)
+                fragmento_css = _css_for_fragment(css, fragmento)
+                if (tipo and "<script" not in fragmento.lower()
+                        and len(fragmento) + len(fragmento_css) >= MIN_CARACTERES_FRAGMENTO
+                        and len(extract_texts(fragmento)) <= MAX_TEXTOS):
+                    componentes.append((tipo, fragmento.strip(), fragmento_css))
+                abierto = None
+            continue
+        
+        if etiqueta in _VOID_TAGS or atributos.rstrip().endswith("/"):
+            continue
+        if abierto is None and etiqueta in ETIQUETAS_SECCION:
+            if etiqueta != "div" or _classify_attrs(atributos):
+                abierto = (len(pila), etiqueta, match.start())
+        pila.append(etiqueta)
+    
+    return componentes
+
+
+def extract_texts(fragmento: str) -> List[str]:
+    """
+    Obtiene los textos visibles de un fragmento, en orden.
+    
+    Args:
+        fragmento (str): HTML del fragmento
+        
+    Returns:
+        List[str]: Textos sin espacios sobrantes, decodificados
+    """
+    return [html.unescape(re.sub(r"\s+", " ", t).strip()) for t in _TEXT_PATTERN.findall(fragmento)]
+
+
+def fill_texts(fragmento: str, textos: List[str]) -> str:
+    """
+    Reemplaza los textos visibles de un fragmento por los indicados, en orden.
+    
+    Los textos que falten conservan su valor original.
+    
+    Args:
+        fragmento (str): HTML del fragmento
+        textos (List[str]): Textos nuevos
+        
+    Returns:
+        str: Fragmento con los textos reemplazados
+    """
+    indice = 0
+    
+    def reemplazar(match: re.Match) -> str:
+        nonlocal indice
+        actual = indice
+        indice += 1
+        if actual >= len(textos):
+            return match.group(0)
+        original = match.group(1)
+        # Conservar los espacios alrededor para no alterar la indentación
+        izquierda = original[:len(original) - len(original.lstrip())]
+        derecha = original[len(original.rstrip()):]
+        return f">{izquierda}{html.escape(textos[actual], quote=False)}{derecha}<"
+    
+    return _TEXT_PATTERN.sub(reemplazar, fragmento)
+
+
+def render_candidates_for_prompt(candidatos: List[Dict]) -> str:
+    """
+    Describe los componentes ofrecidos para incluirlos en el prompt de generación.
+    
+    Args:
+        candidatos (List[Dict]): Componentes devueltos por `find_candidates`
+        
+    Returns:
+        str: Instrucciones y lista de componentes, o cadena vacía si no hay
+    """
+    if not candidatos:
+        return ""
+    
+    lineas = [
+        "COMPONENTES REUTILIZABLES (ya tienen HTML y CSS listos):",
+        "Si uno encaja con lo pedido, NO escribas su HTML ni su CSS: en su lugar escribí exactamente",
+        '<!-- componente:ID ["texto 1", "texto 2", ...] -->',
+        "con la misma cantidad de textos, en el mismo orden, adaptados a esta página.",
+        "Escribí completo solo lo que sea nuevo. Si ninguno encaja, ignorá esta lista.",
+    ]
+    for candidato in candidatos:
+        textos = json.dumps([t[:60] for t in candidato["texts"]], ensure_ascii=False)
+        lineas.append(f"- {candidato['id']} ({candidato['type']}, {len(candidato['texts'])} textos): {textos}")
+    return "\n".join(lineas)
+
+
+def _classify(etiqueta: str, apertura: str, fragmento: str) -> Optional[str]:
+    tipo = _classify_attrs(apertura[:apertura.find(">") + 1])
+    if tipo:
+        return tipo
+    if etiqueta in ("nav", "footer"):
+        return etiqueta
+    if etiqueta == "header":
+        return "nav" if "<nav" in fragmento.lower() else "hero"
+    titulo = _HEADING_PATTERN.search(fragmento)
+    if titulo:
+        return _classify_words(re.sub(r"<[^>]+>", " ", titulo.group(1)))
+    return None
+
+
+def _classify_attrs(atributos: str) -> Optional[str]:
+    valores = " ".join(valor for _, valor in _ATTR_PATTERN.findall(atributos))
+    return _classify_words(valores) if valores else None
+
+
+def _classify_words(texto: str) -> Optional[str]:
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+    for tipo, claves in TIPOS_SECCION.items():
+        if any(clave in texto for clave in claves):
+            return tipo
+    return None
+
+
+def _css_for_fragment(css: str, fragmento: str) -> str:
+    """
+    Selecciona las reglas CSS cuyos selectores usan ids o clases del fragmento.
+    
+    Las reglas de etiquetas sueltas (body, h2, ...) se consideran globales y se
+    dejan afuera: la página nueva ya tiene las suyas.
+    """
+    nombres = set()
+    for atributo, valor in _ATTR_PATTERN.findall(fragmento):
+        prefijo = "#" if atributo.lower() == "id" else "."
+        nombres.update(prefijo + v for v in valor.split())
+    if not nombres:
+        return ""
+    
+    reglas = []
+    for selector, cuerpo in _split_css_rules(css):
+        if selector.startswith("@"):
+            internas = [
+                f"{s} {{{c}}}" for s, c in _split_css_rules(cuerpo)
+                if _selector_matches(s, nombres)
+            ]
+            if internas and not selector.lower().startswith("@keyframes"):
+                reglas.append(f"{selector} {{\n" + "\n".join(internas) + "\n}")
+        elif _selector_matches(selector, nombres):
+            reglas.append(f"{selector} {{{cuerpo}}}")
+    return "\n".join(reglas)
+
+
+def _selector_matches(selector: str, nombres: Set[str]) -> bool:
+    usados = re.findall(r"[#.][a-zA-Z_][\w-]*", selector)
+    return bool(usados) and all(u in nombres for u in usados)
+
+
+def _split_css_rules(css: str) -> List[Tuple[str, str]]:
+    reglas = []
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    profundidad, inicio, apertura = 0, 0, 0
+    for i, caracter in enumerate(css):
+        if caracter == "{":
+            if profundidad == 0:
+                apertura = i
+            profundidad += 1
+        elif caracter == "}" and profundidad:
+            profundidad -= 1
+            if profundidad == 0:
+                selector = css[inicio:apertura].strip()
+                if selector:
+                    reglas.append((selector, css[apertura + 1:i]))
+                inicio = i + 1
+        elif caracter == ";" and profundidad == 0:
+            # Reglas sin bloque como @import o @charset
+            inicio = i + 1
+    return reglas
+
+
+def _merge_css(hojas: List[str]) -> str:
+    # Los componentes suelen compartir reglas de utilidad (.container, .btn): no repetirlas
+    reglas, vistas = [], set()
+    for hoja in hojas:
+        for selector, cuerpo in _split_css_rules(hoja):
+            clave = (selector, re.sub(r"\s+", "", cuerpo))
+            if clave not in vistas:
+                vistas.add(clave)
+                reglas.append(f"{selector} {{{cuerpo}}}")
+    return "\n".join(reglas)
+
+
+def _component_id(tipo: str, fragmento: str) -> str:
+    # Dos fragmentos con la misma estructura y distintos textos son el mismo componente
+    estructura = _TEXT_PATTERN.sub("><", re.sub(r"\s+", " ", fragmento))
+    return hashlib.sha256(f"{tipo}\n{estructura}".encode("utf-8")).hexdigest()[:12]
+
+
+def _parse_texts(crudo: Optional[str]) -> List[str]:
+    if not crudo:
+        return []
+    try:
+        textos = json.loads(crudo)
+    except ValueError:
+        return []
+    return [str(t) for t in textos] if isinstance(textos, list) else []
+
+
+def _inject_css(css: str, html_code: str) -> str:
+    if not css:
+        return html_code
+    cierre = re.search(r"</style>", html_code, re.IGNORECASE)
+    if cierre:
+        return html_code[:cierre.start()] + "\n" + css + "\n" + html_code[cierre.start():]
+    head = re.search(r"</head>", html_code, re.IGNORECASE)
+    if head:
+        return html_code[:head.start()] + f"<style>\n{css}\n</style>\n" + html_code[head.start():]
+    return f"<style>\n{css}\n</style>\n" + html_code
+
+
+# Instancia global de la biblioteca
+_component_library = ComponentLibrary(
+    db_path=os.getenv("COMPONENTS_DB_PATH", DEFAULT_DB_PATH),
+    enabled=os.getenv("COMPONENT_LIBRARY", "1").lower() not in ("0", "false", "no")
+)
+
+
+def get_component_library() -> ComponentLibrary:
+    """
+    Función helper para obtener la biblioteca de componentes.
+    
+    Returns:
+        ComponentLibrary: Biblioteca global
+    """
+    return _component_library
@@ -0,0 +1,247 @@
+"""
+Resumen incremental de conversaciones de modificación.
+
+En lugar de descartar los turnos más viejos, cada turno se resume localmente
+(instrucción del usuario + primera oración del análisis de cambios) y se
+archiva por tema: paleta, tipografía, estructura, textos, etc. Cada tema
+conserva solo sus decisiones más recientes, así que el resumen tiene un tamaño
+fijo sin importar cuántos turnos tenga la conversación, y una decisión
+temprana sobre un tema sobrevive hasta que otra decisión sobre ese mismo tema
+la reemplaza.
+
+El resumen guarda además su estado después de cada turno, indexado por la
+página resultante: si el cliente deshace turnos y envía una página anterior,
+el resumen vuelve al estado que tenía con esa página.
+"""
+
+import re
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from schemas.modification_schema import ConversationEntry
+from utils.html_diff import html_checksum
+from utils.lru_cache import LRUCache
+
+
+# Temas del resumen y palabras clave (en minúsculas) que los identifican, en orden de prioridad
+TEMAS_RESUMEN = OrderedDict([
+    ("paleta", ("color", "fondo", "paleta", "azul", "rojo", "verde", "negro", "blanco",
+                "gris", "oscuro", "claro", "gradiente", "degradado")),
+    ("tipografia", ("fuente", "tipograf", "font", "letra", "negrita", "tamaño del texto")),
+    ("estructura", ("sección", "seccion", "agrega", "añade", "elimina", "quita", "header",
+                    "footer", "hero", "formulario", "testimonio", "menú", "menu", "galería", "precios")),
+    ("textos", ("título", "titulo", "texto", "subtítulo", "eslogan", "mensaje", "nombre")),
+    ("responsive", ("responsive", "móvil", "movil", "mobile", "tablet", "pantalla")),
+    ("estilo", ("moderno", "profesional", "minimalista", "sombra", "borde", "animación",
+                "animacion", "espaciado", "diseño")),
+])
+
+# Un color hexadecimal (#fff, #1e3a8a) también indica una decisión de paleta; un
+# "#" suelto (anclas como #contacto, numeraciones) no
+_COLOR_HEX = re.compile(r"#(?:[0-9a-f]{3,4}|[0-9a-f]{6}|[0-9a-f]{8})\b")
+
+# Tema por defecto para decisiones que no encajan en ningún otro
+TEMA_OTROS = "otros"
+
+# Decisiones conservadas por tema y longitud máxima de cada una. La estructura es
+# acumulativa (cada sección agregada sigue vigente), así que conserva más entradas
+DECISIONES_POR_TEMA = 2
+DECISIONES_POR_TEMA_ESPECIAL = {"estructura": 4}
+MAX_CHARS_DECISION = 160
+
+# Entradas recientes que se listan textualmente además del resumen
+ENTRADAS_RECIENTES = 3
+
+# Estados guardados por conversación: cuántos turnos se pueden deshacer
+MAX_CHECKPOINTS = 20
+
+
+class ConversationSummary:
+    """
+    Resumen de tamaño acotado de las decisiones tomadas en una conversación.
+    """
+    
+    def __init__(self):
+        self.turns = 0
+        self._decisions: Dict[str, deque] = {
+            tema: deque(maxlen=DECISIONES_POR_TEMA_ESPECIAL.get(tema, DECISIONES_POR_TEMA))
+            for tema in list(TEMAS_RESUMEN) + [TEMA_OTROS]
+        }
+        self._checkpoints: LRUCache[Tuple[int, Dict[str, tuple]]] = LRUCache(MAX_CHECKPOINTS)
+    
+    def update(self, instruccion: str, analisis: Optional[str] = None) -> None:
+        """
+        Incorpora un turno al resumen.
+        
+        Args:
+            instruccion (str): Instrucción o prompt del usuario
+            analisis (Optional[str]): Análisis de cambios devuelto por el modelo
+        """
+        decision = _compactar(instruccion)
+        detalle = _primera_oracion(analisis or "")
+        if detalle:
+            decision = _compactar(f"{decision} → {detalle}")
+        
+        if decision:
+            self._decisions[_clasificar(f"{instruccion} {analisis or ''}")].append(decision)
+            self.turns += 1
+    
+    def seed_from_history(self, historial: List[ConversationEntry]) -> None:
+        """
+        Inicializa el resumen a partir del historial que envía el cliente.
+        
+        Args:
+            historial (List[ConversationEntry]): Historial de la conversación
+        """
+        for entrada in historial:
+            self.update(entrada.userInput)
+    
+    def checkpoint(self, html: str) -> None:
+        """
+        Guarda el estado actual del resumen como el que corresponde a una página.
+        
+        Args:
+            html (str): Página que resulta de los turnos incorporados hasta ahora
+        """
+        estado = (self.turns, {tema: tuple(d) for tema, d in self._decisions.items()})
+        self._checkpoints.put(html_checksum(html), estado)
+    
+    def restore(self, html: str) -> bool:
+        """
+        Vuelve al estado guardado para una página, por ejemplo tras deshacer turnos.
+        
+        Args:
+            html (str): Página actual del cliente
+            
+        Returns:
+            bool: True si la página era conocida y se restauró su estado
+        """
+        estado = self._checkpoints.get(html_checksum(html))
+        if estado is None:
+            return False
+        self.turns, decisiones = estado
+        for tema, guardadas in decisiones.items():
+            self._decisions[tema] = deque(guardadas, maxlen=self._decisions[tema].maxlen)
+        return True
+    
+    def is_empty(self) -> bool:
+        """
+        Indica si el resumen todavía no tiene decisiones.
+        
+        Returns:
+            bool: True si no hay decisiones registradas
+        """
+        return self.turns == 0
+    
+    def render(self) -> str:
+        """
+        Formatea el resumen para incluirlo en el prompt.
+        
+        Returns:
+            str: Resumen por tema, o cadena vacía si no hay decisiones
+        """
+        lineas = []
+        for tema, decisiones in self._decisions.items():
+            for decision in decisiones:
+                lineas.append(f"- [{tema}] {decision}")
+        
+        if not lineas:
+            return ""
+        return f"Resumen de decisiones vigentes ({self.turns} turnos):\n" + "\n".join(lineas)
+    
+    def to_dict(self) -> Dict:
+        """
+        Serializa el resumen para la API.
+        
+        Returns:
+            Dict: Turnos registrados y decisiones por tema
+        """
+        return {
+            "turns": self.turns,
+            "decisions": {tema: list(d) for tema, d in self._decisions.items() if d}
+        }
+
+
+def _clasificar(texto: str) -> str:
+    texto = texto.lower()
+    for tema, claves in TEMAS_RESUMEN.items():
+        if any(clave in texto for clave in claves):
+            return tema
+        if tema == "paleta" and _COLOR_HEX.search(texto):
+            return tema
+    return TEMA_OTROS
+
+
+def _compactar(texto: str) -> str:
+    texto = re.sub(r"\s+", " ", texto).strip()
+    if len(texto) > MAX_CHARS_DECISION:
+        texto = texto[:MAX_CHARS_DECISION - 1].rstrip() + "…"
+    return texto
+
+
+def _primera_oracion(texto: str) -> str:
+    # Ignorar viñetas y encabezados vacíos; quedarse con la primera oración con contenido
+    for linea in texto.splitlines():
+        linea = linea.strip(" -*•\t")
+        if len(linea) > 10:
+            return re.split(r"(?<=[.!?])\s", linea, maxsplit=1)[0]
+    return ""
+
+
+class SummaryStore:
+    """
+    Almacén LRU de resúmenes por conversación, con tamaño acotado y expiración.
+    """
+    
+    def __init__(self, max_conversations: int = 500, ttl_seconds: float = 6 * 60 * 60):
+        self._summaries: LRUCache[ConversationSummary] = LRUCache(max_conversations, ttl_seconds)
+    
+    def get(self, conversation_id: str) -> Optional[ConversationSummary]:
+        """
+        Obtiene el resumen de una conversación, si existe y no expiró.
+        
+        Args:
+            conversation_id (str): ID de la conversación
+            
+        Returns:
+            Optional[ConversationSummary]: Resumen o None
+        """
+        return self._summaries.get(conversation_id)
+    
+    def get_or_create(self, conversation_id: str) -> ConversationSummary:
+        """
+        Obtiene el resumen de una conversación, creándolo si no existe.
+        
+        Args:
+            conversation_id (str): ID de la conversación
+            
+        Returns:
+            ConversationSummary: Resumen de la conversación
+        """
+        return self._summaries.get_or_create(conversation_id, ConversationSummary)
+    
+    def delete(self, conversation_id: str) -> bool:
+        """
+        Elimina el resumen de una conversación.
+        
+        Args:
+            conversation_id (str): ID de la conversación
+            
+        Returns:
+            bool: True si existía
+        """
+        return self._summaries.pop(conversation_id) is not None
+
+
+# Instancia global del almacén
+_summary_store = SummaryStore()
+
+
+def get_summary_store() -> SummaryStore:
+    """
+    Función helper para obtener el almacén de resúmenes.
+    
+    Returns:
+        SummaryStore: Almacén global de resúmenes
+    """
+    return _summary_store
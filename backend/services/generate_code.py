@@ -5,32 +5,82 @@ Este módulo contiene la lógica para generar código HTML/CSS completo
 de landing pages basado en descripciones en lenguaje natural.
 """
 
-from utils.openai_client import create_chat_completion, build_system_message, build_user_message
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, List, Optional
+
+from services.component_library import get_component_library, render_candidates_for_prompt
+from utils.openai_client import (
+    create_chat_completion,
+    create_chat_completions,
+    build_system_message,
+    build_user_message
+)
 from utils.error_handlers import handle_openai_error, validate_required_fields
+from utils.cancellation import CancellationToken, RequestCancelled
+from utils.deadline import DeadlineExceeded
+from utils.css_optimize import optimize_page_css
+from utils.design_tokens import extract_design_tokens, read_design_tokens
+from utils.html_minify import minify_for_delivery
+from utils.html_normalize import normalize_html_document, strip_code_fences
+from utils.server_timing import stage
+
+
+# Extracción de design tokens en el post-procesamiento (se desactiva con DESIGN_TOKENS=0)
+DESIGN_TOKENS_ENABLED = os.getenv("DESIGN_TOKENS", "1").lower() not in ("0", "false", "no")
+
+# Poda de CSS sin uso y repetido en el post-procesamiento (se desactiva con CSS_OPTIMIZATION=0)
+CSS_OPTIMIZATION_ENABLED = os.getenv("CSS_OPTIMIZATION", "1").lower() not in ("0", "false", "no")
+
+# Número máximo de variantes que se pueden pedir en una sola llamada
+MAX_VARIANTES = 4
+
+# Número máximo de secciones que se generan en paralelo a partir del esqueleto
+MAX_SECCIONES_PARALELAS = 6
+
+# Esquema de secciones usado cuando el esqueleto no trae un outline válido
+SECCIONES_POR_DEFECTO = [
+    {"id": "header", "type": "header", "description": "Header con logo y navegación principal"},
+    {"id": "hero", "type": "hero", "description": "Sección hero con título, subtítulo y llamada a la acción"},
+    {"id": "contenido", "type": "content", "description": "Sección de contenido principal según los requisitos"},
+    {"id": "footer", "type": "footer", "description": "Footer con información de contacto"},
+]
 
 
-def generar_landing(prompt_usuario: str) -> str:
+def generar_landing(prompt_usuario: str, cancel_token: Optional[CancellationToken] = None) -> str:
     """
     Genera una landing page completa usando la API de OpenAI GPT-3.5-turbo.
     
     Esta función toma un prompt del usuario y utiliza inteligencia artificial
     para generar código HTML y CSS completo de una landing page moderna.
+    Si la biblioteca de componentes tiene secciones parecidas de generaciones
+    anteriores, el modelo puede reutilizarlas por referencia en lugar de reescribirlas.
     
     Args:
         prompt_usuario (str): Descripción de la landing page que el usuario desea generar
-        
+        cancel_token (Optional[CancellationToken]): Token que corta la llamada a OpenAI
+            si el cliente se desconecta
+            
     Returns:
         str: Código HTML completo con CSS embebido listo para usar
         
     Raises:
         HTTPException: Para errores de validación o de la API de OpenAI
+        RequestCancelled: Si el token se cancela durante la generación
+        DeadlineExceeded: Si vence el plazo del token
     """
     
     # Validar que el prompt no esté vacío
     validate_required_fields({"prompt": prompt_usuario}, ["prompt"])
     
+    # Buscar componentes ya generados que el modelo pueda reutilizar
+    candidatos = _buscar_componentes(prompt_usuario)
+    
     # Construir el prompt completo con instrucciones específicas
-    prompt_completo = _build_generation_prompt(prompt_usuario)
+    prompt_completo = _build_generation_prompt(prompt_usuario, candidatos)
     
     # Construir mensajes para la API
     messages = [
@@ -44,19 +94,89 @@ def generar_landing(prompt_usuario: str) -> str:
             messages=messages,
             model="gpt-3.5-turbo",
             temperature=0.7,
-            max_tokens=4000
+            max_tokens=4000,
+            cancel_token=cancel_token
         )
         
-        # Limpiar y asegurar estructura HTML completa
-        clean_html = _clean_html_code(generated_html)
-        complete_html = _ensure_complete_html_structure(clean_html)
+        # Expandir los componentes reutilizados, limpiar y asegurar estructura HTML completa
+        generated_html = get_component_library().expand_references(generated_html, candidatos)
+        html_final = _postprocess_html(generated_html, cancel_token)
+        
+        # Guardar las secciones de la página para futuras generaciones
+        _indexar_componentes(html_final, prompt_usuario)
+        return html_final
+    
+    except (RequestCancelled, DeadlineExceeded):
+        # Nadie va a leer la respuesta: no tiene sentido armar un HTML de error
+        raise
+    
+    except Exception as e:
+        # Manejar errores usando el handler modular: un HTML de error no debe
+        # llegar como resultado exitoso (ni quedar guardado por idempotencia)
+        raise handle_openai_error(str(e))
+
+
+def generar_landing_variantes(
+    prompt_usuario: str,
+    variantes: int,
+    cancel_token: Optional[CancellationToken] = None
+) -> List[str]:
+    """
+    Genera varias landing pages alternativas para el mismo prompt en una sola llamada.
+    
+    Los tokens del prompt se envían una sola vez y la API devuelve N candidatos
+    mediante el parámetro `n`, por lo que obtener varias opciones cuesta casi lo
+    mismo que una generación. Cada candidato pasa por la misma limpieza y
+    reparación de estructura que `generar_landing`.
+    
+    Args:
+        prompt_usuario (str): Descripción de la landing page que el usuario desea generar
+        variantes (int): Número de candidatos a generar (1 a MAX_VARIANTES)
+        cancel_token (Optional[CancellationToken]): Token que corta la llamada a OpenAI
+        
+    Returns:
+        List[str]: Lista de códigos HTML completos, uno por variante
         
-        return complete_html
+    Raises:
+        HTTPException: Para errores de validación o de la API de OpenAI
+        RequestCancelled: Si el token se cancela durante la generación
+        DeadlineExceeded: Si vence el plazo del token
+    """
+    
+    # Validar que el prompt no esté vacío
+    validate_required_fields({"prompt": prompt_usuario}, ["prompt"])
+    
+    candidatos = _buscar_componentes(prompt_usuario)
+    messages = [
+        build_system_message(_get_system_role()),
+        build_user_message(_build_generation_prompt(prompt_usuario, candidatos))
+    ]
+    
+    try:
+        paginas_generadas = create_chat_completions(
+            messages=messages,
+            n=variantes,
+            model="gpt-3.5-turbo",
+            temperature=0.9,  # Temperatura más alta para que las variantes difieran entre sí
+            max_tokens=4000,
+            cancel_token=cancel_token
+        )
         
+        biblioteca = get_component_library()
+        paginas = [
+            _postprocess_html(biblioteca.expand_references(pagina, candidatos), cancel_token)
+            for pagina in paginas_generadas
+        ]
+        for pagina in paginas:
+            _indexar_componentes(pagina, prompt_usuario)
+        return paginas
+    
+    except (RequestCancelled, DeadlineExceeded):
+        raise
+    
     except Exception as e:
-        # Manejar errores usando el handler modular y retornar HTML de error
-        error_html = _generate_error_html(str(e))
-        return error_html
+        # Mismo comportamiento que la generación simple
+        raise handle_openai_error(str(e))
 
 
 def generate_landing_code(prompt: str) -> str:
@@ -72,6 +192,66 @@ def generate_landing_code(prompt: str) -> str:
     return generar_landing(prompt)
 
 
+def generar_landing_paralela(prompt_usuario: str, cancel_token: Optional[CancellationToken] = None) -> str:
+    """
+    Genera una landing page por secciones concurrentes a partir de un esqueleto de diseño.
+    
+    Primero se pide al modelo un esqueleto compacto (paleta, tipografía, variables
+    CSS y outline de secciones). Luego cada sección se genera en una llamada
+    independiente y concurrente que comparte ese esqueleto como contexto, y al
+    final se ensamblan en un único documento. La latencia total se acerca a la
+    de la sección más larga en lugar de la de la página completa.
+    
+    Args:
+        prompt_usuario (str): Descripción de la landing page que el usuario desea generar
+        cancel_token (Optional[CancellationToken]): Token compartido por el esqueleto y
+            todas las secciones; al cancelarse se cortan todas las llamadas en curso
+            
+    Returns:
+        str: Código HTML completo con CSS embebido listo para usar
+        
+    Raises:
+        HTTPException: Para errores de validación o de la API de OpenAI
+        RequestCancelled: Si el token se cancela durante la generación
+        DeadlineExceeded: Si vence el plazo del token
+    """
+    
+    # Validar que el prompt no esté vacío
+    validate_required_fields({"prompt": prompt_usuario}, ["prompt"])
+    
+    try:
+        # Generar el esqueleto de diseño compartido
+        esqueleto = _generar_esqueleto_diseno(prompt_usuario, cancel_token)
+        secciones = esqueleto["sections"]
+        
+        # Generar todas las secciones de forma concurrente; cada hilo corre en una
+        # copia del contexto de la petición para que sus etapas lleguen a Server-Timing
+        contextos = [copy_context() for _ in secciones]
+        with ThreadPoolExecutor(max_workers=len(secciones)) as executor:
+            fragmentos = list(executor.map(
+                lambda contexto, seccion: contexto.run(
+                    _generar_seccion, prompt_usuario, esqueleto, seccion, cancel_token
+                ),
+                contextos,
+                secciones
+            ))
+        
+        # Ensamblar, limpiar y asegurar estructura HTML completa
+        documento = _ensamblar_documento(esqueleto, fragmentos)
+        html_final = _postprocess_html(documento, cancel_token)
+        
+        # Guardar las secciones de la página para futuras generaciones
+        _indexar_componentes(html_final, prompt_usuario)
+        return html_final
+    
+    except (RequestCancelled, DeadlineExceeded):
+        raise
+    
+    except Exception as e:
+        # Mismo comportamiento que la generación secuencial
+        raise handle_openai_error(str(e))
+
+
 def _get_system_role() -> str:
     """
     Obtiene la descripción del rol del sistema para la generación.
@@ -106,12 +286,14 @@ def _get_system_role() -> str:
     Tu respuesta debe comenzar con <!DOCTYPE html> y terminar con </html>."""
 
 
-def _build_generation_prompt(prompt_usuario: str) -> str:
+@stage("prompt")
+def _build_generation_prompt(prompt_usuario: str, candidatos: Optional[List[Dict]] = None) -> str:
     """
     Construye el prompt completo para la generación de landing pages.
     
     Args:
         prompt_usuario (str): Descripción del usuario
+        candidatos (Optional[List[Dict]]): Componentes de la biblioteca que se pueden reutilizar
         
     Returns:
         str: Prompt completo con instrucciones
@@ -154,241 +336,335 @@ def _build_generation_prompt(prompt_usuario: str) -> str:
     - Sección hero principal
     - Secciones de contenido según los requisitos
     - Footer con información de contacto
+    
+    {render_candidates_for_prompt(candidatos or [])}
     """
 
 
-def validate_generation_request(prompt: str) -> None:
+@stage("components")
+def _buscar_componentes(prompt_usuario: str) -> List[Dict]:
     """
-    Valida una petición de generación de landing page.
+    Busca en la biblioteca componentes reutilizables para el prompt.
+    
+    Un problema con la biblioteca no debe impedir la generación: en ese caso
+    simplemente no se ofrecen componentes.
     
     Args:
-        prompt (str): Prompt del usuario a validar
+        prompt_usuario (str): Descripción del usuario
         
-    Raises:
-        HTTPException: Si la validación falla
+    Returns:
+        List[Dict]: Componentes candidatos (posiblemente vacía)
     """
-    # Validar longitud mínima
-    if len(prompt.strip()) < 10:
-        from utils.error_handlers import handle_validation_error
-        raise handle_validation_error(
-            "prompt", 
-            "Debe tener al menos 10 caracteres para generar una landing page útil"
-        )
+    try:
+        return get_component_library().find_candidates(prompt_usuario)
+    except Exception:
+        return []
+
+
+@stage("components")
+def _indexar_componentes(html_code: str, prompt_usuario: str) -> None:
+    """
+    Guarda en la biblioteca las secciones reutilizables de una página generada.
     
-    # Validar longitud máxima
-    if len(prompt.strip()) > 1000:
-        from utils.error_handlers import handle_validation_error
-        raise handle_validation_error(
-            "prompt", 
-            "Debe tener menos de 1000 caracteres para evitar timeouts"
-        )
+    Args:
+        html_code (str): Página HTML generada
+        prompt_usuario (str): Prompt que originó la página
+    """
+    try:
+        get_component_library().index_page(html_code, prompt_usuario)
+    except Exception:
+        pass
 
 
-def get_generation_examples() -> list:
+def _generar_esqueleto_diseno(prompt_usuario: str, cancel_token: Optional[CancellationToken] = None) -> Dict:
     """
-    Obtiene ejemplos de prompts para la generación.
+    Genera el esqueleto de diseño compartido por todas las secciones.
     
+    Args:
+        prompt_usuario (str): Descripción del usuario
+        cancel_token (Optional[CancellationToken]): Token de cancelación de la request
+        
     Returns:
-        list: Lista de ejemplos de prompts
+        Dict: Esqueleto con claves 'title', 'css' y 'sections'
     """
-    return [
-        "Una landing page para una empresa de marketing digital con colores azules, sección hero, servicios y contacto",
-        "Landing page para un restaurante italiano con galería de platos, menú y reservas online",
-        "Página de producto para una app móvil de fitness con testimonios y descarga",
-        "Landing page para un curso online de programación con precios y testimonios",
-        "Página corporativa para una consultora con equipo, servicios y casos de éxito"
-    ]
+    prompt = f"""
+    Diseñá el esqueleto de una landing page para estos requisitos: {prompt_usuario}
+    
+    Devolvé ÚNICAMENTE un objeto JSON con esta forma:
+    {{
+        "title": "título de la página",
+        "palette": {{"primary": "#hex", "secondary": "#hex", "accent": "#hex", "background": "#hex", "text": "#hex"}},
+        "typography": {{"headings": "font-family", "body": "font-family"}},
+        "css": "reglas CSS globales: :root con variables (--color-primary, --font-body, etc.), reset, body, contenedores y botones",
+        "sections": [
+            {{"id": "header", "type": "header", "description": "qué contiene"}},
+            {{"id": "hero", "type": "hero", "description": "qué contiene"}},
+            {{"id": "...", "type": "content", "description": "qué contiene"}},
+            {{"id": "footer", "type": "footer", "description": "qué contiene"}}
+        ]
+    }}
+    
+    - Entre 4 y {MAX_SECCIONES_PARALELAS} secciones, empezando por header y hero y terminando con footer
+    - Los ids deben ser únicos, en minúsculas y sin espacios
+    - El CSS debe ser breve: solo lo que comparten todas las secciones
+    - No expliques nada, solo devolvé el JSON
+    """
+    
+    respuesta = create_chat_completion(
+        messages=[
+            build_system_message(_get_skeleton_system_role()),
+            build_user_message(prompt)
+        ],
+        model="gpt-3.5-turbo",
+        temperature=0.5,
+        max_tokens=1200,
+        cancel_token=cancel_token
+    )
+    
+    return _parse_esqueleto(respuesta)
+
+
+def _get_skeleton_system_role() -> str:
+    """
+    Obtiene la descripción del rol del sistema para el esqueleto de diseño.
+    
+    Returns:
+        str: Descripción del rol del asistente
+    """
+    return """Eres un director de arte web que define sistemas de diseño compactos para landing pages.
+    Respondés siempre con JSON válido, sin texto adicional ni bloques markdown."""
 
 
-def _clean_html_code(html_code: str) -> str:
+@stage("parse")
+def _parse_esqueleto(respuesta: str) -> Dict:
     """
-    Limpia el código HTML de caracteres no deseados y formato incorrecto.
+    Parsea y normaliza el esqueleto devuelto por el modelo.
     
     Args:
-        html_code (str): Código HTML a limpiar
+        respuesta (str): Respuesta cruda del modelo
         
     Returns:
-        str: Código HTML limpio
+        Dict: Esqueleto normalizado con 'title', 'css', 'palette', 'typography' y 'sections'
     """
-    # Remover posibles bloques de código markdown
-    if html_code.startswith('```html'):
-        html_code = html_code.replace('```html', '').replace('```', '').strip()
-    elif html_code.startswith('```'):
-        html_code = html_code.replace('```', '').strip()
+    esqueleto = {}
+    inicio, fin = respuesta.find("{"), respuesta.rfind("}")
+    if inicio != -1 and fin > inicio:
+        try:
+            esqueleto = json.loads(respuesta[inicio:fin + 1])
+        except ValueError:
+            esqueleto = {}
     
-    # Remover espacios en blanco excesivos al inicio y final
-    html_code = html_code.strip()
+    secciones = []
+    ids_vistos = set()
+    for seccion in esqueleto.get("sections") or []:
+        if not isinstance(seccion, dict):
+            continue
+        seccion_id = re.sub(r"[^a-z0-9_-]", "", str(seccion.get("id", "")).lower())
+        if not seccion_id or seccion_id in ids_vistos:
+            seccion_id = f"seccion-{len(secciones) + 1}"
+        ids_vistos.add(seccion_id)
+        secciones.append({
+            "id": seccion_id,
+            "type": str(seccion.get("type", "content")),
+            "description": str(seccion.get("description", ""))
+        })
     
-    return html_code
+    return {
+        "title": str(esqueleto.get("title") or "Landing Page"),
+        "palette": esqueleto.get("palette") or {},
+        "typography": esqueleto.get("typography") or {},
+        "css": str(esqueleto.get("css") or ""),
+        "sections": secciones[:MAX_SECCIONES_PARALELAS] or list(SECCIONES_POR_DEFECTO)
+    }
 
 
-def _ensure_complete_html_structure(html_code: str) -> str:
+def _generar_seccion(
+    prompt_usuario: str,
+    esqueleto: Dict,
+    seccion: Dict,
+    cancel_token: Optional[CancellationToken] = None
+) -> Dict[str, str]:
     """
-    Asegura que el código HTML tenga una estructura completa.
+    Genera el HTML y CSS de una sección usando el esqueleto como contexto compartido.
     
     Args:
-        html_code (str): Código HTML a validar
+        prompt_usuario (str): Descripción del usuario
+        esqueleto (Dict): Esqueleto de diseño compartido
+        seccion (Dict): Sección a generar ('id', 'type', 'description')
+        cancel_token (Optional[CancellationToken]): Token de cancelación de la request
         
     Returns:
-        str: Código HTML con estructura completa garantizada
-    """
-    import re
-    
-    # Verificar si ya tiene estructura completa
-    has_doctype = html_code.lower().startswith('<!doctype html>')
-    has_html_tag = '<html' in html_code.lower()
-    has_head_tag = '<head>' in html_code.lower() or '<head ' in html_code.lower()
-    has_body_tag = '<body>' in html_code.lower() or '<body ' in html_code.lower()
-    
-    if has_doctype and has_html_tag and has_head_tag and has_body_tag:
-        return html_code
-    
-    # Si no tiene estructura completa, envolverlo en estructura básica
-    if not has_doctype or not has_html_tag:
-        # Extraer título si existe
-        title = "Landing Page"
-        if '<title>' in html_code:
-            title_match = re.search(r'<title>(.*?)</title>', html_code, re.IGNORECASE)
-            if title_match:
-                title = title_match.group(1)
-        
-        # Extraer estilos si existen
-        styles = """
-        body {
-            margin: 0;
-            padding: 20px;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            line-height: 1.6;
-            color: #333;
-        }
-        * {
-            box-sizing: border-box;
-        }
-        """
-        
-        if '<style>' in html_code:
-            style_match = re.search(r'<style>(.*?)</style>', html_code, re.DOTALL | re.IGNORECASE)
-            if style_match:
-                styles = style_match.group(1)
-        
-        # Limpiar el contenido del body (remover tags de estructura si existen)
-        body_content = html_code
-        # Remover tags de estructura existentes si los hay
-        body_content = re.sub(r'<!DOCTYPE[^>]*>', '', body_content, flags=re.IGNORECASE)
-        body_content = re.sub(r'</?html[^>]*>', '', body_content, flags=re.IGNORECASE)
-        body_content = re.sub(r'<head>.*?</head>', '', body_content, flags=re.DOTALL | re.IGNORECASE)
-        body_content = re.sub(r'</?body[^>]*>', '', body_content, flags=re.IGNORECASE)
-        body_content = re.sub(r'<style>.*?</style>', '', body_content, flags=re.DOTALL | re.IGNORECASE)
-        body_content = body_content.strip()
-        
-        # Construir HTML completo
-        complete_html = f"""<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>{styles}</style>
-</head>
-<body>
-    {body_content}
-</body>
-</html>"""
-        
-        return complete_html
+        Dict[str, str]: Fragmento con claves 'css' y 'html'
+    """
+    outline = ", ".join(s["id"] for s in esqueleto["sections"])
+    prompt = f"""
+    Requisitos de la landing page: {prompt_usuario}
+    
+    Sistema de diseño compartido (NO lo repitas, usá sus variables CSS):
+    Paleta: {json.dumps(esqueleto["palette"], ensure_ascii=False)}
+    Tipografía: {json.dumps(esqueleto["typography"], ensure_ascii=False)}
+    CSS global:
+    {esqueleto["css"]}
+    
+    Secciones de la página, en orden: {outline}
+    
+    Generá SOLO la sección "{seccion["id"]}" ({seccion["type"]}): {seccion["description"]}
+    
+    Formato de respuesta:
+    <style>
+    [CSS exclusivo de esta sección, con selectores prefijados por #{seccion["id"]}]
+    </style>
+    [HTML de la sección, con un único elemento raíz con id="{seccion["id"]}"]
+    
+    - Diseño responsivo y accesible (alt texts, HTML semántico)
+    - NO uses enlaces externos a CSS, JS o imágenes
+    - No expliques nada, solo devolvé el fragmento
+    """
     
-    return html_code
+    respuesta = create_chat_completion(
+        messages=[
+            build_system_message(_get_system_role()),
+            build_user_message(prompt)
+        ],
+        model="gpt-3.5-turbo",
+        temperature=0.7,
+        max_tokens=1500,
+        cancel_token=cancel_token
+    )
+    
+    fragmento = strip_code_fences(respuesta)
+    estilos = re.findall(r"<style[^>]*>(.*?)</style>", fragmento, flags=re.DOTALL | re.IGNORECASE)
+    markup = re.sub(r"<style[^>]*>.*?</style>", "", fragmento, flags=re.DOTALL | re.IGNORECASE)
+    
+    return {"css": "\n".join(e.strip() for e in estilos), "html": markup.strip()}
 
 
-def _generate_error_html(error_message: str) -> str:
+def _ensamblar_documento(esqueleto: Dict, fragmentos: List[Dict[str, str]]) -> str:
     """
-    Genera HTML de error cuando falla la generación.
+    Une el esqueleto y los fragmentos de sección en un único documento HTML.
     
     Args:
-        error_message (str): Mensaje de error
+        esqueleto (Dict): Esqueleto de diseño compartido
+        fragmentos (List[Dict[str, str]]): Fragmentos en el orden del outline
         
     Returns:
-        str: HTML completo con mensaje de error
+        str: Documento HTML completo
     """
+    estilos = "\n".join([esqueleto["css"]] + [f["css"] for f in fragmentos if f["css"]])
+    cuerpo = "\n".join(f["html"] for f in fragmentos if f["html"])
+    
     return f"""<!DOCTYPE html>
 <html lang="es">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Error - Generador de Landing Pages</title>
+    <title>{esqueleto["title"]}</title>
     <style>
-        body {{
-            margin: 0;
-            padding: 0;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }}
-        .error-container {{
-            max-width: 600px;
-            margin: 20px;
-            background: white;
-            padding: 40px;
-            border-radius: 12px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            text-align: center;
-        }}
-        .error-icon {{
-            font-size: 64px;
-            color: #dc3545;
-            margin-bottom: 20px;
-        }}
-        h1 {{
-            color: #dc3545;
-            margin-bottom: 20px;
-            font-size: 28px;
-        }}
-        p {{
-            color: #666;
-            line-height: 1.6;
-            margin-bottom: 15px;
-        }}
-        .error-details {{
-            background: #f8f9fa;
-            padding: 15px;
-            border-radius: 8px;
-            border-left: 4px solid #dc3545;
-            margin-top: 20px;
-            text-align: left;
-        }}
-        .retry-button {{
-            display: inline-block;
-            margin-top: 20px;
-            padding: 12px 24px;
-            background: #007bff;
-            color: white;
-            text-decoration: none;
-            border-radius: 6px;
-            transition: background 0.3s;
-        }}
-        .retry-button:hover {{
-            background: #0056b3;
-        }}
+{estilos}
     </style>
 </head>
 <body>
-    <div class="error-container">
-        <div class="error-icon">⚠️</div>
-        <h1>Error al generar la landing page</h1>
-        <p>Ocurrió un problema al procesar tu solicitud. Por favor, intenta nuevamente con una descripción diferente o más específica.</p>
-        <div class="error-details">
-            <strong>Detalles del error:</strong><br>
-            {error_message}
-        </div>
-        <p><strong>Sugerencias:</strong></p>
-        <ul style="text-align: left; color: #666;">
-            <li>Verifica que tu descripción sea clara y específica</li>
-            <li>Intenta con una descripción más corta</li>
-            <li>Asegúrate de tener conexión a internet</li>
-        </ul>
-    </div>
+{cuerpo}
 </body>
 </html>"""
+
+
+def build_generation_result(paginas: List[str], minify: bool = False) -> Dict[str, Any]:
+    """
+    Construye el resultado de una generación, el mismo para la API síncrona y los trabajos.
+    
+    Args:
+        paginas (List[str]): Páginas generadas; más de una si se pidieron variantes
+        minify (bool): Si el HTML se entrega minificado
+        
+    Returns:
+        Dict[str, Any]: 'html', 'design_tokens' y, con `minify`, 'output_stats'.
+            Con varias variantes, 'html' es la primera, 'variants' las trae todas
+            y 'design_tokens' y 'output_stats' son listas con un elemento por variante
+    """
+    tokens = [read_design_tokens(pagina) for pagina in paginas]
+    entregas = [minify_for_delivery(pagina) if minify else (pagina, None) for pagina in paginas]
+    
+    if len(paginas) == 1:
+        resultado = {"html": entregas[0][0], "design_tokens": tokens[0]}
+        if minify:
+            resultado["output_stats"] = entregas[0][1]
+        return resultado
+    
+    resultado = {
+        "html": entregas[0][0],
+        "variants": [html for html, _ in entregas],
+        "design_tokens": tokens
+    }
+    if minify:
+        resultado["output_stats"] = [stats for _, stats in entregas]
+    return resultado
+
+
+@stage("validation")
+def validate_generation_request(prompt: str) -> None:
+    """
+    Valida una petición de generación de landing page.
+    
+    Args:
+        prompt (str): Prompt del usuario a validar
+        
+    Raises:
+        HTTPException: Si la validación falla
+    """
+    # Validar longitud mínima
+    if len(prompt.strip()) < 10:
+        from utils.error_handlers import handle_validation_error
+        raise handle_validation_error(
+            "prompt", 
+            "Debe tener al menos 10 caracteres para generar una landing page útil"
+        )
+    
+    # Validar longitud máxima
+    if len(prompt.strip()) > 1000:
+        from utils.error_handlers import handle_validation_error
+        raise handle_validation_error(
+            "prompt", 
+            "Debe tener menos de 1000 caracteres para evitar timeouts"
+        )
+
+
+def get_generation_examples() -> list:
+    """
+    Obtiene ejemplos de prompts para la generación.
+    
+    Returns:
+        list: Lista de ejemplos de prompts
+    """
+    return [
+        "Una landing page para una empresa de marketing digital con colores azules, sección hero, servicios y contacto",
+        "Landing page para un restaurante italiano con galería de platos, menú y reservas online",
+        "Página de producto para una app móvil de fitness con testimonios y descarga",
+        "Landing page para un curso online de programación con precios y testimonios",
+        "Página corporativa para una consultora con equipo, servicios y casos de éxito"
+    ]
+
+
+@stage("postprocess")
+def _postprocess_html(html_code: str, cancel_token: Optional[CancellationToken] = None) -> str:
+    """
+    Aplica la limpieza, la reparación de estructura, la poda del CSS sin uso y la
+    extracción de design tokens a una respuesta del modelo.
+    
+    Args:
+        html_code (str): Respuesta cruda del modelo
+        cancel_token (Optional[CancellationToken]): Token cuyo plazo se verifica antes de empezar
+        
+    Returns:
+        str: Código HTML limpio, con estructura completa, sin reglas CSS sin uso ni
+            repetidas y con los colores, fuentes y espaciados repetidos declarados
+            como variables en `:root`
+    """
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled("post-procesamiento")
+    complete_html = normalize_html_document(html_code)
+    if CSS_OPTIMIZATION_ENABLED:
+        complete_html, _ = optimize_page_css(complete_html)
+    if DESIGN_TOKENS_ENABLED:
+        complete_html = extract_design_tokens(complete_html)
+    return complete_html
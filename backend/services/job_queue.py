@@ -0,0 +1,365 @@
+"""
+Cola de trabajos durable en SQLite para generaciones y modificaciones largas.
+
+Los endpoints de trabajos encolan la petición y devuelven un ID de inmediato;
+un pool de workers asíncronos reclama los trabajos de forma atómica y ejecuta
+el handler correspondiente en el threadpool. Los trabajos encolados sobreviven
+a un reinicio del proceso. Varios procesos pueden compartir la misma base.
+
+Mientras un trabajo se ejecuta, su worker renueva periódicamente un lease. Un
+trabajo en ejecución cuyo lease venció (el proceso que lo reclamó se detuvo)
+se marca como fallido, en lugar de re-ejecutarse, para garantizar que ningún
+trabajo se ejecute dos veces; los trabajos de otros procesos vivos no se tocan.
+
+Cada trabajo guarda su plazo absoluto: el tiempo en cola lo consume, y un
+trabajo que se reclama con el plazo vencido falla sin llegar a ejecutarse.
+
+Las consultas a SQLite de los workers y de los endpoints se ejecutan en el
+threadpool: `BEGIN IMMEDIATE` puede esperar hasta el busy timeout cuando otros
+procesos escriben en la base, y esa espera no debe bloquear el event loop.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from utils.cancellation import CancellationToken
+from utils.deadline import Deadline
+
+
+# Ruta por defecto de la base de datos de trabajos
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "jobs.db")
+
+# Número de workers por defecto
+DEFAULT_WORKERS = 2
+
+# Tiempo (en segundos) que se conservan los trabajos terminados
+FINISHED_RETENTION_SECONDS = 24 * 60 * 60
+
+# Intervalo máximo (en segundos) entre sondeos de la cola cuando está vacía
+IDLE_POLL_SECONDS = 1.0
+
+# Duración (en segundos) del lease de un trabajo en ejecución; se renueva cada tercio
+JOB_LEASE_SECONDS = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    deadline REAL,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobQueue:
+    """
+    Cola de trabajos persistida en SQLite con un pool de workers asíncronos.
+    """
+    
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, workers: int = DEFAULT_WORKERS):
+        self._db_path = db_path
+        self._workers = workers
+        self._handlers: Dict[str, Callable[[Dict[str, Any], CancellationToken], Dict[str, Any]]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._tasks: list = []
+        self._running = False
+        self._last_purge = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+    
+    def register_handler(
+        self,
+        kind: str,
+        handler: Callable[[Dict[str, Any], CancellationToken], Dict[str, Any]]
+    ) -> None:
+        """
+        Registra la función que procesa los trabajos de un tipo.
+        
+        Args:
+            kind (str): Tipo de trabajo ('generate', 'modify', ...)
+            handler (Callable): Función síncrona que recibe el payload y el token con el
+                plazo restante del trabajo, y devuelve el resultado
+        """
+        self._handlers[kind] = handler
+    
+    async def start(self) -> None:
+        """
+        Abre la base de datos, recupera el estado tras un reinicio y lanza los workers.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self._db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self._db_path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            # Bases creadas antes de que los trabajos tuvieran plazo y lease
+            columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "deadline" not in columnas:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN deadline REAL")
+            if "lease_expires_at" not in columnas:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires_at REAL")
+        self._fail_abandoned()
+        self._purge_finished()
+        
+        self._wakeup = asyncio.Event()
+        self._running = True
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+    
+    async def stop(self) -> None:
+        """
+        Detiene los workers y cierra la base de datos.
+        """
+        # wait_for puede absorber una cancelación que coincide con un wakeup:
+        # el flag garantiza que los workers salgan igual
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+    
+    async def enqueue(self, kind: str, payload: Dict[str, Any], deadline: Optional[Deadline] = None) -> str:
+        """
+        Encola un trabajo nuevo.
+        
+        Args:
+            kind (str): Tipo de trabajo, con un handler registrado
+            payload (Dict[str, Any]): Datos del trabajo (serializables a JSON)
+            deadline (Optional[Deadline]): Plazo total del trabajo, incluida la espera en cola
+            
+        Returns:
+            str: ID del trabajo
+            
+        Raises:
+            ValueError: Si no hay handler para el tipo de trabajo
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        
+        job_id = uuid.uuid4().hex
+        await run_in_threadpool(
+            self._insert,
+            job_id,
+            kind,
+            json.dumps(payload, ensure_ascii=False),
+            deadline.expires_at if deadline is not None else None
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el estado de un trabajo.
+        
+        Args:
+            job_id (str): ID del trabajo
+            
+        Returns:
+            Optional[Dict[str, Any]]: Estado, resultado y tiempos del trabajo, o None si no existe
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, result, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        
+        return {
+            "job_id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "created_at": row[5],
+            "started_at": row[6],
+            "finished_at": row[7],
+        }
+    
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Espera (long-poll) a que un trabajo termine, hasta `timeout` segundos.
+        
+        Args:
+            job_id (str): ID del trabajo
+            timeout (float): Tiempo máximo de espera en segundos
+            
+        Returns:
+            Optional[Dict[str, Any]]: Estado del trabajo al terminar o al vencer el plazo
+        """
+        job = await run_in_threadpool(self.get, job_id)
+        if job is None or job["status"] in ("succeeded", "failed") or timeout <= 0:
+            return job
+        
+        event = self._finished.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            job = await run_in_threadpool(self.get, job_id)
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            # El último en dejar de esperar libera el evento, haya terminado o no el trabajo
+            self._waiters[job_id] -= 1
+            if self._waiters[job_id] == 0:
+                del self._waiters[job_id]
+                if self._finished.get(job_id) is event:
+                    del self._finished[job_id]
+        return await run_in_threadpool(self.get, job_id)
+    
+    def depth(self) -> int:
+        """
+        Cantidad de trabajos pendientes en la cola.
+        
+        Returns:
+            int: Trabajos con estado 'queued'
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+    
+    def _insert(self, job_id: str, kind: str, payload: str, expires_at: Optional[float]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at, deadline) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, payload, time.time(), expires_at)
+            )
+    
+    def _claim(self) -> Optional[tuple]:
+        # Reclamar el trabajo más antiguo dentro de una transacción inmediata:
+        # solo un worker (o proceso) puede pasarlo de 'queued' a 'running'
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, kind, payload, deadline FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    ahora = time.time()
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, lease_expires_at = ? "
+                        "WHERE id = ? AND status = 'queued'",
+                        (ahora, ahora + JOB_LEASE_SECONDS, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row
+    
+    async def _finish(self, job_id: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        await run_in_threadpool(self._store_result, job_id, result, error)
+        event = self._finished.pop(job_id, None)
+        if event is not None:
+            event.set()
+    
+    def _store_result(self, job_id: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (
+                    "failed" if error else "succeeded",
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id
+                )
+            )
+    
+    def _fail_abandoned(self) -> None:
+        # Trabajos cuyo proceso se detuvo sin terminarlos (incluidos los de un
+        # base anterior a la columna de lease): no se re-ejecutan
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                ("Trabajo interrumpido por un reinicio del servidor", time.time(), time.time())
+            )
+    
+    async def _renew_lease(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            await run_in_threadpool(self._extend_lease, job_id)
+    
+    def _extend_lease(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = 'running'",
+                (time.time() + JOB_LEASE_SECONDS, job_id)
+            )
+    
+    def _purge_finished(self) -> None:
+        self._last_purge = time.monotonic()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                (time.time() - FINISHED_RETENTION_SECONDS,)
+            )
+    
+    async def _worker(self) -> None:
+        while self._running:
+            job = await run_in_threadpool(self._claim)
+            if job is None:
+                if time.monotonic() - self._last_purge > 10 * 60:
+                    self._last_purge = time.monotonic()
+                    await run_in_threadpool(self._fail_abandoned)
+                    await run_in_threadpool(self._purge_finished)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), IDLE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            job_id, kind, payload, expires_at = job
+            token = CancellationToken(Deadline(expires_at) if expires_at is not None else None)
+            lease = asyncio.create_task(self._renew_lease(job_id))
+            try:
+                token.raise_if_cancelled("espera en cola")
+                result = await run_in_threadpool(self._handlers[kind], json.loads(payload), token)
+                await self._finish(job_id, result, None)
+            except Exception as e:
+                await self._finish(job_id, None, getattr(e, "detail", None) or str(e))
+            finally:
+                lease.cancel()
+
+
+# Instancia global de la cola
+_job_queue = JobQueue(
+    db_path=os.getenv("JOBS_DB_PATH", DEFAULT_DB_PATH),
+    workers=int(os.getenv("JOBS_WORKERS", DEFAULT_WORKERS))
+)
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Función helper para obtener la cola de trabajos.
+    
+    Returns:
+        JobQueue: Cola global de trabajos
+    """
+    return _job_queue
@@ -0,0 +1,70 @@
+"""
+Almacén en memoria de las páginas producidas por modificaciones devueltas como diff.
+
+Cuando /api/modify-landing responde con un diff, la página completa se guarda
+aquí por un rato bajo el checksum del resultado (`patch.resultChecksum`). Si el
+cliente no puede aplicar el diff, la descarga con
+`GET /api/modify-landing/results/{checksum}` en lugar de repetir la
+modificación contra el modelo.
+"""
+
+from typing import Optional
+
+from utils.html_diff import html_checksum
+from utils.lru_cache import LRUCache
+
+
+# Número máximo de páginas recordadas simultáneamente
+MAX_RESULTS = 100
+
+# Tiempo (en segundos) durante el cual una página sigue disponible
+RESULT_TTL_SECONDS = 10 * 60
+
+
+class ModificationResultStore:
+    """
+    Almacén LRU de páginas por checksum, con tamaño acotado y expiración.
+    """
+    
+    def __init__(self, max_results: int = MAX_RESULTS, ttl_seconds: float = RESULT_TTL_SECONDS):
+        self._results: LRUCache[str] = LRUCache(max_results, ttl_seconds, refresh_on_get=False)
+    
+    def put(self, html: str) -> str:
+        """
+        Guarda una página producida por una modificación.
+        
+        Args:
+            html (str): Página completa
+            
+        Returns:
+            str: Checksum de la página, que sirve de clave para recuperarla
+        """
+        checksum = html_checksum(html)
+        self._results.put(checksum, html)
+        return checksum
+    
+    def get(self, checksum: str) -> Optional[str]:
+        """
+        Obtiene una página guardada, si existe y no expiró.
+        
+        Args:
+            checksum (str): Checksum de la página (`patch.resultChecksum`)
+            
+        Returns:
+            Optional[str]: La página, o None
+        """
+        return self._results.get(checksum)
+
+
+# Instancia global del almacén
+_result_store = ModificationResultStore()
+
+
+def get_modification_result_store() -> ModificationResultStore:
+    """
+    Función helper para obtener el almacén de resultados de modificación.
+    
+    Returns:
+        ModificationResultStore: Almacén global
+    """
+    return _result_store
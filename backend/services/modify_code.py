@@ -5,30 +5,101 @@ Este módulo contiene la lógica para modificar código HTML/CSS existente
 basado en instrucciones conversacionales del usuario.
 """
 
-from typing import List
+import json
+import os
+import re
+from typing import Callable, List, Optional
 from schemas.modification_schema import ConversationEntry
-from utils.openai_client import create_chat_completion, build_system_message, build_user_message
+from services.conversation_summary import ConversationSummary, ENTRADAS_RECIENTES
+from utils.openai_client import (
+    create_chat_completion,
+    stream_chat_completion,
+    stream_tool_call_arguments,
+    build_system_message,
+    build_user_message
+)
 from utils.error_handlers import handle_openai_error, validate_required_fields
+from utils.cancellation import CancellationToken, RequestCancelled
+from utils.deadline import DeadlineExceeded
+from utils.html_minify import minify_for_prompt, preserve_formatting
+from utils.json_stream import JSONStringFieldStream
+from utils.server_timing import stage
+
+
+# Formato de salida por defecto de las modificaciones: 'markers' (texto con
+# marcadores) o 'structured' (llamada a herramienta con JSON), que es opcional
+DEFAULT_OUTPUT_MODE = os.getenv("MODIFICATION_OUTPUT_MODE", "markers")
+
+# Herramienta con la que el modelo devuelve la modificación en modo 'structured'.
+# `html` va primero para poder informar el progreso mientras se genera.
+MODIFICATION_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "aplicar_modificacion",
+        "description": "Devuelve la landing page modificada y los cambios aplicados",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "html": {
+                    "type": "string",
+                    "description": "Código HTML completo de la página modificada"
+                },
+                "changes_applied": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Cambios realizados, uno por elemento"
+                },
+                "warnings": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Advertencias o notas sobre la modificación"
+                }
+            },
+            "required": ["html", "changes_applied"]
+        }
+    }
+}
 
 
 def modificar_landing_conversacional(
     codigo_actual: str,
     instruccion_modificacion: str,
-    historial_conversacion: List[ConversationEntry]
-) -> tuple[str, str]:
+    historial_conversacion: List[ConversationEntry],
+    on_progress: Optional[Callable[[int], None]] = None,
+    resumen: Optional[ConversationSummary] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    output_mode: Optional[str] = None
+) -> tuple[str, str, List[str], List[str]]:
     """
     Modifica una landing page existente basándose en instrucciones conversacionales.
     
+    En modo 'structured' el modelo devuelve el resultado llamando a una herramienta
+    con un JSON de campos `html`, `changes_applied` y `warnings`, que se decodifica
+    a medida que llega. Si el JSON queda inválido (por ejemplo, truncado) pero el
+    campo `html` llegó completo, se usa ese código sin volver a llamar al modelo;
+    solo si falta el código se repite la modificación en modo 'markers', que
+    separa código y análisis por los marcadores de texto.
+    
     Args:
         codigo_actual (str): Código HTML actual de la landing page
         instruccion_modificacion (str): Instrucción de modificación del usuario
         historial_conversacion (List[ConversationEntry]): Historial de la conversación
+        on_progress (Optional[Callable[[int], None]]): Si se indica, la respuesta se
+            pide en streaming y se invoca con los caracteres recibidos hasta el momento
+        resumen (Optional[ConversationSummary]): Resumen incremental de la conversación;
+            se usa como contexto y se actualiza con este turno si la modificación tiene éxito
+        cancel_token (Optional[CancellationToken]): Token que corta la llamada a OpenAI
+            si el cliente se desconecta
+        output_mode (Optional[str]): 'structured' o 'markers'; por defecto DEFAULT_OUTPUT_MODE
         
     Returns:
-        tuple[str, str]: (código_modificado, análisis_de_cambios)
-        
+        tuple[str, str, List[str], List[str]]: (código_modificado, análisis_de_cambios,
+            cambios_aplicados, advertencias)
+            
     Raises:
         HTTPException: Para errores de validación o de la API de OpenAI
+        RequestCancelled: Si el token se cancela durante la modificación
+        DeadlineExceeded: Si vence el plazo del token
     """
     
     # Validar inputs requeridos
@@ -37,37 +108,179 @@ def modificar_landing_conversacional(
         "instruccion_modificacion": instruccion_modificacion
     }, ["codigo_actual", "instruccion_modificacion"])
     
-    # Construir contexto conversacional
-    contexto_conversacion = _build_conversation_context(historial_conversacion)
+    with stage("prompt"):
+        # Construir contexto conversacional
+        contexto_conversacion = _build_conversation_context(historial_conversacion, resumen)
+        
+        # Minificar el código para ahorrar tokens en el prompt
+        codigo_minificado = minify_for_prompt(codigo_actual)
     
-    # Construir prompt de modificación
-    prompt_modificacion = _build_modification_prompt(
-        codigo_actual, 
-        instruccion_modificacion, 
-        contexto_conversacion
-    )
+    try:
+        advertencias: List[str] = []
+        resultado = None
+        
+        if (output_mode or DEFAULT_OUTPUT_MODE) == "structured":
+            resultado = _modificar_estructurado(
+                codigo_minificado, instruccion_modificacion, contexto_conversacion,
+                on_progress, cancel_token
+            )
+            if resultado is None:
+                advertencias.append(
+                    "La salida estructurada del modelo no incluyó el código completo; "
+                    "se repitió la modificación con el formato de marcadores"
+                )
+        
+        if resultado is None:
+            resultado = _modificar_con_marcadores(
+                codigo_minificado, instruccion_modificacion, contexto_conversacion,
+                on_progress, cancel_token
+            )
+        
+        codigo, cambios, advertencias_modelo = resultado
+        advertencias.extend(advertencias_modelo)
+        analisis = "; ".join(cambios) or "Modificación aplicada según instrucciones"
+        
+        # Devolver el código con el formato de la página original, para que solo
+        # cambie (y solo aparezca en un diff) lo que el modelo modificó
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled("post-procesamiento")
+        with stage("postprocess"):
+            codigo = preserve_formatting(codigo_actual, codigo)
+        
+        # Incorporar este turno al resumen de la conversación
+        if resumen is not None:
+            resumen.update(instruccion_modificacion, analisis)
+        
+        return codigo, analisis, cambios, advertencias
     
-    # Construir mensajes para la API
+    except (RequestCancelled, DeadlineExceeded):
+        # No es un error de OpenAI: el cliente ya no espera la respuesta
+        raise
+    
+    except Exception as e:
+        # Manejar errores usando el handler modular
+        raise handle_openai_error(str(e))
+
+
+def _modificar_estructurado(
+    codigo_minificado: str,
+    instruccion: str,
+    contexto: str,
+    on_progress: Optional[Callable[[int], None]],
+    cancel_token: Optional[CancellationToken]
+) -> Optional[tuple[str, List[str], List[str]]]:
+    """
+    Pide la modificación como llamada a la herramienta MODIFICATION_TOOL.
+    
+    El campo `html` se decodifica de forma incremental mientras llegan los
+    argumentos, para informar el progreso en caracteres de código y para
+    recuperarlo si el resto del JSON no es válido.
+    
+    Args:
+        codigo_minificado (str): Código HTML actual, minificado
+        instruccion (str): Instrucción de modificación
+        contexto (str): Contexto conversacional
+        on_progress (Optional[Callable[[int], None]]): Callback de progreso
+        cancel_token (Optional[CancellationToken]): Token que corta la llamada a OpenAI
+        
+    Returns:
+        Optional[tuple[str, List[str], List[str]]]: (código, cambios_aplicados, advertencias),
+            o None si el campo `html` no llegó completo
+    """
     messages = [
         build_system_message(_get_modification_system_role()),
-        build_user_message(prompt_modificacion)
+        build_user_message(_build_modification_prompt(codigo_minificado, instruccion, contexto, estructurado=True))
     ]
     
+    argumentos = []
+    html_stream = JSONStringFieldStream("html")
+    html_partes = []
+    recibidos = 0
+    for fragmento in stream_tool_call_arguments(
+        messages=messages,
+        tool=MODIFICATION_TOOL,
+        model="gpt-3.5-turbo",
+        temperature=0.3,
+        max_tokens=4000,
+        cancel_token=cancel_token
+    ):
+        argumentos.append(fragmento)
+        nuevo = html_stream.feed(fragmento)
+        html_partes.append(nuevo)
+        if nuevo and on_progress is not None:
+            recibidos += len(nuevo)
+            on_progress(recibidos)
+    
     try:
+        with stage("parse"):
+            datos = json.loads("".join(argumentos))
+    except json.JSONDecodeError:
+        # JSON truncado o mal formado: si el código llegó completo, no hace
+        # falta pedir la modificación otra vez
+        html_code = "".join(html_partes).strip()
+        if not html_stream.done or not html_code:
+            return None
+        return html_code, [], ["La respuesta del modelo llegó incompleta; no incluyó la lista de cambios"]
+    
+    if not isinstance(datos, dict) or not isinstance(datos.get("html"), str) or not datos["html"].strip():
+        return None
+    
+    return datos["html"].strip(), _lista_de_textos(datos.get("changes_applied")), _lista_de_textos(datos.get("warnings"))
+
+
+def _modificar_con_marcadores(
+    codigo_minificado: str,
+    instruccion: str,
+    contexto: str,
+    on_progress: Optional[Callable[[int], None]],
+    cancel_token: Optional[CancellationToken]
+) -> tuple[str, List[str], List[str]]:
+    """
+    Pide la modificación en texto libre con los marcadores CÓDIGO_MODIFICADO y ANÁLISIS_DE_CAMBIOS.
+    
+    Args:
+        codigo_minificado (str): Código HTML actual, minificado
+        instruccion (str): Instrucción de modificación
+        contexto (str): Contexto conversacional
+        on_progress (Optional[Callable[[int], None]]): Si se indica, se usa streaming
+        cancel_token (Optional[CancellationToken]): Token que corta la llamada a OpenAI
+        
+    Returns:
+        tuple[str, List[str], List[str]]: (código, cambios_aplicados, advertencias)
+    """
+    messages = [
+        build_system_message(_get_modification_system_role()),
+        build_user_message(_build_modification_prompt(codigo_minificado, instruccion, contexto))
+    ]
+    
+    if on_progress is None:
         # Generar modificación usando el cliente modular
         respuesta_completa = create_chat_completion(
             messages=messages,
             model="gpt-3.5-turbo",
             temperature=0.3,  # Temperatura baja para modificaciones precisas
-            max_tokens=4000
+            max_tokens=4000,
+            cancel_token=cancel_token
         )
-        
-        # Separar código y análisis
-        return _parse_modification_response(respuesta_completa)
-        
-    except Exception as e:
-        # Manejar errores usando el handler modular
-        raise handle_openai_error(str(e))
+    else:
+        # Generar en streaming informando el progreso al llamador
+        fragmentos = []
+        recibidos = 0
+        for fragmento in stream_chat_completion(
+            messages=messages,
+            model="gpt-3.5-turbo",
+            temperature=0.3,
+            max_tokens=4000,
+            cancel_token=cancel_token
+        ):
+            fragmentos.append(fragmento)
+            recibidos += len(fragmento)
+            on_progress(recibidos)
+        respuesta_completa = "".join(fragmentos).strip()
+    
+    # Separar código y análisis
+    codigo, analisis, advertencias = _parse_modification_response(respuesta_completa)
+    return codigo, _split_changes(analisis), advertencias
 
 
 def _get_modification_system_role() -> str:
@@ -78,7 +291,7 @@ def _get_modification_system_role() -> str:
         str: Descripción del rol del asistente para modificaciones
     """
     return """Eres un experto desarrollador web especializado en modificaciones precisas de landing pages.
-
+    
     Tu trabajo es:
     - Analizar código HTML/CSS existente
     - Aplicar modificaciones específicas manteniendo la estructura
@@ -93,16 +306,31 @@ def _get_modification_system_role() -> str:
     - Aplicar mejores prácticas de desarrollo web"""
 
 
-def _build_conversation_context(historial: List[ConversationEntry]) -> str:
+def _build_conversation_context(
+    historial: List[ConversationEntry],
+    resumen: Optional[ConversationSummary] = None
+) -> str:
     """
     Construye el contexto conversacional para mantener coherencia.
     
+    Con un resumen disponible, el contexto es el resumen de tamaño fijo más
+    las últimas entradas textuales; sin resumen, se listan las últimas 5.
+    
     Args:
         historial (List[ConversationEntry]): Historial de conversación
+        resumen (Optional[ConversationSummary]): Resumen incremental de la conversación
         
     Returns:
         str: Contexto conversacional formateado
     """
+    if resumen is not None and not resumen.is_empty():
+        contexto_lines = [resumen.render()]
+        if historial:
+            contexto_lines.append("Últimas instrucciones:")
+            for i, entrada in enumerate(historial[-ENTRADAS_RECIENTES:], 1):
+                contexto_lines.append(f"{i}. {entrada.userInput}")
+        return "\n".join(contexto_lines)
+    
     if not historial:
         return "Esta es la primera modificación de la landing page."
     
@@ -118,10 +346,12 @@ def _build_conversation_context(historial: List[ConversationEntry]) -> str:
     return "\n".join(contexto_lines)
 
 
+@stage("prompt")
 def _build_modification_prompt(
     codigo_actual: str, 
     instruccion: str, 
-    contexto: str
+    contexto: str,
+    estructurado: bool = False
 ) -> str:
     """
     Construye el prompt completo para la modificación.
@@ -130,41 +360,59 @@ def _build_modification_prompt(
         codigo_actual (str): Código HTML actual
         instruccion (str): Instrucción de modificación
         contexto (str): Contexto conversacional
-        
+        estructurado (bool): Si la respuesta se pide con la herramienta MODIFICATION_TOOL
+            en lugar de con marcadores de texto
+            
     Returns:
         str: Prompt completo para la modificación
     """
+    formato = _FORMATO_ESTRUCTURADO if estructurado else _FORMATO_MARCADORES
     return f"""
     {contexto}
-
-    CÓDIGO ACTUAL:
+    
+    CÓDIGO ACTUAL (minificado):
     {codigo_actual}
-
+    
     INSTRUCCIÓN DE MODIFICACIÓN:
     {instruccion}
-
+    
     INSTRUCCIONES PARA LA MODIFICACIÓN:
     1. Analiza el código actual y la instrucción de modificación
     2. Aplica ÚNICAMENTE los cambios solicitados
     3. Mantén todo el resto del código intacto
     4. Conserva la estructura, funcionalidad y responsividad
     5. Asegúrate de que el resultado sea válido y funcional
+{formato}
+    IMPORTANTE: 
+    - Devuelve el código HTML COMPLETO, no solo las partes modificadas
+    - Podés devolverlo minificado como el código actual; se reindenta automáticamente
+    - Mantén toda la funcionalidad existente
+    - Solo modifica lo específicamente solicitado
+    - Si el cambio es de paleta o tipografía y la página define variables CSS en :root,
+      cambia los valores de esas variables en lugar de cada regla
+    """
+
 
+_FORMATO_MARCADORES = """
     FORMATO DE RESPUESTA REQUERIDO:
     CÓDIGO_MODIFICADO:
     [Aquí el código HTML completo modificado]
-
+    
     ANÁLISIS_DE_CAMBIOS:
-    [Aquí una explicación breve de los cambios realizados]
+    [Aquí una lista breve de los cambios realizados, uno por línea]
+"""
 
-    IMPORTANTE: 
-    - Devuelve el código HTML COMPLETO, no solo las partes modificadas
-    - Mantén toda la funcionalidad existente
-    - Solo modifica lo específicamente solicitado
-    """
+_FORMATO_ESTRUCTURADO = f"""
+    FORMATO DE RESPUESTA REQUERIDO:
+    Llama a la herramienta {MODIFICATION_TOOL["function"]["name"]} con:
+    - html: el código HTML completo modificado
+    - changes_applied: los cambios realizados, uno por elemento
+    - warnings: notas para el usuario (por ejemplo, partes de la instrucción que no se pudieron aplicar)
+"""
 
 
-def _parse_modification_response(respuesta: str) -> tuple[str, str]:
+@stage("parse")
+def _parse_modification_response(respuesta: str) -> tuple[str, str, List[str]]:
     """
     Parsea la respuesta de modificación separando código y análisis.
     
@@ -172,7 +420,7 @@ def _parse_modification_response(respuesta: str) -> tuple[str, str]:
         respuesta (str): Respuesta completa de la API
         
     Returns:
-        tuple[str, str]: (código_modificado, análisis_de_cambios)
+        tuple[str, str, List[str]]: (código_modificado, análisis_de_cambios, advertencias)
     """
     try:
         # Buscar los marcadores en la respuesta
@@ -184,16 +432,55 @@ def _parse_modification_response(respuesta: str) -> tuple[str, str]:
                     codigo_y_analisis = resto.split("ANÁLISIS_DE_CAMBIOS:")
                     codigo = codigo_y_analisis[0].strip()
                     analisis = codigo_y_analisis[1].strip() if len(codigo_y_analisis) > 1 else "Modificación aplicada"
-                    return codigo, analisis
+                    return codigo, analisis, []
         
         # Fallback: si no se encuentran los marcadores, usar toda la respuesta como código
-        return respuesta.strip(), "Modificación aplicada según instrucciones"
-        
+        return respuesta.strip(), "Modificación aplicada según instrucciones", [
+            "La respuesta del modelo no incluyó los marcadores de formato; "
+            "se usó completa como código y puede contener texto que no es HTML"
+        ]
+    
     except Exception:
         # En caso de error en el parsing, devolver la respuesta completa
-        return respuesta.strip(), "Modificación aplicada"
+        return respuesta.strip(), "Modificación aplicada", []
+
+
+def _split_changes(analisis: str) -> List[str]:
+    """
+    Convierte el análisis de cambios en texto libre en una lista de cambios.
+    
+    Args:
+        analisis (str): Análisis devuelto después de ANÁLISIS_DE_CAMBIOS
+        
+    Returns:
+        List[str]: Un cambio por línea, sin viñetas ni numeración
+    """
+    cambios = []
+    for linea in analisis.splitlines():
+        linea = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", linea).strip()
+        if linea:
+            cambios.append(linea)
+    return cambios
+
+
+def _lista_de_textos(valor) -> List[str]:
+    """
+    Normaliza un campo de lista de la salida estructurada.
+    
+    Args:
+        valor: Valor del campo en el JSON (puede faltar o venir con otro tipo)
+        
+    Returns:
+        List[str]: Textos no vacíos del campo
+    """
+    if isinstance(valor, str):
+        valor = [valor]
+    if not isinstance(valor, list):
+        return []
+    return [str(v).strip() for v in valor if str(v).strip()]
 
 
+@stage("validation")
 def validate_modification_request(
     codigo_actual: str, 
     instruccion: str
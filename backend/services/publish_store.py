@@ -0,0 +1,293 @@
+"""
+Almacén de landing pages publicadas, direccionado por contenido.
+
+Cada página publicada se guarda en `PUBLISH_DIR/pages/<id>/`, donde `id` son
+los primeros 32 dígitos hexadecimales del SHA-256 del HTML, junto con sus
+variantes precomprimidas `index.html.gz` (y `index.html.br` si `brotli` está
+instalado) a máxima compresión, calculadas una sola vez al publicar. Publicar
+dos veces la misma página no escribe nada nuevo. Un alias opcional (`slug`)
+apunta a la última versión publicada con ese nombre.
+
+Con `external_css`, el CSS embebido de la página se guarda aparte como hoja de
+estilos en `PUBLISH_DIR/styles/<id>.css` (también direccionada por contenido y
+precomprimida), que las páginas con el mismo CSS comparten.
+
+El directorio tiene la forma que espera un servidor de archivos estáticos
+(`index.html` con sus hermanos `.gz`/`.br`), así que en producción se puede
+servir directamente con nginx (`gzip_static`/`brotli_static`) sin pasar por
+la aplicación.
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from utils.error_handlers import handle_validation_error
+from utils.stylesheet_extract import externalize_stylesheet
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional
+    brotli = None
+
+
+# Directorio por defecto de las páginas publicadas
+DEFAULT_PUBLISH_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "published")
+
+# Tamaño máximo de una página publicada
+MAX_PUBLISH_BYTES = int(os.getenv("MAX_PUBLISH_BYTES", str(2 * 1024 * 1024)))
+
+# URL de las hojas de estilos compartidas, relativa a la raíz para que funcione con cualquier host
+STYLESHEET_URL_PREFIX = "/p/styles/"
+
+PAGE_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+SLUG_PATTERN = re.compile(r"[a-z0-9][a-z0-9-]{0,63}")
+
+# Variantes precomprimidas: codificación HTTP -> extensión del archivo
+_VARIANTES = (("br", ".br"), ("gzip", ".gz"))
+
+
+class PublishStore:
+    """
+    Páginas publicadas en disco, con sus variantes precomprimidas y alias.
+    
+    La escritura de cada archivo es atómica (archivo temporal + rename), así que
+    un lector nunca ve una página a medio escribir.
+    """
+    
+    def __init__(self, base_dir: str = DEFAULT_PUBLISH_DIR):
+        self._base_dir = os.path.abspath(base_dir)
+        self._lock = threading.Lock()
+        self._stats = {"published": 0, "reused": 0, "stylesheets_published": 0, "stylesheets_reused": 0}
+    
+    def publish(
+        self,
+        html_code: str,
+        slug: Optional[str] = None,
+        external_css: bool = False,
+        critical_css: bool = False
+    ) -> Dict:
+        """
+        Guarda una página y sus variantes precomprimidas.
+        
+        Args:
+            html_code (str): Página HTML completa
+            slug (Optional[str]): Alias que pasa a apuntar a esta versión
+            external_css (bool): Si mover el CSS embebido a una hoja de estilos compartida
+            critical_css (bool): Con `external_css`, si dejar inline el CSS de la
+                parte visible al cargar
+                
+        Returns:
+            Dict: 'id', 'etag', 'bytes', 'variants' (bytes de cada variante
+                comprimida), 'reused' (si ya estaba publicada), 'slug' y, si se
+                extrajo el CSS, 'stylesheet' con su 'id', 'url', 'bytes' y 'reused'
+        """
+        hoja = None
+        if external_css:
+            def publicar_hoja(css: str) -> str:
+                nonlocal hoja
+                hoja = self._publish_stylesheet(css)
+                return hoja["url"]
+            
+            html_code, _ = externalize_stylesheet(html_code, publicar_hoja, critical_css)
+        
+        contenido = html_code.encode("utf-8")
+        page_id = _content_id(contenido)
+        ruta = os.path.join(self._page_dir(page_id), "index.html")
+        reutilizada = _write_with_variants(ruta, contenido)
+        
+        if slug is not None:
+            os.makedirs(os.path.join(self._base_dir, "aliases"), exist_ok=True)
+            _write_atomic(os.path.join(self._base_dir, "aliases", slug), page_id.encode("ascii"))
+        
+        with self._lock:
+            self._stats["reused" if reutilizada else "published"] += 1
+        
+        publicada = {
+            "id": page_id,
+            "etag": page_id,
+            "bytes": len(contenido),
+            "variants": _variant_sizes(ruta),
+            "reused": reutilizada,
+            "slug": slug
+        }
+        if hoja is not None:
+            publicada["stylesheet"] = hoja
+        return publicada
+    
+    def resolve(self, ref: str) -> Optional[Tuple[str, bool]]:
+        """
+        Resuelve un id de página o un alias.
+        
+        Args:
+            ref (str): Id de 32 dígitos hexadecimales o slug
+            
+        Returns:
+            Optional[Tuple[str, bool]]: Id de la página y si se llegó por alias,
+                o None si no existe
+        """
+        if PAGE_ID_PATTERN.fullmatch(ref):
+            if os.path.exists(os.path.join(self._page_dir(ref), "index.html")):
+                return ref, False
+            return None
+        if not SLUG_PATTERN.fullmatch(ref):
+            return None
+        try:
+            with open(os.path.join(self._base_dir, "aliases", ref), "rb") as f:
+                page_id = f.read().decode("ascii").strip()
+        except OSError:
+            return None
+        return (page_id, True) if PAGE_ID_PATTERN.fullmatch(page_id) else None
+    
+    def variants(self, page_id: str) -> List[Tuple[Optional[str], str]]:
+        """
+        Lista los archivos de una página en orden de preferencia.
+        
+        Args:
+            page_id (str): Id de la página (ya validado por `resolve`)
+            
+        Returns:
+            List[Tuple[Optional[str], str]]: Pares (codificación, ruta); el
+                último es el HTML sin comprimir, con codificación None
+        """
+        return _variant_paths(os.path.join(self._page_dir(page_id), "index.html"))
+    
+    def stylesheet_variants(self, style_id: str) -> Optional[List[Tuple[Optional[str], str]]]:
+        """
+        Lista los archivos de una hoja de estilos compartida en orden de preferencia.
+        
+        Args:
+            style_id (str): Id de la hoja de estilos
+            
+        Returns:
+            Optional[List[Tuple[Optional[str], str]]]: Pares (codificación, ruta)
+                como en `variants`, o None si la hoja no existe
+        """
+        if not PAGE_ID_PATTERN.fullmatch(style_id):
+            return None
+        ruta = self._stylesheet_path(style_id)
+        return _variant_paths(ruta) if os.path.exists(ruta) else None
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Páginas y hojas de estilos publicadas, y publicaciones
+                que reutilizaron una existente
+        """
+        with self._lock:
+            return dict(self._stats)
+    
+    def _publish_stylesheet(self, css: str) -> Dict:
+        contenido = css.encode("utf-8")
+        style_id = _content_id(contenido)
+        reutilizada = _write_with_variants(self._stylesheet_path(style_id), contenido)
+        with self._lock:
+            self._stats["stylesheets_reused" if reutilizada else "stylesheets_published"] += 1
+        return {
+            "id": style_id,
+            "url": f"{STYLESHEET_URL_PREFIX}{style_id}.css",
+            "bytes": len(contenido),
+            "reused": reutilizada
+        }
+    
+    def _page_dir(self, page_id: str) -> str:
+        return os.path.join(self._base_dir, "pages", page_id)
+    
+    def _stylesheet_path(self, style_id: str) -> str:
+        return os.path.join(self._base_dir, "styles", f"{style_id}.css")
+
+
+def _content_id(contenido: bytes) -> str:
+    return hashlib.sha256(contenido).hexdigest()[:32]
+
+
+def _write_with_variants(ruta: str, contenido: bytes) -> bool:
+    """Escribe un archivo y sus variantes precomprimidas si no existe; devuelve si ya existía."""
+    if os.path.exists(ruta):
+        return True
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    # Las variantes se escriben antes que el archivo: si existe, están completas
+    if brotli is not None:
+        _write_atomic(ruta + ".br", brotli.compress(contenido, quality=11))
+    _write_atomic(ruta + ".gz", gzip.compress(contenido, compresslevel=9, mtime=0))
+    _write_atomic(ruta, contenido)
+    return False
+
+
+def _variant_paths(ruta: str) -> List[Tuple[Optional[str], str]]:
+    disponibles = [
+        (encoding, ruta + extension)
+        for encoding, extension in _VARIANTES
+        if os.path.exists(ruta + extension)
+    ]
+    return disponibles + [(None, ruta)]
+
+
+def _variant_sizes(ruta: str) -> Dict[str, int]:
+    return {encoding: os.path.getsize(variante) for encoding, variante in _variant_paths(ruta) if encoding}
+
+
+def _write_atomic(ruta: str, contenido: bytes) -> None:
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix=".tmp-")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(contenido)
+        # mkstemp crea el archivo con 0600: un servidor estático tiene que poder leerlo
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+
+
+def validate_publish_request(
+    html_code: str,
+    slug: Optional[str],
+    external_css: bool = False,
+    critical_css: bool = False
+) -> None:
+    """
+    Valida una petición de publicación.
+    
+    Args:
+        html_code (str): Página a publicar
+        slug (Optional[str]): Alias pedido
+        external_css (bool): Si se pidió extraer el CSS
+        critical_css (bool): Si se pidió dejar inline el CSS crítico
+        
+    Raises:
+        HTTPException: Si la validación falla
+    """
+    if not ("<html" in html_code.lower() or "<!doctype" in html_code.lower()):
+        raise handle_validation_error("html", "Solo se pueden publicar documentos HTML completos")
+    
+    if len(html_code.encode("utf-8")) > MAX_PUBLISH_BYTES:
+        raise handle_validation_error("html", f"La página supera el máximo de {MAX_PUBLISH_BYTES} bytes")
+    
+    if slug is not None and not SLUG_PATTERN.fullmatch(slug):
+        raise handle_validation_error(
+            "slug",
+            "Debe tener de 1 a 64 caracteres: minúsculas, números y guiones, sin empezar con guion"
+        )
+    
+    if critical_css and not external_css:
+        raise handle_validation_error("critical_css", "Solo tiene sentido junto con external_css")
+
+
+# Instancia global del almacén de publicaciones
+_publish_store = PublishStore(os.getenv("PUBLISH_DIR", DEFAULT_PUBLISH_DIR))
+
+
+def get_publish_store() -> PublishStore:
+    """
+    Función helper para obtener el almacén de páginas publicadas.
+    
+    Returns:
+        PublishStore: Almacén global
+    """
+    return _publish_store
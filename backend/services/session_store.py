@@ -0,0 +1,140 @@
+"""
+Almacén en memoria de sesiones de edición conversacional.
+
+Cada sesión conserva el HTML actual y el historial de la conversación del lado
+del servidor, de modo que los clientes conectados por WebSocket solo envían la
+instrucción de cada turno en lugar de re-enviar la página completa.
+"""
+
+import time
+import uuid
+from typing import List, Optional
+
+from schemas.modification_schema import ConversationEntry
+from services.conversation_summary import ConversationSummary
+from utils.lru_cache import LRUCache
+
+
+# Número máximo de sesiones simultáneas en memoria
+MAX_SESSIONS = 200
+
+# Tiempo de inactividad (en segundos) tras el cual una sesión se descarta
+SESSION_TTL_SECONDS = 30 * 60
+
+# Número máximo de entradas de historial conservadas por sesión
+MAX_HISTORY_ENTRIES = 10
+
+
+class LandingSession:
+    """
+    Estado de una sesión de edición: HTML actual, historial sin páginas embebidas
+    y resumen incremental de las decisiones tomadas.
+    """
+    
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.current_html: str = ""
+        self.history: List[ConversationEntry] = []
+        self.summary = ConversationSummary()
+    
+    def sync(self, html: str, history: List[ConversationEntry]) -> None:
+        """
+        Reemplaza el estado de la sesión con el que tiene el cliente.
+        
+        Args:
+            html (str): HTML actual del cliente
+            history (List[ConversationEntry]): Historial del cliente
+        """
+        self.current_html = html
+        self.history = [self._strip_entry(entry) for entry in history][-MAX_HISTORY_ENTRIES:]
+        
+        # Tras deshacer turnos el cliente vuelve a una página conocida: recuperar
+        # el resumen que tenía con ella en lugar de rearmarlo con el historial corto
+        if not self.summary.restore(html):
+            self.summary = ConversationSummary()
+            self.summary.seed_from_history(self.history)
+            self.summary.checkpoint(html)
+    
+    def record_turn(self, entry_type: str, user_input: str, html: str) -> None:
+        """
+        Registra un turno completado y actualiza el HTML actual.
+        
+        El resumen de las modificaciones lo actualiza el servicio de modificación;
+        aquí solo se incorpora la generación inicial.
+        
+        Args:
+            entry_type (str): 'initial_generation' o 'modification'
+            user_input (str): Prompt o instrucción del usuario
+            html (str): HTML resultante del turno
+        """
+        self.current_html = html
+        if entry_type == "initial_generation":
+            self.summary.update(user_input)
+        self.summary.checkpoint(html)
+        self.history.append(ConversationEntry(
+            id=int(time.time() * 1000),
+            type=entry_type,
+            userInput=user_input,
+            timestamp=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        ))
+        self.history = self.history[-MAX_HISTORY_ENTRIES:]
+    
+    @staticmethod
+    def _strip_entry(entry: ConversationEntry) -> ConversationEntry:
+        # El contexto conversacional solo usa tipo e input: no retener páginas completas
+        return entry.model_copy(update={"result": None, "previousHTML": None})
+
+
+class SessionStore:
+    """
+    Almacén LRU de sesiones con tamaño acotado y expiración por inactividad.
+    """
+    
+    def __init__(self, max_sessions: int = MAX_SESSIONS, ttl_seconds: float = SESSION_TTL_SECONDS):
+        self._sessions: LRUCache[LandingSession] = LRUCache(max_sessions, ttl_seconds)
+    
+    def create(self) -> LandingSession:
+        """
+        Crea una sesión nueva, descartando las expiradas o las menos usadas si hace falta.
+        
+        Returns:
+            LandingSession: Sesión creada
+        """
+        session = LandingSession(uuid.uuid4().hex)
+        self._sessions.put(session.session_id, session)
+        return session
+    
+    def get(self, session_id: str) -> Optional[LandingSession]:
+        """
+        Obtiene una sesión existente y la marca como usada.
+        
+        Args:
+            session_id (str): ID de la sesión
+            
+        Returns:
+            Optional[LandingSession]: La sesión, o None si no existe o expiró
+        """
+        return self._sessions.get(session_id)
+    
+    def delete(self, session_id: str) -> None:
+        """
+        Elimina una sesión si existe.
+        
+        Args:
+            session_id (str): ID de la sesión
+        """
+        self._sessions.pop(session_id)
+
+
+# Instancia global del almacén
+_session_store = SessionStore()
+
+
+def get_session_store() -> SessionStore:
+    """
+    Función helper para obtener el almacén de sesiones.
+    
+    Returns:
+        SessionStore: Almacén global de sesiones
+    """
+    return _session_store
@@ -0,0 +1,406 @@
+"""
+Servicio para generar variantes localizadas de una landing page.
+
+En lugar de regenerar la página completa en cada idioma, se extraen solo los
+textos visibles y los atributos traducibles (alt, title, placeholder y la
+meta descripción), se traducen en un lote compacto por idioma y se escriben de
+vuelta sobre el HTML original, que conserva intactos estructura, CSS y scripts.
+Así el costo en tokens y la latencia dependen de la cantidad de texto visible
+y no del tamaño de la página. Los idiomas se traducen en paralelo.
+"""
+
+import html
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Dict, List, Optional, Tuple
+
+from utils.cancellation import CancellationToken, RequestCancelled
+from utils.deadline import DeadlineExceeded
+from utils.error_handlers import handle_openai_error, handle_validation_error
+from utils.openai_client import build_system_message, build_user_message, stream_tool_call_arguments
+from utils.server_timing import stage
+from utils.token_count import estimate_tokens
+
+
+# Atributos cuyo valor se muestra al usuario y por lo tanto se traduce
+ATRIBUTOS_TRADUCIBLES = ("alt", "title", "placeholder")
+
+# Etiquetas cuyo contenido no es texto a traducir
+ETIQUETAS_SIN_TEXTO = ("script", "style", "code", "svg", "template")
+
+# Máximo de idiomas por petición
+MAX_IDIOMAS = 5
+
+# Máximo de caracteres de texto por llamada al modelo; las páginas con más
+# texto se traducen en varios lotes concurrentes
+MAX_CARACTERES_LOTE = 6000
+
+# Máximo de llamadas simultáneas al modelo entre todos los idiomas y lotes
+MAX_LLAMADAS_CONCURRENTES = 8
+
+# Herramienta con la que el modelo devuelve las traducciones de un lote
+TRANSLATION_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "devolver_traducciones",
+        "description": "Devuelve las traducciones de los textos, en el mismo orden",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "translations": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Un texto traducido por cada texto recibido, en el mismo orden"
+                }
+            },
+            "required": ["translations"]
+        }
+    }
+}
+
+_TAG_PATTERN = re.compile(r"""<!--.*?-->|<![^>]*>|<(/?)([a-zA-Z][a-zA-Z0-9-]*)((?:[^>"']|"[^"]*"|'[^']*')*)>""", re.DOTALL)
+_ATTR_PATTERN = re.compile(r"""\b([a-zA-Z-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_LANG_PATTERN = re.compile(r"[a-zA-Z]{2,3}(-[a-zA-Z0-9]{2,8})?")
+
+# Un segmento traducible: (inicio, fin, texto, es_atributo), con los offsets del
+# texto crudo en la página y el texto decodificado y sin espacios sobrantes
+Segmento = Tuple[int, int, str, bool]
+
+
+def traducir_landing(
+    html_code: str,
+    idiomas: List[str],
+    idioma_origen: Optional[str] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> Tuple[Dict[str, Dict], Dict[str, int]]:
+    """
+    Traduce una landing page a varios idiomas sin regenerar su HTML.
+    
+    Args:
+        html_code (str): Página HTML completa
+        idiomas (List[str]): Códigos de los idiomas destino (por ejemplo 'en', 'pt-BR')
+        idioma_origen (Optional[str]): Idioma de la página; si no se indica lo detecta el modelo
+        cancel_token (Optional[CancellationToken]): Token que corta las llamadas a OpenAI
+        
+    Returns:
+        Tuple[Dict[str, Dict], Dict[str, int]]: ({idioma: {"html", "warnings"}}, estadísticas
+            con la cantidad de segmentos, textos únicos, caracteres y lotes de cada idioma)
+            
+    Raises:
+        HTTPException: Si hay errores en la API de OpenAI
+        RequestCancelled: Si el token se cancela durante la traducción
+        DeadlineExceeded: Si vence el plazo del token
+    """
+    segmentos = extract_segments(html_code)
+    
+    # Los textos repetidos (menú y footer, botones) se traducen una sola vez
+    textos = list(dict.fromkeys(texto for _, _, texto, _ in segmentos))
+    lotes = _split_batches(textos)
+    
+    try:
+        trabajos = [(idioma, lote) for idioma in idiomas for lote in lotes]
+        traducciones: Dict[str, Dict[str, str]] = {idioma: {} for idioma in idiomas}
+        advertencias: Dict[str, List[str]] = {idioma: [] for idioma in idiomas}
+        
+        if trabajos:
+            # Cada hilo corre en una copia del contexto de la petición (etapas de Server-Timing)
+            contextos = [copy_context() for _ in trabajos]
+            with ThreadPoolExecutor(max_workers=min(len(trabajos), MAX_LLAMADAS_CONCURRENTES)) as executor:
+                resultados = list(executor.map(
+                    lambda contexto, trabajo: contexto.run(
+                        _traducir_lote, trabajo[1], trabajo[0], idioma_origen, cancel_token
+                    ),
+                    contextos,
+                    trabajos
+                ))
+            for (idioma, lote), (traducidos, advertencia) in zip(trabajos, resultados):
+                traducciones[idioma].update(zip(lote, traducidos))
+                if advertencia:
+                    advertencias[idioma].append(advertencia)
+        
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled("post-procesamiento")
+        
+        paginas = {
+            idioma: {
+                "html": apply_translations(html_code, segmentos, traducciones[idioma], idioma),
+                "warnings": advertencias[idioma]
+            }
+            for idioma in idiomas
+        }
+        estadisticas = {
+            "segments": len(segmentos),
+            "unique_texts": len(textos),
+            "characters": sum(len(t) for t in textos),
+            "batches": len(lotes)
+        }
+        return paginas, estadisticas
+    
+    except (RequestCancelled, DeadlineExceeded):
+        # No es un error de OpenAI: el cliente ya no espera la respuesta
+        raise
+    
+    except Exception as e:
+        raise handle_openai_error(str(e))
+
+
+def _traducir_lote(
+    textos: List[str],
+    idioma: str,
+    idioma_origen: Optional[str],
+    cancel_token: Optional[CancellationToken]
+) -> Tuple[List[str], Optional[str]]:
+    """
+    Traduce un lote de textos con una sola llamada al modelo.
+    
+    Args:
+        textos (List[str]): Textos a traducir
+        idioma (str): Idioma destino
+        idioma_origen (Optional[str]): Idioma de los textos, si se conoce
+        cancel_token (Optional[CancellationToken]): Token que corta la llamada a OpenAI
+        
+    Returns:
+        Tuple[List[str], Optional[str]]: (un texto traducido por cada texto recibido,
+            advertencia si el modelo no devolvió todas las traducciones)
+    """
+    origen = f" del idioma '{idioma_origen}'" if idioma_origen else ""
+    messages = [
+        build_system_message(_get_translation_system_role()),
+        build_user_message(
+            f"Traduce{origen} al idioma '{idioma}' estos textos de una landing page. "
+            "Son fragmentos consecutivos de la página, en orden: usa los vecinos como contexto, "
+            "pero devuelve exactamente una traducción por texto.\n"
+            + json.dumps(textos, ensure_ascii=False, separators=(",", ":"))
+        )
+    ]
+    
+    # La salida ocupa aproximadamente lo mismo que la entrada, más el JSON que la envuelve
+    max_tokens = min(4000, estimate_tokens(json.dumps(textos, ensure_ascii=False)) * 2 + 100)
+    argumentos = "".join(stream_tool_call_arguments(
+        messages=messages,
+        tool=TRANSLATION_TOOL,
+        model="gpt-3.5-turbo",
+        temperature=0.2,
+        max_tokens=max_tokens,
+        cancel_token=cancel_token
+    ))
+    
+    try:
+        traducidos = json.loads(argumentos).get("translations")
+    except (json.JSONDecodeError, AttributeError):
+        traducidos = None
+    if not isinstance(traducidos, list):
+        return textos, f"No se pudieron traducir {len(textos)} textos: la respuesta del modelo no fue válida"
+    
+    traducidos = [str(t).strip() if str(t).strip() else original for t, original in zip(traducidos, textos)]
+    if len(traducidos) < len(textos):
+        # Conservar el texto original de los que falten
+        faltantes = len(textos) - len(traducidos)
+        return traducidos + textos[len(traducidos):], f"{faltantes} textos quedaron sin traducir"
+    return traducidos, None
+
+
+def _get_translation_system_role() -> str:
+    """
+    Obtiene la descripción del rol del sistema para traducciones.
+    
+    Returns:
+        str: Descripción del rol del asistente para traducir textos de landing pages
+    """
+    return """Eres un traductor profesional de textos de marketing para sitios web.
+    
+    Principios importantes:
+    - Traduce con naturalidad y adapta expresiones, no palabra por palabra
+    - Mantén el tono, la longitud aproximada y las mayúsculas del original
+    - No traduzcas nombres de marcas, productos, emails, URLs ni números
+    - Si un texto no necesita traducción, devuélvelo igual"""
+
+
+def extract_segments(html_code: str) -> List[Segmento]:
+    """
+    Ubica los textos visibles y los atributos traducibles de una página.
+    
+    Se omiten comentarios, el contenido de ETIQUETAS_SIN_TEXTO y los textos sin
+    letras (números, símbolos, espacios).
+    
+    Args:
+        html_code (str): Página HTML completa
+        
+    Returns:
+        List[Segmento]: Segmentos en orden de aparición
+    """
+    segmentos: List[Segmento] = []
+    posicion = 0
+    
+    while True:
+        match = _TAG_PATTERN.search(html_code, posicion)
+        fin_texto = match.start() if match else len(html_code)
+        _add_text_segment(segmentos, html_code, posicion, fin_texto)
+        if match is None:
+            break
+        posicion = match.end()
+        
+        if match.group(2) is None or match.group(1):
+            continue
+        etiqueta, atributos = match.group(2).lower(), match.group(3)
+        
+        # Saltar el contenido completo de las etiquetas que no tienen texto traducible
+        if etiqueta in ETIQUETAS_SIN_TEXTO and not atributos.rstrip().endswith("/"):
+            cierre = re.compile(rf"</{etiqueta}\s*>", re.IGNORECASE).search(html_code, posicion)
+            posicion = cierre.end() if cierre else len(html_code)
+            continue
+        
+        _add_attribute_segments(segmentos, etiqueta, atributos, match.start(3))
+    
+    return segmentos
+
+
+def _add_text_segment(segmentos: List[Segmento], html_code: str, inicio: int, fin: int) -> None:
+    crudo = html_code[inicio:fin]
+    texto = _normalize(crudo)
+    if not _is_translatable(texto):
+        return
+    # Conservar los espacios alrededor para no alterar la indentación
+    izquierda = len(crudo) - len(crudo.lstrip())
+    derecha = len(crudo.rstrip())
+    segmentos.append((inicio + izquierda, inicio + derecha, texto, False))
+
+
+def _add_attribute_segments(segmentos: List[Segmento], etiqueta: str, atributos: str, offset: int) -> None:
+    valores = {}
+    for attr in _ATTR_PATTERN.finditer(atributos):
+        grupo = 2 if attr.group(2) is not None else 3
+        valores[attr.group(1).lower()] = (attr.start(grupo), attr.end(grupo), attr.group(grupo))
+    
+    traducibles = [nombre for nombre in ATRIBUTOS_TRADUCIBLES if nombre in valores]
+    if etiqueta == "meta" and valores.get("name", (0, 0, ""))[2].lower() == "description" and "content" in valores:
+        traducibles.append("content")
+    
+    for nombre in sorted(traducibles, key=lambda n: valores[n][0]):
+        inicio, fin, crudo = valores[nombre]
+        texto = _normalize(crudo)
+        if _is_translatable(texto):
+            segmentos.append((offset + inicio, offset + fin, texto, True))
+
+
+def apply_translations(
+    html_code: str,
+    segmentos: List[Segmento],
+    traducciones: Dict[str, str],
+    idioma: Optional[str] = None
+) -> str:
+    """
+    Escribe las traducciones sobre la página original.
+    
+    Args:
+        html_code (str): Página HTML original
+        segmentos (List[Segmento]): Segmentos devueltos por extract_segments
+        traducciones (Dict[str, str]): Texto traducido para cada texto original; los
+            segmentos sin traducción quedan como estaban
+        idioma (Optional[str]): Si se indica, se usa como atributo `lang` de `<html>`
+        
+    Returns:
+        str: Página traducida, idéntica a la original fuera de los segmentos
+    """
+    partes = []
+    anterior = 0
+    for inicio, fin, texto, es_atributo in segmentos:
+        traducido = traducciones.get(texto)
+        partes.append(html_code[anterior:inicio])
+        # Sin traducción se conserva el texto crudo, con sus entidades y saltos de línea
+        partes.append(html_code[inicio:fin] if traducido is None else html.escape(traducido, quote=es_atributo))
+        anterior = fin
+    partes.append(html_code[anterior:])
+    resultado = "".join(partes)
+    
+    if idioma is not None:
+        resultado = _set_lang(resultado, idioma)
+    return resultado
+
+
+def _set_lang(html_code: str, idioma: str) -> str:
+    """
+    Reemplaza o agrega el atributo `lang` de la etiqueta `<html>`.
+    
+    Args:
+        html_code (str): Página HTML
+        idioma (str): Código de idioma
+        
+    Returns:
+        str: Página con el idioma actualizado
+    """
+    apertura = re.search(r"<html\b[^>]*>", html_code, re.IGNORECASE)
+    if apertura is None:
+        return html_code
+    etiqueta = apertura.group(0)
+    if re.search(r"\blang\s*=", etiqueta, re.IGNORECASE):
+        nueva = re.sub(
+            r"""\blang\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>]+)""", f'lang="{idioma}"', etiqueta,
+            count=1, flags=re.IGNORECASE
+        )
+    else:
+        nueva = f'<html lang="{idioma}"' + etiqueta[len("<html"):]
+    return html_code[:apertura.start()] + nueva + html_code[apertura.end():]
+
+
+def _split_batches(textos: List[str]) -> List[List[str]]:
+    """
+    Agrupa los textos en lotes de hasta MAX_CARACTERES_LOTE caracteres.
+    
+    Args:
+        textos (List[str]): Textos únicos a traducir
+        
+    Returns:
+        List[List[str]]: Lotes en el orden original
+    """
+    lotes: List[List[str]] = []
+    actual: List[str] = []
+    caracteres = 0
+    for texto in textos:
+        if actual and caracteres + len(texto) > MAX_CARACTERES_LOTE:
+            lotes.append(actual)
+            actual, caracteres = [], 0
+        actual.append(texto)
+        caracteres += len(texto)
+    if actual:
+        lotes.append(actual)
+    return lotes
+
+
+def _normalize(crudo: str) -> str:
+    return re.sub(r"\s+", " ", html.unescape(crudo)).strip()
+
+
+def _is_translatable(texto: str) -> bool:
+    return re.search(r"[^\W\d_]", texto) is not None
+
+
+@stage("validation")
+def validate_translation_request(html_code: str, idiomas: List[str]) -> None:
+    """
+    Valida una petición de traducción.
+    
+    Args:
+        html_code (str): Página HTML a traducir
+        idiomas (List[str]): Idiomas destino
+        
+    Raises:
+        HTTPException: Si la validación falla
+    """
+    if not ("<html" in html_code.lower() or "<!doctype" in html_code.lower()):
+        raise handle_validation_error("html", "El código debe ser HTML válido")
+    
+    if not idiomas or len(idiomas) > MAX_IDIOMAS:
+        raise handle_validation_error("languages", f"Se deben indicar entre 1 y {MAX_IDIOMAS} idiomas")
+    
+    for idioma in idiomas:
+        if not _LANG_PATTERN.fullmatch(idioma):
+            raise handle_validation_error(
+                "languages",
+                f"'{idioma}' no es un código de idioma válido (por ejemplo 'en' o 'pt-BR')"
+            )
+    
+    if len({idioma.lower() for idioma in idiomas}) != len(idiomas):
+        raise handle_validation_error("languages", "Los idiomas no se pueden repetir")
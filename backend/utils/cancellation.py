@@ -0,0 +1,230 @@
+"""
+Cancelación de llamadas a OpenAI cuando el cliente se desconecta.
+
+Las rutas crean un `CancellationToken` y vigilan la desconexión del cliente;
+el cliente de OpenAI registra el cierre del stream en el token, de modo que al
+cancelar se corta la conexión con OpenAI de inmediato y se dejan de generar
+(y pagar) tokens. El token también lleva el plazo de la petición: al vencer se
+cancela igual que si el cliente se hubiera ido. También se lleva la cuenta de
+los tokens y segundos ahorrados.
+"""
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+
+from utils.deadline import Deadline, DeadlineExceeded
+
+
+# Intervalo (en segundos) entre comprobaciones de desconexión del cliente
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+class RequestCancelled(HTTPException):
+    """
+    El trabajo se canceló porque el cliente ya no espera el resultado.
+    
+    Usa el código 499 (petición cerrada por el cliente), que no llega a nadie
+    pero deja registro en los logs de acceso.
+    """
+    
+    def __init__(self):
+        super().__init__(status_code=499, detail="Petición cancelada: el cliente se desconectó")
+
+
+class CancellationToken:
+    """
+    Señal de cancelación compartida entre el event loop y los hilos de trabajo.
+    
+    Si tiene un plazo, cada etapa consulta `remaining()` para acotar su duración
+    y `raise_if_cancelled()` antes de empezar.
+    """
+    
+    def __init__(self, deadline: Optional[Deadline] = None):
+        self.deadline = deadline
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def cancel(self) -> None:
+        """
+        Marca el token como cancelado y ejecuta los callbacks registrados.
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+    
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Registra un callback a ejecutar al cancelar (de inmediato si ya se canceló).
+        
+        Args:
+            callback (Callable[[], None]): Función a ejecutar, por ejemplo cerrar un stream
+            
+        Returns:
+            Callable[[], None]: Función para desregistrar el callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                
+                def unregister():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+                return unregister
+        callback()
+        return lambda: None
+    
+    def remaining(self) -> Optional[float]:
+        """
+        Returns:
+            Optional[float]: Segundos restantes del plazo, o None si no tiene plazo
+        """
+        return self.deadline.remaining() if self.deadline is not None else None
+    
+    def error(self, etapa: str) -> Optional[HTTPException]:
+        """
+        Obtiene la excepción que corresponde al estado del token.
+        
+        Args:
+            etapa (str): Etapa en curso, para el mensaje de plazo agotado
+            
+        Returns:
+            Optional[HTTPException]: DeadlineExceeded si venció el plazo,
+                RequestCancelled si se canceló, o None si puede continuar
+        """
+        if self.deadline is not None and self.deadline.expired:
+            return DeadlineExceeded(etapa)
+        if self._event.is_set():
+            return RequestCancelled()
+        return None
+    
+    def raise_if_cancelled(self, etapa: str = "procesamiento") -> None:
+        """
+        Args:
+            etapa (str): Etapa que está por empezar
+            
+        Raises:
+            DeadlineExceeded: Si el plazo venció
+            RequestCancelled: Si el token fue cancelado
+        """
+        error = self.error(etapa)
+        if error is not None:
+            self.cancel()
+            raise error
+
+
+@asynccontextmanager
+async def cancel_on_disconnect(request: Request, on_disconnect: Callable[[], None]) -> AsyncIterator[None]:
+    """
+    Vigila la desconexión del cliente mientras dura el bloque.
+    
+    Args:
+        request (Request): Petición HTTP en curso
+        on_disconnect (Callable[[], None]): Función a ejecutar una vez si el cliente se desconecta
+    """
+    async def vigilar():
+        while not await request.is_disconnected():
+            await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+        on_disconnect()
+    
+    vigilante = asyncio.create_task(vigilar())
+    try:
+        yield
+    finally:
+        vigilante.cancel()
+
+
+class CancellationStats:
+    """
+    Estadísticas de cancelaciones y del ahorro estimado en tokens y tiempo.
+    
+    El ahorro se estima con medias móviles de las completions que terminan
+    normalmente: tokens esperados por completion y tokens por segundo.
+    """
+    
+    _ALPHA = 0.2  # Peso de cada observación nueva en las medias móviles
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cancelled = 0
+        self.tokens_saved = 0.0
+        self.seconds_saved = 0.0
+        self._avg_tokens = None
+        self._avg_rate = None
+    
+    def record_completed(self, tokens: int, seconds: float) -> None:
+        """
+        Registra una completion que terminó normalmente.
+        
+        Args:
+            tokens (int): Tokens recibidos
+            seconds (float): Duración de la completion
+        """
+        with self._lock:
+            self._avg_tokens = self._ema(self._avg_tokens, tokens)
+            if seconds > 0 and tokens > 0:
+                self._avg_rate = self._ema(self._avg_rate, tokens / seconds)
+    
+    def record_cancelled(self, tokens_received: int, max_tokens: int, seconds: float) -> None:
+        """
+        Registra una completion cancelada y estima lo que se dejó de generar.
+        
+        Args:
+            tokens_received (int): Tokens recibidos antes de cancelar
+            max_tokens (int): Límite de tokens pedido para la completion
+            seconds (float): Tiempo transcurrido hasta la cancelación
+        """
+        with self._lock:
+            esperados = min(max_tokens, self._avg_tokens or max_tokens / 2)
+            restantes = max(0.0, esperados - tokens_received)
+            tasa = tokens_received / seconds if tokens_received > 10 and seconds > 0 else self._avg_rate
+            
+            self.cancelled += 1
+            self.tokens_saved += restantes
+            if tasa:
+                self.seconds_saved += restantes / tasa
+    
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: Cancelaciones y ahorro estimado acumulado
+        """
+        with self._lock:
+            return {
+                "cancelled_requests": self.cancelled,
+                "estimated_tokens_saved": round(self.tokens_saved),
+                "estimated_seconds_saved": round(self.seconds_saved, 1),
+            }
+    
+    def _ema(self, actual, valor):
+        return valor if actual is None else actual + self._ALPHA * (valor - actual)
+
+
+# Instancia global de estadísticas
+_cancellation_stats = CancellationStats()
+
+
+def get_cancellation_stats() -> CancellationStats:
+    """
+    Función helper para obtener las estadísticas de cancelación.
+    
+    Returns:
+        CancellationStats: Estadísticas globales
+    """
+    return _cancellation_stats
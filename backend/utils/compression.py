@@ -0,0 +1,514 @@
+"""
+Compresión de las respuestas HTTP de la API y descompresión de los cuerpos de las peticiones.
+
+`CompressionMiddleware` comprime con brotli (si el paquete `brotli` está
+instalado) o gzip las respuestas de texto que superan un tamaño mínimo, según
+el `Accept-Encoding` del cliente. Las respuestas completas se comprimen de una
+vez y se guardan en una caché LRU de variantes ya comprimidas, de modo que los
+resultados que se piden varias veces (el polling de un trabajo terminado, los
+reintentos con `Idempotency-Key`) no se vuelven a comprimir. Las respuestas en
+streaming (NDJSON del lote) se comprimen por fragmento con un flush después de
+cada uno, para que cada línea siga llegando apenas está lista.
+
+`RequestDecompressionMiddleware` acepta cuerpos con `Content-Encoding` gzip,
+br (con `brotli` >= 1.1) o zstd (con `zstandard`): los descomprime a medida que
+llegan los fragmentos y corta con 413 en cuanto el resultado supera el máximo,
+sin llegar a materializar una "zip bomb". La aplicación recibe el cuerpo ya
+descomprimido.
+
+Configuración por variables de entorno:
+    RESPONSE_COMPRESSION            "0" para desactivarla (por defecto activa)
+    RESPONSE_COMPRESSION_MIN_BYTES  tamaño mínimo a comprimir (por defecto 1024)
+    RESPONSE_COMPRESSION_CACHE      variantes comprimidas en caché (por defecto 128)
+    MAX_DECOMPRESSED_REQUEST_BYTES  tamaño máximo de un cuerpo descomprimido (por defecto 8 MB)
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.lru_cache import LRUCache
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Dependencia opcional
+    zstandard = None
+
+
+COMPRESSION_ENABLED = os.getenv("RESPONSE_COMPRESSION", "1").lower() not in ("0", "false", "no")
+MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+CACHE_ENTRIES = int(os.getenv("RESPONSE_COMPRESSION_CACHE", "128"))
+MAX_DECOMPRESSED_REQUEST_BYTES = int(os.getenv("MAX_DECOMPRESSED_REQUEST_BYTES", str(8 * 1024 * 1024)))
+
+# Niveles pensados para contenido dinámico: casi toda la ganancia, poco CPU
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Por encima de este tamaño la compresión se hace fuera del event loop
+_THREADPOOL_MIN_BYTES = 128 * 1024
+
+_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml"
+)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "responses": 0,
+    "streamed": 0,
+    "cache_hits": 0,
+    "bytes_before": 0,
+    "bytes_after": 0,
+    "requests_decompressed": 0,
+    "request_bytes_compressed": 0,
+    "request_bytes_decompressed": 0
+}
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Elige la codificación de la respuesta según el header `Accept-Encoding`.
+    
+    Args:
+        accept_encoding (str): Valor del header (puede traer pesos `q`)
+        
+    Returns:
+        Optional[str]: 'br', 'gzip' o None si el cliente no acepta ninguna disponible
+    """
+    candidatas = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return choose_encoding(accept_encoding, candidatas)
+
+
+def choose_encoding(accept_encoding: str, candidatas: List[str]) -> Optional[str]:
+    """
+    Elige entre varias codificaciones disponibles según el header `Accept-Encoding`.
+    
+    Args:
+        accept_encoding (str): Valor del header (puede traer pesos `q`)
+        candidatas (List[str]): Codificaciones disponibles, en orden de preferencia
+        
+    Returns:
+        Optional[str]: La candidata con mayor peso (a igual peso, la primera) o
+            None si el cliente no acepta ninguna
+    """
+    aceptadas: Dict[str, float] = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        peso = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                peso = float(parametros[2:])
+            except ValueError:
+                peso = 0.0
+        if nombre:
+            aceptadas[nombre.strip()] = peso
+    
+    if not candidatas:
+        return None
+    comodin = aceptadas.get("*", 0.0)
+    pesos = [(aceptadas.get(c, comodin), -i, c) for i, c in enumerate(candidatas)]
+    peso, _, elegida = max(pesos)
+    return elegida if peso > 0 else None
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """
+    Comprime un cuerpo completo.
+    
+    Args:
+        body (bytes): Cuerpo sin comprimir
+        encoding (str): 'br' o 'gzip'
+        
+    Returns:
+        bytes: Cuerpo comprimido
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def get_compression_stats() -> Dict[str, int]:
+    """
+    Obtiene las estadísticas acumuladas de compresión de respuestas.
+    
+    Returns:
+        Dict[str, int]: Respuestas comprimidas (completas y en streaming),
+            aciertos de la caché y bytes antes/después, y peticiones descomprimidas
+            con sus bytes recibidos y descomprimidos
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["bytes_saved"] = stats["bytes_before"] - stats["bytes_after"]
+    stats["brotli_available"] = brotli is not None
+    stats["request_encodings"] = sorted(supported_request_encodings())
+    return stats
+
+
+class PrecompressedCache:
+    """
+    Caché LRU de cuerpos ya comprimidos, indexada por codificación y hash del cuerpo.
+    """
+    
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self._max_entries = max_entries
+        self._entries: LRUCache[bytes] = LRUCache(max_entries)
+    
+    def get(self, body: bytes, encoding: str) -> Tuple[bytes, bool]:
+        """
+        Devuelve la variante comprimida del cuerpo, comprimiéndolo si no está en caché.
+        
+        Args:
+            body (bytes): Cuerpo sin comprimir
+            encoding (str): 'br' o 'gzip'
+            
+        Returns:
+            Tuple[bytes, bool]: Cuerpo comprimido y si vino de la caché
+        """
+        if self._max_entries <= 0:
+            return compress_body(body, encoding), False
+        
+        clave = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        comprimido = self._entries.get(clave)
+        if comprimido is not None:
+            return comprimido, True
+        
+        comprimido = compress_body(body, encoding)
+        self._entries.put(clave, comprimido)
+        return comprimido, False
+
+
+# Instancia global de la caché
+_precompressed_cache = PrecompressedCache()
+
+
+def get_precompressed_cache() -> PrecompressedCache:
+    """
+    Obtiene la instancia global de la caché de variantes comprimidas.
+    
+    Returns:
+        PrecompressedCache: Caché compartida por todas las respuestas
+    """
+    return _precompressed_cache
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime las respuestas HTTP con brotli o gzip.
+    """
+    
+    def __init__(self, app: ASGIApp, minimum_size: int = MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        await _CompressionResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressionResponder:
+    """
+    Intercepta los mensajes de una respuesta y decide si comprimirla al ver el primer fragmento.
+    """
+    
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.started = False
+        self.compress = False
+        self.compressor = None
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+    
+    async def send_with_compression(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Se retiene hasta ver el cuerpo: los headers dependen de si se comprime
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            # Otros tipos de envío (p. ej. zero-copy de archivos) pasan sin comprimir
+            if not self.started:
+                self.started = True
+                await self.send(self.start_message)
+            await self.send(message)
+            return
+        
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            tipo = headers.get("content-type", "")
+            self.compress = (
+                "content-encoding" not in headers
+                and tipo.startswith(_COMPRESSIBLE_TYPES)
+                and (more_body or len(body) >= self.minimum_size)
+            )
+            if not self.compress:
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            
+            if not more_body:
+                if len(body) >= _THREADPOOL_MIN_BYTES:
+                    comprimido, en_cache = await run_in_threadpool(get_precompressed_cache().get, body, self.encoding)
+                else:
+                    comprimido, en_cache = get_precompressed_cache().get(body, self.encoding)
+                headers["Content-Length"] = str(len(comprimido))
+                _record(len(body), len(comprimido), streamed=False, cache_hit=en_cache)
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": comprimido})
+                return
+            
+            del headers["Content-Length"]
+            self.compressor = _StreamCompressor(self.encoding)
+            await self.send(self.start_message)
+        
+        elif not self.compress:
+            await self.send(message)
+            return
+        
+        salida = self.compressor.compress(body, final=not more_body)
+        _record(len(body), len(salida), streamed=True, cache_hit=False, count=not more_body)
+        await self.send({"type": "http.response.body", "body": salida, "more_body": more_body})
+
+
+class _StreamCompressor:
+    """
+    Compresor incremental que vacía su buffer después de cada fragmento.
+    """
+    
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            salida = self._compressor.process(data)
+            return salida + (self._compressor.finish() if final else self._compressor.flush())
+        salida = self._compressor.compress(data)
+        return salida + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class RequestBodyTooLarge(Exception):
+    """El cuerpo descomprimido supera el tamaño máximo permitido."""
+
+
+def supported_request_encodings() -> Set[str]:
+    """
+    Returns:
+        Set[str]: Codificaciones de cuerpo que se pueden descomprimir con los paquetes instalados
+    """
+    codificaciones = {"gzip"}
+    # brotli < 1.1 no permite acotar la salida de cada llamada
+    if brotli is not None and hasattr(brotli.Decompressor, "can_accept_more_data"):
+        codificaciones.add("br")
+    if zstandard is not None:
+        codificaciones.add("zstd")
+    return codificaciones
+
+
+class StreamDecompressor:
+    """
+    Descompresor incremental que nunca produce más de `max_size` bytes en total.
+    """
+    
+    def __init__(self, encoding: str, max_size: int = MAX_DECOMPRESSED_REQUEST_BYTES):
+        self.encoding = encoding
+        self.max_size = max_size
+        self.total = 0
+        self._partes: List[bytes] = []
+        if encoding == "gzip":
+            self._decoder = zlib.decompressobj(31)
+        elif encoding == "br":
+            self._decoder = brotli.Decompressor()
+        else:
+            self._decoder = zstandard.ZstdDecompressor()
+            self._comprimido = bytearray()
+    
+    def feed(self, data: bytes) -> None:
+        """
+        Descomprime un fragmento del cuerpo.
+        
+        Args:
+            data (bytes): Fragmento comprimido
+            
+        Raises:
+            RequestBodyTooLarge: Si el total descomprimido supera `max_size`
+            ValueError: Si el fragmento no es válido para la codificación
+        """
+        if self.encoding == "gzip":
+            while data:
+                self._append(self._decoder.decompress(data, self._remaining()))
+                data = self._decoder.unconsumed_tail
+            if self._decoder.unused_data:
+                raise ValueError("datos después del final del stream gzip")
+        elif self.encoding == "br":
+            self._append(self._decoder.process(data, output_buffer_limit=self._remaining()))
+            while not self._decoder.can_accept_more_data():
+                self._append(self._decoder.process(b"", output_buffer_limit=self._remaining()))
+        else:
+            # El decompressobj de zstandard no acota su salida: el cuerpo comprimido
+            # se junta y se lee en bloques acotados al terminar
+            if len(self._comprimido) + len(data) > self.max_size:
+                raise RequestBodyTooLarge()
+            self._comprimido.extend(data)
+    
+    def finish(self) -> bytes:
+        """
+        Returns:
+            bytes: Cuerpo descomprimido completo
+            
+        Raises:
+            RequestBodyTooLarge: Si el total descomprimido supera `max_size`
+            ValueError: Si el stream comprimido está truncado
+        """
+        if self.encoding == "gzip" and not self._decoder.eof:
+            raise ValueError("stream gzip truncado")
+        if self.encoding == "br" and not self._decoder.is_finished():
+            raise ValueError("stream brotli truncado")
+        if self.encoding == "zstd":
+            with self._decoder.stream_reader(io.BytesIO(bytes(self._comprimido))) as lector:
+                while True:
+                    bloque = lector.read(min(self._remaining(), 64 * 1024))
+                    if not bloque:
+                        break
+                    self._append(bloque)
+        return b"".join(self._partes)
+    
+    def _remaining(self) -> int:
+        # Un byte de más para detectar que se superó el máximo
+        return self.max_size - self.total + 1
+    
+    def _append(self, salida: bytes) -> None:
+        self.total += len(salida)
+        if self.total > self.max_size:
+            raise RequestBodyTooLarge()
+        self._partes.append(salida)
+
+
+class RequestDecompressionMiddleware:
+    """
+    Middleware ASGI que descomprime los cuerpos de las peticiones con `Content-Encoding`.
+    """
+    
+    def __init__(self, app: ASGIApp, max_size: int = MAX_DECOMPRESSED_REQUEST_BYTES):
+        self.app = app
+        self.max_size = max_size
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = Headers(scope=scope).get("content-encoding", "").strip().lower()
+        if encoding in ("", "identity"):
+            await self.app(scope, receive, send)
+            return
+        
+        if encoding not in supported_request_encodings():
+            respuesta = JSONResponse(
+                {"detail": f"Content-Encoding no soportado: {encoding}"},
+                status_code=415,
+                headers={"Accept-Encoding": ", ".join(sorted(supported_request_encodings()))}
+            )
+            await respuesta(scope, receive, send)
+            return
+        
+        decompressor = StreamDecompressor(encoding, self.max_size)
+        recibidos = 0
+        try:
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                chunk = message.get("body", b"")
+                recibidos += len(chunk)
+                decompressor.feed(chunk)
+                more_body = message.get("more_body", False)
+            body = decompressor.finish()
+        except RequestBodyTooLarge:
+            respuesta = JSONResponse(
+                {"detail": f"El cuerpo descomprimido supera el máximo de {self.max_size} bytes"},
+                status_code=413
+            )
+            await respuesta(scope, receive, send)
+            return
+        except Exception as e:
+            # zlib.error, brotli.error y ZstdError no comparten una clase base
+            respuesta = JSONResponse(
+                {"detail": f"Cuerpo {encoding} inválido: {e}"},
+                status_code=400
+            )
+            await respuesta(scope, receive, send)
+            return
+        
+        with _stats_lock:
+            _stats["requests_decompressed"] += 1
+            _stats["request_bytes_compressed"] += recibidos
+            _stats["request_bytes_decompressed"] += len(body)
+        
+        headers = MutableHeaders(scope=scope)
+        del headers["content-encoding"]
+        headers["content-length"] = str(len(body))
+        
+        entregado = False
+        
+        async def receive_decompressed() -> Message:
+            nonlocal entregado
+            if not entregado:
+                entregado = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Después del cuerpo, seguir informando la desconexión del cliente
+            return await receive()
+        
+        await self.app(scope, receive_decompressed, send)
+
+
+def _record(antes: int, despues: int, streamed: bool, cache_hit: bool, count: bool = True) -> None:
+    with _stats_lock:
+        _stats["bytes_before"] += antes
+        _stats["bytes_after"] += despues
+        if count:
+            _stats["responses"] += 1
+            _stats["streamed"] += int(streamed)
+            _stats["cache_hits"] += int(cache_hit)
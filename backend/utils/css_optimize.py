@@ -0,0 +1,409 @@
+"""
+Optimización del CSS embebido de las páginas generadas.
+
+`optimize_page_css` recorre los bloques `<style>` de una página y:
+
+- quita las reglas cuyos selectores no coinciden con ningún elemento del
+  documento (y los selectores sueltos de una lista que no se usan),
+- quita las declaraciones repetidas dentro de una regla y las reglas idénticas
+  que vuelven a aparecer más adelante en el mismo bloque,
+- une reglas consecutivas con el mismo selector o con las mismas declaraciones.
+
+El análisis es conservador: un selector solo se considera sin uso si alguna de
+sus clases, ids o etiquetas no aparece en el documento. Las palabras de los
+`<script>` y de los atributos que no son `class`/`id` cuentan como usadas (el
+JavaScript puede agregar clases), y los selectores que no se pueden analizar
+(`:is()`, `:has()`, escapes) se conservan. Los at-rules distintos de
+`@media`/`@supports`/`@container`/`@layer` se dejan intactos.
+"""
+
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple, Union
+
+from utils.html_minify import minify_css
+
+
+# Etiquetas que el navegador crea aunque no estén escritas
+_IMPLICIT_TAGS = frozenset({"html", "head", "body"})
+
+# At-rules cuyo contenido son reglas que se pueden optimizar
+_GROUPING_AT_RULES = ("@media", "@supports", "@container", "@layer")
+
+_STYLE_BLOCK = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.DOTALL | re.IGNORECASE)
+_SCRIPT_BLOCK = re.compile(r"<script\b[^>]*>(.*?)</script\s*>", re.DOTALL | re.IGNORECASE)
+_TAG = re.compile(r"<([a-zA-Z][\w-]*)((?:\"[^\"]*\"|'[^']*'|[^'\">])*)>")
+_ATTRIBUTE = re.compile(r"([^\s=/]+)\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s\"'>]+)")
+_WORD = re.compile(r"[\w-]+")
+
+_CSS_TOKEN = re.compile(
+    r"/\*.*?(?:\*/|$)|\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|\([^()\"']*\)|[{};]|[^{};\"'/(]+|[/(]",
+    re.DOTALL
+)
+# Pseudo-clases cuyo argumento es una lista de selectores: no se analizan
+_SELECTOR_ARGUMENT = re.compile(r":(?:is|where|has|matches|-\w+-any)\(", re.IGNORECASE)
+_PSEUDO = re.compile(r"::?[\w-]+(?:\([^)]*\))?")
+_ATTRIBUTE_SELECTOR = re.compile(r"\[[^\]]*\]")
+_COMBINATOR = re.compile(r"\s*[>+~]\s*|\s+")
+_COMPOUND_PART = re.compile(r"([.#]?)(-?[_a-zA-Z][\w-]*|\*)")
+
+# Regla o at-rule con bloque: (prelude, contenido). El contenido mezcla
+# declaraciones (str) y bloques anidados
+Block = Tuple[str, List[Union[str, "Block"]]]
+
+_stats_lock = threading.Lock()
+_stats = {
+    "pages": 0,
+    "rules_removed": 0,
+    "selectors_removed": 0,
+    "declarations_removed": 0,
+    "rules_merged": 0,
+    "css_bytes_before": 0,
+    "css_bytes_after": 0
+}
+
+
+def optimize_page_css(html: str) -> Tuple[str, Dict[str, int]]:
+    """
+    Quita el CSS sin uso y repetido de los bloques `<style>` de una página.
+    
+    Args:
+        html (str): Documento HTML con CSS embebido
+        
+    Returns:
+        Tuple[str, Dict[str, int]]: Documento con los estilos optimizados y el
+            detalle de lo eliminado, con el tamaño del CSS minificado antes y
+            después para que sea comparable. Los bloques optimizados se reescriben
+            con una declaración por línea; los que no cambian, o que así
+            ocuparían más bytes, se conservan con su formato original
+    """
+    stats = {
+        "rules_removed": 0,
+        "selectors_removed": 0,
+        "declarations_removed": 0,
+        "rules_merged": 0,
+        "css_bytes_before": 0,
+        "css_bytes_after": 0
+    }
+    bloques = list(_STYLE_BLOCK.finditer(html))
+    if not bloques:
+        with _stats_lock:
+            _stats["pages"] += 1
+        return html, stats
+    
+    usados = _collect_used_names(html, bloques)
+    partes = []
+    anterior = 0
+    for bloque in bloques:
+        original = bloque.group(2)
+        bytes_originales = len(minify_css(original).encode("utf-8"))
+        cambios = defaultdict(int)
+        nodos = _optimize_level(_parse_css(original), usados, cambios)
+        
+        # Un bloque sin nada que quitar, o cuyo CSS reescrito (una declaración por
+        # línea) ocuparía más que el original, se deja tal cual: el ahorro tiene
+        # que verse en la página, no solo en el CSS minificado
+        css = original
+        if any(cambios.values()):
+            sangria = _line_indent(html, bloque.start())
+            unidad = _indent_unit(original, sangria)
+            reescrito = "\n" + "\n".join(_serialize(nodos, sangria + unidad, unidad)) + "\n" + sangria if nodos else ""
+            if len(reescrito.encode("utf-8")) < len(original.encode("utf-8")):
+                css = reescrito
+                for clave, valor in cambios.items():
+                    stats[clave] += valor
+        
+        partes.append(html[anterior:bloque.start()])
+        partes.append(bloque.group(1) + css + bloque.group(3))
+        stats["css_bytes_before"] += bytes_originales
+        stats["css_bytes_after"] += bytes_originales if css == original else len(minify_css(css).encode("utf-8"))
+        anterior = bloque.end()
+    partes.append(html[anterior:])
+    resultado = "".join(partes)
+    
+    with _stats_lock:
+        _stats["pages"] += 1
+        for clave, valor in stats.items():
+            _stats[clave] += valor
+    return resultado, stats
+
+
+def get_css_optimization_stats() -> Dict[str, int]:
+    """
+    Obtiene las estadísticas acumuladas de optimización de CSS.
+    
+    Returns:
+        Dict[str, int]: Páginas procesadas, reglas, selectores y declaraciones
+            eliminadas, reglas unidas y bytes de CSS minificado antes/después
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["css_bytes_saved"] = stats["css_bytes_before"] - stats["css_bytes_after"]
+    return stats
+
+
+def select_matching_css(css: str, html: str) -> str:
+    """
+    Reduce una hoja de estilos a las reglas que pueden aplicarse a un fragmento de HTML.
+    
+    Usa el mismo análisis conservador que `optimize_page_css`; sirve para armar
+    el CSS crítico de la parte de la página visible al cargar.
+    
+    Args:
+        css (str): Hoja de estilos
+        html (str): Fragmento de HTML (sin bloques `<style>`)
+        
+    Returns:
+        str: Reglas que pueden coincidir con el fragmento, minificadas
+    """
+    usados = _collect_used_names(html, [])
+    nodos = _optimize_level(_parse_css(css), usados, defaultdict(int))
+    return minify_css("\n".join(_serialize(nodos, "", "")))
+
+
+def _collect_used_names(html: str, bloques: List[re.Match]) -> Dict[str, Set[str]]:
+    """
+    Reúne las etiquetas, clases e ids del documento fuera de los `<style>`.
+    
+    Returns:
+        Dict[str, Set[str]]: 'tags', 'classes', 'ids' y 'words' (palabras de
+            scripts y otros atributos, que cuentan como cualquiera de los tres)
+    """
+    partes = []
+    anterior = 0
+    for bloque in bloques:
+        partes.append(html[anterior:bloque.start()])
+        anterior = bloque.end()
+    partes.append(html[anterior:])
+    documento = "".join(partes)
+    
+    tags: Set[str] = set(_IMPLICIT_TAGS)
+    classes: Set[str] = set()
+    ids: Set[str] = set()
+    words: Set[str] = set()
+    
+    for script in _SCRIPT_BLOCK.finditer(documento):
+        words.update(_WORD.findall(script.group(1)))
+    
+    for tag in _TAG.finditer(documento):
+        tags.add(tag.group(1).lower())
+        for nombre, valor in _ATTRIBUTE.findall(tag.group(2)):
+            valor = valor.strip("\"'")
+            nombre = nombre.lower()
+            if nombre == "class":
+                classes.update(valor.split())
+            elif nombre == "id":
+                ids.add(valor.strip())
+            else:
+                words.update(_WORD.findall(valor))
+    
+    return {"tags": tags, "classes": classes, "ids": ids, "words": words}
+
+
+def _parse_css(css: str) -> List[Union[str, Block]]:
+    """
+    Convierte una hoja de estilos en una lista de sentencias y bloques anidados,
+    sin comentarios.
+    """
+    raiz: List[Union[str, Block]] = []
+    pila: List[List[Union[str, Block]]] = [raiz]
+    actual: List[str] = []
+    
+    for token in _CSS_TOKEN.findall(css):
+        if token.startswith("/*"):
+            continue
+        if token == "{":
+            hijos: List[Union[str, Block]] = []
+            pila[-1].append((_collapse("".join(actual)), hijos))
+            pila.append(hijos)
+            actual = []
+        elif token == ";" or token == "}":
+            texto = _collapse("".join(actual))
+            if texto:
+                pila[-1].append(texto)
+            actual = []
+            if token == "}" and len(pila) > 1:
+                pila.pop()
+        else:
+            actual.append(token)
+    
+    texto = _collapse("".join(actual))
+    if texto:
+        pila[-1].append(texto)
+    return raiz
+
+
+def _optimize_level(
+    nodos: List[Union[str, Block]],
+    usados: Dict[str, Set[str]],
+    stats: Dict[str, int]
+) -> List[Union[str, Block]]:
+    """Poda, deduplica y une las reglas de un nivel de la hoja de estilos."""
+    podados: List[Union[str, Block]] = []
+    for nodo in nodos:
+        if isinstance(nodo, str):
+            podados.append(nodo)
+            continue
+        prelude, contenido = nodo
+        
+        if prelude.startswith("@"):
+            if prelude.lower().startswith(_GROUPING_AT_RULES):
+                contenido = _optimize_level(contenido, usados, stats)
+                if not contenido:
+                    continue
+            podados.append((prelude, contenido))
+            continue
+        
+        selectores = _split_selector_list(prelude)
+        vivos = [s for s in selectores if _selector_may_match(s, usados)]
+        if not vivos:
+            stats["rules_removed"] += 1
+            continue
+        stats["selectors_removed"] += len(selectores) - len(vivos)
+        
+        if all(isinstance(item, str) for item in contenido):
+            contenido = _dedupe_declarations(contenido, stats)
+        podados.append((", ".join(vivos), contenido))
+    
+    # Una regla idéntica a otra posterior del mismo nivel no aporta nada
+    ultima_aparicion = {}
+    for indice, nodo in enumerate(podados):
+        if _is_plain_rule(nodo):
+            ultima_aparicion[(nodo[0], tuple(nodo[1]))] = indice
+    sin_repetidas = []
+    for indice, nodo in enumerate(podados):
+        if _is_plain_rule(nodo) and ultima_aparicion[(nodo[0], tuple(nodo[1]))] != indice:
+            stats["rules_removed"] += 1
+            continue
+        sin_repetidas.append(nodo)
+    
+    resultado: List[Union[str, Block]] = []
+    for nodo in sin_repetidas:
+        previo = resultado[-1] if resultado else None
+        if previo is not None and _is_plain_rule(previo) and _is_plain_rule(nodo):
+            if previo[0] == nodo[0]:
+                resultado[-1] = (previo[0], _dedupe_declarations(previo[1] + nodo[1], stats))
+                stats["rules_merged"] += 1
+                continue
+            if previo[1] == nodo[1] and not _has_vendor_pseudo(previo[0]) and not _has_vendor_pseudo(nodo[0]):
+                resultado[-1] = (previo[0] + ", " + nodo[0], previo[1])
+                stats["rules_merged"] += 1
+                continue
+        resultado.append(nodo)
+    return resultado
+
+
+def _dedupe_declarations(declaraciones: List[str], stats: Dict[str, int]) -> List[str]:
+    """
+    Quita las declaraciones repetidas conservando la última aparición, que es la
+    que gana en la cascada. Las declaraciones distintas de una misma propiedad
+    (fallbacks) se conservan.
+    """
+    normalizadas = [_normalize_declaration(d) for d in declaraciones]
+    vistas: Set[str] = set()
+    resultado: List[str] = []
+    for declaracion in reversed(normalizadas):
+        if declaracion in vistas:
+            stats["declarations_removed"] += 1
+            continue
+        vistas.add(declaracion)
+        resultado.append(declaracion)
+    resultado.reverse()
+    return resultado
+
+
+def _selector_may_match(selector: str, usados: Dict[str, Set[str]]) -> bool:
+    """Indica si un selector puede coincidir con algún elemento del documento."""
+    if "\\" in selector or _SELECTOR_ARGUMENT.search(selector):
+        return True
+    simple = _PSEUDO.sub("", _ATTRIBUTE_SELECTOR.sub("", selector))
+    palabras = usados["words"]
+    for compuesto in _COMBINATOR.split(simple.strip()):
+        for prefijo, nombre in _COMPOUND_PART.findall(compuesto):
+            if nombre == "*":
+                continue
+            if prefijo == ".":
+                if nombre not in usados["classes"] and nombre not in palabras:
+                    return False
+            elif prefijo == "#":
+                if nombre not in usados["ids"] and nombre not in palabras:
+                    return False
+            elif nombre.lower() not in usados["tags"] and nombre not in palabras:
+                return False
+    return True
+
+
+def _split_selector_list(prelude: str) -> List[str]:
+    """Divide una lista de selectores por las comas que no están entre paréntesis o corchetes."""
+    selectores = []
+    profundidad = 0
+    inicio = 0
+    for indice, caracter in enumerate(prelude):
+        if caracter in "([":
+            profundidad += 1
+        elif caracter in ")]":
+            profundidad -= 1
+        elif caracter == "," and profundidad == 0:
+            selectores.append(prelude[inicio:indice].strip())
+            inicio = indice + 1
+    selectores.append(prelude[inicio:].strip())
+    return [s for s in selectores if s]
+
+
+def _serialize(nodos: List[Union[str, Block]], sangria: str, unidad: str) -> List[str]:
+    lineas = []
+    for nodo in nodos:
+        if isinstance(nodo, str):
+            lineas.append(sangria + nodo + ";")
+            continue
+        prelude, contenido = nodo
+        lineas.append(sangria + prelude + " {")
+        lineas.extend(_serialize(contenido, sangria + unidad, unidad))
+        lineas.append(sangria + "}")
+    return lineas
+
+
+def _normalize_declaration(declaracion: str) -> str:
+    propiedad, separador, valor = declaracion.partition(":")
+    if not separador:
+        return declaracion
+    return propiedad.strip() + ": " + valor.strip()
+
+
+def _is_plain_rule(nodo: Union[str, Block]) -> bool:
+    return (
+        not isinstance(nodo, str)
+        and not nodo[0].startswith("@")
+        and all(isinstance(item, str) for item in nodo[1])
+    )
+
+
+def _has_vendor_pseudo(selector: str) -> bool:
+    # Un selector desconocido invalida toda la lista: no se mezcla con otros
+    return ":-" in selector
+
+
+def _collapse(texto: str) -> str:
+    """Colapsa los espacios fuera de las cadenas."""
+    partes = re.split(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')", texto)
+    for indice in range(0, len(partes), 2):
+        partes[indice] = re.sub(r"\s+", " ", partes[indice])
+    return "".join(partes).strip()
+
+
+def _indent_unit(css: str, sangria: str) -> str:
+    """Deduce la indentación por nivel del CSS original (4 espacios si no se puede)."""
+    for linea in css.splitlines():
+        if linea.strip():
+            propia = linea[:len(linea) - len(linea.lstrip())]
+            if propia.startswith(sangria) and len(propia) > len(sangria):
+                return propia[len(sangria):]
+            break
+    return "    "
+
+
+def _line_indent(html: str, posicion: int) -> str:
+    inicio = html.rfind("\n", 0, posicion) + 1
+    linea = html[inicio:posicion]
+    return linea[:len(linea) - len(linea.lstrip())]
@@ -0,0 +1,122 @@
+"""
+Plazos de extremo a extremo para las peticiones.
+
+Cada petición recibe un plazo absoluto (por defecto según el endpoint, o el que
+pida el cliente con el header `X-Request-Timeout`) que se comparte entre todas
+sus etapas: validación, espera en cola, llamadas a OpenAI (incluidos reintentos
+y continuaciones) y post-procesamiento. Cada etapa usa el tiempo restante y se
+detiene antes de empezar si el plazo ya se agotó.
+"""
+
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+# Plazo por defecto (en segundos) de cada tipo de petición
+DEFAULT_DEADLINES = {
+    "generate": 120.0,
+    "modify": 90.0,
+    "translate": 120.0,
+    "batch": 900.0,
+    "job": 900.0,
+}
+
+# Plazo máximo (en segundos) que un cliente puede pedir
+MAX_DEADLINE_SECONDS = 1800.0
+
+# Plazo mínimo (en segundos) que un cliente puede pedir
+MIN_DEADLINE_SECONDS = 1.0
+
+
+class DeadlineExceeded(HTTPException):
+    """
+    El plazo de la petición se agotó antes de terminar una etapa.
+    """
+    
+    def __init__(self, etapa: str):
+        super().__init__(
+            status_code=504,
+            detail=f"Tiempo límite de la petición agotado durante: {etapa}"
+        )
+
+
+class Deadline:
+    """
+    Instante límite absoluto de una petición.
+    
+    Usa el reloj de pared para poder persistirse junto a los trabajos encolados.
+    """
+    
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+    
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        """
+        Crea un plazo que vence dentro de `seconds` segundos.
+        
+        Args:
+            seconds (float): Duración del plazo
+            
+        Returns:
+            Deadline: Plazo nuevo
+        """
+        return cls(time.time() + seconds)
+    
+    def remaining(self) -> float:
+        """
+        Returns:
+            float: Segundos restantes (0 si ya venció)
+        """
+        return max(0.0, self.expires_at - time.time())
+    
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+    
+    def check(self, etapa: str) -> None:
+        """
+        Verifica que quede tiempo antes de empezar una etapa.
+        
+        Args:
+            etapa (str): Nombre de la etapa, para el mensaje de error
+            
+        Raises:
+            DeadlineExceeded: Si el plazo ya venció
+        """
+        if self.expired:
+            raise DeadlineExceeded(etapa)
+
+
+def resolve_deadline(header_value: Optional[str], endpoint: str) -> Deadline:
+    """
+    Construye el plazo de una petición a partir del header `X-Request-Timeout`.
+    
+    Args:
+        header_value (Optional[str]): Segundos pedidos por el cliente, o None
+        endpoint (str): Tipo de petición, clave de DEFAULT_DEADLINES
+        
+    Returns:
+        Deadline: Plazo de la petición, acotado a MAX_DEADLINE_SECONDS
+        
+    Raises:
+        HTTPException: 400 si el header no es un número válido
+    """
+    if header_value is None:
+        return Deadline.after(DEFAULT_DEADLINES[endpoint])
+    
+    try:
+        seconds = float(header_value)
+    except ValueError:
+        seconds = float("nan")
+    if not MIN_DEADLINE_SECONDS <= seconds <= MAX_DEADLINE_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                "Error de validación en X-Request-Timeout: debe ser un número de segundos "
+                f"entre {MIN_DEADLINE_SECONDS:g} y {MAX_DEADLINE_SECONDS:g}"
+            )
+        )
+    return Deadline.after(seconds)
@@ -0,0 +1,400 @@
+"""
+Extracción de design tokens del CSS de una landing page.
+
+Las páginas generadas repiten los mismos colores, fuentes y espaciados decenas
+de veces. `extract_design_tokens` busca los valores literales repetidos en los
+bloques `<style>` y en los atributos `style`, los declara una vez como
+propiedades personalizadas en `:root` y reemplaza cada aparición por
+`var(--nombre)`. Así un cambio de paleta o tipografía se aplica reescribiendo
+unas pocas variables (`apply_design_tokens`) en lugar de regenerar la página.
+"""
+
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+
+# Apariciones mínimas para convertir un valor en token, por tipo (las fuentes se
+# tokenizan siempre, para que la tipografía se pueda cambiar sin el modelo)
+MIN_REPETICIONES = {"color": 2, "font": 1, "space": 3}
+
+# Máximo de tokens nuevos por tipo (los más repetidos)
+MAX_TOKENS_POR_TIPO = 12
+
+# Propiedades cuyas longitudes se consideran espaciado
+_SPACE_PROPERTY = re.compile(r"^(?:padding|margin)(?:-[a-z]+)?$|^(?:row-|column-)?gap$")
+
+_STYLE_BLOCK = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.DOTALL | re.IGNORECASE)
+_STYLE_ATTR = re.compile(r"""(\sstyle\s*=\s*)(["'])(.*?)\2""", re.DOTALL | re.IGNORECASE)
+_ROOT_BLOCK = re.compile(r":root\s*\{([^{}]*)\}")
+# Sentencias que deben ir antes de cualquier regla: un @import después de una
+# regla se ignora (y con él, por ejemplo, las fuentes web de la página)
+_LEADING_STATEMENT = re.compile(
+    r"""(?:\s|/\*.*?\*/)*@(?:charset|import|layer|namespace)\b(?:"[^"]*"|'[^']*'|url\([^()]*\)|[^;{"'])*;""",
+    re.DOTALL | re.IGNORECASE
+)
+# Los valores pueden tener textos entre comillas y `url(...)` con `;`, `{` o `}` adentro
+_DECLARATION = re.compile(
+    r"""(?<![-\w])(-?-?[a-zA-Z][-a-zA-Z0-9]*)\s*:\s*"""
+    r"""((?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|\((?:"[^"]*"|'[^']*'|\([^()]*\)|[^()"'])*\)|[^;{}"'()])+?)"""
+    r"""\s*(?=;|\}|$)"""
+)
+# Textos entre comillas y contenido de `url(...)`: no son valores de diseño
+_PROTEGIDO = re.compile(
+    r""""(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|(?<![-\w])url\((?:"[^"]*"|'[^']*'|[^()"'])*\)""",
+    re.IGNORECASE
+)
+_COLOR = re.compile(r"#[0-9a-fA-F]{3,8}\b|\b(?:rgba?|hsla?)\([^()]*\)|(?<![-\w])(?:white|black)(?![-\w])")
+_LENGTH = re.compile(r"(?<![\w.#-])\d*\.?\d+(?:px|rem|em)\b")
+_IMPORTANT = re.compile(r"\s*!important\s*$", re.IGNORECASE)
+_VAR = re.compile(r"var\(\s*(--[-\w]+)\s*(?:,[^()]*)?\)")
+
+# Valores que heredan o reinician la propiedad en lugar de fijarla
+_PALABRAS_GLOBALES = ("inherit", "initial", "unset", "revert")
+
+# Prefijo del nombre de los tokens nuevos de cada tipo
+_PREFIJOS = {"color": "--color", "font": "--font", "space": "--space"}
+
+
+def extract_design_tokens(html_code: str) -> str:
+    """
+    Convierte los valores literales repetidos del CSS en propiedades personalizadas.
+    
+    Los valores que ya están declarados en un `:root` existente reutilizan esa
+    variable. Los tokens nuevos se declaran en un bloque `:root` al principio del
+    primer `<style>`; si la página no tiene `<style>`, se devuelve sin cambios.
+    
+    Args:
+        html_code (str): Página HTML completa
+        
+    Returns:
+        str: Página con los valores repetidos reemplazados por `var(--nombre)`
+    """
+    primer_style = _STYLE_BLOCK.search(html_code)
+    if primer_style is None:
+        return html_code
+    
+    existentes = read_design_tokens(html_code)
+    por_valor = {_normalize(_kind_of_value(valor), valor): nombre for nombre, valor in existentes.items()}
+    
+    # Contar las apariciones de cada valor, en orden de primera aparición
+    apariciones: Counter = Counter()
+    originales: Dict[Tuple[str, str], str] = {}
+    
+    def contar(propiedad: str, valor: str) -> str:
+        for tipo, literal in _literals(propiedad, valor):
+            clave = (tipo, _normalize(tipo, literal))
+            apariciones[clave] += 1
+            originales.setdefault(clave, literal)
+        return valor
+    
+    _rewrite_declarations(html_code, contar)
+    
+    # Asignar un nombre a cada valor repetido que no tenga ya una variable
+    tokens: Dict[Tuple[str, str], str] = {}
+    nuevos: List[Tuple[str, str]] = []
+    usados = set(existentes)
+    for tipo in _PREFIJOS:
+        candidatos = [
+            clave for clave, cantidad in apariciones.items()
+            if clave[0] == tipo and cantidad >= MIN_REPETICIONES[tipo]
+        ]
+        candidatos.sort(key=lambda clave: -apariciones[clave])
+        indice = 0
+        for clave in candidatos:
+            if clave[1] in por_valor:
+                tokens[clave] = por_valor[clave[1]]
+                continue
+            if sum(1 for nombre, _ in nuevos if nombre.startswith(_PREFIJOS[tipo])) >= MAX_TOKENS_POR_TIPO:
+                break
+            indice += 1
+            while f"{_PREFIJOS[tipo]}-{indice}" in usados:
+                indice += 1
+            nombre = f"{_PREFIJOS[tipo]}-{indice}"
+            usados.add(nombre)
+            tokens[clave] = nombre
+            nuevos.append((nombre, re.sub(r"\s+", " ", originales[clave]).strip()))
+    
+    if not tokens:
+        return html_code
+    
+    def reemplazar(propiedad: str, valor: str) -> str:
+        if propiedad == "font-family":
+            clave = ("font", _normalize("font", valor))
+            return f"var({tokens[clave]})" if clave in tokens else valor
+        
+        def reemplazar_literal(match: re.Match) -> str:
+            tipo = "color" if match.re is _COLOR else "space"
+            clave = (tipo, _normalize(tipo, match.group(0)))
+            return f"var({tokens[clave]})" if clave in tokens else match.group(0)
+        
+        def reemplazar_tramo(tramo: str) -> str:
+            tramo = _COLOR.sub(reemplazar_literal, tramo)
+            if _SPACE_PROPERTY.match(propiedad):
+                tramo = _LENGTH.sub(reemplazar_literal, tramo)
+            return tramo
+        
+        return _outside_protected(valor, reemplazar_tramo)
+    
+    resultado = _rewrite_declarations(html_code, reemplazar)
+    if not nuevos:
+        return resultado
+    return _insert_root_block(resultado, nuevos)
+
+
+def read_design_tokens(html_code: str) -> Dict[str, str]:
+    """
+    Lee las propiedades personalizadas declaradas en los bloques `:root` de la página.
+    
+    Args:
+        html_code (str): Página HTML completa
+        
+    Returns:
+        Dict[str, str]: Nombre de cada variable (con `--`) y su valor, en orden de declaración
+    """
+    tokens: Dict[str, str] = {}
+    for bloque in _STYLE_BLOCK.finditer(html_code):
+        for root in _ROOT_BLOCK.finditer(bloque.group(2)):
+            for declaracion in _DECLARATION.finditer(root.group(1)):
+                if declaracion.group(1).startswith("--"):
+                    tokens[declaracion.group(1)] = declaracion.group(2).strip()
+    return tokens
+
+
+def apply_design_tokens(html_code: str, cambios: Dict[str, str]) -> str:
+    """
+    Reescribe el valor de las variables indicadas en los bloques `:root`.
+    
+    Args:
+        html_code (str): Página HTML completa
+        cambios (Dict[str, str]): Valor nuevo para cada variable (con `--`)
+        
+    Returns:
+        str: Página con las variables actualizadas; el resto queda idéntico
+        
+    Raises:
+        ValueError: Si una variable no está declarada en la página o un valor
+            contiene caracteres que cerrarían la regla CSS
+    """
+    existentes = read_design_tokens(html_code)
+    for nombre, valor in cambios.items():
+        if nombre not in existentes:
+            raise ValueError(f"La variable {nombre} no está declarada en :root")
+        if not valor.strip() or re.search(r"[;{}<>]", valor):
+            raise ValueError(f"Valor inválido para {nombre}: {valor!r}")
+    
+    def reemplazar_root(root: re.Match) -> str:
+        def reemplazar_declaracion(declaracion: re.Match) -> str:
+            nombre = declaracion.group(1)
+            if nombre not in cambios:
+                return declaracion.group(0)
+            inicio = declaracion.start(2) - declaracion.start(0)
+            fin = declaracion.end(2) - declaracion.start(0)
+            texto = declaracion.group(0)
+            return texto[:inicio] + cambios[nombre].strip() + texto[fin:]
+        
+        return _DECLARATION.sub(reemplazar_declaracion, root.group(0))
+    
+    return _STYLE_BLOCK.sub(
+        lambda bloque: bloque.group(1) + _ROOT_BLOCK.sub(reemplazar_root, bloque.group(2)) + bloque.group(3),
+        html_code
+    )
+
+
+def inline_design_tokens(html_code: str) -> str:
+    """
+    Reemplaza cada `var(--nombre)` por el valor declarado en `:root`.
+    
+    Sirve para obtener fragmentos autocontenidos de una página que usa tokens.
+    Las variables que no están declaradas en la página se conservan.
+    
+    Args:
+        html_code (str): Página HTML completa
+        
+    Returns:
+        str: Página con los valores literales en lugar de las variables
+    """
+    tokens = read_design_tokens(html_code)
+    if not tokens:
+        return html_code
+    
+    def reemplazar(match: re.Match) -> str:
+        return tokens.get(match.group(1), match.group(0))
+    
+    def reemplazar_declaraciones(propiedad: str, valor: str) -> str:
+        # Resolver también las variables que referencian a otras
+        for _ in range(3):
+            nuevo = _VAR.sub(reemplazar, valor)
+            if nuevo == valor:
+                break
+            valor = nuevo
+        return valor
+    
+    return _rewrite_declarations(html_code, reemplazar_declaraciones)
+
+
+def _rewrite_declarations(html_code: str, funcion: Callable[[str, str], str]) -> str:
+    """
+    Aplica `funcion(propiedad, valor)` a cada declaración CSS de la página.
+    
+    Recorre los bloques `<style>` y los atributos `style`, salteando las
+    declaraciones de los bloques `:root` y las propiedades personalizadas.
+    
+    Args:
+        html_code (str): Página HTML completa
+        funcion (Callable[[str, str], str]): Devuelve el valor nuevo de la declaración
+        
+    Returns:
+        str: Página con las declaraciones reescritas
+    """
+    def reescribir_css(css: str) -> str:
+        roots = [(m.start(), m.end()) for m in _ROOT_BLOCK.finditer(css)]
+        
+        def reescribir(declaracion: re.Match) -> str:
+            propiedad = declaracion.group(1).lower()
+            if propiedad.startswith("--") or any(a <= declaracion.start() < b for a, b in roots):
+                return declaracion.group(0)
+            valor = declaracion.group(2)
+            importante = _IMPORTANT.search(valor)
+            base = valor[:importante.start()] if importante else valor
+            nuevo = funcion(propiedad, base)
+            if nuevo == base:
+                return declaracion.group(0)
+            texto = declaracion.group(0)
+            inicio = declaracion.start(2) - declaracion.start(0)
+            return texto[:inicio] + nuevo + (importante.group(0) if importante else "") + texto[inicio + len(valor):]
+        
+        return _DECLARATION.sub(reescribir, css)
+    
+    html_code = _STYLE_BLOCK.sub(
+        lambda bloque: bloque.group(1) + reescribir_css(bloque.group(2)) + bloque.group(3),
+        html_code
+    )
+    return _STYLE_ATTR.sub(
+        lambda attr: attr.group(1) + attr.group(2) + reescribir_css(attr.group(3)) + attr.group(2),
+        html_code
+    )
+
+
+def _literals(propiedad: str, valor: str) -> List[Tuple[str, str]]:
+    """
+    Obtiene los valores literales tokenizables de una declaración.
+    
+    Args:
+        propiedad (str): Propiedad CSS, en minúsculas
+        valor (str): Valor de la declaración, sin `!important`
+        
+    Returns:
+        List[Tuple[str, str]]: (tipo, literal) con tipo 'color', 'font' o 'space'
+    """
+    if propiedad == "font-family":
+        if "var(" in valor or valor.strip().lower() in _PALABRAS_GLOBALES:
+            return []
+        return [("font", valor)]
+    
+    valor = _PROTEGIDO.sub(" ", valor)
+    literales = [("color", c) for c in _COLOR.findall(valor) if _is_color(c)]
+    if _SPACE_PROPERTY.match(propiedad):
+        literales += [("space", l) for l in _LENGTH.findall(valor) if float(re.sub(r"[a-z]+$", "", l)) != 0]
+    return literales
+
+
+def _outside_protected(valor: str, funcion: Callable[[str], str]) -> str:
+    """
+    Aplica `funcion` a los tramos de un valor CSS fuera de comillas y de `url(...)`.
+    
+    Args:
+        valor (str): Valor de una declaración
+        funcion (Callable[[str], str]): Reescribe un tramo sin textos ni URLs
+        
+    Returns:
+        str: Valor con los tramos reescritos y los textos y URLs intactos
+    """
+    partes = []
+    posicion = 0
+    for protegido in _PROTEGIDO.finditer(valor):
+        partes.append(funcion(valor[posicion:protegido.start()]))
+        partes.append(protegido.group(0))
+        posicion = protegido.end()
+    partes.append(funcion(valor[posicion:]))
+    return "".join(partes)
+
+
+def _is_color(literal: str) -> bool:
+    return not literal.startswith("#") or len(literal) in (4, 5, 7, 9)
+
+
+def _kind_of_value(valor: str) -> str:
+    """
+    Adivina el tipo de un valor declarado en `:root`, para poder reutilizar la variable.
+    
+    Args:
+        valor (str): Valor de la variable
+        
+    Returns:
+        str: 'color', 'space' o 'font'
+    """
+    valor = valor.strip()
+    if _COLOR.fullmatch(valor) and _is_color(valor):
+        return "color"
+    if _LENGTH.fullmatch(valor):
+        return "space"
+    return "font"
+
+
+def _normalize(tipo: str, literal: str) -> str:
+    """
+    Normaliza un literal para que las variantes de escritura cuenten como el mismo valor.
+    
+    Args:
+        tipo (str): 'color', 'font' o 'space'
+        literal (str): Valor tal como aparece en el CSS
+        
+    Returns:
+        str: Forma canónica del valor
+    """
+    literal = literal.strip().lower()
+    if tipo == "color":
+        if re.fullmatch(r"#[0-9a-f]{3,4}", literal):
+            literal = "#" + "".join(c * 2 for c in literal[1:])
+        return re.sub(r"\s+", "", literal)
+    if tipo == "font":
+        return re.sub(r"\s*,\s*", ",", literal.replace("'", '"'))
+    return literal
+
+
+def _insert_root_block(html_code: str, tokens: List[Tuple[str, str]]) -> str:
+    """
+    Declara los tokens nuevos en un bloque `:root` al principio del primer `<style>`,
+    después de los `@charset`, `@import`, `@layer` y `@namespace` iniciales.
+    
+    Args:
+        html_code (str): Página HTML completa
+        tokens (List[Tuple[str, str]]): (nombre, valor) de cada token nuevo
+        
+    Returns:
+        str: Página con el bloque `:root` agregado, con la indentación de sus reglas
+    """
+    bloque = _STYLE_BLOCK.search(html_code)
+    contenido = bloque.group(2)
+    sangria_match = re.match(r"\s*?\n([ \t]*)\S", contenido)
+    sangria = sangria_match.group(1) if sangria_match else ""
+    nivel = "    " if sangria or "\n" in contenido else ""
+    salto = "\n" if sangria or "\n" in contenido else ""
+    
+    lineas = [f"{sangria}:root {{"]
+    lineas += [f"{sangria}{nivel}{nombre}: {valor};" for nombre, valor in tokens]
+    lineas.append(f"{sangria}}}")
+    root = salto.join(lineas) if salto else "".join(lineas)
+    
+    posicion = bloque.start(2)
+    inicial = posicion
+    while True:
+        sentencia = _LEADING_STATEMENT.match(html_code, posicion, bloque.end(2))
+        if sentencia is None:
+            break
+        posicion = sentencia.end()
+    if posicion > inicial:
+        return html_code[:posicion] + salto + root + html_code[posicion:]
+    return html_code[:posicion] + salto + root + salto + html_code[posicion:]
+
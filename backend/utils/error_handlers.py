@@ -9,6 +9,24 @@ from fastapi import HTTPException
 from typing import Dict, Any
 
 
+def classify_openai_error(error_message: str) -> str:
+    """
+    Clasifica un error de OpenAI según su mensaje.
+    
+    Args:
+        error_message (str): Mensaje de error original
+        
+    Returns:
+        str: 'insufficient_quota', 'invalid_api_key', 'rate_limit',
+            'model_not_found' u 'other'
+    """
+    error_lower = error_message.lower()
+    for categoria in ("insufficient_quota", "invalid_api_key", "rate_limit", "model_not_found"):
+        if categoria in error_lower:
+            return categoria
+    return "other"
+
+
 def handle_openai_error(error_message: str) -> HTTPException:
     """
     Maneja errores específicos de OpenAI y retorna HTTPException apropiada.
@@ -19,24 +37,24 @@ def handle_openai_error(error_message: str) -> HTTPException:
     Returns:
         HTTPException: Excepción HTTP con código y mensaje apropiados
     """
-    error_lower = error_message.lower()
+    categoria = classify_openai_error(error_message)
     
-    if "insufficient_quota" in error_lower:
+    if categoria == "insufficient_quota":
         return HTTPException(
             status_code=500,
             detail="Error: Has excedido tu cuota de OpenAI. Verifica tu plan y detalles de facturación."
         )
-    elif "invalid_api_key" in error_lower:
+    elif categoria == "invalid_api_key":
         return HTTPException(
             status_code=500,
             detail="Error: API key de OpenAI inválida. Verifica tu configuración."
         )
-    elif "rate_limit" in error_lower:
+    elif categoria == "rate_limit":
         return HTTPException(
             status_code=429,
             detail="Error: Límite de velocidad excedido. Intenta nuevamente en unos momentos."
         )
-    elif "model_not_found" in error_lower:
+    elif categoria == "model_not_found":
         return HTTPException(
             status_code=500,
             detail="Error: Modelo no encontrado. Verifica que el modelo esté disponible."
@@ -0,0 +1,144 @@
+"""
+Utilidades para calcular y aplicar diffs compactos entre versiones de una página HTML.
+
+El diff trabaja sobre unidades estructurales: el documento se corta después de
+cada cierre de etiqueta ('>') y de cada salto de línea, de modo que funciona
+igual de bien con HTML indentado que con HTML minificado en pocas líneas.
+Cada diff lleva el checksum SHA-256 de la versión base y de la resultante para
+que el cliente pueda verificar que lo aplica sobre el mismo HTML.
+"""
+
+import hashlib
+import json
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List
+
+
+# Identificador del formato de diff, para poder versionarlo en el cliente
+PATCH_FORMAT = "html-units-v1"
+
+# Patrón que corta el documento en unidades: hasta '>' o '\n' inclusive, o el resto final
+_UNIT_PATTERN = re.compile(r"[^\n>]*(?:>|\n)|[^\n>]+$")
+
+
+def split_html_units(html: str) -> List[str]:
+    """
+    Divide un documento HTML en unidades estructurales.
+    
+    Args:
+        html (str): Documento HTML
+        
+    Returns:
+        List[str]: Unidades cuya concatenación reproduce exactamente el documento
+    """
+    return _UNIT_PATTERN.findall(html)
+
+
+def html_checksum(html: str) -> str:
+    """
+    Calcula el checksum de un documento HTML.
+    
+    Args:
+        html (str): Documento HTML
+        
+    Returns:
+        str: SHA-256 en hexadecimal del documento codificado en UTF-8
+    """
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def compute_html_patch(base_html: str, new_html: str) -> Dict[str, Any]:
+    """
+    Calcula un diff compacto que transforma `base_html` en `new_html`.
+    
+    Las operaciones son tripletas [inicio, fin, texto]: las unidades de la base en
+    el rango [inicio, fin) se reemplazan por `texto`. Los índices se refieren
+    siempre a la base original, y las operaciones vienen ordenadas.
+    
+    Args:
+        base_html (str): HTML que ya tiene el cliente
+        new_html (str): HTML resultante de la modificación
+        
+    Returns:
+        Dict[str, Any]: Diff con claves 'format', 'baseChecksum', 'resultChecksum' y 'ops'
+    """
+    base_units = split_html_units(base_html)
+    new_units = split_html_units(new_html)
+    
+    # Recortar el prefijo y el sufijo comunes: las modificaciones suelen ser locales
+    # y así SequenceMatcher solo compara la zona que realmente cambió
+    prefix = 0
+    limit = min(len(base_units), len(new_units))
+    while prefix < limit and base_units[prefix] == new_units[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and base_units[len(base_units) - 1 - suffix] == new_units[len(new_units) - 1 - suffix]):
+        suffix += 1
+    
+    base_middle = base_units[prefix:len(base_units) - suffix]
+    new_middle = new_units[prefix:len(new_units) - suffix]
+    
+    matcher = SequenceMatcher(None, base_middle, new_middle)
+    ops = [
+        [prefix + i1, prefix + i2, "".join(new_middle[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+    
+    return {
+        "format": PATCH_FORMAT,
+        "baseChecksum": html_checksum(base_html),
+        "resultChecksum": html_checksum(new_html),
+        "ops": ops
+    }
+
+
+def apply_html_patch(base_html: str, patch: Dict[str, Any]) -> str:
+    """
+    Aplica un diff generado por `compute_html_patch`.
+    
+    Args:
+        base_html (str): HTML base sobre el que se calculó el diff
+        patch (Dict[str, Any]): Diff a aplicar
+        
+    Returns:
+        str: HTML resultante
+        
+    Raises:
+        ValueError: Si el formato no es soportado o algún checksum no coincide
+    """
+    if patch.get("format") != PATCH_FORMAT:
+        raise ValueError(f"Formato de diff no soportado: {patch.get('format')}")
+    
+    if html_checksum(base_html) != patch["baseChecksum"]:
+        raise ValueError("El HTML base no coincide con el checksum del diff")
+    
+    units = split_html_units(base_html)
+    parts = []
+    cursor = 0
+    for start, end, text in patch["ops"]:
+        parts.extend(units[cursor:start])
+        parts.append(text)
+        cursor = end
+    parts.extend(units[cursor:])
+    
+    result = "".join(parts)
+    if html_checksum(result) != patch["resultChecksum"]:
+        raise ValueError("El HTML resultante no coincide con el checksum del diff")
+    
+    return result
+
+
+def patch_size(patch: Dict[str, Any]) -> int:
+    """
+    Calcula el tamaño en bytes del diff serializado como JSON.
+    
+    Args:
+        patch (Dict[str, Any]): Diff a medir
+        
+    Returns:
+        int: Tamaño en bytes del JSON compacto en UTF-8
+    """
+    return len(json.dumps(patch, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
@@ -0,0 +1,424 @@
+"""
+Normalización reversible de HTML y CSS para reducir tokens en los prompts.
+
+`minify_html` elimina comentarios, indentación y espacios redundantes (también
+dentro de `<style>`) sin cambiar la semántica del documento: el contenido de
+`<pre>`, `<textarea>` y `<script>` se conserva tal cual, y los espacios entre
+elementos en línea se reducen a uno en lugar de eliminarse. `pretty_print_html`
+hace el camino inverso, reindentando un documento para que sea legible, y
+`preserve_formatting` vuelve a aplicar el formato de la página original sobre
+la respuesta minificada del modelo, de modo que solo cambian las partes que el
+modelo modificó.
+"""
+
+import re
+import threading
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+from utils.token_count import estimate_tokens
+
+
+# Elementos de bloque: los espacios entre ellos no se renderizan y se pueden quitar.
+# `svg`, `video`, `audio`, `canvas`, `iframe` e `img` son elementos en línea: el
+# espacio a su alrededor se ve, así que no van aquí
+BLOCK_TAGS = frozenset("""
+    html head body title meta link style script base noscript template
+    header footer main nav section article aside address div p ul ol li dl dt dd
+    h1 h2 h3 h4 h5 h6 hr form fieldset legend table thead tbody tfoot tr th td caption
+    figure figcaption blockquote details summary dialog
+""".split())
+
+# Elementos cuyo contenido no se toca
+RAW_TAGS = ("script", "pre", "textarea")
+
+# Elementos vacíos (sin etiqueta de cierre)
+VOID_TAGS = frozenset("area base br col embed hr img input link meta source track wbr".split())
+
+_TOKEN_PATTERN = re.compile(
+    r"(?P<comment><!--.*?-->)"
+    r"|(?P<raw><(?P<rawtag>script|pre|textarea|style)\b[^>]*>.*?</(?P=rawtag)\s*>)"
+    r"|(?P<tag></?[a-zA-Z!][^>]*>)"
+    r"|(?P<text>[^<]+|<)",
+    re.DOTALL | re.IGNORECASE
+)
+_TAG_NAME_PATTERN = re.compile(r"</?\s*([a-zA-Z0-9!-]+)")
+# Valores de atributo entre comillas: sus espacios son parte del valor
+_ATTRIBUTE_VALUE_PATTERN = re.compile(r"(\"[^\"]*\"|'[^']*')")
+# Cadenas y `url(...)` del CSS: su contenido no se toca al minificar
+_CSS_PROTECTED_PATTERN = re.compile(
+    r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'"
+    r"|(?<![-\w])url\((?:\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|[^()\"'])*\))",
+    re.IGNORECASE
+)
+# Átomos del CSS para cortarlo en reglas y declaraciones: comentarios, cadenas y
+# paréntesis (con `;` o llaves adentro, como en `url(data:...;base64,...)`) son indivisibles
+_CSS_ATOM_PATTERN = re.compile(
+    r"/\*.*?(?:\*/|$)|\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'"
+    r"|\((?:\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|\([^()]*\)|[^()\"'])*\)"
+    r"|[{};]|[^{};\"'/(]+|[/(\"']",
+    re.DOTALL
+)
+_LEADING_SPACE_PATTERN = re.compile(r"(?:\s|/\*.*?\*/)*", re.DOTALL)
+
+# Estadísticas acumuladas de tokens ahorrados
+_stats_lock = threading.Lock()
+_stats = {"documents": 0, "tokens_before": 0, "tokens_after": 0}
+
+
+def minify_css(css: str) -> str:
+    """
+    Minifica CSS preservando cadenas y la semántica de selectores y valores.
+    
+    Args:
+        css (str): Código CSS
+        
+    Returns:
+        str: CSS sin comentarios ni espacios redundantes
+    """
+    parts = _CSS_PROTECTED_PATTERN.split(css)
+    for i in range(0, len(parts), 2):
+        chunk = re.sub(r"/\*.*?\*/", "", parts[i], flags=re.DOTALL)
+        chunk = re.sub(r"\s+", " ", chunk)
+        # No tocar el espacio antes de ':' (separa selectores descendientes de pseudo-clases)
+        chunk = re.sub(r"\s*([{};,>])\s*", r"\1", chunk)
+        chunk = re.sub(r":\s+", ":", chunk)
+        chunk = chunk.replace(";}", "}")
+        parts[i] = chunk
+    return "".join(parts).strip()
+
+
+def minify_html(html: str) -> str:
+    """
+    Minifica un documento HTML con CSS embebido.
+    
+    Args:
+        html (str): Documento HTML
+        
+    Returns:
+        str: Documento equivalente sin comentarios ni espacios redundantes
+    """
+    tokens: List[tuple[str, str]] = []
+    for match in _TOKEN_PATTERN.finditer(html):
+        kind = match.lastgroup if match.lastgroup != "rawtag" else "raw"
+        value = match.group(kind)
+        
+        if kind == "comment":
+            # Conservar comentarios condicionales de IE
+            if value.startswith("<!--[if"):
+                tokens.append(("tag", value))
+        elif kind == "raw":
+            if match.group("rawtag").lower() == "style":
+                open_end = value.index(">") + 1
+                close_start = value.lower().rindex("</style")
+                value = value[:open_end] + minify_css(value[open_end:close_start]) + "</style>"
+            tokens.append(("tag", value))
+        elif kind == "tag":
+            tokens.append(("tag", _collapse_tag(value)))
+        elif tokens and tokens[-1][0] == "text":
+            # Unir texto separado por un comentario eliminado
+            tokens[-1] = ("text", tokens[-1][1] + value)
+        else:
+            tokens.append(("text", value))
+    
+    out = []
+    for i, (kind, value) in enumerate(tokens):
+        if kind == "tag":
+            out.append(value)
+            continue
+        
+        collapsed = re.sub(r"\s+", " ", value)
+        prev_tag = tokens[i - 1][1] if i > 0 else ""
+        next_tag = tokens[i + 1][1] if i + 1 < len(tokens) else ""
+        # Junto a un límite de bloque los espacios no se renderizan
+        if not prev_tag or _is_block(prev_tag):
+            collapsed = collapsed.lstrip()
+        if not next_tag or _is_block(next_tag):
+            collapsed = collapsed.rstrip()
+        if collapsed:
+            out.append(collapsed)
+    
+    return "".join(out).strip()
+
+
+def pretty_print_html(html: str, indent: str = "    ") -> str:
+    """
+    Reindenta un documento HTML (minificado o no) para que sea legible.
+    
+    Solo agrega o quita espacios en posiciones donde no se renderizan: entre
+    elementos de bloque y dentro de `<style>`.
+    
+    Args:
+        html (str): Documento HTML
+        indent (str): Indentación por nivel
+        
+    Returns:
+        str: Documento reindentado
+    """
+    lines: List[str] = []
+    inline: List[str] = []
+    depth = 0
+    open_line = None  # Línea de la última etiqueta de bloque abierta, si aún no tiene hijos de bloque
+    
+    def flush():
+        text = "".join(inline).strip()
+        if text:
+            lines.append(indent * depth + text)
+        inline.clear()
+    
+    for match in _TOKEN_PATTERN.finditer(minify_html(html)):
+        kind = match.lastgroup if match.lastgroup != "rawtag" else "raw"
+        value = match.group(kind)
+        
+        if kind == "raw" and match.group("rawtag").lower() == "style":
+            flush()
+            open_line = None
+            open_end = value.index(">") + 1
+            lines.append(indent * depth + value[:open_end])
+            lines.extend(_pretty_css(value[open_end:value.lower().rindex("</style")], indent, depth + 1))
+            lines.append(indent * depth + "</style>")
+        elif kind == "raw" and _is_block(value):
+            # <script> y <pre> van en su propia línea, con el contenido intacto
+            flush()
+            open_line = None
+            lines.append(indent * depth + value)
+        elif kind in ("raw", "comment") or kind == "text" or not _is_block(value):
+            inline.append(value)
+        elif value.startswith("</"):
+            if open_line is not None:
+                # Elemento con contenido solo en línea: mantenerlo en una única línea
+                lines[open_line] += "".join(inline).strip() + value
+                inline.clear()
+                depth = max(0, depth - 1)
+            else:
+                flush()
+                depth = max(0, depth - 1)
+                lines.append(indent * depth + value)
+            open_line = None
+        else:
+            flush()
+            lines.append(indent * depth + value)
+            open_line = None
+            name = _tag_name(value)
+            if name not in VOID_TAGS and not value.endswith("/>") and not value.startswith("<!"):
+                depth += 1
+                open_line = len(lines) - 1
+    flush()
+    
+    return "\n".join(lines)
+
+
+def preserve_formatting(original: str, modified: str) -> str:
+    """
+    Aplica los cambios de `modified` sobre `original` conservando el formato de `original`.
+    
+    El modelo recibe la página minificada y responde con HTML minificado. Ambos
+    documentos se comparan por unidades normalizadas (etiquetas, textos y cada
+    regla o declaración de `<style>`, sin diferencias de espacios ni comentarios):
+    las unidades iguales se toman del original, con su indentación y saltos de
+    línea, y las que cambiaron se toman de la respuesta con la indentación de la
+    unidad que reemplazan. Así el resultado solo difiere del original en lo que
+    el modelo modificó, y un diff contra la página del cliente queda chico. Si
+    cambió más de la mitad del documento, se reindenta completo con `pretty_print_html`.
+    
+    Args:
+        original (str): Página que envió el cliente
+        modified (str): Página devuelta por el modelo
+        
+    Returns:
+        str: Página modificada con el formato del original
+    """
+    base, final_base = _format_units(original)
+    nuevo, _ = _format_units(modified)
+    
+    # Recortar el prefijo y el sufijo comunes antes de alinear la zona que cambió
+    limite = min(len(base), len(nuevo))
+    prefijo = 0
+    while prefijo < limite and base[prefijo][0] == nuevo[prefijo][0]:
+        prefijo += 1
+    sufijo = 0
+    while sufijo < limite - prefijo and base[-1 - sufijo][0] == nuevo[-1 - sufijo][0]:
+        sufijo += 1
+    
+    matcher = SequenceMatcher(
+        None,
+        [clave for clave, _, _ in base[prefijo:len(base) - sufijo]],
+        [clave for clave, _, _ in nuevo[prefijo:len(nuevo) - sufijo]]
+    )
+    opcodes = matcher.get_opcodes()
+    iguales = prefijo + sufijo + sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == "equal")
+    if not base or iguales * 2 < len(base):
+        return pretty_print_html(modified)
+    
+    partes = ["".join(sangria + texto for _, sangria, texto in base[:prefijo])]
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            partes.extend(sangria + texto for _, sangria, texto in base[prefijo + i1:prefijo + i2])
+        elif tag != "delete":
+            reemplazadas = nuevo[prefijo + j1:prefijo + j2]
+            sangria = base[prefijo + i1][1] if prefijo + i1 < len(base) else final_base
+            partes.append(sangria + reemplazadas[0][2])
+            partes.extend(sangria_nueva + texto for _, sangria_nueva, texto in reemplazadas[1:])
+    partes.extend(sangria + texto for _, sangria, texto in base[len(base) - sufijo:])
+    partes.append(final_base)
+    return "".join(partes)
+
+
+def _format_units(html: str) -> Tuple[List[Tuple[str, str, str]], str]:
+    """
+    Corta un documento en unidades comparables para `preserve_formatting`.
+    
+    Args:
+        html (str): Documento HTML
+        
+    Returns:
+        Tuple[List[Tuple[str, str, str]], str]: (clave normalizada, espacios y
+            comentarios previos, texto) de cada unidad, y los espacios del final
+    """
+    unidades: List[Tuple[str, str, str]] = []
+    pendiente = []  # Espacios y comentarios que preceden a la próxima unidad
+    
+    def agregar(clave: str, texto: str) -> None:
+        sangria = _LEADING_SPACE_PATTERN.match(texto).end() if texto.strip() else len(texto)
+        pendiente.append(texto[:sangria])
+        if clave:
+            unidades.append((clave, "".join(pendiente), texto[sangria:]))
+            pendiente.clear()
+        else:
+            pendiente.append(texto[sangria:])
+    
+    for match in _TOKEN_PATTERN.finditer(html):
+        kind = match.lastgroup if match.lastgroup != "rawtag" else "raw"
+        value = match.group(kind)
+        
+        if kind == "comment":
+            agregar(value if value.startswith("<!--[if") else "", value)
+        elif kind == "raw" and match.group("rawtag").lower() == "style":
+            open_end = value.index(">") + 1
+            close_start = value.lower().rindex("</style")
+            agregar(_collapse_tag(value[:open_end]), value[:open_end])
+            for pieza in _css_pieces(value[open_end:close_start]):
+                agregar(minify_css(pieza).rstrip(";"), pieza)
+            agregar("</style>", value[close_start:])
+        elif kind == "text":
+            agregar(re.sub(r"\s+", " ", value).strip(), value)
+        else:
+            agregar(value if kind == "raw" else _collapse_tag(value), value)
+    
+    return unidades, "".join(pendiente)
+
+
+def _css_pieces(css: str) -> List[str]:
+    """
+    Corta CSS en selectores con su `{`, declaraciones con su `;` y llaves de cierre.
+    
+    Args:
+        css (str): Código CSS
+        
+    Returns:
+        List[str]: Piezas cuya concatenación reproduce exactamente el CSS
+    """
+    piezas = []
+    actual: List[str] = []
+    for atomo in _CSS_ATOM_PATTERN.findall(css):
+        if atomo == "}":
+            if actual:
+                piezas.append("".join(actual))
+            piezas.append(atomo)
+            actual = []
+            continue
+        actual.append(atomo)
+        if atomo in ("{", ";"):
+            piezas.append("".join(actual))
+            actual = []
+    if actual:
+        piezas.append("".join(actual))
+    return piezas
+
+
+def _pretty_css(css: str, indent: str, depth: int) -> List[str]:
+    lines = []
+    level = depth
+    for piece in _css_pieces(css):
+        piece = piece.strip()
+        if not piece or piece == ";":
+            continue
+        if piece == "}":
+            level = max(depth, level - 1)
+            lines.append(indent * level + "}")
+        elif piece.endswith("{"):
+            lines.append(indent * level + piece[:-1].strip() + " {")
+            level += 1
+        else:
+            if not piece.endswith(";"):
+                piece += ";"
+            lines.append(indent * level + piece.replace(":", ": ", 1))
+    return lines
+
+
+def _collapse_tag(tag: str) -> str:
+    """Colapsa los espacios de una etiqueta fuera de los valores de atributo entre comillas."""
+    partes = _ATTRIBUTE_VALUE_PATTERN.split(tag)
+    for indice in range(0, len(partes), 2):
+        partes[indice] = re.sub(r"\s+", " ", partes[indice])
+    return "".join(partes)
+
+
+def _tag_name(tag: str) -> str:
+    match = _TAG_NAME_PATTERN.match(tag)
+    return match.group(1).lower() if match else ""
+
+
+def _is_block(tag: str) -> bool:
+    if tag.startswith("<!"):
+        return True
+    return _tag_name(tag) in BLOCK_TAGS or _tag_name(tag) == "style"
+
+
+def minify_for_prompt(html: str) -> str:
+    """
+    Minifica el HTML que se envía al modelo y registra los tokens ahorrados.
+    
+    Args:
+        html (str): Documento HTML
+        
+    Returns:
+        str: Documento minificado
+    """
+    minified = minify_html(html)
+    before, after = estimate_tokens(html), estimate_tokens(minified)
+    with _stats_lock:
+        _stats["documents"] += 1
+        _stats["tokens_before"] += before
+        _stats["tokens_after"] += after
+    return minified
+
+
+def minify_for_delivery(html: str) -> Tuple[str, Dict[str, int]]:
+    """
+    Minifica el HTML que se entrega al cliente y mide los bytes ahorrados.
+    
+    Args:
+        html (str): Documento HTML
+        
+    Returns:
+        Tuple[str, Dict[str, int]]: Documento minificado y sus bytes antes/después
+    """
+    minified = minify_html(html)
+    return minified, {
+        "bytes_before": len(html.encode("utf-8")),
+        "bytes_after": len(minified.encode("utf-8"))
+    }
+
+
+def get_minification_stats() -> Dict[str, int]:
+    """
+    Obtiene las estadísticas acumuladas de minificación de prompts.
+    
+    Returns:
+        Dict[str, int]: Documentos procesados, tokens antes/después y tokens ahorrados
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    return stats
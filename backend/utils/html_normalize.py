@@ -0,0 +1,160 @@
+"""
+Normalización de la respuesta del modelo en un documento HTML completo.
+
+`normalize_html_document` quita los bloques de código markdown y, si la
+respuesta no es un documento (le falta el doctype o `<html>`), extrae el título
+y los estilos y envuelve el fragmento en el esqueleto básico. Las etiquetas de
+estructura se buscan con patrones compilados que no distinguen mayúsculas, sin
+copiar la página en minúsculas, y el contenido del body se arma en una sola
+pasada arrastrando offsets en lugar de aplicar una cascada de sustituciones que
+copia el documento en cada paso.
+
+Los documentos completos, el caso habitual, se devuelven tras mirar el prefijo
+y encontrar la primera etiqueta `<html`.
+"""
+
+import re
+from typing import List, Tuple
+
+
+# Estilos del esqueleto cuando el fragmento no trae un <style>
+DEFAULT_STYLES = """
+        body {
+            margin: 0;
+            padding: 20px;
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            line-height: 1.6;
+            color: #333;
+        }
+        * {
+            box-sizing: border-box;
+        }
+        """
+
+# Título del esqueleto cuando el fragmento no trae un <title>
+DEFAULT_TITLE = "Landing Page"
+
+_FENCE = "```"
+_FENCE_HTML = "```html"
+
+_HTML_OPEN = re.compile(r"<html", re.IGNORECASE)
+# Etiquetas que no forman parte del contenido del body
+_STRUCTURE_TOKEN = re.compile(
+    r"<(?:(?P<tag>!doctype|/?html|/?body)|(?P<head>head>)|(?P<style>style>))",
+    re.IGNORECASE
+)
+_TITLE = re.compile(r"<title>(.*?)</title>", re.IGNORECASE)
+_STYLE = re.compile(r"<style>(.*?)</style>", re.DOTALL | re.IGNORECASE)
+_HEAD_CLOSE = re.compile(r"</head>", re.IGNORECASE)
+_STYLE_CLOSE = re.compile(r"</style>", re.IGNORECASE)
+
+
+def normalize_html_document(html_code: str) -> str:
+    """
+    Limpia la respuesta del modelo y garantiza una estructura HTML completa.
+    
+    Args:
+        html_code (str): Respuesta cruda del modelo
+        
+    Returns:
+        str: Documento sin bloques markdown; si la respuesta no tenía doctype o
+            `<html>`, el fragmento envuelto en un esqueleto con su título y estilos
+    """
+    codigo = strip_code_fences(html_code)
+    
+    if codigo[:15].lower() == "<!doctype html>" and _HTML_OPEN.search(codigo):
+        return codigo
+    
+    title = DEFAULT_TITLE
+    if "<title>" in codigo:
+        match = _TITLE.search(codigo)
+        if match:
+            title = match.group(1)
+    
+    styles = DEFAULT_STYLES
+    if "<style>" in codigo:
+        match = _STYLE.search(codigo)
+        if match:
+            styles = match.group(1)
+    
+    return "".join([
+        "<!DOCTYPE html>\n<html lang=\"es\">\n<head>\n",
+        "    <meta charset=\"UTF-8\">\n",
+        "    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">\n",
+        "    <title>", title, "</title>\n",
+        "    <style>", styles, "</style>\n",
+        "</head>\n<body>\n    ",
+        _body_content(codigo),
+        "\n</body>\n</html>"
+    ])
+
+
+def strip_code_fences(html_code: str) -> str:
+    """
+    Quita los bloques de código markdown (```html ... ```) y los espacios de los extremos.
+    
+    Si la respuesta empieza con un bloque, se quitan todas las marcas del documento.
+    
+    Args:
+        html_code (str): Respuesta cruda del modelo
+        
+    Returns:
+        str: Respuesta sin marcas de bloque
+    """
+    if not html_code.startswith(_FENCE):
+        return html_code.strip()
+    
+    partes = []
+    anterior = 0
+    posicion = html_code.find(_FENCE)
+    con_lenguaje = html_code.startswith(_FENCE_HTML)
+    while posicion != -1:
+        partes.append(html_code[anterior:posicion])
+        largo = 7 if con_lenguaje and html_code.startswith(_FENCE_HTML, posicion) else 3
+        anterior = posicion + largo
+        posicion = html_code.find(_FENCE, anterior)
+    partes.append(html_code[anterior:])
+    return "".join(partes).strip()
+
+
+def _body_content(codigo: str) -> str:
+    """
+    Arma el contenido del body quitando en una pasada las etiquetas de estructura,
+    el `<head>` y los bloques `<style>`.
+    
+    Args:
+        codigo (str): Fragmento sin bloques markdown
+        
+    Returns:
+        str: Contenido del body sin espacios en los extremos
+    """
+    removidos: List[Tuple[int, int]] = []
+    posicion = 0
+    while True:
+        token = _STRUCTURE_TOKEN.search(codigo, posicion)
+        if token is None:
+            break
+        posicion = token.end()
+        
+        if token.lastgroup == "tag":
+            # doctype, <html>, </html>, <body>, </body>: hasta el primer '>'
+            fin = codigo.find(">", posicion)
+            fin = fin + 1 if fin != -1 else -1
+        elif token.lastgroup == "head":
+            cierre = _HEAD_CLOSE.search(codigo, posicion)
+            fin = cierre.end() if cierre else -1
+        else:
+            cierre = _STYLE_CLOSE.search(codigo, posicion)
+            fin = cierre.end() if cierre else -1
+        
+        if fin != -1:
+            removidos.append((token.start(), fin))
+            posicion = fin
+    
+    partes = []
+    anterior = 0
+    for inicio, fin in removidos:
+        partes.append(codigo[anterior:inicio])
+        anterior = fin
+    partes.append(codigo[anterior:])
+    return "".join(partes).strip()
@@ -0,0 +1,238 @@
+"""
+Soporte de claves de idempotencia (header `Idempotency-Key`) para endpoints costosos.
+
+Cuando un cliente reintenta una petición con la misma clave y el mismo cuerpo,
+el reintento se engancha al trabajo que sigue en curso o recibe el resultado ya
+guardado, en lugar de disparar una nueva generación contra OpenAI. Las claves
+expiran tras un TTL y el almacén tiene un tamaño máximo, que solo descarta
+resultados terminados (nunca trabajos en curso).
+
+Si todos los clientes enganchados a un trabajo se desconectan, el trabajo se
+cancela recién después de un período de gracia, para que un reintento que
+llega tras un timeout del proxy todavía pueda engancharse a él.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from utils.cancellation import CancellationToken, RequestCancelled, cancel_on_disconnect
+from utils.deadline import Deadline
+from utils.lru_cache import LRUCache
+
+
+# Número máximo de claves recordadas simultáneamente
+MAX_IDEMPOTENCY_KEYS = 1000
+
+# Tiempo (en segundos) durante el cual se recuerda una clave
+IDEMPOTENCY_TTL_SECONDS = 60 * 60
+
+# Longitud máxima aceptada para una clave
+MAX_KEY_LENGTH = 255
+
+# Segundos que se espera un reintento antes de cancelar un trabajo sin clientes
+CANCEL_GRACE_SECONDS = 10
+
+
+class _Entry:
+    def __init__(self, fingerprint: str, future: asyncio.Future, deadline: Optional[Deadline]):
+        self.fingerprint = fingerprint
+        self.future = future
+        self.token = CancellationToken(deadline)
+        self.waiters = 0
+        self.cancel_handle: Optional[asyncio.TimerHandle] = None
+
+
+class IdempotencyStore:
+    """
+    Almacén en memoria de resultados por clave de idempotencia.
+    
+    Solo se usa desde el event loop, por lo que no necesita locks.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = MAX_IDEMPOTENCY_KEYS,
+        ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+        cancel_grace_seconds: float = CANCEL_GRACE_SECONDS
+    ):
+        # El TTL corre desde que se inicia el trabajo, y por tamaño solo se
+        # descartan resultados ya terminados: un trabajo en curso sigue
+        # enganchable hasta que termine, aunque el almacén supere su tamaño por un rato
+        self._entries: LRUCache[_Entry] = LRUCache(
+            max_entries,
+            ttl_seconds,
+            refresh_on_get=False,
+            evictable=lambda entry: entry.future.done()
+        )
+        self._cancel_grace_seconds = cancel_grace_seconds
+        self.hits = 0
+        self.misses = 0
+    
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        factory: Callable[[CancellationToken], Awaitable[Any]],
+        request: Optional[Request] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Ejecuta `factory` una sola vez por clave, o reutiliza su resultado.
+        
+        El trabajo corre en una tarea propia, de modo que sigue en curso aunque
+        el cliente original se desconecte y un reintento pueda engancharse a él.
+        Si el trabajo falla, la clave se libera para que un reintento lo repita.
+        
+        Args:
+            key (str): Clave de idempotencia enviada por el cliente
+            fingerprint (str): Huella de la petición (ruta + cuerpo)
+            factory (Callable[[CancellationToken], Awaitable[Any]]): Corrutina que produce
+                el resultado; recibe el token que se cancela si nadie espera el trabajo
+            request (Optional[Request]): Petición HTTP; si se indica, se vigila su desconexión
+            deadline (Optional[Deadline]): Plazo del trabajo; lo fija la petición que lo inicia
+            
+        Returns:
+            Tuple[Any, bool]: (resultado, True si se reutilizó un trabajo previo)
+            
+        Raises:
+            HTTPException: 422 si la clave ya se usó con un cuerpo distinto
+            RequestCancelled: Si el cliente se desconecta antes de tener el resultado
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=422,
+                    detail="La Idempotency-Key ya se usó con una petición distinta"
+                )
+            self.hits += 1
+            return await self._wait(entry, request), True
+        
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        entry = _Entry(fingerprint, future, deadline)
+        self._entries.put(key, entry)
+        
+        task = asyncio.create_task(factory(entry.token))
+        task.add_done_callback(lambda t: self._complete(key, future, t))
+        return await self._wait(entry, request), False
+    
+    def forget(self, key: str) -> None:
+        """
+        Libera una clave para que su resultado no se reutilice.
+        
+        Args:
+            key (str): Clave de idempotencia
+        """
+        self._entries.pop(key)
+    
+    async def _wait(self, entry: _Entry, request: Optional[Request]) -> Any:
+        """
+        Espera el resultado de un trabajo llevando la cuenta de los clientes enganchados.
+        
+        Cuando el último cliente se desconecta, el token del trabajo se cancela tras
+        el período de gracia, salvo que antes se enganche un reintento.
+        """
+        loop = asyncio.get_running_loop()
+        if entry.cancel_handle is not None:
+            entry.cancel_handle.cancel()
+            entry.cancel_handle = None
+        entry.waiters += 1
+        
+        if request is None:
+            try:
+                return await asyncio.shield(entry.future)
+            finally:
+                self._release(entry, loop)
+        
+        actual = asyncio.current_task()
+        desconectado = False
+        
+        def on_disconnect():
+            nonlocal desconectado
+            desconectado = True
+            actual.cancel()
+        
+        try:
+            async with cancel_on_disconnect(request, on_disconnect):
+                return await asyncio.shield(entry.future)
+        except asyncio.CancelledError:
+            if not desconectado:
+                raise
+            raise RequestCancelled() from None
+        finally:
+            self._release(entry, loop)
+    
+    def _release(self, entry: _Entry, loop: asyncio.AbstractEventLoop) -> None:
+        entry.waiters -= 1
+        if entry.waiters == 0 and not entry.future.done():
+            entry.cancel_handle = loop.call_later(self._cancel_grace_seconds, entry.token.cancel)
+    
+    def _complete(self, key: str, future: asyncio.Future, task: asyncio.Task) -> None:
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+            return
+        
+        # Trabajo fallido o cancelado: no guardarlo como resultado
+        entry = self._entries.get(key)
+        if entry is not None and entry.future is future:
+            self._entries.pop(key)
+
+
+def request_fingerprint(route: str, body: str) -> str:
+    """
+    Calcula la huella de una petición para detectar claves reutilizadas.
+    
+    Args:
+        route (str): Ruta del endpoint
+        body (str): Cuerpo serializado de forma canónica
+        
+    Returns:
+        str: SHA-256 en hexadecimal de la ruta y el cuerpo
+    """
+    return hashlib.sha256(f"{route}\n{body}".encode("utf-8")).hexdigest()
+
+
+def validate_idempotency_key(key: Optional[str]) -> Optional[str]:
+    """
+    Valida el header `Idempotency-Key`.
+    
+    Args:
+        key (Optional[str]): Valor del header
+        
+    Returns:
+        Optional[str]: La clave sin espacios, o None si no se envió
+        
+    Raises:
+        HTTPException: 400 si la clave está vacía o es demasiado larga
+    """
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error de validación en Idempotency-Key: debe tener entre 1 y {MAX_KEY_LENGTH} caracteres"
+        )
+    return key
+
+
+# Instancia global del almacén
+_idempotency_store = IdempotencyStore()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """
+    Función helper para obtener el almacén de idempotencia.
+    
+    Returns:
+        IdempotencyStore: Almacén global
+    """
+    return _idempotency_store
@@ -0,0 +1,162 @@
+"""
+Parseo incremental de JSON recibido en streaming.
+
+Los argumentos de una llamada a herramienta llegan fragmentados mientras el
+modelo los genera. Este módulo decodifica, a medida que llegan los fragmentos,
+el valor de un campo string de primer nivel (por ejemplo `html`), para poder
+informar el progreso sin esperar a que el JSON esté completo.
+"""
+
+from typing import List
+
+
+class JSONStringFieldStream:
+    """
+    Extrae de forma incremental un campo string de primer nivel de un objeto JSON.
+    
+    Sólo interpreta lo necesario para ubicar el campo (strings, anidamiento y
+    claves del objeto raíz); la validación completa queda para `json.loads`
+    sobre el texto final.
+    """
+    
+    def __init__(self, field: str):
+        self.field = field
+        self.done = False
+        self._buffer = ""
+        self._depth = 0
+        self._in_string = False
+        self._string_role = None  # "key", "value" (el campo buscado) u "other"
+        self._key_chars: List[str] = []
+        self._last_key = None
+        self._expecting_key = False
+        self._after_colon = False
+    
+    def feed(self, fragmento: str) -> str:
+        """
+        Procesa un fragmento del JSON.
+        
+        Args:
+            fragmento (str): Texto recibido
+            
+        Returns:
+            str: Texto nuevo decodificado del campo buscado (vacío si no hubo avance)
+        """
+        self._buffer += fragmento
+        salida: List[str] = []
+        i = 0
+        n = len(self._buffer)
+        
+        while i < n:
+            c = self._buffer[i]
+            
+            if self._in_string:
+                if c == '"':
+                    self._close_string()
+                    i += 1
+                elif c == "\\":
+                    decodificado, consumidos = _decode_escape(self._buffer, i)
+                    if consumidos == 0:
+                        # Escape incompleto: esperar al próximo fragmento
+                        break
+                    self._emit(decodificado, salida)
+                    i += consumidos
+                else:
+                    # Avanzar hasta el próximo carácter especial de una vez
+                    fin = i
+                    while fin < n and self._buffer[fin] not in '"\\':
+                        fin += 1
+                    self._emit(self._buffer[i:fin], salida)
+                    i = fin
+                continue
+            
+            if c == '"':
+                self._open_string()
+            elif c in "{[":
+                self._depth += 1
+                self._expecting_key = c == "{" and self._depth == 1
+                self._after_colon = False
+            elif c in "}]":
+                self._depth -= 1
+            elif c == "," and self._depth == 1:
+                self._expecting_key = True
+                self._after_colon = False
+            elif c == ":" and self._depth == 1:
+                self._after_colon = True
+            i += 1
+        
+        self._buffer = self._buffer[i:]
+        return "".join(salida)
+    
+    def _open_string(self) -> None:
+        self._in_string = True
+        if self._depth == 1 and self._expecting_key:
+            self._string_role = "key"
+            self._key_chars = []
+        elif self._depth == 1 and self._after_colon and self._last_key == self.field and not self.done:
+            self._string_role = "value"
+        else:
+            self._string_role = "other"
+    
+    def _close_string(self) -> None:
+        self._in_string = False
+        if self._string_role == "key":
+            self._last_key = "".join(self._key_chars)
+            self._expecting_key = False
+        elif self._string_role == "value":
+            self.done = True
+        self._string_role = None
+        self._after_colon = False
+    
+    def _emit(self, texto: str, salida: List[str]) -> None:
+        if self._string_role == "key":
+            self._key_chars.append(texto)
+        elif self._string_role == "value":
+            salida.append(texto)
+
+
+_ESCAPES_SIMPLES = {
+    '"': '"', "\\": "\\", "/": "/",
+    "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t",
+}
+
+
+def _decode_escape(texto: str, i: int) -> tuple[str, int]:
+    """
+    Decodifica la secuencia de escape que empieza en `texto[i]` (una barra invertida).
+    
+    Args:
+        texto (str): Texto con la secuencia
+        i (int): Posición de la barra invertida
+        
+    Returns:
+        tuple[str, int]: (texto decodificado, caracteres consumidos); 0 consumidos
+            si la secuencia todavía está incompleta
+    """
+    if i + 1 >= len(texto):
+        return "", 0
+    
+    tipo = texto[i + 1]
+    if tipo != "u":
+        # Un escape inválido se conserva tal cual; json.loads lo rechazará al final
+        return _ESCAPES_SIMPLES.get(tipo, tipo), 2
+    
+    if i + 6 > len(texto):
+        return "", 0
+    codigo = int(texto[i + 2:i + 6], 16) if _is_hex(texto[i + 2:i + 6]) else 0xFFFD
+    
+    if 0xD800 <= codigo <= 0xDBFF:
+        # Par sustituto: el carácter completo necesita también el segundo escape
+        if i + 12 > len(texto):
+            if len(texto) - (i + 6) < 2 or texto[i + 6:i + 8] == "\\u":
+                return "", 0
+        elif texto[i + 6:i + 8] == "\\u" and _is_hex(texto[i + 8:i + 12]):
+            bajo = int(texto[i + 8:i + 12], 16)
+            if 0xDC00 <= bajo <= 0xDFFF:
+                return chr(0x10000 + ((codigo - 0xD800) << 10) + (bajo - 0xDC00)), 12
+        return "�", 6
+    
+    return chr(codigo), 6
+
+
+def _is_hex(texto: str) -> bool:
+    return len(texto) == 4 and all(c in "0123456789abcdefABCDEF" for c in texto)
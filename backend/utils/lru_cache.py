@@ -0,0 +1,154 @@
+"""
+Caché LRU en memoria con tamaño acotado y expiración opcional.
+
+Es la base de los almacenes en memoria del backend (sesiones, resúmenes de
+conversación, claves de idempotencia, resultados de modificación y cuerpos
+comprimidos): todos necesitan lo mismo, descartar lo menos usado al superar
+un tamaño máximo y olvidar lo que lleva demasiado tiempo sin usarse.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """
+    Caché LRU segura entre hilos, con tamaño máximo y TTL opcional.
+    
+    Las entradas se mantienen ordenadas de la menos a la más recientemente
+    usada, de modo que tanto la expiración como el descarte por tamaño solo
+    miran el principio del orden.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: Optional[float] = None,
+        refresh_on_get: bool = True,
+        evictable: Optional[Callable[[V], bool]] = None
+    ):
+        """
+        Args:
+            max_entries (int): Número máximo de entradas
+            ttl_seconds (Optional[float]): Segundos tras los cuales una entrada
+                expira, o None para no expirar nunca
+            refresh_on_get (bool): Si leer una entrada la marca como usada (y
+                reinicia su TTL); si es False, el TTL corre desde que se guardó
+            evictable (Optional[Callable[[V], bool]]): Indica si una entrada se
+                puede descartar por tamaño o por expiración; las que no, se
+                conservan aunque la caché supere su máximo o su TTL por un rato
+        """
+        self._entries: "OrderedDict[Hashable, tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._refresh_on_get = refresh_on_get
+        self._evictable = evictable
+    
+    def get(self, key: Hashable) -> Optional[V]:
+        """
+        Obtiene una entrada si existe y no expiró.
+        
+        Args:
+            key (Hashable): Clave de la entrada
+            
+        Returns:
+            Optional[V]: El valor, o None
+        """
+        with self._lock:
+            self._evict_expired()
+            return self._lookup(key)
+    
+    def put(self, key: Hashable, value: V) -> None:
+        """
+        Guarda una entrada como la más reciente, descartando las que sobren.
+        
+        Args:
+            key (Hashable): Clave de la entrada
+            value (V): Valor a guardar
+        """
+        with self._lock:
+            self._evict_expired()
+            self._store(key, value)
+    
+    def get_or_create(self, key: Hashable, factory: Callable[[], V]) -> V:
+        """
+        Obtiene una entrada, creándola con `factory` si no existe o expiró.
+        
+        Args:
+            key (Hashable): Clave de la entrada
+            factory (Callable[[], V]): Crea el valor; se llama con el lock tomado
+            
+        Returns:
+            V: El valor existente o el creado
+        """
+        with self._lock:
+            self._evict_expired()
+            value = self._lookup(key)
+            if value is None:
+                value = factory()
+                self._store(key, value)
+            return value
+    
+    def pop(self, key: Hashable) -> Optional[V]:
+        """
+        Elimina una entrada.
+        
+        Args:
+            key (Hashable): Clave de la entrada
+            
+        Returns:
+            Optional[V]: El valor eliminado, o None si no existía
+        """
+        with self._lock:
+            item = self._entries.pop(key, None)
+            return item[1] if item is not None else None
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+    
+    def _lookup(self, key: Hashable) -> Optional[V]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        if self._refresh_on_get:
+            self._entries[key] = (time.monotonic(), item[1])
+            self._entries.move_to_end(key)
+        return item[1]
+    
+    def _store(self, key: Hashable, value: V) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic(), value)
+        
+        exceso = len(self._entries) - self._max_entries
+        if exceso <= 0:
+            return
+        descartables = list(islice(
+            (clave for clave, (_, valor) in self._entries.items()
+             if self._evictable is None or self._evictable(valor)),
+            exceso
+        ))
+        for clave in descartables:
+            del self._entries[clave]
+    
+    def _evict_expired(self) -> None:
+        if self._ttl_seconds is None:
+            return
+        limite = time.monotonic() - self._ttl_seconds
+        # Las entradas no descartables (p. ej. una petición aún en curso) se
+        # conservan aunque hayan expirado y no cortan el recorrido
+        expiradas = []
+        for clave, (ultimo_uso, valor) in self._entries.items():
+            if ultimo_uso >= limite:
+                break
+            if self._evictable is None or self._evictable(valor):
+                expiradas.append(clave)
+        for clave in expiradas:
+            del self._entries[clave]
@@ -0,0 +1,349 @@
+"""
+Métricas de la aplicación en el formato de texto de Prometheus.
+
+Los contadores, gauges e histogramas se registran sin locks en el camino
+caliente: cada hilo (el event loop y cada hilo del threadpool) acumula en su
+propio shard (`threading.local`) y `render_metrics` suma los shards al momento
+del scrape. Solo la primera métrica que registra un hilo toma un lock, para
+anotar su shard.
+
+Los valores que ya llevan otros módulos (profundidad de la cola de trabajos,
+aciertos de las cachés) no se duplican: se leen al momento del scrape con
+`register_collector`.
+
+`MetricsMiddleware` mide la latencia de cada petición HTTP por ruta (la plantilla
+de la ruta, p. ej. `/p/{ref}`, para que la cardinalidad no dependa de los ids) y
+las peticiones en curso.
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# Límites de los histogramas de latencia, en segundos: las llamadas al modelo tardan de segundos a minutos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Límites del tiempo hasta el primer token
+TTFT_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10, 20)
+
+# Tipo de contenido del formato de texto de Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Muestra exportada por un collector: (labels, valor)
+Sample = Tuple[Dict[str, str], float]
+
+_local = threading.local()
+_shards: List[dict] = []
+_shards_lock = threading.Lock()
+
+
+def _shard() -> dict:
+    try:
+        return _local.shard
+    except AttributeError:
+        shard = _local.shard = {}
+        with _shards_lock:
+            _shards.append(shard)
+        return shard
+
+
+def _snapshots() -> List[dict]:
+    with _shards_lock:
+        shards = list(_shards)
+    # dict.copy no suelta el GIL: cada copia es consistente aunque el hilo dueño siga escribiendo
+    return [shard.copy() for shard in shards]
+
+
+class _Metric:
+    tipo = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+    
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        return (self.name, *map(labels.get, self.labelnames))
+    
+    def _labels(self, key: tuple) -> Dict[str, str]:
+        return {nombre: "" if valor is None else str(valor) for nombre, valor in zip(self.labelnames, key[1:])}
+
+
+class Counter(_Metric):
+    """
+    Contador monótono, con labels opcionales.
+    """
+    
+    tipo = "counter"
+    
+    def inc(self, value: float = 1, **labels: str) -> None:
+        """
+        Suma al contador.
+        
+        Args:
+            value (float): Cantidad a sumar (no negativa)
+            **labels (str): Valor de cada label declarado
+        """
+        shard = _shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + value
+    
+    def samples(self, snapshots: List[dict]) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        totales: Dict[tuple, float] = {}
+        for snapshot in snapshots:
+            for key, valor in snapshot.items():
+                if key[0] == self.name:
+                    totales[key] = totales.get(key, 0) + valor
+        for key, valor in sorted(totales.items()):
+            yield self.name + "_total", self._labels(key), valor
+
+
+class Gauge(Counter):
+    """
+    Valor que sube y baja (p. ej. peticiones en curso), repartido entre hilos.
+    """
+    
+    tipo = "gauge"
+    
+    def dec(self, value: float = 1, **labels: str) -> None:
+        """
+        Resta al gauge.
+        
+        Args:
+            value (float): Cantidad a restar
+            **labels (str): Valor de cada label declarado
+        """
+        self.inc(-value, **labels)
+    
+    def samples(self, snapshots: List[dict]) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for _, labels, valor in super().samples(snapshots):
+            yield self.name, labels, valor
+
+
+class Histogram(_Metric):
+    """
+    Histograma con límites fijos, con labels opcionales.
+    """
+    
+    tipo = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+    
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Registra una observación.
+        
+        Args:
+            value (float): Valor observado
+            **labels (str): Valor de cada label declarado
+        """
+        shard = _shard()
+        key = self._key(labels)
+        # [conteo por intervalo (no acumulado)..., suma, cantidad]
+        celdas = shard.get(key)
+        if celdas is None:
+            celdas = shard[key] = [0] * (len(self.buckets) + 3)
+        celdas[bisect.bisect_left(self.buckets, value)] += 1
+        celdas[-2] += value
+        celdas[-1] += 1
+    
+    def samples(self, snapshots: List[dict]) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        totales: Dict[tuple, List[float]] = {}
+        for snapshot in snapshots:
+            for key, celdas in snapshot.items():
+                if key[0] != self.name:
+                    continue
+                acumuladas = totales.setdefault(key, [0] * len(celdas))
+                for i, valor in enumerate(list(celdas)):
+                    acumuladas[i] += valor
+        
+        for key, celdas in sorted(totales.items()):
+            labels = self._labels(key)
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), celdas):
+                acumulado += conteo
+                yield self.name + "_bucket", {**labels, "le": _format_value(limite)}, acumulado
+            yield self.name + "_sum", labels, celdas[-2]
+            yield self.name + "_count", labels, celdas[-1]
+
+
+_registry: List[_Metric] = []
+_collectors: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+
+def register_collector(name: str, tipo: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> None:
+    """
+    Registra una métrica cuyo valor se lee al momento del scrape.
+    
+    Args:
+        name (str): Nombre de la métrica (con el sufijo `_total` si es un counter)
+        tipo (str): 'counter' o 'gauge'
+        documentation (str): Descripción para `# HELP`
+        collect (Callable[[], Iterable[Sample]]): Devuelve pares (labels, valor)
+    """
+    _collectors.append((name, tipo, documentation, collect))
+
+
+def render_metrics() -> str:
+    """
+    Genera la exposición de todas las métricas en el formato de texto de Prometheus.
+    
+    Returns:
+        str: Texto para la respuesta de `/metrics`
+    """
+    snapshots = _snapshots()
+    lineas = []
+    for metrica in _registry:
+        lineas.append(f"# HELP {metrica.name} {metrica.documentation}")
+        lineas.append(f"# TYPE {metrica.name} {metrica.tipo}")
+        for nombre, labels, valor in metrica.samples(snapshots):
+            lineas.append(_format_sample(nombre, labels, valor))
+    
+    for nombre, tipo, documentacion, collect in _collectors:
+        base = nombre.removesuffix("_total") if tipo == "counter" else nombre
+        lineas.append(f"# HELP {base} {documentacion}")
+        lineas.append(f"# TYPE {base} {tipo}")
+        try:
+            muestras = list(collect())
+        except Exception:
+            # Una fuente caída (p. ej. la base de la cola cerrada) no debe romper el scrape
+            continue
+        for labels, valor in muestras:
+            lineas.append(_format_sample(nombre, labels, valor))
+    return "\n".join(lineas) + "\n"
+
+
+def _format_sample(nombre: str, labels: Dict[str, str], valor: float) -> str:
+    if not labels:
+        return f"{nombre} {_format_value(valor)}"
+    pares = ",".join(f'{clave}="{_escape(valor_label)}"' for clave, valor_label in labels.items())
+    return f"{nombre}{{{pares}}} {_format_value(valor)}"
+
+
+def _format_value(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _escape(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Métricas HTTP
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta, método y estado",
+    ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Peticiones HTTP en curso"
+)
+
+# Métricas de las llamadas al modelo
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds",
+    "Duración de las llamadas a OpenAI, de la petición al último fragmento",
+    ("model", "mode")
+)
+LLM_TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Tiempo hasta el primer fragmento de las llamadas en streaming",
+    ("model",),
+    buckets=TTFT_BUCKETS
+)
+LLM_PROMPT_TOKENS = Counter(
+    "llm_prompt_tokens",
+    "Tokens de prompt enviados; source='usage' si los informó la API, 'estimate' si se estimaron",
+    ("model", "source")
+)
+LLM_COMPLETION_TOKENS = Counter(
+    "llm_completion_tokens",
+    "Tokens de respuesta recibidos; source='usage' si los informó la API, 'estimate' si se estimaron",
+    ("model", "source")
+)
+LLM_RETRIES = Counter(
+    "llm_retries",
+    "Reintentos de peticiones HTTP hacia OpenAI hechos por el cliente",
+    ("model",)
+)
+LLM_ERRORS = Counter(
+    "llm_errors",
+    "Llamadas a OpenAI fallidas, por categoría de handle_openai_error",
+    ("model", "category")
+)
+LLM_CANCELLED = Counter(
+    "llm_cancelled",
+    "Llamadas a OpenAI cortadas por cancelación o plazo vencido",
+    ("model",)
+)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia y las peticiones en curso por ruta.
+    
+    La latencia va hasta el último fragmento del cuerpo de la respuesta, así que
+    en las respuestas en streaming incluye la generación completa.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._rutas: Dict[Callable, str] = {}
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        inicio = time.perf_counter()
+        estado = 500
+        
+        async def send_with_status(message: Message) -> None:
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+            await send(message)
+        
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - inicio,
+                method=scope["method"],
+                route=self._route_template(scope),
+                status=str(estado)
+            )
+    
+    def _route_template(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        ruta = self._rutas.get(endpoint)
+        if ruta is None:
+            plantillas = {
+                getattr(route, "endpoint", None): route.path
+                for route in getattr(scope.get("app"), "routes", [])
+                if hasattr(route, "path")
+            }
+            ruta = self._rutas[endpoint] = plantillas.get(endpoint, "unmatched")
+        return ruta
+
@@ -5,24 +5,96 @@ Este módulo proporciona una instancia configurada del cliente de OpenAI
 y funciones helper para interactuar con la API.
 """
 
+import importlib.util
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import httpx
+import openai
 from openai import OpenAI
+from openai.types import CompletionUsage
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Iterator, List, Optional, Tuple
+
+from utils.cancellation import CancellationToken, RequestCancelled, get_cancellation_stats
+from utils.deadline import DeadlineExceeded
+from utils.error_handlers import classify_openai_error
+from utils.metrics import (
+    LLM_CANCELLED,
+    LLM_COMPLETION_TOKENS,
+    LLM_ERRORS,
+    LLM_PROMPT_TOKENS,
+    LLM_REQUEST_SECONDS,
+    LLM_RETRIES,
+    LLM_TIME_TO_FIRST_TOKEN_SECONDS
+)
+from utils.server_timing import add_stage
+from utils.traffic_recorder import record_llm_usage
 
 # Cargar variables de entorno
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+def _env_number(name: str, default: float) -> float:
+    """
+    Lee una variable de entorno numérica, con valor por defecto.
+    
+    Args:
+        name (str): Nombre de la variable
+        default (float): Valor si la variable no está definida
+        
+    Returns:
+        float: Valor configurado
+    """
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+# Conexiones simultáneas máximas hacia OpenAI (hilos de generación paralela, lotes, workers)
+MAX_CONNECTIONS = int(_env_number("OPENAI_MAX_CONNECTIONS", 32))
+
+# Conexiones ociosas que se mantienen abiertas para reutilizar
+MAX_KEEPALIVE_CONNECTIONS = int(_env_number("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 16))
+
+# Segundos que una conexión ociosa se mantiene abierta
+KEEPALIVE_EXPIRY_SECONDS = _env_number("OPENAI_KEEPALIVE_EXPIRY", 60.0)
+
+# Multiplexar las peticiones sobre HTTP/2 (requiere el paquete `h2`)
+HTTP2_ENABLED = os.getenv("OPENAI_HTTP2", "").lower() in ("1", "true", "yes")
+
+# Conexiones que se abren al arrancar para que el primer usuario no pague DNS + TLS
+WARMUP_CONNECTIONS = int(_env_number("OPENAI_WARMUP_CONNECTIONS", 2))
+
+# Timeout (en segundos) de cada petición de precalentamiento
+WARMUP_TIMEOUT_SECONDS = 5.0
+
+# Intentos HTTP de la llamada en curso de cada hilo: el cliente de OpenAI
+# reintenta dentro del mismo hilo, así que los intentos de más son reintentos
+_intentos = threading.local()
+
+
+def _contar_intento(request: httpx.Request) -> None:
+    _intentos.cantidad = getattr(_intentos, "cantidad", 0) + 1
+
 
 class OpenAIClientManager:
     """
     Gestor del cliente de OpenAI con configuración optimizada.
+    
+    El cliente HTTP mantiene un pool de conexiones keep-alive configurable por
+    variables de entorno y, opcionalmente, usa HTTP/2 para multiplexar las
+    llamadas concurrentes sobre una sola conexión.
     """
     
     def __init__(self):
         self._client: Optional[OpenAI] = None
         self._http_client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        self.http2 = False
     
     def get_client(self) -> OpenAI:
         """
@@ -35,33 +107,94 @@ class OpenAIClientManager:
             ValueError: Si la API key no está configurada
         """
         if self._client is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY no está configurada en el archivo .env")
-            
-            # Crear cliente HTTP personalizado
-            self._http_client = httpx.Client(
-                timeout=60.0,
-                follow_redirects=True
+            # Varios hilos del threadpool pueden pedir el cliente a la vez
+            with self._lock:
+                if self._client is None:
+                    self._create_client()
+        
+        return self._client
+    
+    def _create_client(self) -> None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY no está configurada en el archivo .env")
+        
+        http2 = HTTP2_ENABLED
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("OPENAI_HTTP2 está activado pero falta el paquete 'h2'; se usa HTTP/1.1")
+            http2 = False
+        
+        # Crear cliente HTTP personalizado con pool de conexiones keep-alive
+        self.http2 = http2
+        self._http_client = httpx.Client(
+            timeout=60.0,
+            follow_redirects=True,
+            http2=http2,
+            event_hooks={"request": [_contar_intento]},
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
             )
+        )
+        
+        # Crear cliente de OpenAI
+        self._client = OpenAI(
+            api_key=api_key,
+            http_client=self._http_client,
+            timeout=60.0
+        )
+    
+    def warm_up(self, connections: int = WARMUP_CONNECTIONS) -> int:
+        """
+        Crea el cliente y abre conexiones hacia la API antes de la primera petición.
+        
+        Hace peticiones livianas y concurrentes a `/models` para resolver DNS,
+        completar el handshake TLS y dejar las conexiones en el pool. Con HTTP/2
+        basta una conexión, que se multiplexa.
+        
+        Args:
+            connections (int): Conexiones a abrir
             
-            # Crear cliente de OpenAI
-            self._client = OpenAI(
-                api_key=api_key,
-                http_client=self._http_client,
-                timeout=60.0
-            )
+        Returns:
+            int: Conexiones abiertas con éxito
+        """
+        try:
+            client = self.get_client()
+        except ValueError as e:
+            logger.warning("No se precalienta el cliente de OpenAI: %s", e)
+            return 0
         
-        return self._client
+        if self.http2:
+            connections = 1
+        
+        url = str(client.base_url).rstrip("/") + "/models"
+        headers = {"Authorization": f"Bearer {client.api_key}"}
+        
+        def conectar(_) -> bool:
+            try:
+                # Cualquier respuesta sirve: lo que importa es la conexión abierta
+                self._http_client.get(url, headers=headers, timeout=WARMUP_TIMEOUT_SECONDS)
+                return True
+            except httpx.HTTPError as e:
+                logger.warning("Falló el precalentamiento de la conexión con OpenAI: %s", e)
+                return False
+        
+        connections = max(0, min(connections, MAX_KEEPALIVE_CONNECTIONS))
+        if connections == 0:
+            return 0
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(conectar, range(connections)))
     
     def close(self):
         """
         Cierra las conexiones del cliente.
         """
-        if self._http_client:
-            self._http_client.close()
-            self._http_client = None
-        self._client = None
+        with self._lock:
+            if self._http_client:
+                self._http_client.close()
+                self._http_client = None
+            self._client = None
 
 
 # Instancia global del gestor
@@ -78,6 +211,19 @@ def get_openai_client() -> OpenAI:
     return _client_manager.get_client()
 
 
+def warm_up_openai_client(connections: int = WARMUP_CONNECTIONS) -> int:
+    """
+    Función helper para crear el cliente de OpenAI y abrir conexiones al arrancar.
+    
+    Args:
+        connections (int): Conexiones a abrir
+        
+    Returns:
+        int: Conexiones abiertas con éxito
+    """
+    return _client_manager.warm_up(connections)
+
+
 def close_openai_client():
     """
     Función helper para cerrar el cliente de OpenAI.
@@ -89,7 +235,8 @@ def create_chat_completion(
     messages: list,
     model: str = "gpt-3.5-turbo",
     temperature: float = 0.3,
-    max_tokens: int = 4000
+    max_tokens: int = 4000,
+    cancel_token: Optional[CancellationToken] = None
 ) -> str:
     """
     Crea una completion de chat con parámetros optimizados.
@@ -99,14 +246,27 @@ def create_chat_completion(
         model (str): Modelo a utilizar
         temperature (float): Temperatura para la generación
         max_tokens (int): Máximo número de tokens
-        
+        cancel_token (Optional[CancellationToken]): Si se indica, la completion se pide
+            en streaming para poder cortarla en cuanto se cancele el token
+            
     Returns:
         str: Respuesta generada por el modelo
         
     Raises:
+        RequestCancelled: Si el token se cancela antes de terminar
         Exception: Si hay errores en la API de OpenAI
     """
+    if cancel_token is not None:
+        return "".join(stream_chat_completion(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            cancel_token=cancel_token
+        )).strip()
+    
     client = get_openai_client()
+    inicio = _iniciar_medicion()
     
     try:
         response = client.chat.completions.create(
@@ -115,16 +275,411 @@ def create_chat_completion(
             temperature=temperature,
             max_tokens=max_tokens
         )
+        _registrar_completion(model, "blocking", inicio, response.usage)
         
         return response.choices[0].message.content.strip()
     
     except Exception as e:
         # Re-lanzar la excepción para que sea manejada por el caller
+        _registrar_fallo(model, e, inicio)
         raise e
     
     finally:
         # No cerrar el cliente aquí para reutilización
-        pass
+        _registrar_reintentos(model)
+
+
+def stream_chat_completion(
+    messages: list,
+    model: str = "gpt-3.5-turbo",
+    temperature: float = 0.3,
+    max_tokens: int = 4000,
+    cancel_token: Optional[CancellationToken] = None
+) -> Iterator[str]:
+    """
+    Crea una completion de chat en modo streaming.
+    
+    Args:
+        messages (list): Lista de mensajes para la conversación
+        model (str): Modelo a utilizar
+        temperature (float): Temperatura para la generación
+        max_tokens (int): Máximo número de tokens
+        cancel_token (Optional[CancellationToken]): Token que corta el stream al cancelarse
+        
+    Yields:
+        str: Fragmentos de texto a medida que el modelo los genera
+        
+    Raises:
+        RequestCancelled: Si el token se cancela antes de terminar
+        Exception: Si hay errores en la API de OpenAI
+    """
+    for _, content in _iter_stream_choices(messages, model, temperature, max_tokens, 1, cancel_token):
+        yield content
+
+
+def create_chat_completions(
+    messages: list,
+    n: int,
+    model: str = "gpt-3.5-turbo",
+    temperature: float = 0.3,
+    max_tokens: int = 4000,
+    cancel_token: Optional[CancellationToken] = None
+) -> List[str]:
+    """
+    Crea N completions alternativas para los mismos mensajes en una sola llamada.
+    
+    Usa el parámetro `n` de la API para que los tokens del prompt se envíen
+    y procesen una única vez para todos los candidatos.
+    
+    Args:
+        messages (list): Lista de mensajes para la conversación
+        n (int): Número de candidatos a generar
+        model (str): Modelo a utilizar
+        temperature (float): Temperatura para la generación
+        max_tokens (int): Máximo número de tokens por candidato
+        cancel_token (Optional[CancellationToken]): Si se indica, se usa streaming para
+            poder cortar la llamada en cuanto se cancele el token
+            
+    Returns:
+        List[str]: Respuestas generadas, en el orden devuelto por la API
+        
+    Raises:
+        RequestCancelled: Si el token se cancela antes de terminar
+        Exception: Si hay errores en la API de OpenAI
+    """
+    if cancel_token is not None:
+        partes: List[List[str]] = [[] for _ in range(n)]
+        for index, content in _iter_stream_choices(messages, model, temperature, max_tokens, n, cancel_token):
+            partes[index].append(content)
+        return ["".join(p).strip() for p in partes]
+    
+    client = get_openai_client()
+    inicio = _iniciar_medicion()
+    
+    try:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            n=n
+        )
+    except Exception as e:
+        _registrar_fallo(model, e, inicio)
+        raise
+    finally:
+        _registrar_reintentos(model)
+    _registrar_completion(model, "blocking", inicio, response.usage)
+    
+    choices = sorted(response.choices, key=lambda choice: choice.index)
+    return [(choice.message.content or "").strip() for choice in choices]
+
+
+def stream_tool_call_arguments(
+    messages: list,
+    tool: dict,
+    model: str = "gpt-3.5-turbo",
+    temperature: float = 0.3,
+    max_tokens: int = 4000,
+    cancel_token: Optional[CancellationToken] = None
+) -> Iterator[str]:
+    """
+    Obliga al modelo a llamar a una herramienta y transmite sus argumentos en streaming.
+    
+    Los argumentos llegan como fragmentos de un JSON que cumple el esquema de
+    `parameters` de la herramienta; para decodificarlos a medida que llegan ver
+    `utils.json_stream`.
+    
+    Args:
+        messages (list): Lista de mensajes para la conversación
+        tool (dict): Definición de la herramienta en el formato de `tools` de la API
+        model (str): Modelo a utilizar
+        temperature (float): Temperatura para la generación
+        max_tokens (int): Máximo número de tokens
+        cancel_token (Optional[CancellationToken]): Token que corta el stream al cancelarse
+        
+    Yields:
+        str: Fragmentos del JSON de argumentos
+        
+    Raises:
+        RequestCancelled: Si el token se cancela antes de terminar
+        Exception: Si hay errores en la API de OpenAI
+    """
+    for _, arguments in _iter_stream_choices(messages, model, temperature, max_tokens, 1, cancel_token, tool):
+        yield arguments
+
+
+def _iter_stream_choices(
+    messages: list,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    n: int,
+    cancel_token: Optional[CancellationToken],
+    tool: Optional[dict] = None
+) -> Iterator[Tuple[int, str]]:
+    """
+    Itera los fragmentos de una completion en streaming, con soporte de cancelación.
+    
+    Al cancelarse el token se cierra la respuesta HTTP desde el hilo que cancela,
+    lo que corta la conexión con OpenAI aunque el stream esté esperando datos.
+    Con token, los reintentos no los hace el SDK sino `_abrir_stream`, que los
+    acota al plazo y deja de esperar en cuanto se cancela el token, también
+    durante la conexión y las pausas entre intentos. El plazo se vigila desde
+    antes del primer intento, así que lo comparten la conexión, los reintentos y
+    el stream.
+    Con `tool` se fuerza la llamada a esa herramienta y se itera sobre los
+    fragmentos de sus argumentos en lugar del contenido.
+    
+    Yields:
+        Tuple[int, str]: (índice del candidato, fragmento de texto o de argumentos)
+        
+    Raises:
+        RequestCancelled: Si el token se cancela antes de terminar
+        DeadlineExceeded: Si el plazo del token vence antes de terminar
+    """
+    parametros = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "n": n,
+        "stream": True,
+        # Pedir el uso real en un último fragmento sin candidatos; el SDK fijado
+        # no tiene `stream_options`, así que va en el cuerpo extra
+        "extra_body": {"stream_options": {"include_usage": True}}
+    }
+    if tool is not None:
+        parametros["tools"] = [tool]
+        parametros["tool_choice"] = {"type": "function", "function": {"name": tool["function"]["name"]}}
+    
+    vencimiento = None
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled("llamada a OpenAI")
+        restante = cancel_token.remaining()
+        if restante is not None:
+            # Cancelar al vencer el plazo, ya sea conectando, entre reintentos o
+            # con el modelo generando (con un margen mínimo para que el token ya
+            # se vea vencido al cancelar)
+            vencimiento = threading.Timer(restante + 0.05, cancel_token.cancel)
+            vencimiento.daemon = True
+            vencimiento.start()
+    
+    client = get_openai_client()
+    inicio = _iniciar_medicion()
+    
+    try:
+        if cancel_token is None:
+            try:
+                stream = client.chat.completions.create(**parametros)
+            finally:
+                _registrar_reintentos(model)
+        else:
+            stream = _abrir_stream(client, parametros, cancel_token)
+    except Exception as e:
+        if vencimiento is not None:
+            vencimiento.cancel()
+        error = cancel_token.error("llamada a OpenAI") if cancel_token is not None else None
+        _registrar_fallo(model, error or e, inicio)
+        if error is not None:
+            raise error from None
+        raise
+    
+    unregister = cancel_token.on_cancel(stream.response.close) if cancel_token else (lambda: None)
+    
+    recibidos = 0
+    uso = None
+    try:
+        for chunk in stream:
+            uso = _leer_uso(chunk) or uso
+            for choice in chunk.choices:
+                if tool is not None:
+                    fragmentos = [
+                        tool_call.function.arguments
+                        for tool_call in choice.delta.tool_calls or []
+                        if tool_call.function and tool_call.function.arguments
+                    ]
+                else:
+                    fragmentos = [choice.delta.content] if choice.delta.content else []
+                for fragmento in fragmentos:
+                    if recibidos == 0:
+                        LLM_TIME_TO_FIRST_TOKEN_SECONDS.observe(time.monotonic() - inicio, model=model)
+                    recibidos += 1
+                    yield choice.index, fragmento
+        get_cancellation_stats().record_completed(recibidos // n, time.monotonic() - inicio)
+        # Si el servidor no envió el uso (p. ej. una API compatible que ignora
+        # `stream_options`), estimarlo: cada fragmento es aproximadamente un token
+        _registrar_completion(model, "stream", inicio, uso, _estimar_tokens_prompt(messages), recibidos)
+    
+    except Exception as e:
+        error = cancel_token.error("llamada a OpenAI") if cancel_token is not None else None
+        _registrar_fallo(model, error or e, inicio)
+        if error is not None:
+            get_cancellation_stats().record_cancelled(recibidos // n, max_tokens, time.monotonic() - inicio)
+            raise error from None
+        raise
+    
+    finally:
+        # Liberar la conexión aunque el consumidor abandone el stream
+        if vencimiento is not None:
+            vencimiento.cancel()
+        unregister()
+        stream.response.close()
+
+
+def _abrir_stream(client: OpenAI, parametros: dict, cancel_token: CancellationToken):
+    """
+    Abre un stream de completion con reintentos acotados por el token.
+    
+    Reintenta los mismos errores que el SDK (conexión, timeout, 408, 409, 429 y
+    5xx), hasta `max_retries` del cliente, con cada intento limitado al tiempo
+    restante del plazo. Sin tiempo para otro intento, se propaga el error.
+    
+    Args:
+        client (OpenAI): Cliente configurado
+        parametros (dict): Argumentos de `chat.completions.create`
+        cancel_token (CancellationToken): Token de la petición
+        
+    Returns:
+        Stream: Stream abierto
+        
+    Raises:
+        RequestCancelled: Si el token se cancela antes de abrir el stream
+        DeadlineExceeded: Si el plazo vence antes de abrir el stream
+        Exception: El error del último intento
+    """
+    sin_reintentos = client.with_options(max_retries=0)
+    for intento in range(client.max_retries + 1):
+        restante = cancel_token.remaining()
+        opciones = dict(parametros, timeout=restante) if restante is not None else parametros
+        try:
+            return _crear_cancelable(lambda: sin_reintentos.chat.completions.create(**opciones), cancel_token)
+        except openai.APIError as e:
+            espera = min(0.5 * 2 ** intento, 8.0)
+            restante = cancel_token.remaining()
+            if (
+                intento == client.max_retries
+                or not _es_reintentable(e)
+                or cancel_token.cancelled
+                or (restante is not None and restante <= espera)
+            ):
+                raise
+        
+        LLM_RETRIES.inc(model=parametros["model"])
+        # Pausa entre intentos que se interrumpe al cancelar el token
+        despertar = threading.Event()
+        unregister = cancel_token.on_cancel(despertar.set)
+        despertar.wait(espera)
+        unregister()
+        cancel_token.raise_if_cancelled("llamada a OpenAI")
+
+
+def _crear_cancelable(crear, cancel_token: CancellationToken):
+    """
+    Ejecuta `crear` en un hilo aparte y deja de esperarlo si se cancela el token.
+    
+    Mientras se conecta no hay respuesta que cerrar: si el token se cancela, el
+    intento se abandona y su stream se cierra apenas llega (el hilo termina a
+    más tardar con el timeout del intento).
+    """
+    cancel_token.raise_if_cancelled("llamada a OpenAI")
+    listo = threading.Event()
+    lock = threading.Lock()
+    estado = {}
+    
+    def abrir():
+        try:
+            stream = crear()
+        except Exception as e:
+            with lock:
+                estado["error"] = e
+                listo.set()
+            return
+        with lock:
+            abandonado = estado.get("abandonado", False)
+            if not abandonado:
+                estado["stream"] = stream
+            listo.set()
+        if abandonado:
+            stream.response.close()
+    
+    unregister = cancel_token.on_cancel(listo.set)
+    threading.Thread(target=abrir, name="openai-connect", daemon=True).start()
+    listo.wait()
+    unregister()
+    
+    with lock:
+        if "stream" in estado:
+            return estado["stream"]
+        if "error" in estado:
+            raise estado["error"]
+        estado["abandonado"] = True
+    cancel_token.raise_if_cancelled("llamada a OpenAI")
+
+
+def _es_reintentable(error: Exception) -> bool:
+    if isinstance(error, openai.APIConnectionError):
+        # Incluye APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def _iniciar_medicion() -> float:
+    _intentos.cantidad = 0
+    return time.monotonic()
+
+
+def _registrar_reintentos(model: str) -> None:
+    reintentos = getattr(_intentos, "cantidad", 0) - 1
+    if reintentos > 0:
+        LLM_RETRIES.inc(reintentos, model=model)
+    _intentos.cantidad = 0
+
+
+def _registrar_completion(
+    model: str,
+    modo: str,
+    inicio: float,
+    usage,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0
+) -> None:
+    duracion = time.monotonic() - inicio
+    LLM_REQUEST_SECONDS.observe(duracion, model=model, mode=modo)
+    add_stage("llm", duracion)
+    origen = "estimate"
+    if usage is not None:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        origen = "usage"
+    LLM_PROMPT_TOKENS.inc(prompt_tokens, model=model, source=origen)
+    LLM_COMPLETION_TOKENS.inc(completion_tokens, model=model, source=origen)
+    record_llm_usage(prompt_tokens, completion_tokens, duracion)
+
+
+def _registrar_fallo(model: str, error: Exception, inicio: float) -> None:
+    add_stage("llm", time.monotonic() - inicio)
+    if isinstance(error, (RequestCancelled, DeadlineExceeded)):
+        LLM_CANCELLED.inc(model=model)
+    else:
+        LLM_ERRORS.inc(model=model, category=classify_openai_error(str(error)))
+
+
+def _leer_uso(chunk) -> Optional[CompletionUsage]:
+    # El SDK fijado no declara `usage` en los fragmentos: llega como campo extra sin validar
+    usage = getattr(chunk, "usage", None)
+    if isinstance(usage, dict):
+        try:
+            return CompletionUsage(**usage)
+        except (TypeError, ValueError):
+            return None
+    return usage if isinstance(usage, CompletionUsage) else None
+
+
+def _estimar_tokens_prompt(messages: list) -> int:
+    # Aproximación de ~4 caracteres por token: tokenizar el prompt completo costaría más que medirlo
+    return sum(len(str(message.get("content") or "")) for message in messages) // 4
 
 
 def build_system_message(role_description: str) -> dict:
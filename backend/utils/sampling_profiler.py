@@ -0,0 +1,203 @@
+"""
+Profiler por muestreo para las próximas N peticiones.
+
+Una sesión de perfilado arranca un hilo que, cada `interval_ms`, toma la pila de
+todos los hilos del proceso (`sys._current_frames`) mientras haya alguna de las
+peticiones perfiladas en curso, y cuenta cuántas veces aparece cada pila. El
+resultado se exporta en formato "folded" (`marco;marco;marco cantidad` por
+línea), que leen directamente flamegraph.pl, speedscope o inferno.
+
+Solo se cuentan las pilas que pasan por código de la aplicación: los hilos
+ociosos (el event loop esperando en `select`, los hilos del threadpool sin
+trabajo) no aparecen. Mientras no hay sesión no existe el hilo de muestreo y el
+middleware solo consulta `active`.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+
+# Duración máxima de una sesión, aunque no lleguen las N peticiones
+MAX_PROFILE_SECONDS = 300
+
+# Rutas que no se perfilan: consultar el estado del perfilado no debe consumir la sesión
+EXCLUDED_PREFIXES = ("/api/admin", "/metrics")
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_THREAD_SUFFIX = re.compile(r"[-_\s\d()]+$")
+
+
+class SamplingProfiler:
+    """
+    Sesión de perfilado por muestreo acotada a un número de peticiones.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = False
+        self._sesion = 0
+        self._pendientes = 0
+        self._en_curso = 0
+        self._perfiladas = 0
+        self._intervalo = 0.01
+        self._pilas: Counter = Counter()
+        self._muestras = 0
+        self._inicio: Optional[float] = None
+        self._fin: Optional[float] = None
+    
+    def start(self, requests: int, interval_ms: float) -> Dict:
+        """
+        Arranca una sesión que perfila las próximas `requests` peticiones.
+        
+        Args:
+            requests (int): Peticiones a perfilar
+            interval_ms (float): Milisegundos entre muestras
+            
+        Returns:
+            Dict: Estado de la sesión
+            
+        Raises:
+            HTTPException: 409 si ya hay una sesión activa
+        """
+        with self._lock:
+            if self.active:
+                raise HTTPException(status_code=409, detail="Ya hay una sesión de perfilado en curso")
+            self._pendientes = requests
+            self._en_curso = 0
+            self._perfiladas = 0
+            self._intervalo = interval_ms / 1000
+            self._pilas = Counter()
+            self._muestras = 0
+            self._inicio = time.time()
+            self._fin = None
+            self._sesion += 1
+            self.active = True
+        threading.Thread(target=self._run, args=(self._sesion,), name="sampling-profiler", daemon=True).start()
+        return self.status()
+    
+    def request_started(self, path: str) -> bool:
+        """
+        Anota el inicio de una petición si la sesión todavía acepta peticiones.
+        
+        Args:
+            path (str): Ruta de la petición
+            
+        Returns:
+            bool: Si la petición se perfila (y hay que llamar a `request_finished`)
+        """
+        if path.startswith(EXCLUDED_PREFIXES):
+            return False
+        with self._lock:
+            if not self.active or self._pendientes == 0:
+                return False
+            self._pendientes -= 1
+            self._en_curso += 1
+            return True
+    
+    def request_finished(self) -> None:
+        """
+        Anota el fin de una petición perfilada; la última cierra la sesión.
+        """
+        with self._lock:
+            self._en_curso -= 1
+            self._perfiladas += 1
+            if self._pendientes == 0 and self._en_curso == 0:
+                self._stop()
+    
+    def status(self) -> Dict:
+        """
+        Returns:
+            Dict: Si la sesión está activa, peticiones perfiladas y pendientes,
+                muestras tomadas y pilas distintas
+        """
+        with self._lock:
+            return {
+                "active": self.active,
+                "requests_profiled": self._perfiladas,
+                "requests_pending": self._pendientes + self._en_curso,
+                "samples": self._muestras,
+                "stacks": len(self._pilas),
+                "interval_ms": self._intervalo * 1000,
+                "started_at": self._inicio,
+                "finished_at": self._fin
+            }
+    
+    def folded(self) -> str:
+        """
+        Exporta las pilas de la última sesión en formato folded.
+        
+        Returns:
+            str: Una línea `marco;marco;... cantidad` por pila distinta, de la raíz a la hoja
+        """
+        with self._lock:
+            pilas = sorted(self._pilas.items())
+        return "".join(f"{pila} {cantidad}\n" for pila, cantidad in pilas)
+    
+    def _stop(self) -> None:
+        self.active = False
+        self._fin = time.time()
+    
+    def _run(self, sesion: int) -> None:
+        propio = threading.get_ident()
+        limite = time.monotonic() + MAX_PROFILE_SECONDS
+        # Si la sesión termina y arranca otra antes de que este hilo lo note, la nueva tiene su propio hilo
+        while self.active and self._sesion == sesion:
+            time.sleep(self._intervalo)
+            if time.monotonic() > limite:
+                with self._lock:
+                    self._stop()
+                break
+            if self._en_curso == 0:
+                continue
+            
+            nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            muestra = []
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = _fold_stack(frame)
+                if pila is not None:
+                    muestra.append(_THREAD_SUFFIX.sub("", nombres.get(ident, "thread")) + ";" + pila)
+            with self._lock:
+                self._pilas.update(muestra)
+                self._muestras += 1
+
+
+def _fold_stack(frame) -> Optional[str]:
+    """Convierte una pila en marcos `módulo:función` de la raíz a la hoja, o None si no pasa por la aplicación."""
+    marcos = []
+    propia = False
+    while frame is not None:
+        archivo = frame.f_code.co_filename
+        if archivo.startswith(_BACKEND_DIR) and os.sep + "venv" + os.sep not in archivo:
+            # El script de arranque (`python main.py`) está en la base de todas las pilas del event loop
+            propia = propia or frame.f_globals.get("__name__") != "__main__"
+            modulo = archivo[len(_BACKEND_DIR):-3].replace(os.sep, ".")
+        else:
+            modulo = os.path.splitext(os.path.basename(archivo))[0]
+        marcos.append(f"{modulo}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    if not propia:
+        return None
+    return ";".join(reversed(marcos))
+
+
+# Instancia global del profiler
+_sampling_profiler = SamplingProfiler()
+
+
+def get_sampling_profiler() -> SamplingProfiler:
+    """
+    Función helper para obtener el profiler por muestreo.
+    
+    Returns:
+        SamplingProfiler: Profiler global
+    """
+    return _sampling_profiler
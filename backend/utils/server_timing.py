@@ -0,0 +1,157 @@
+"""
+Desglose por etapas del tiempo de cada petición en el header `Server-Timing`.
+
+`ServerTimingMiddleware` abre un registro de etapas por petición en una
+`ContextVar`, que heredan el threadpool y las tareas que crea la petición. Las
+etapas se miden con `stage` (context manager o decorador) o se agregan ya
+medidas con `add_stage`; si una etapa se repite (p. ej. varias llamadas al
+modelo) sus duraciones se suman. Al enviar los headers de la respuesta se
+agrega, por ejemplo:
+
+    Server-Timing: validation;dur=0.2, prompt;dur=1.4, llm;dur=8123.0, postprocess;dur=14.9, total;dur=8141.2
+
+En las respuestas en streaming los headers salen antes de que termine el
+trabajo, así que solo llevan las etapas previas al primer fragmento. Fuera de
+una petición (scripts, benchmarks) `stage` no mide nada.
+
+El mismo middleware cuenta las peticiones que perfila `utils.sampling_profiler`
+cuando hay una sesión de perfilado activa.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.sampling_profiler import get_sampling_profiler
+
+
+# Agregar el header Server-Timing a las respuestas (SERVER_TIMING=0 lo desactiva)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING", "1").lower() not in ("0", "false", "no")
+
+
+class StageTimings:
+    """
+    Duración acumulada de cada etapa de una petición, en orden de aparición.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # etapa -> [segundos, veces]
+        self._etapas: Dict[str, List[float]] = {}
+    
+    def add(self, nombre: str, segundos: float) -> None:
+        """
+        Suma la duración de una etapa.
+        
+        Args:
+            nombre (str): Nombre de la etapa (un token de HTTP: letras, números y guiones)
+            segundos (float): Duración
+        """
+        # Las etapas de una petición pueden correr en varios hilos del threadpool
+        with self._lock:
+            etapa = self._etapas.setdefault(nombre, [0.0, 0])
+            etapa[0] += segundos
+            etapa[1] += 1
+    
+    def header(self, total: float) -> str:
+        """
+        Arma el valor del header `Server-Timing`.
+        
+        Args:
+            total (float): Segundos desde que llegó la petición
+            
+        Returns:
+            str: Etapas con su duración en milisegundos, y el total
+        """
+        with self._lock:
+            etapas = list(self._etapas.items())
+        partes = []
+        for nombre, (segundos, veces) in etapas:
+            parte = f"{nombre};dur={segundos * 1000:.1f}"
+            if veces > 1:
+                parte += f';desc="{veces}x"'
+            partes.append(parte)
+        partes.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(partes)
+
+
+_registro: ContextVar[Optional[StageTimings]] = ContextVar("server_timing", default=None)
+
+
+@contextmanager
+def stage(nombre: str) -> Iterator[None]:
+    """
+    Mide una etapa de la petición en curso. Sirve también como decorador.
+    
+    Args:
+        nombre (str): Nombre de la etapa
+    """
+    registro = _registro.get()
+    if registro is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro.add(nombre, time.perf_counter() - inicio)
+
+
+def add_stage(nombre: str, segundos: float) -> None:
+    """
+    Agrega una etapa ya medida a la petición en curso.
+    
+    Args:
+        nombre (str): Nombre de la etapa
+        segundos (float): Duración
+    """
+    registro = _registro.get()
+    if registro is not None:
+        registro.add(nombre, segundos)
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que registra las etapas de cada petición y agrega `Server-Timing`.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        profiler = get_sampling_profiler()
+        perfilada = profiler.active and profiler.request_started(scope["path"])
+        if not SERVER_TIMING_ENABLED:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                if perfilada:
+                    profiler.request_finished()
+            return
+        
+        registro = StageTimings()
+        contexto = _registro.set(registro)
+        inicio = time.perf_counter()
+        
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", registro.header(time.perf_counter() - inicio))
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _registro.reset(contexto)
+            if perfilada:
+                profiler.request_finished()
@@ -0,0 +1,98 @@
+"""
+Entrega de archivos estáticos inmutables (páginas publicadas, hojas de estilo).
+
+`static_file_response` elige entre las variantes precomprimidas de un archivo
+según `Accept-Encoding`, responde 304 si el `If-None-Match` del cliente
+coincide con el `ETag` fuerte de esa variante y, si no, entrega el archivo con
+`StaticFileResponse`: el contenido va del disco al socket sin decodificarse ni
+pasar por cadenas de Python. Si el servidor ASGI ofrece la extensión
+`http.response.zerocopysend`, el archivo se entrega con sendfile; si no, en
+bloques de 64 KB.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+from utils.compression import choose_encoding
+
+
+# Caché de un año sin revalidar: el contenido de una URL direccionada por hash no cambia
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Sufijo del ETag de cada variante: cada representación necesita un ETag fuerte propio
+_ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz", None: ""}
+
+
+class StaticFileResponse(FileResponse):
+    """
+    FileResponse que usa la extensión ASGI de envío zero-copy cuando el servidor la ofrece.
+    """
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.send_header_only or "http.response.zerocopysend" not in scope.get("extensions", {}):
+            await super().__call__(scope, receive, send)
+            return
+        
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        with open(self.path, "rb") as archivo:
+            await send({"type": "http.response.zerocopysend", "file": archivo, "more_body": False})
+
+
+def static_file_response(
+    request: Request,
+    variantes: List[Tuple[Optional[str], str]],
+    etag: str,
+    media_type: str,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Construye la respuesta para un archivo estático con variantes precomprimidas.
+    
+    Args:
+        request (Request): Petición HTTP (Accept-Encoding, If-None-Match y método)
+        variantes (List[Tuple[Optional[str], str]]): Pares (codificación, ruta),
+            con la versión sin comprimir bajo la codificación None
+        etag (str): Identificador del contenido (sin comillas)
+        media_type (str): Tipo MIME del archivo sin comprimir
+        cache_control (str): Valor del header Cache-Control
+        headers (Optional[Dict[str, str]]): Headers adicionales
+        
+    Returns:
+        Response: 304 si el cliente ya tiene la variante elegida, o el archivo
+    """
+    rutas = dict(variantes)
+    comprimidas = [encoding for encoding, _ in variantes if encoding is not None]
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), comprimidas)
+    etiqueta = f'"{etag}{_ETAG_SUFFIXES[encoding]}"'
+    
+    comunes = {"ETag": etiqueta, "Cache-Control": cache_control, **(headers or {})}
+    if comprimidas:
+        comunes["Vary"] = "Accept-Encoding"
+    
+    if _etag_matches(request.headers.get("if-none-match"), etiqueta):
+        return Response(status_code=304, headers=comunes)
+    
+    if encoding is not None:
+        comunes["Content-Encoding"] = encoding
+    ruta = rutas[encoding]
+    return StaticFileResponse(
+        ruta,
+        media_type=media_type,
+        headers=comunes,
+        stat_result=os.stat(ruta),
+        method=request.method
+    )
+
+
+def _etag_matches(if_none_match: Optional[str], etiqueta: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    return any(parte.strip().removeprefix("W/") == etiqueta for parte in if_none_match.split(","))
@@ -0,0 +1,96 @@
+"""
+Extracción del CSS embebido de una página a una hoja de estilos externa.
+
+Las páginas de una misma campaña comparten casi todo su CSS. Servido como hoja
+externa con nombre por hash, el navegador lo descarga una sola vez y lo reutiliza
+en todas. `externalize_stylesheet` saca de la página los bloques `<style>`,
+entrega el CSS a quien lo guarda (que devuelve su URL) y deja un `<link>` en el
+lugar del primer bloque.
+
+Con `critical_css`, la página conserva inline las reglas que pueden aplicarse a
+la parte visible al cargar (hasta el final de la primera `<section>`, que en las
+landings generadas es el hero) y la hoja completa se carga sin bloquear el
+primer render.
+
+Los bloques `<style>` con atributos distintos de `type` (por ejemplo `media`) se
+dejan inline.
+"""
+
+import re
+from typing import Callable, Optional, Tuple
+
+from utils.css_optimize import select_matching_css
+from utils.html_minify import minify_css
+
+
+# Si la página no tiene <section>, la parte visible se aproxima con los primeros caracteres del <body>
+CRITICAL_FOLD_CHARS = 8000
+
+_STYLE_BLOCK = re.compile(
+    r"(?P<sangria>[ \t]*)<style(?P<atributos>\s[^>]*)?>(?P<css>.*?)</style\s*>(?P<fin>[ \t]*\n?)",
+    re.DOTALL | re.IGNORECASE
+)
+_ONLY_TYPE = re.compile(r"^\s*(?:type\s*=\s*([\"']?)text/css\1\s*)?$", re.IGNORECASE)
+_BODY_START = re.compile(r"<body\b", re.IGNORECASE)
+_FOLD_END = re.compile(r"</section\s*>", re.IGNORECASE)
+
+
+def externalize_stylesheet(
+    html_code: str,
+    publicar: Callable[[str], str],
+    critical_css: bool = False
+) -> Tuple[str, Optional[str]]:
+    """
+    Reemplaza el CSS embebido de una página por una hoja de estilos externa.
+    
+    Args:
+        html_code (str): Documento HTML con CSS embebido
+        publicar (Callable[[str], str]): Recibe el CSS minificado, lo guarda y
+            devuelve la URL de la hoja de estilos
+        critical_css (bool): Si dejar inline el CSS de la parte visible al cargar
+        
+    Returns:
+        Tuple[str, Optional[str]]: Documento que enlaza la hoja de estilos y el
+            CSS extraído, o el documento sin cambios y None si no había CSS
+    """
+    bloques = [
+        bloque for bloque in _STYLE_BLOCK.finditer(html_code)
+        if _ONLY_TYPE.match(bloque.group("atributos") or "")
+    ]
+    css = minify_css("\n".join(bloque.group("css") for bloque in bloques)) if bloques else ""
+    if not css:
+        return html_code, None
+    
+    partes = []
+    anterior = 0
+    for bloque in bloques:
+        partes.append(html_code[anterior:bloque.start()])
+        anterior = bloque.end()
+    partes.append(html_code[anterior:])
+    sin_estilos = "".join(partes)
+    
+    href = publicar(css)
+    sangria = bloques[0].group("sangria")
+    if critical_css:
+        critico = select_matching_css(css, _above_the_fold(sin_estilos))
+        etiquetas = [
+            f"<style>{critico}</style>" if critico else "",
+            f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">',
+            f'<noscript><link rel="stylesheet" href="{href}"></noscript>'
+        ]
+        enlace = f"\n{sangria}".join(etiqueta for etiqueta in etiquetas if etiqueta)
+    else:
+        enlace = f'<link rel="stylesheet" href="{href}">'
+    
+    # El <link> ocupa el lugar del primer bloque; los demás se quitan con su línea
+    posicion = bloques[0].start()
+    resultado = sin_estilos[:posicion] + sangria + enlace + bloques[0].group("fin") + sin_estilos[posicion:]
+    return resultado, css
+
+
+def _above_the_fold(html_code: str) -> str:
+    """Devuelve el comienzo del <body> hasta el final de la primera <section>."""
+    cuerpo = _BODY_START.search(html_code)
+    inicio = cuerpo.start() if cuerpo else 0
+    fin = _FOLD_END.search(html_code, inicio)
+    return html_code[inicio:fin.end() if fin else inicio + CRITICAL_FOLD_CHARS]
@@ -0,0 +1,39 @@
+"""
+Estimación de tokens para medir el tamaño de prompts y respuestas.
+
+Usa `tiktoken` si está instalado (conteo exacto para los modelos de OpenAI) y,
+si no, la aproximación habitual de ~4 caracteres por token.
+"""
+
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # Dependencia opcional
+    tiktoken = None
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def estimate_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """
+    Estima la cantidad de tokens de un texto.
+    
+    Args:
+        text (str): Texto a medir
+        model (str): Modelo cuyo tokenizador se usa si `tiktoken` está disponible
+        
+    Returns:
+        int: Cantidad de tokens (exacta con tiktoken, aproximada sin él)
+    """
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_get_encoding(model).encode(text))
+    return max(1, len(text) // 4)
@@ -0,0 +1,318 @@
+"""
+Grabación opcional del tráfico de producción para repetirlo en pruebas de rendimiento.
+
+Con la variable de entorno TRAFFIC_RECORD_PATH, `TrafficRecorderMiddleware`
+agrega una línea JSON por cada petición a las rutas de generación, modificación
+y traducción: el cuerpo de la petición sanitizado, el estado, la duración, los
+bytes de la respuesta y las llamadas a OpenAI que hizo (tokens de prompt y de
+respuesta y segundos de espera). `benchmarks/replay_traffic.py` repite ese
+tráfico contra completions simuladas.
+
+La sanitización conserva la forma del tráfico y no su contenido: cada letra de
+los textos pasa a `x` y cada dígito a `0` (la longitud, los espacios y la
+puntuación se mantienen), en el HTML se enmascaran los textos visibles y los
+atributos con texto o URLs conservando las etiquetas, el CSS y los scripts, y
+los ids de conversación se reemplazan por un hash estable. Así se conservan el
+largo de los prompts, el tamaño de las páginas y la profundidad de las
+conversaciones, sin guardar lo que escribieron los usuarios.
+
+Configuración por variables de entorno:
+    TRAFFIC_RECORD_PATH     archivo JSONL donde grabar (sin definir, no se graba)
+    TRAFFIC_RECORD_SAMPLE   fracción de las peticiones a grabar (por defecto 1)
+    TRAFFIC_RECORD_MAX_MB   tamaño a partir del cual se deja de grabar (por defecto 100)
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+RECORD_PATH = os.getenv("TRAFFIC_RECORD_PATH", "")
+RECORD_SAMPLE = float(os.getenv("TRAFFIC_RECORD_SAMPLE", "1"))
+RECORD_MAX_BYTES = int(float(os.getenv("TRAFFIC_RECORD_MAX_MB", "100")) * 1024 * 1024)
+
+# Rutas cuyo tráfico se graba (las que llaman a OpenAI en la misma petición)
+RECORDED_PATHS = frozenset({
+    "/api/generate-landing",
+    "/api/generate-landings",
+    "/api/modify-landing",
+    "/api/translate-landing"
+})
+
+# Campos que se graban tal cual: opciones, no texto de los usuarios
+_PLAIN_FIELDS = frozenset({
+    "mode", "variants", "minify", "concurrency", "responseFormat", "outputMode",
+    "type", "timestamp", "languages", "sourceLanguage"
+})
+
+# Campos que identifican una conversación: se reemplazan por un hash estable
+_ID_FIELDS = frozenset({"conversationId"})
+
+_LETRA = re.compile(r"[^\W\d_]")
+_DIGITO = re.compile(r"\d")
+_HTML_TOKEN = re.compile(r"(<(script|style)\b[^>]*>.*?</\2\s*>)|(<[^>]*>)|([^<]+)", re.IGNORECASE | re.DOTALL)
+_HTML_ATTR = re.compile(
+    r"""(\b(?:alt|title|placeholder|content|value|href|src|srcset|action|aria-label)\s*=\s*)("[^"]*"|'[^']*')""",
+    re.IGNORECASE
+)
+
+
+def mask_text(texto: str) -> str:
+    """
+    Enmascara un texto conservando su forma.
+    
+    Args:
+        texto (str): Texto original
+        
+    Returns:
+        str: El mismo texto con cada letra reemplazada por `x` y cada dígito por `0`
+    """
+    return _DIGITO.sub("0", _LETRA.sub("x", texto))
+
+
+def mask_html(html: str) -> str:
+    """
+    Enmascara los textos visibles y los atributos con texto o URLs de un HTML.
+    
+    Args:
+        html (str): Documento o fragmento HTML
+        
+    Returns:
+        str: HTML con las mismas etiquetas, CSS y scripts, y los textos enmascarados
+    """
+    def enmascarar(match: re.Match) -> str:
+        if match.group(1):
+            # <style> y <script>: forma y peso de la página, sin texto de los usuarios
+            return match.group(1)
+        if match.group(3):
+            return _HTML_ATTR.sub(
+                lambda attr: attr.group(1) + attr.group(2)[0] + mask_text(attr.group(2)[1:-1]) + attr.group(2)[-1],
+                match.group(3)
+            )
+        return mask_text(match.group(4))
+    
+    return _HTML_TOKEN.sub(enmascarar, html)
+
+
+def sanitize_body(valor: Any, campo: Optional[str] = None) -> Any:
+    """
+    Sanitiza recursivamente el cuerpo JSON de una petición.
+    
+    Args:
+        valor (Any): Valor a sanitizar
+        campo (Optional[str]): Nombre del campo que contiene el valor
+        
+    Returns:
+        Any: Valor con la misma estructura y tamaños, sin el texto de los usuarios
+    """
+    if isinstance(valor, dict):
+        return {clave: sanitize_body(v, clave) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [sanitize_body(v, campo) for v in valor]
+    if not isinstance(valor, str) or campo in _PLAIN_FIELDS:
+        return valor
+    if campo in _ID_FIELDS:
+        return hashlib.sha256(valor.encode()).hexdigest()[:16]
+    if "<" in valor and ">" in valor:
+        return mask_html(valor)
+    return mask_text(valor)
+
+
+class _LLMUsage:
+    """Llamadas a OpenAI de una petición grabada; las secciones paralelas suman desde varios hilos."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.seconds = 0.0
+    
+    def add(self, prompt_tokens: int, completion_tokens: int, segundos: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.seconds += segundos
+    
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "seconds": round(self.seconds, 3)
+            }
+
+
+_uso: ContextVar[Optional[_LLMUsage]] = ContextVar("traffic_llm_usage", default=None)
+
+
+def record_llm_usage(prompt_tokens: int, completion_tokens: int, segundos: float) -> None:
+    """
+    Anota una llamada a OpenAI en la petición grabada en curso, si la hay.
+    
+    Args:
+        prompt_tokens (int): Tokens de prompt
+        completion_tokens (int): Tokens de respuesta
+        segundos (float): Duración de la llamada
+    """
+    uso = _uso.get()
+    if uso is not None:
+        uso.add(prompt_tokens, completion_tokens, segundos)
+
+
+class TrafficRecorder:
+    """
+    Archivo JSONL de tráfico grabado.
+    """
+    
+    def __init__(self, path: str = RECORD_PATH, sample: float = RECORD_SAMPLE, max_bytes: int = RECORD_MAX_BYTES):
+        self.path = path
+        self.sample = sample
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes: Optional[int] = None
+        self.recorded = 0
+        self.dropped = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.sample > 0
+    
+    def sampled(self) -> bool:
+        """
+        Returns:
+            bool: Si la próxima petición se graba, según TRAFFIC_RECORD_SAMPLE
+        """
+        return self.sample >= 1 or random.random() < self.sample
+    
+    def record(self, cuerpo: bytes, entrada: Dict) -> None:
+        """
+        Sanitiza el cuerpo de una petición y agrega su línea al archivo.
+        
+        Args:
+            cuerpo (bytes): Cuerpo de la petición, ya descomprimido
+            entrada (Dict): Datos de la petición y de su respuesta
+        """
+        try:
+            entrada["body"] = sanitize_body(json.loads(cuerpo)) if cuerpo else None
+        except ValueError:
+            entrada["body"] = None
+        linea = (json.dumps(entrada, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+        
+        with self._lock:
+            if self._bytes is None:
+                directorio = os.path.dirname(self.path)
+                if directorio:
+                    os.makedirs(directorio, exist_ok=True)
+                self._bytes = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if self._bytes + len(linea) > self.max_bytes:
+                self.dropped += 1
+                return
+            with open(self.path, "ab") as archivo:
+                archivo.write(linea)
+            self._bytes += len(linea)
+            self.recorded += 1
+    
+    def stats(self) -> Dict:
+        """
+        Returns:
+            Dict: Si la grabación está activa, archivo y peticiones grabadas y descartadas por tamaño
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "path": self.path or None,
+                "recorded": self.recorded,
+                "dropped": self.dropped
+            }
+
+
+# Instancia global de la grabación de tráfico
+_traffic_recorder = TrafficRecorder()
+
+
+def get_traffic_recorder() -> TrafficRecorder:
+    """
+    Función helper para obtener la grabación de tráfico.
+    
+    Returns:
+        TrafficRecorder: Grabación global
+    """
+    return _traffic_recorder
+
+
+class TrafficRecorderMiddleware:
+    """
+    Middleware ASGI que graba las peticiones de RECORDED_PATHS con TRAFFIC_RECORD_PATH.
+    
+    Se registra por dentro de la descompresión para grabar los cuerpos ya
+    descomprimidos. La línea se escribe al terminar de enviar la respuesta, en el
+    threadpool, así que la sanitización no suma latencia a la petición grabada.
+    """
+    
+    def __init__(self, app: ASGIApp, recorder: Optional[TrafficRecorder] = None):
+        self.app = app
+        self.recorder = recorder or get_traffic_recorder()
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not self.recorder.enabled
+            or scope["method"] != "POST"
+            or scope["path"] not in RECORDED_PATHS
+            or not self.recorder.sampled()
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        partes = []
+        estado = 500
+        bytes_respuesta = 0
+        
+        async def receive_recording() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                partes.append(message.get("body", b""))
+            return message
+        
+        async def send_recording(message: Message) -> None:
+            nonlocal estado, bytes_respuesta
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_respuesta += len(message.get("body", b""))
+            await send(message)
+        
+        uso = _LLMUsage()
+        contexto = _uso.set(uso)
+        recibida = time.time()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive_recording, send_recording)
+        finally:
+            _uso.reset(contexto)
+        
+        cuerpo = b"".join(partes)
+        entrada = {
+            "ts": round(recibida, 3),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1") or None,
+            "request_bytes": len(cuerpo),
+            "status": estado,
+            "duration_ms": round((time.perf_counter() - inicio) * 1000, 1),
+            "response_bytes": bytes_respuesta,
+            "llm": uso.to_dict()
+        }
+        await run_in_threadpool(self.recorder.record, cuerpo, entrada)
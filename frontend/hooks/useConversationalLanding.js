@@ -1,5 +1,28 @@
-import { useState, useCallback } from "react";
+import { useState, useCallback, useRef, useEffect } from "react";
 import axios from "axios";
+import { applyHtmlPatch } from "../utils/htmlPatch";
+import { postCompressedJson } from "../utils/requestCompression";
+import { LandingSocket } from "../utils/landingSocket";
+
+const MODIFY_URL = "http://localhost:8001/api/modify-landing";
+
+/**
+ * Aplica el diff de una modificación; si no se puede aplicar, descarga la
+ * página ya producida por el servidor en lugar de repetir la modificación.
+ *
+ * @param {string} baseHTML - HTML sobre el que se calculó el diff
+ * @param {Object} patch - Diff devuelto por el backend
+ * @returns {Promise<string>} HTML modificado
+ */
+const applyPatchOrFetch = async (baseHTML, patch) => {
+  try {
+    return await applyHtmlPatch(baseHTML, patch);
+  } catch (patchError) {
+    console.warn("No se pudo aplicar el diff, descargando la página completa:", patchError);
+    const response = await axios.get(`${MODIFY_URL}/results/${patch.resultChecksum}`);
+    return response.data.data.html;
+  }
+};
 
 /**
  * Hook personalizado para manejar la generación y modificación conversacional de landing pages.
@@ -19,6 +42,34 @@ export const useConversationalLanding = () => {
   const [isLoading, setIsLoading] = useState(false); // Estado de carga
   const [error, setError] = useState(null); // Estado de error
   const [isInitialGeneration, setIsInitialGeneration] = useState(true); // Flag para saber si es la primera generación
+  const [streamProgress, setStreamProgress] = useState(0); // Caracteres recibidos del turno en curso (WebSocket)
+  const socketRef = useRef(null); // Sesión WebSocket (si está disponible)
+  const conversationIdRef = useRef(null); // ID de la conversación para el resumen del servidor
+
+  /**
+   * Obtiene una sesión WebSocket abierta, o null si no se puede usar.
+   *
+   * @returns {Promise<LandingSocket|null>}
+   */
+  const getSocket = useCallback(async () => {
+    if (typeof WebSocket === "undefined") return null;
+    if (socketRef.current?.isReady) return socketRef.current;
+
+    try {
+      // Reconectar la sesión existente la retoma (HTML e historial) si el servidor aún la tiene
+      const socket = socketRef.current ?? new LandingSocket();
+      await socket.connect();
+      socketRef.current = socket;
+      return socket;
+    } catch (err) {
+      console.warn("WebSocket no disponible, se usará HTTP:", err);
+      socketRef.current = null;
+      return null;
+    }
+  }, []);
+
+  // Cerrar la sesión WebSocket al desmontar el componente
+  useEffect(() => () => socketRef.current?.close(), []);
 
   /**
    * Genera una landing page inicial basada en un prompt del usuario.
@@ -47,6 +98,7 @@ export const useConversationalLanding = () => {
 
       const generatedHTML = response.data.data.html;
       setCurrentHTML(generatedHTML);
+      conversationIdRef.current = `${Date.now()}-${Math.random().toString(36).slice(2, 10)}`;
 
       // Inicializar el historial de conversación
       setConversationHistory([
@@ -71,6 +123,56 @@ export const useConversationalLanding = () => {
     }
   }, []);
 
+  /**
+   * Aplica una modificación a través de la sesión WebSocket.
+   *
+   * @param {string} modificationRequest - Instrucción de modificación
+   * @returns {Promise<string|null>} HTML modificado, o null si no hay sesión disponible
+   */
+  const modifyOverSocket = useCallback(
+    async (modificationRequest) => {
+      const socket = await getSocket();
+      if (!socket) return null;
+
+      // La sesión solo necesita el HTML completo cuando aún no lo tiene
+      if (socket.syncedHTML !== currentHTML) {
+        socket.sync(currentHTML, conversationHistory.slice(-5));
+      }
+
+      const result = await socket.modify(modificationRequest, setStreamProgress);
+      const modifiedHTML = result.patch
+        ? await applyPatchOrFetch(currentHTML, result.patch)
+        : result.html;
+      socket.syncedHTML = modifiedHTML;
+      return modifiedHTML;
+    },
+    [currentHTML, conversationHistory, getSocket]
+  );
+
+  /**
+   * Aplica una modificación con una petición HTTP a /api/modify-landing.
+   *
+   * @param {string} modificationRequest - Instrucción de modificación
+   * @returns {Promise<string>} HTML modificado
+   */
+  const modifyOverHttp = useCallback(
+    async (modificationRequest) => {
+      // Pedir solo el diff contra el HTML que ya tenemos (el cuerpo viaja con gzip)
+      const response = await postCompressedJson(axios, MODIFY_URL, {
+        currentHTML: currentHTML,
+        modificationRequest: modificationRequest,
+        conversationHistory: conversationHistory.slice(-5), // Enviar solo los últimos 5 intercambios para contexto
+        conversationId: conversationIdRef.current, // El servidor mantiene un resumen de toda la conversación
+        responseFormat: "diff",
+      });
+
+      return response.data.patch
+        ? await applyPatchOrFetch(currentHTML, response.data.patch)
+        : response.data.html;
+    },
+    [currentHTML, conversationHistory]
+  );
+
   /**
    * Modifica la landing page actual basada en una instrucción conversacional.
    *
@@ -98,16 +200,9 @@ export const useConversationalLanding = () => {
           modificationRequest
         );
 
-        const response = await axios.post(
-          "http://localhost:8001/api/modify-landing",
-          {
-            currentHTML: currentHTML,
-            modificationRequest: modificationRequest,
-            conversationHistory: conversationHistory.slice(-5), // Enviar solo los últimos 5 intercambios para contexto
-          }
-        );
-
-        const modifiedHTML = response.data.data.html;
+        const modifiedHTML =
+          (await modifyOverSocket(modificationRequest)) ??
+          (await modifyOverHttp(modificationRequest));
         setCurrentHTML(modifiedHTML);
 
         // Agregar la modificación al historial
@@ -127,13 +222,16 @@ export const useConversationalLanding = () => {
       } catch (err) {
         console.error("Error al modificar landing page:", err);
         setError(
-          err.response?.data?.detail || "Error al modificar la landing page"
+          err.response?.data?.detail ||
+            err.message ||
+            "Error al modificar la landing page"
         );
       } finally {
         setIsLoading(false);
+        setStreamProgress(0);
       }
     },
-    [currentHTML, conversationHistory]
+    [currentHTML, modifyOverSocket, modifyOverHttp]
   );
 
   /**
@@ -171,6 +269,9 @@ export const useConversationalLanding = () => {
     setIsInitialGeneration(true);
     setError(null);
     setIsLoading(false);
+    socketRef.current?.close();
+    socketRef.current = null;
+    conversationIdRef.current = null;
     console.log("Conversación reiniciada");
   }, []);
 
@@ -195,6 +296,7 @@ export const useConversationalLanding = () => {
     isLoading,
     error,
     isInitialGeneration,
+    streamProgress,
 
     // Funciones principales
     generateInitialLanding,
@@ -0,0 +1,70 @@
+/**
+ * Utilidades para aplicar los diffs compactos que devuelve /api/modify-landing
+ * cuando se pide `responseFormat: "diff"`.
+ *
+ * El formato es el mismo que genera `backend/utils/html_diff.py`: el HTML se
+ * divide en unidades (hasta cada ">" o salto de línea) y cada operación
+ * [inicio, fin, texto] reemplaza las unidades [inicio, fin) de la base.
+ */
+
+export const PATCH_FORMAT = "html-units-v1";
+
+const UNIT_PATTERN = /[^\n>]*(?:>|\n)|[^\n>]+$/g;
+
+/**
+ * Divide un documento HTML en unidades estructurales.
+ *
+ * @param {string} html - Documento HTML
+ * @returns {string[]} Unidades cuya concatenación reproduce el documento
+ */
+export const splitHtmlUnits = (html) => html.match(UNIT_PATTERN) || [];
+
+/**
+ * Calcula el SHA-256 en hexadecimal de un texto codificado en UTF-8.
+ *
+ * @param {string} text - Texto a resumir
+ * @returns {Promise<string>} Checksum en hexadecimal
+ */
+export const sha256Hex = async (text) => {
+  const digest = await crypto.subtle.digest(
+    "SHA-256",
+    new TextEncoder().encode(text)
+  );
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, "0"))
+    .join("");
+};
+
+/**
+ * Aplica un diff sobre el HTML base y verifica los checksums.
+ *
+ * @param {string} baseHTML - HTML sobre el que se calculó el diff
+ * @param {Object} patch - Diff devuelto por el backend
+ * @returns {Promise<string>} HTML resultante
+ * @throws {Error} Si el formato no es soportado o los checksums no coinciden
+ */
+export const applyHtmlPatch = async (baseHTML, patch) => {
+  if (patch?.format !== PATCH_FORMAT) {
+    throw new Error(`Formato de diff no soportado: ${patch?.format}`);
+  }
+
+  if ((await sha256Hex(baseHTML)) !== patch.baseChecksum) {
+    throw new Error("El HTML base no coincide con el checksum del diff");
+  }
+
+  const units = splitHtmlUnits(baseHTML);
+  const parts = [];
+  let cursor = 0;
+  for (const [start, end, text] of patch.ops) {
+    parts.push(...units.slice(cursor, start), text);
+    cursor = end;
+  }
+  parts.push(...units.slice(cursor));
+
+  const result = parts.join("");
+  if ((await sha256Hex(result)) !== patch.resultChecksum) {
+    throw new Error("El HTML resultante no coincide con el checksum del diff");
+  }
+
+  return result;
+};
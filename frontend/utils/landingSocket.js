@@ -0,0 +1,131 @@
+/**
+ * Cliente WebSocket para las sesiones de edición conversacional.
+ *
+ * La sesión guarda el HTML actual y el historial en el servidor: cada turno
+ * envía solo la instrucción y recibe el progreso y el resultado por la misma
+ * conexión. Si la conexión se corta, `connect()` la reabre retomando la misma
+ * sesión mientras el servidor la conserve. Ver el protocolo en
+ * `backend/routes/session.py`.
+ */
+
+export const SESSION_URL = "ws://localhost:8001/api/ws/landing-session";
+
+export class LandingSocket {
+  constructor(url = SESSION_URL) {
+    this.url = url;
+    this.socket = null;
+    this.sessionId = null;
+    this.syncedHTML = null; // Último HTML que el servidor tiene para esta sesión
+    this.pending = null; // { resolve, reject, onProgress } del turno en curso
+  }
+
+  /**
+   * Abre la conexión y espera a que el servidor asigne la sesión. Si ya hubo
+   * una sesión, pide retomarla; si expiró, el servidor crea otra vacía.
+   *
+   * @returns {Promise<void>}
+   */
+  connect() {
+    return new Promise((resolve, reject) => {
+      const url = this.sessionId
+        ? `${this.url}?sessionId=${encodeURIComponent(this.sessionId)}`
+        : this.url;
+      const socket = new WebSocket(url);
+      this.socket = socket;
+
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === "session") {
+          if (!message.resumed) {
+            this.syncedHTML = null; // Sesión nueva: el servidor todavía no tiene el HTML
+          }
+          this.sessionId = message.sessionId;
+          resolve();
+        } else {
+          this._dispatch(message);
+        }
+      };
+      socket.onerror = () => reject(new Error("No se pudo abrir la sesión WebSocket"));
+      socket.onclose = () => {
+        // Se conserva sessionId para retomar la sesión al reconectar
+        this.socket = null;
+        this.pending?.reject(new Error("La sesión WebSocket se cerró"));
+        this.pending = null;
+      };
+    });
+  }
+
+  get isReady() {
+    return this.socket?.readyState === WebSocket.OPEN && !!this.sessionId;
+  }
+
+  /**
+   * Reemplaza el estado de la sesión con el HTML e historial del cliente.
+   * El historial se envía sin las páginas embebidas.
+   *
+   * @param {string} html - HTML actual
+   * @param {Array} history - Historial de la conversación
+   */
+  sync(html, history) {
+    this._send({
+      type: "sync",
+      html,
+      history: history.map(({ id, type, userInput, timestamp }) => ({
+        id,
+        type,
+        userInput,
+        timestamp,
+      })),
+    });
+  }
+
+  /**
+   * Pide una modificación sobre el HTML de la sesión.
+   *
+   * @param {string} instruction - Instrucción del usuario
+   * @param {Function} onProgress - Callback con los caracteres recibidos
+   * @returns {Promise<Object>} Resultado con `html` o `patch`
+   */
+  modify(instruction, onProgress) {
+    return this._request(
+      { type: "modify", instruction, responseFormat: "diff" },
+      onProgress
+    );
+  }
+
+  close() {
+    this.socket?.close();
+  }
+
+  _request(message, onProgress) {
+    if (this.pending) {
+      return Promise.reject(new Error("Ya hay un turno en curso en la sesión"));
+    }
+    return new Promise((resolve, reject) => {
+      this.pending = { resolve, reject, onProgress };
+      this._send(message);
+    });
+  }
+
+  _send(message) {
+    if (!this.isReady) {
+      throw new Error("La sesión WebSocket no está conectada");
+    }
+    this.socket.send(JSON.stringify(message));
+  }
+
+  _dispatch(message) {
+    const pending = this.pending;
+    if (!pending) return;
+
+    if (message.type === "progress") {
+      pending.onProgress?.(message.chars);
+    } else if (message.type === "result") {
+      this.pending = null;
+      pending.resolve(message);
+    } else if (message.type === "error") {
+      this.pending = null;
+      pending.reject(new Error(message.detail));
+    }
+  }
+}
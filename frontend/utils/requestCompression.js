@@ -0,0 +1,57 @@
+/**
+ * Compresión de los cuerpos JSON que se envían al backend.
+ *
+ * Las peticiones a /api/modify-landing llevan la página actual y el historial
+ * reciente, así que pesan cientos de KB. Si el navegador tiene
+ * `CompressionStream`, el cuerpo se envía con gzip y el header
+ * `Content-Encoding: gzip`; el backend lo descomprime antes de validarlo
+ * (`backend/utils/compression.py`).
+ */
+
+// Por debajo de este tamaño comprimir no compensa el costo de CPU
+export const COMPRESSION_THRESHOLD = 8 * 1024;
+
+/**
+ * Serializa un payload a JSON y lo comprime con gzip si conviene.
+ *
+ * @param {Object} payload - Cuerpo de la petición
+ * @returns {Promise<{data: (string|ArrayBuffer), headers: Object}>} Cuerpo y headers para axios
+ */
+export const compressJsonBody = async (payload) => {
+  const json = JSON.stringify(payload);
+  const headers = { "Content-Type": "application/json" };
+
+  if (
+    typeof CompressionStream === "undefined" ||
+    json.length < COMPRESSION_THRESHOLD
+  ) {
+    return { data: json, headers };
+  }
+
+  try {
+    const stream = new Blob([json])
+      .stream()
+      .pipeThrough(new CompressionStream("gzip"));
+    const data = await new Response(stream).arrayBuffer();
+    return { data, headers: { ...headers, "Content-Encoding": "gzip" } };
+  } catch (err) {
+    console.warn(
+      "No se pudo comprimir el cuerpo, se envía sin comprimir:",
+      err
+    );
+    return { data: json, headers };
+  }
+};
+
+/**
+ * Envía un POST con el cuerpo JSON comprimido.
+ *
+ * @param {Object} client - Instancia de axios
+ * @param {string} url - URL del endpoint
+ * @param {Object} payload - Cuerpo de la petición
+ * @returns {Promise<Object>} Respuesta de axios
+ */
+export const postCompressedJson = async (client, url, payload) => {
+  const { data, headers } = await compressJsonBody(payload);
+  return client.post(url, data, { headers });
+};